@@ -0,0 +1,39 @@
+"""create sifen_ruc_cache
+
+Revision ID: 5e9b2d4f8a16
+Revises: c7d3a5e91b20
+Create Date: 2026-10-16 23:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9b2d4f8a16'
+down_revision: Union[str, None] = 'c7d3a5e91b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sifen_ruc_cache',
+        sa.Column('ruc', sa.String(length=20), nullable=False),
+        sa.Column('found', sa.Boolean(), nullable=False),
+        sa.Column('code', sa.String(length=10), nullable=False),
+        sa.Column('message', sa.String(length=500), nullable=False),
+        sa.Column('razon_social', sa.String(length=255), nullable=True),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('queried_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('ruc'),
+    )
+    op.create_index('ix_sifen_ruc_cache_expires_at', 'sifen_ruc_cache', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sifen_ruc_cache_expires_at', table_name='sifen_ruc_cache')
+    op.drop_table('sifen_ruc_cache')
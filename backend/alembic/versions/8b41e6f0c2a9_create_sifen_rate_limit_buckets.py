@@ -0,0 +1,32 @@
+"""create sifen_rate_limit_buckets
+
+Revision ID: 8b41e6f0c2a9
+Revises: 3f2a9c1d7e54
+Create Date: 2026-10-16 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b41e6f0c2a9'
+down_revision: Union[str, None] = '3f2a9c1d7e54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sifen_rate_limit_buckets',
+        sa.Column('bucket', sa.String(length=100), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sifen_rate_limit_buckets')
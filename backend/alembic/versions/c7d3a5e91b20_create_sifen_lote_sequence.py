@@ -0,0 +1,32 @@
+"""create sifen_lote_sequence
+
+Revision ID: c7d3a5e91b20
+Revises: 8b41e6f0c2a9
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d3a5e91b20'
+down_revision: Union[str, None] = '8b41e6f0c2a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    sequence = op.create_table(
+        'sifen_lote_sequence',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    op.bulk_insert(sequence, [{'name': 'lote', 'value': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('sifen_lote_sequence')
@@ -132,6 +132,14 @@ class Settings(BaseSettings):
         default=3, description="Máximo reintentos SIFEN")
     SIFEN_RETRY_DELAY: int = Field(
         default=5, description="Delay entre reintentos SIFEN")
+    SIFEN_OUTBOX_WORKERS: int = Field(
+        default=0, ge=0,
+        description="Workers del outbox de envíos en este proceso (0 = deshabilitado)"
+    )
+    EXISTENCE_INDEX_WARMUP: bool = Field(
+        default=True,
+        description="Construir al iniciar el índice de CDCs en memoria (en segundo plano)"
+    )
 
     # === CONFIGURACIÓN DE ARCHIVOS ===
     UPLOAD_PATH: Path = Field(
@@ -140,6 +148,10 @@ class Settings(BaseSettings):
     )
     MAX_FILE_SIZE_MB: int = Field(
         default=10, description="Tamaño máximo archivo en MB")
+    RUC_INDEX_PATH: Optional[Path] = Field(
+        default=None,
+        description="Índice binario del registro de RUCs SET (ver app/utils/ruc_registry.py)"
+    )
 
     # === CONFIGURACIÓN DE LOGGING ===
     LOG_LEVEL: str = Field(default="INFO", description="Nivel de logging")
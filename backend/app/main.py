@@ -1,14 +1,70 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from .core.database import get_db
+from .core.config import settings
+from .core.database import engine, get_db
+from .services.xml_generator.template_registry import warmup_templates
+from .services.xml_generator.fragment_cache import register_model_invalidation
+from .services.xml_generator.schema_registry import preload_schemas
+from .repositories.existence_index import warmup_existence_indexes
+from .utils.ruc_registry import configure_ruc_registry
+from .services.sifen_client.config import SifenConfig
+from .services.sifen_client.wsdl_bundle import preload_wsdl_documents
+from .services.sifen_client.transport_manager import close_transport_managers
+from .services.sifen_client.rate_limiter import configure_rate_limit_store
+from .services.sifen_client.lote import configure_lote_sequence
+from .services.sifen_client.outbox_worker import run_outbox_workers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Precompilar templates XML antes de atender el primer request
+    warmup_templates()
+    # Compilar los esquemas XSD una vez, con instancias para los threads del pool
+    preload_schemas()
+    # Invalidar fragmentos emisor/timbrado cuando cambian Empresa/Timbrado
+    register_model_invalidation()
+    # Índice de CDC en memoria; se construye en segundo plano para no
+    # demorar el arranque con el escaneo de la tabla
+    if settings.EXISTENCE_INDEX_WARMUP:
+        warmup_existence_indexes(background=True)
+    # Registro SET local para validar RUCs de clientes sin consultaRUC
+    if settings.RUC_INDEX_PATH:
+        configure_ruc_registry(settings.RUC_INDEX_PATH)
+    # WSDL empaquetados solo si se habilitaron (pruebas offline)
+    sifen_config = SifenConfig.from_env()
+    if sifen_config.use_bundled_wsdl:
+        preload_wsdl_documents(sifen_config)
+    # Buckets de rate limiting SIFEN en la base compartida por todos los procesos
+    configure_rate_limit_store(engine)
+    # dId de lotes desde la secuencia compartida por todos los procesos y nodos
+    configure_lote_sequence(engine)
+    # Outbox durable de envíos (tabla creada por alembic); los workers son
+    # opcionales por proceso
+    outbox_stop = asyncio.Event()
+    outbox_task = None
+    if settings.SIFEN_OUTBOX_WORKERS:
+        outbox_task = asyncio.create_task(run_outbox_workers(
+            workers=settings.SIFEN_OUTBOX_WORKERS, stop_event=outbox_stop, engine=engine))
+    yield
+    # Terminar los envíos en curso del outbox antes de cerrar el pool
+    outbox_stop.set()
+    if outbox_task is not None:
+        await outbox_task
+    # Cerrar el pool HTTP compartido con SIFEN
+    await close_transport_managers()
+
 
 app = FastAPI(
     title="SIFEN Facturación Electrónica",
     description="API para facturación electrónica en Paraguay",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configuración CORS
@@ -4,7 +4,6 @@
 # ===============================================
 
 from .user import User
-from .empresa import Empresa
 from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Text
 from sqlalchemy.orm import relationship, validates
 from .base import BaseModel
@@ -33,6 +33,7 @@ from app.core.exceptions import (
 )
 from app.models.cliente import Cliente, TipoClienteEnum, TipoDocumentoEnum
 from app.schemas.cliente import ClienteCreateDTO, ClienteUpdateDTO
+from app.utils.ruc_registry import get_ruc_registry
 from app.utils.ruc_utils import is_valid_ruc
 from .base import BaseRepository, RepositoryFilter
 from .utils import safe_get, safe_set, safe_bool, safe_str
@@ -513,7 +514,9 @@ class ClienteRepository(BaseRepository[Cliente, ClienteCreateDTO, ClienteUpdateD
             bool: True si es válido
 
         Raises:
-            SifenRUCValidationError: Si es contribuyente y el RUC no es válido
+            SifenRUCValidationError: Si es contribuyente y el RUC no es válido,
+                o si el registro SET local está cargado y el RUC no figura
+                como contribuyente activo
         """
         if not es_contribuyente:
             return True  # No contribuyentes no necesitan RUC válido
@@ -527,6 +530,13 @@ class ClienteRepository(BaseRepository[Cliente, ClienteCreateDTO, ClienteUpdateD
                 reason="Formato de RUC inválido para Paraguay"
             )
 
+        # Registro SET local (sin consulta al servicio consultaRUC)
+        registry = get_ruc_registry()
+        if registry is not None and registry.ready:
+            valido, motivo = registry.verify(normalized_ruc)
+            if not valido:
+                raise SifenRUCValidationError(ruc=numero_documento, reason=motivo)
+
         return True
 
     # === OVERRIDE DE MÉTODOS BASE ===
@@ -50,6 +50,7 @@ from app.schemas.documento import (
     DocumentoEstadoDTO,
     DocumentoSifenDTO
 )
+from ..sifen_outbox import encolar_envio as registrar_en_outbox
 from .utils import (
     VALID_STATE_TRANSITIONS,
     EDITABLE_STATES,
@@ -298,14 +299,20 @@ class SifenStateMixin:
     def marcar_como_firmado(self,
                             documento_id: int,
                             xml_firmado: str,
-                            certificado_serial: Optional[str] = None) -> Documento:
+                            certificado_serial: Optional[str] = None,
+                            encolar_envio: bool = False) -> Documento:
         """
         Marca un documento como firmado digitalmente.
 
+        Con encolar_envio el envío a SIFEN se registra en sifen_outbox en
+        la misma transacción que el cambio de estado; lo envían los workers
+        de app/services/sifen_client/outbox_worker.py.
+
         Args:
             documento_id: ID del documento
             xml_firmado: XML con firma digital
             certificado_serial: Serial del certificado usado
+            encolar_envio: Registrar el envío en el outbox durable
 
         Returns:
             Documento: Documento actualizado
@@ -332,6 +339,10 @@ class SifenStateMixin:
             if certificado_serial:
                 datos_adicionales["certificado_serial"] = certificado_serial
 
+            # Sin commit: se confirma junto con el cambio de estado
+            if encolar_envio:
+                registrar_en_outbox(self.db, documento_id, certificado_serial)
+
             documento = self.actualizar_estado_documento(
                 documento_id,
                 EstadoDocumentoSifenEnum.FIRMADO.value,
@@ -348,7 +359,8 @@ class SifenStateMixin:
                 documento_id,
                 {
                     "xml_firmado_size": len(xml_firmado),
-                    "has_certificado": bool(certificado_serial)
+                    "has_certificado": bool(certificado_serial),
+                    "encolado": encolar_envio
                 }
             )
 
@@ -416,6 +428,98 @@ class SifenStateMixin:
                 e, "marcar_como_enviado", "Documento", documento_id)
             raise
 
+    def registrar_envio_lote(self,
+                             documento_ids: List[int],
+                             numero_protocolo_lote: str,
+                             codigo_respuesta: Optional[str] = None,
+                             mensaje: Optional[str] = None) -> int:
+        """
+        Marca como enviados los documentos de un lote rLoteDE recibido por SIFEN.
+
+        Guarda el protocolo del lote en numero_protocolo de cada documento
+        (sirve para consultar el resultado del lote); el protocolo de
+        autorización individual lo reemplaza luego procesar_respuesta_sifen.
+        Se actualizan todos los documentos con un único UPDATE; los que no
+        pueden pasar a "enviado" desde su estado actual se omiten.
+
+        Args:
+            documento_ids: IDs de los documentos incluidos en el lote
+            numero_protocolo_lote: Protocolo de recepción del lote
+            codigo_respuesta: Código de recepción del lote (opcional)
+            mensaje: Mensaje de recepción del lote (opcional)
+
+        Returns:
+            int: Cantidad de documentos actualizados
+
+        Example:
+            >>> actualizados = mixin.registrar_envio_lote(
+            ...     [101, 102, 103], "LOTE123456789", "0300", "Lote recibido"
+            ... )
+        """
+        start_time = datetime.now()
+
+        try:
+            if not numero_protocolo_lote:
+                raise SifenValidationError(
+                    "Número de protocolo del lote es requerido",
+                    field="numero_protocolo_lote"
+                )
+
+            if not documento_ids:
+                return 0
+
+            estado_enviado = EstadoDocumentoSifenEnum.ENVIADO.value
+            estados_origen = [
+                estado for estado, destinos in VALID_STATE_TRANSITIONS.items()
+                if estado_enviado in destinos
+            ]
+
+            now = datetime.now()
+            valores: Dict[str, Any] = {
+                "estado": estado_enviado,
+                "numero_protocolo": numero_protocolo_lote,
+                "fecha_envio_sifen": now,
+                "updated_at": now
+            }
+            if codigo_respuesta:
+                valores["codigo_respuesta_sifen"] = codigo_respuesta
+            if mensaje:
+                valores["mensaje_sifen"] = mensaje
+
+            actualizados = self.db.query(self.model).filter(
+                self.model.id.in_(documento_ids),
+                self.model.estado.in_(estados_origen)
+            ).update(valores, synchronize_session=False)
+
+            self.db.commit()
+
+            # Log de operación
+            duration = (datetime.now() - start_time).total_seconds()
+            log_performance_metric(
+                "registrar_envio_lote", duration, len(documento_ids))
+
+            log_repository_operation(
+                "registrar_envio_lote",
+                "Documento",
+                None,
+                {
+                    "documentos": len(documento_ids),
+                    "actualizados": actualizados,
+                    "omitidos": len(documento_ids) - actualizados,
+                    "codigo_respuesta": codigo_respuesta
+                }
+            )
+
+            return actualizados
+
+        except SifenValidationError:
+            raise
+        except Exception as e:
+            self.db.rollback()
+            handle_repository_error(
+                e, "registrar_envio_lote", "Documento", None)
+            raise handle_database_exception(e, "registrar_envio_lote")
+
     def marcar_como_cancelado(self,
                               documento_id: int,
                               motivo: str,
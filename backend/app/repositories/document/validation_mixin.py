@@ -71,6 +71,11 @@ from .utils import (
     log_performance_metric,
     handle_repository_error
 )
+from ..existence_index import (
+    CDC_INDEX,
+    get_existence_index,
+    rebuild_existence_indexes
+)
 
 logger = get_logger(__name__)
 
@@ -273,18 +278,27 @@ class DocumentoValidationMixin:
                     value=cdc
                 )
 
-            # Construir query
-            query = self.db.query(self.model).filter(
-                text("cdc = :cdc")
-            ).params(cdc=cdc_normalized)
+            # Índice en memoria: un negativo evita la consulta
+            index = get_existence_index(CDC_INDEX)
+            if not index.might_contain(cdc_normalized):
+                is_available = True
+            else:
+                # Construir query
+                query = self.db.query(self.model).filter(
+                    text("cdc = :cdc")
+                ).params(cdc=cdc_normalized)
 
-            # Excluir documento específico si se proporciona
-            if exclude_id:
-                query = query.filter(self.model.id != exclude_id)
+                # Excluir documento específico si se proporciona
+                if exclude_id:
+                    query = query.filter(self.model.id != exclude_id)
 
-            # Verificar existencia
-            existing = query.first()
-            is_available = existing is None
+                # Verificar existencia
+                existing = query.first()
+                is_available = existing is None
+
+                # Con exclude_id un "no existe" no indica falso positivo
+                if not exclude_id:
+                    index.record_confirmation(not is_available)
 
             # Log de operación
             duration = (datetime.now() - start_time).total_seconds()
@@ -309,6 +323,26 @@ class DocumentoValidationMixin:
             handle_repository_error(e, "is_cdc_disponible", "Documento")
             raise handle_database_exception(e, "is_cdc_disponible")
 
+    def rebuild_existence_indexes(self) -> Dict[str, int]:
+        """
+        Reconstruye desde la BD los índices de existencia del proceso.
+
+        Descarta CDCs de documentos borrados y carga los insertados por
+        otros procesos.
+
+        Returns:
+            Dict[str, int]: Claves cargadas por índice
+
+        Example:
+            >>> mixin.rebuild_existence_indexes()
+            {'documento.cdc': 120431}
+        """
+        try:
+            return rebuild_existence_indexes(self.db)
+        except Exception as e:
+            handle_repository_error(e, "rebuild_existence_indexes", "Documento")
+            raise handle_database_exception(e, "rebuild_existence_indexes")
+
     def validate_unique_constraints(self,
                                     document_data: Dict[str, Any],
                                     exclude_id: Optional[int] = None) -> None:
@@ -0,0 +1,404 @@
+"""
+Índices de existencia en memoria (filtro de Bloom) para chequeos de unicidad.
+
+Crear un documento verifica que su CDC no exista. Casi todas las
+respuestas son "no existe", y cada una costaba una consulta a la BD.
+Este módulo mantiene por proceso un filtro de Bloom por clave única:
+
+- Respuesta negativa del filtro: la clave seguro no existe, no se consulta la BD.
+- Respuesta positiva: puede ser un falso positivo, se confirma en la BD.
+
+El filtro se construye al iniciar la aplicación desde la tabla, y se
+mantiene con listeners SQLAlchemy en cada insert/update del modelo. Las
+bajas no se pueden quitar de un filtro de Bloom: quedan como falsos
+positivos (confirmados en BD) hasta la próxima reconstrucción.
+
+Otros procesos también insertan, y este proceso no ve esas filas hasta
+reconstruir. Por eso solo se indexan columnas con restricción UNIQUE en
+la BD, que sigue siendo la garantía final: el índice solo evita
+consultas, no reemplaza la restricción. La numeración de facturas no
+tiene esa restricción y check_numero_duplicado siempre consulta la BD.
+
+Índices:
+- CDC_INDEX: Documento.cdc (is_cdc_disponible)
+
+Uso:
+    index = get_existence_index(CDC_INDEX)
+    if not index.might_contain(cdc):
+        disponible = True          # sin consulta
+    else:
+        existe = consultar_bd(cdc)
+        index.record_confirmation(existe)
+
+path: app/repositories/existence_index.py
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# ===============================================
+# CONFIGURACIÓN
+# ===============================================
+
+CDC_INDEX = "documento.cdc"
+
+# Claves esperadas por índice si no se conoce el tamaño de la tabla
+DEFAULT_CAPACITY = 1_000_000
+
+# Tasa de falsos positivos objetivo
+DEFAULT_ERROR_RATE = 0.001
+
+# Margen de crecimiento al dimensionar desde la tabla
+CAPACITY_GROWTH_FACTOR = 2
+
+# Filas por lote al leer la tabla
+REBUILD_BATCH_SIZE = 10_000
+
+
+# ===============================================
+# FILTRO DE BLOOM
+# ===============================================
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un bytearray
+
+    Las k posiciones de cada clave salen de un único hash blake2b de 128
+    bits (doble hashing: h1 + i*h2).
+    """
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        """
+        Args:
+            capacity: Claves esperadas
+            error_rate: Tasa de falsos positivos con capacity claves
+        """
+        if capacity < 1:
+            raise ValueError("capacity debe ser mayor a 0")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate debe estar entre 0 y 1")
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> None:
+        bits = self._bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def estimated_error_rate(self) -> float:
+        """Tasa de falsos positivos esperada con las claves cargadas"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+# ===============================================
+# ÍNDICE DE EXISTENCIA
+# ===============================================
+
+class ExistenceIndex:
+    """
+    Filtro de Bloom con reconstrucción atómica y métricas de aciertos
+
+    Hasta la primera reconstrucción el índice no está listo y
+    might_contain responde True: todas las consultas van a la BD.
+    """
+
+    def __init__(self, name: str,
+                 capacity: int = DEFAULT_CAPACITY,
+                 error_rate: float = DEFAULT_ERROR_RATE):
+        self.name = name
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: Optional[BloomFilter] = None
+        # Claves insertadas mientras se reconstruye (se aplican al nuevo filtro)
+        self._pending: Optional[list] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._stats = {
+            'lookups': 0,
+            'negatives': 0,
+            'positives': 0,
+            'false_positives': 0,
+            'bypassed': 0,
+            'rebuilds': 0,
+            'last_rebuild_ms': 0.0
+        }
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def rebuild(self, keys: Iterable[Optional[str]],
+                expected: Optional[int] = None) -> int:
+        """
+        Construye un filtro nuevo con las claves y lo reemplaza de forma atómica
+
+        Args:
+            keys: Claves existentes (None se ignora)
+            expected: Cantidad de claves esperada, para dimensionar el filtro
+
+        Returns:
+            int: Claves cargadas
+        """
+        with self._rebuild_lock:
+            start = time.perf_counter()
+            capacity = max(self.capacity, (expected or 0) * CAPACITY_GROWTH_FACTOR)
+            bloom = BloomFilter(capacity, self.error_rate)
+            with self._lock:
+                self._pending = []
+
+            try:
+                for key in keys:
+                    if key:
+                        bloom.add(key)
+            except BaseException:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                for key in self._pending:
+                    bloom.add(key)
+                self._pending = None
+                self._filter = bloom
+                self._stats['rebuilds'] += 1
+                self._stats['last_rebuild_ms'] = (time.perf_counter() - start) * 1000
+
+        logger.info(f"Índice {self.name} reconstruido: {bloom.count} claves, "
+                    f"{bloom.size_bytes} bytes, "
+                    f"{self._stats['last_rebuild_ms']:.1f}ms")
+        return bloom.count
+
+    def add(self, key: Optional[str]) -> None:
+        """Registra una clave insertada"""
+        if not key:
+            return
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(key)
+            if self._pending is not None:
+                self._pending.append(key)
+
+    def might_contain(self, key: str) -> bool:
+        """
+        False si la clave seguro no existe; True si hay que confirmar en la BD
+        """
+        with self._lock:
+            self._stats['lookups'] += 1
+            if self._filter is None:
+                self._stats['bypassed'] += 1
+                return True
+            if key in self._filter:
+                self._stats['positives'] += 1
+                return True
+            self._stats['negatives'] += 1
+            return False
+
+    def record_confirmation(self, exists: bool) -> None:
+        """Resultado de la BD tras un positivo del filtro (mide falsos positivos)"""
+        if not exists:
+            with self._lock:
+                self._stats['false_positives'] += 1
+
+    def clear(self) -> None:
+        """Descarta el filtro (el índice deja de estar listo)"""
+        with self._lock:
+            self._filter = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de consultas evitadas y tasa de falsos positivos"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            bloom = self._filter
+            stats['ready'] = bloom is not None
+            stats['keys'] = bloom.count if bloom else 0
+            stats['capacity'] = bloom.capacity if bloom else self.capacity
+            stats['size_bytes'] = bloom.size_bytes if bloom else 0
+            stats['num_hashes'] = bloom.num_hashes if bloom else 0
+            stats['estimated_fp_rate'] = bloom.estimated_error_rate() if bloom else 0.0
+
+        # Entre claves inexistentes: cuántas pasaron el filtro igual
+        absent = stats['negatives'] + stats['false_positives']
+        stats['observed_fp_rate'] = stats['false_positives'] / absent if absent else 0.0
+        filtered = stats['lookups'] - stats['bypassed']
+        stats['db_skip_rate'] = stats['negatives'] / filtered if filtered else 0.0
+        stats['saturated'] = stats['keys'] > stats['capacity']
+        return stats
+
+
+# ===============================================
+# ÍNDICES DEL PROCESO
+# ===============================================
+
+_indexes: Dict[str, ExistenceIndex] = {}
+_indexes_lock = threading.Lock()
+_listeners_registered = False
+
+
+def get_existence_index(name: str) -> ExistenceIndex:
+    """Índice de existencia compartido por el proceso"""
+    index = _indexes.get(name)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(name)
+            if index is None:
+                index = _indexes[name] = ExistenceIndex(name)
+    return index
+
+
+def reset_existence_indexes() -> None:
+    """Descarta los índices del proceso (usado en tests)"""
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def get_existence_index_stats() -> Dict[str, Dict[str, Any]]:
+    """Métricas de todos los índices del proceso"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    return {index.name: index.get_stats() for index in indexes}
+
+
+def _stream(db, *columns):
+    """Filas de las columnas, leídas por lotes"""
+    return db.query(*columns).yield_per(REBUILD_BATCH_SIZE)
+
+
+def _index_loaders() -> Dict[str, Callable]:
+    """Por índice: (consulta de claves, conteo esperado) sobre una sesión"""
+    from sqlalchemy import func
+    from app.models.documento import Documento
+
+    def cdc_loader(db):
+        total = db.query(func.count(Documento.id)).filter(Documento.cdc.isnot(None)).scalar()
+        keys = (cdc for (cdc,) in _stream(db, Documento.cdc).filter(Documento.cdc.isnot(None)))
+        return keys, total
+
+    return {CDC_INDEX: cdc_loader}
+
+
+def rebuild_existence_indexes(db, names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Reconstruye los índices desde la BD (comando de reconstrucción)
+
+    Llamar al iniciar la aplicación y cuando se quiera limpiar claves
+    borradas o recuperar inserts hechos por otros procesos.
+
+    Args:
+        db: Sesión SQLAlchemy
+        names: Índices a reconstruir (todos por defecto)
+
+    Returns:
+        Dict[str, int]: Claves cargadas por índice
+    """
+    loaders = _index_loaders()
+    result = {}
+    for name in names or loaders:
+        keys, total = loaders[name](db)
+        result[name] = get_existence_index(name).rebuild(keys, expected=total)
+    return result
+
+
+def register_index_listeners() -> None:
+    """
+    Mantiene los índices al día: conecta listeners de insert/update sobre
+    Documento (y sus subclases). Es idempotente; llamar al iniciar la
+    aplicación.
+    """
+    global _listeners_registered
+    with _indexes_lock:
+        if _listeners_registered:
+            return
+
+        from sqlalchemy import event, inspect
+        from app.models.documento import Documento
+
+        def changed(target, *fields) -> bool:
+            state = inspect(target)
+            return any(state.attrs[name].history.has_changes() for name in fields)
+
+        def on_documento_insert(mapper, connection, target) -> None:
+            get_existence_index(CDC_INDEX).add(target.cdc)
+
+        def on_documento_update(mapper, connection, target) -> None:
+            if changed(target, "cdc"):
+                on_documento_insert(mapper, connection, target)
+
+        event.listen(Documento, "after_insert", on_documento_insert, propagate=True)
+        event.listen(Documento, "after_update", on_documento_update, propagate=True)
+        _listeners_registered = True
+        logger.info("Índices de existencia registrados para Documento")
+
+
+def _build_existence_indexes() -> None:
+    # Sin listeners los inserts nuevos no entrarían al filtro y un negativo
+    # dejaría de ser confiable: en ese caso el índice no se construye
+    try:
+        register_index_listeners()
+    except Exception as e:
+        logger.warning(f"Índices de existencia deshabilitados: {e}")
+        return
+    try:
+        from app.core.database import get_db_context
+        with get_db_context() as db:
+            rebuild_existence_indexes(db)
+    except Exception as e:
+        logger.warning(f"No se pudieron construir los índices de existencia: {e}")
+
+
+def warmup_existence_indexes(background: bool = False) -> None:
+    """
+    Registra los listeners y construye los índices al iniciar la aplicación
+
+    Con background=True el registro de listeners y la construcción (un
+    escaneo completo de la tabla) corren en un thread aparte y el arranque
+    no los espera. Mientras no termina, o si los modelos o la BD no están
+    disponibles, los índices no están listos y las verificaciones de
+    unicidad consultan la BD como antes.
+    """
+    if background:
+        threading.Thread(
+            target=_build_existence_indexes, name="existence-index-warmup", daemon=True
+        ).start()
+    else:
+        _build_existence_indexes()
+
+
+__all__ = [
+    'CDC_INDEX',
+    'BloomFilter',
+    'ExistenceIndex',
+    'get_existence_index',
+    'reset_existence_indexes',
+    'get_existence_index_stats',
+    'rebuild_existence_indexes',
+    'register_index_listeners',
+    'warmup_existence_indexes',
+]
@@ -0,0 +1,287 @@
+"""
+Outbox durable para el envío de documentos firmados a SIFEN.
+
+marcar_como_firmado(..., encolar_envio=True) inserta una fila en
+sifen_outbox dentro de la misma transacción que el cambio de estado: si
+el documento quedó firmado, su envío quedó registrado. Los workers
+(app/services/sifen_client/outbox_worker.py) reclaman filas con
+SELECT ... FOR UPDATE SKIP LOCKED, por lo que cualquier cantidad de
+procesos y nodos reparte el trabajo sin tomar dos veces la misma fila.
+
+Estados de una fila:
+- pending: esperando available_at (primer envío o reintento con backoff)
+- processing: tomada por un worker hasta locked_until
+- done: respuesta SIFEN registrada en el documento
+- failed: error definitivo o reintentos agotados
+
+Si un worker muere con filas en processing, el lease vence y otro worker
+las vuelve a tomar: no se pierde ningún envío. Mientras un envío sigue en
+curso el worker renueva su lease (renew_lease), así una secuencia larga de
+reintentos no entrega la fila a otro worker.
+
+La tabla la crea la migración alembic (alembic/versions); la aplicación
+no ejecuta DDL al arrancar. create_outbox_table queda para tests.
+
+En SQLite (tests) FOR UPDATE se omite; el UPDATE condicionado al estado
+leído evita igualmente que dos workers confirmen la misma fila.
+
+path: app/repositories/sifen_outbox.py
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, Text,
+    and_, func, insert, or_, select, update
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# ===============================================
+# TABLA OUTBOX
+# ===============================================
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+metadata = MetaData()
+
+outbox_table = Table(
+    "sifen_outbox",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("documento_id", Integer, nullable=False, unique=True,
+           doc="Documento firmado a enviar"),
+    Column("certificado_serial", String(100), nullable=True,
+           doc="Serial del certificado con el que se firmó"),
+    Column("status", String(20), nullable=False, default=STATUS_PENDING),
+    Column("attempts", Integer, nullable=False, default=0,
+           doc="Envíos intentados"),
+    Column("available_at", DateTime, nullable=False,
+           doc="Momento desde el que la fila puede tomarse"),
+    Column("locked_by", String(100), nullable=True, doc="Worker que tiene la fila"),
+    Column("locked_until", DateTime, nullable=True, doc="Vencimiento del lease"),
+    Column("last_code", String(10), nullable=True, doc="Último código SIFEN"),
+    Column("last_error", Text, nullable=True, doc="Último error de envío"),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Index("ix_sifen_outbox_claim", "status", "available_at"),
+)
+
+
+def create_outbox_table(bind: Union[Engine, Connection]) -> None:
+    """Crea la tabla sifen_outbox si no existe (tests; en producción, alembic)"""
+    metadata.create_all(bind, tables=[outbox_table], checkfirst=True)
+
+
+def encolar_envio(db: Union[Session, Connection],
+                  documento_id: int,
+                  certificado_serial: Optional[str] = None,
+                  disponible_desde: Optional[datetime] = None) -> bool:
+    """
+    Registra el envío de un documento en la transacción actual (sin commit).
+
+    Es idempotente: si el documento ya tiene una fila pendiente o en
+    proceso no se duplica; una fila failed o done vuelve a pending.
+
+    Args:
+        db: Sesión o conexión con la transacción del cambio de estado
+        documento_id: ID del documento firmado
+        certificado_serial: Serial del certificado usado para firmar
+        disponible_desde: Primer intento (default: ahora)
+
+    Returns:
+        bool: True si se creó o reactivó la fila
+    """
+    now = datetime.now()
+    existente = db.execute(
+        select(outbox_table.c.id, outbox_table.c.status)
+        .where(outbox_table.c.documento_id == documento_id)
+    ).first()
+
+    if existente is None:
+        db.execute(insert(outbox_table).values(
+            documento_id=documento_id,
+            certificado_serial=certificado_serial,
+            status=STATUS_PENDING,
+            attempts=0,
+            available_at=disponible_desde or now,
+            created_at=now,
+            updated_at=now
+        ))
+        return True
+
+    if existente.status in (STATUS_PENDING, STATUS_PROCESSING):
+        return False
+
+    db.execute(
+        update(outbox_table)
+        .where(outbox_table.c.id == existente.id)
+        .values(status=STATUS_PENDING, attempts=0, available_at=disponible_desde or now,
+                certificado_serial=certificado_serial, locked_by=None,
+                locked_until=None, last_error=None, updated_at=now)
+    )
+    return True
+
+
+class SifenOutboxStore:
+    """
+    Operaciones de los workers sobre sifen_outbox.
+
+    Cada método usa una transacción corta propia sobre el engine; ninguna
+    transacción queda abierta mientras se espera la respuesta de SIFEN.
+    """
+
+    def __init__(self, engine: Engine, create_table: bool = False):
+        self.engine = engine
+        if create_table:
+            create_outbox_table(engine)
+
+    def claim(self,
+              worker_id: str,
+              limit: int = 10,
+              lease_seconds: int = 300,
+              now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Toma hasta `limit` filas listas para enviar.
+
+        Incluye filas pending con available_at vencido y filas processing
+        cuyo lease expiró (worker caído).
+
+        Returns:
+            List[Dict]: Filas tomadas (id, documento_id, certificado_serial, attempts)
+        """
+        now = now or datetime.now()
+        t = outbox_table
+        disponible = or_(
+            and_(t.c.status == STATUS_PENDING, t.c.available_at <= now),
+            and_(t.c.status == STATUS_PROCESSING, t.c.locked_until < now)
+        )
+
+        with self.engine.begin() as conn:
+            candidatas = conn.execute(
+                select(t.c.id, t.c.status, t.c.attempts)
+                .where(disponible)
+                .order_by(t.c.available_at, t.c.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+
+            tomadas = []
+            for fila in candidatas:
+                resultado = conn.execute(
+                    update(t)
+                    .where(t.c.id == fila.id, t.c.status == fila.status,
+                           t.c.attempts == fila.attempts)
+                    .values(status=STATUS_PROCESSING, attempts=fila.attempts + 1,
+                            locked_by=worker_id,
+                            locked_until=now + timedelta(seconds=lease_seconds),
+                            updated_at=now)
+                )
+                if resultado.rowcount == 1:
+                    tomadas.append(fila.id)
+
+            if not tomadas:
+                return []
+
+            filas = conn.execute(
+                select(t.c.id, t.c.documento_id, t.c.certificado_serial, t.c.attempts)
+                .where(t.c.id.in_(tomadas))
+                .order_by(t.c.id)
+            ).mappings().all()
+
+        return [dict(fila) for fila in filas]
+
+    def renew_lease(self, outbox_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Extiende locked_until de una fila que el worker sigue procesando
+
+        Returns:
+            bool: False si la fila ya no pertenece al worker
+        """
+        t = outbox_table
+        now = datetime.now()
+        with self.engine.begin() as conn:
+            resultado = conn.execute(
+                update(t)
+                .where(t.c.id == outbox_id, t.c.status == STATUS_PROCESSING,
+                       t.c.locked_by == worker_id)
+                .values(locked_until=now + timedelta(seconds=lease_seconds), updated_at=now)
+            )
+        return resultado.rowcount == 1
+
+    def _finish(self, outbox_id: int, worker_id: str, **valores: Any) -> bool:
+        t = outbox_table
+        valores.update(locked_by=None, locked_until=None, updated_at=datetime.now())
+        with self.engine.begin() as conn:
+            resultado = conn.execute(
+                update(t)
+                .where(t.c.id == outbox_id, t.c.status == STATUS_PROCESSING,
+                       t.c.locked_by == worker_id)
+                .values(**valores)
+            )
+        if resultado.rowcount != 1:
+            logger.warning(
+                f"Fila outbox {outbox_id} ya no pertenece al worker {worker_id}")
+        return resultado.rowcount == 1
+
+    def mark_done(self, outbox_id: int, worker_id: str,
+                  codigo: Optional[str] = None) -> bool:
+        """Envío terminado: la respuesta quedó registrada en el documento"""
+        return self._finish(outbox_id, worker_id, status=STATUS_DONE, last_code=codigo)
+
+    def schedule_retry(self, outbox_id: int, worker_id: str, delay_seconds: float,
+                       error: str, codigo: Optional[str] = None) -> bool:
+        """Vuelve la fila a pending con available_at = ahora + backoff"""
+        return self._finish(
+            outbox_id, worker_id,
+            status=STATUS_PENDING,
+            available_at=datetime.now() + timedelta(seconds=delay_seconds),
+            last_error=error[:2000], last_code=codigo
+        )
+
+    def mark_failed(self, outbox_id: int, worker_id: str, error: str,
+                    codigo: Optional[str] = None) -> bool:
+        """Error definitivo o reintentos agotados (requiere intervención)"""
+        return self._finish(outbox_id, worker_id, status=STATUS_FAILED,
+                            last_error=error[:2000], last_code=codigo)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Filas por estado y antigüedad de la fila pendiente más vieja"""
+        t = outbox_table
+        with self.engine.connect() as conn:
+            por_estado = dict(conn.execute(
+                select(t.c.status, func.count()).group_by(t.c.status)
+            ).all())
+            mas_vieja = conn.execute(
+                select(func.min(t.c.available_at)).where(t.c.status == STATUS_PENDING)
+            ).scalar()
+
+        return {
+            "pending": por_estado.get(STATUS_PENDING, 0),
+            "processing": por_estado.get(STATUS_PROCESSING, 0),
+            "done": por_estado.get(STATUS_DONE, 0),
+            "failed": por_estado.get(STATUS_FAILED, 0),
+            "oldest_pending_seconds": (
+                max(0.0, (datetime.now() - mas_vieja).total_seconds()) if mas_vieja else 0.0
+            ),
+        }
+
+
+__all__ = [
+    "outbox_table",
+    "create_outbox_table",
+    "encolar_envio",
+    "SifenOutboxStore",
+    "STATUS_PENDING",
+    "STATUS_PROCESSING",
+    "STATUS_DONE",
+    "STATUS_FAILED",
+]
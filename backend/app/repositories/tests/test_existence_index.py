@@ -0,0 +1,193 @@
+"""
+Tests para el índice de existencia en memoria (filtro de Bloom)
+"""
+import threading
+
+import pytest
+
+from app.repositories.existence_index import (
+    CDC_INDEX,
+    BloomFilter,
+    ExistenceIndex,
+    get_existence_index,
+    get_existence_index_stats,
+    reset_existence_indexes,
+    warmup_existence_indexes,
+)
+from app.repositories import existence_index as existence_index_module
+
+
+@pytest.fixture(autouse=True)
+def _limpiar_indices():
+    reset_existence_indexes()
+    yield
+    reset_existence_indexes()
+
+
+# ===============================================
+# BloomFilter
+# ===============================================
+
+def test_bloom_sin_falsos_negativos():
+    """Test toda clave agregada se reporta como presente"""
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    claves = [f"{i:044d}" for i in range(5000)]
+    for clave in claves:
+        bloom.add(clave)
+
+    assert all(clave in bloom for clave in claves)
+    assert bloom.count == 5000
+
+
+def test_bloom_tasa_de_falsos_positivos():
+    """Test la tasa observada queda cerca de la configurada"""
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(f"presente-{i}")
+
+    falsos = sum(f"ausente-{i}" in bloom for i in range(20000))
+
+    assert falsos / 20000 < 0.03
+    assert bloom.estimated_error_rate() == pytest.approx(0.01, rel=0.5)
+
+
+def test_bloom_vacio_no_contiene_nada():
+    """Test un filtro vacío responde negativo"""
+    bloom = BloomFilter(capacity=100)
+
+    assert "cualquier-clave" not in bloom
+    assert bloom.estimated_error_rate() == 0.0
+
+
+@pytest.mark.parametrize("capacity,error_rate", [(0, 0.01), (100, 0), (100, 1)])
+def test_bloom_parametros_invalidos(capacity, error_rate):
+    """Test capacidad y tasa de error fuera de rango"""
+    with pytest.raises(ValueError):
+        BloomFilter(capacity, error_rate)
+
+
+# ===============================================
+# ExistenceIndex
+# ===============================================
+
+def test_indice_sin_construir_siempre_consulta():
+    """Test antes de la primera reconstrucción todo va a la BD"""
+    index = ExistenceIndex("test")
+
+    assert not index.ready
+    assert index.might_contain("x")
+    assert index.get_stats()['bypassed'] == 1
+
+
+def test_indice_negativo_y_positivo():
+    """Test negativos evitan la BD y positivos se confirman"""
+    index = ExistenceIndex("test", capacity=100)
+    index.rebuild(["a", "b", None, ""])
+
+    assert index.might_contain("a")
+    index.record_confirmation(True)
+    assert not index.might_contain("z")
+
+    stats = index.get_stats()
+    assert stats['keys'] == 2
+    assert stats['positives'] == 1
+    assert stats['negatives'] == 1
+    assert stats['false_positives'] == 0
+    assert stats['db_skip_rate'] == 0.5
+
+
+def test_indice_add_despues_de_construir():
+    """Test los inserts posteriores al warmup quedan indexados"""
+    index = ExistenceIndex("test", capacity=100)
+    index.rebuild([])
+    index.add("nuevo")
+
+    assert index.might_contain("nuevo")
+
+
+def test_rebuild_conserva_inserts_pendientes():
+    """Test claves insertadas durante la reconstrucción no se pierden"""
+    index = ExistenceIndex("test", capacity=100)
+    leyendo = threading.Event()
+    continuar = threading.Event()
+
+    def claves():
+        yield "existente"
+        leyendo.set()
+        continuar.wait(5)
+        yield "otra"
+
+    hilo = threading.Thread(target=index.rebuild, args=(claves(),))
+    hilo.start()
+    assert leyendo.wait(5)
+    index.add("insertada-durante-rebuild")
+    continuar.set()
+    hilo.join(5)
+
+    assert index.ready
+    for clave in ("existente", "otra", "insertada-durante-rebuild"):
+        assert index.might_contain(clave)
+    assert index.get_stats()['keys'] == 3
+
+
+def test_rebuild_fallido_conserva_filtro_anterior():
+    """Test un error leyendo la tabla deja el filtro previo activo"""
+    index = ExistenceIndex("test", capacity=100)
+    index.rebuild(["a"])
+
+    def claves_con_error():
+        yield "b"
+        raise RuntimeError("conexión perdida")
+
+    with pytest.raises(RuntimeError):
+        index.rebuild(claves_con_error())
+
+    assert index.might_contain("a")
+    assert not index.might_contain("b")
+    index.add("c")
+    assert index.might_contain("c")
+
+
+def test_indices_del_proceso():
+    """Test los índices se comparten por nombre"""
+    index = get_existence_index(CDC_INDEX)
+
+    assert get_existence_index(CDC_INDEX) is index
+    assert CDC_INDEX in get_existence_index_stats()
+
+
+def test_warmup_en_segundo_plano_no_bloquea(monkeypatch):
+    """Test el arranque no espera el escaneo; mientras tanto se consulta la BD"""
+    continuar = threading.Event()
+    terminado = threading.Event()
+
+    def construir():
+        continuar.wait(5)
+        get_existence_index(CDC_INDEX).rebuild(["existente"])
+        terminado.set()
+
+    monkeypatch.setattr(existence_index_module, "register_index_listeners", lambda: None)
+    monkeypatch.setattr(existence_index_module, "_build_existence_indexes", construir)
+
+    warmup_existence_indexes(background=True)
+
+    assert not get_existence_index(CDC_INDEX).ready
+    continuar.set()
+    assert terminado.wait(5)
+    assert get_existence_index(CDC_INDEX).ready
+
+
+def test_warmup_sin_modelos_deja_indice_deshabilitado(monkeypatch):
+    """Test si los listeners no se registran el índice no se construye"""
+    def modelos_rotos():
+        raise RuntimeError("modelo no mapeable")
+
+    def reconstruir(db, names=None):
+        raise AssertionError("no debe reconstruirse sin listeners")
+
+    monkeypatch.setattr(existence_index_module, "register_index_listeners", modelos_rotos)
+    monkeypatch.setattr(existence_index_module, "rebuild_existence_indexes", reconstruir)
+
+    warmup_existence_indexes()
+
+    assert not get_existence_index(CDC_INDEX).ready
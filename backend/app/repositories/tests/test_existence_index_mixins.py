@@ -0,0 +1,75 @@
+"""
+Tests de los repositorios que consultan el índice de existencia
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.repositories.existence_index import (
+    CDC_INDEX,
+    get_existence_index,
+    reset_existence_indexes,
+)
+
+try:
+    from app.repositories.document.validation_mixin import DocumentoValidationMixin
+    from app.repositories.factura.numeration_mixin import FacturaNumeracionMixin
+except Exception as e:  # los modelos no se pueden mapear en este entorno
+    pytest.skip(f"Repositorios no importables: {e}", allow_module_level=True)
+
+CDC_EXISTENTE = "80016875101001001000099512025011514188467375"
+CDC_NUEVO = "80016875101001001000099612025011514188467371"
+
+
+class _Repo(DocumentoValidationMixin, FacturaNumeracionMixin):
+    def __init__(self, existente=None):
+        self.model = MagicMock()
+        self.db = MagicMock()
+        query = self.db.query.return_value
+        query.filter.return_value = query
+        query.params.return_value = query
+        query.first.return_value = existente
+
+
+@pytest.fixture(autouse=True)
+def _limpiar_indices():
+    reset_existence_indexes()
+    yield
+    reset_existence_indexes()
+
+
+def test_cdc_negativo_no_consulta_bd():
+    """Test un negativo del filtro responde disponible sin consultar"""
+    get_existence_index(CDC_INDEX).rebuild([CDC_EXISTENTE])
+    repo = _Repo()
+
+    assert repo.is_cdc_disponible(CDC_NUEVO) is True
+    repo.db.query.assert_not_called()
+
+
+def test_cdc_positivo_confirma_en_bd():
+    """Test un positivo del filtro se confirma con la consulta"""
+    get_existence_index(CDC_INDEX).rebuild([CDC_EXISTENTE])
+    repo = _Repo(existente=object())
+
+    assert repo.is_cdc_disponible(CDC_EXISTENTE) is False
+    repo.db.query.assert_called_once()
+    assert get_existence_index(CDC_INDEX).get_stats()['false_positives'] == 0
+
+
+def test_cdc_sin_indice_consulta_bd():
+    """Test sin warmup todas las verificaciones van a la BD"""
+    repo = _Repo()
+
+    assert repo.is_cdc_disponible(CDC_NUEVO) is True
+    repo.db.query.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_numero_duplicado_siempre_consulta_bd():
+    """Test la numeración no usa el índice: otro proceso pudo insertarla"""
+    get_existence_index(CDC_INDEX).rebuild([CDC_EXISTENTE])
+    repo = _Repo(existente=object())
+
+    assert await repo.check_numero_duplicado("001-001-0000123", empresa_id=1) is True
+    repo.db.query.assert_called_once()
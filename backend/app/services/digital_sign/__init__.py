@@ -3,11 +3,17 @@ Módulo de firma digital para documentos XML SIFEN
 """
 from .certificate_manager import CertificateManager
 from .xml_signer import XMLSigner
+from .signing_pool import SigningPool, SigningResult
+from .key_registry import KeyRegistry, get_key_registry
 from .config import CertificateConfig, DigitalSignConfig
 
 __all__ = [
     'CertificateManager',
     'XMLSigner',
+    'SigningPool',
+    'SigningResult',
+    'KeyRegistry',
+    'get_key_registry',
     'CertificateConfig',
     'DigitalSignConfig'
 ]
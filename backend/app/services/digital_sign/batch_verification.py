@@ -0,0 +1,374 @@
+"""
+Verificación de firmas por lotes sobre un pool de procesos
+
+Propósito:
+    Las auditorías re-verifican millones de xml_firmado archivados. Cada
+    documento trae su certificado en ds:X509Certificate, así que la
+    verificación no depende de CertificateManager: se usa la clave pública
+    embebida.
+
+Diseño:
+    - Las claves públicas parseadas se cachean por huella SHA-256 del
+      certificado (DER); con pocos certificados por millones de documentos
+      el parseo X.509 ocurre una vez por certificado y por proceso.
+    - Cada worker mantiene su propio caché; los documentos viajan en chunks
+      y la cantidad de chunks en vuelo está acotada.
+    - Los errores por documento (XML mal formado, firma ausente) vuelven
+      como resultado inválido, nunca abortan el lote.
+    - trusted_fingerprints opcional: una firma íntegra hecha con un
+      certificado fuera de la lista se reporta como inválida.
+
+Uso:
+    run = verify_many(blobs, workers=8)
+    for result in run:
+        if not result.is_valid:
+            registrar(result.index, result.error)
+    print(run.stats)
+"""
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import (Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple,
+                    Optional, Tuple, Union)
+
+from lxml import etree
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
+
+from .xml_signer import _DS, _ds_b64decode, exc_c14n_digest
+
+# Documentos por chunk enviado a cada worker
+DEFAULT_CHUNK_SIZE = 100
+
+# Chunks en vuelo por worker (controla memoria con entradas muy grandes)
+MAX_PENDING_CHUNKS_PER_WORKER = 2
+
+# Claves públicas cacheadas por proceso
+MAX_CACHED_PUBLIC_KEYS = 1024
+
+
+class SignatureVerificationResult(NamedTuple):
+    """
+    Resultado de verificación de un documento dentro de un lote
+    """
+    index: int
+    is_valid: bool
+    error: Optional[str] = None
+    fingerprint: Optional[str] = None
+    verify_time_ms: float = 0.0
+    key_cached: bool = False
+
+
+# Entrada de trabajo: (posición en el lote, XML firmado)
+_WorkItem = Tuple[int, Union[str, bytes]]
+
+
+# ===============================================
+# CACHÉ DE CLAVES PÚBLICAS
+# ===============================================
+
+_public_keys: "OrderedDict[bytes, rsa.RSAPublicKey]" = OrderedDict()
+_public_keys_lock = threading.Lock()
+
+
+def _certificate_der(certificate_text: str) -> bytes:
+    """DER del X509Certificate embebido (PEM o base64 de DER)"""
+    lines = [line.strip() for line in certificate_text.strip().splitlines()]
+    body = "".join(line for line in lines if line and not line.startswith("-----"))
+    return base64.b64decode(body, validate=True)
+
+
+def get_public_key(certificate_text: str) -> Tuple[bytes, rsa.RSAPublicKey, bool]:
+    """
+    Clave pública de un X509Certificate embebido, cacheada por huella
+
+    Args:
+        certificate_text: Texto del elemento ds:X509Certificate
+
+    Returns:
+        Tuple[bytes, rsa.RSAPublicKey, bool]: Huella SHA-256, clave pública y
+        si provino del caché
+
+    Raises:
+        ValueError: Si el certificado no es válido o no contiene clave RSA
+    """
+    der = _certificate_der(certificate_text)
+    fingerprint = hashlib.sha256(der).digest()
+
+    with _public_keys_lock:
+        public_key = _public_keys.get(fingerprint)
+        if public_key is not None:
+            _public_keys.move_to_end(fingerprint)
+            return fingerprint, public_key, True
+
+    public_key = x509.load_der_x509_certificate(der).public_key()
+    if not isinstance(public_key, rsa.RSAPublicKey):
+        raise ValueError("El certificado no contiene una clave RSA")
+
+    with _public_keys_lock:
+        _public_keys[fingerprint] = public_key
+        while len(_public_keys) > MAX_CACHED_PUBLIC_KEYS:
+            _public_keys.popitem(last=False)
+    return fingerprint, public_key, False
+
+
+def clear_public_keys() -> None:
+    """Descarta las claves públicas cacheadas del proceso"""
+    with _public_keys_lock:
+        _public_keys.clear()
+
+
+# ===============================================
+# VERIFICACIÓN DE UN DOCUMENTO
+# ===============================================
+
+def verify_signed_xml(index: int,
+                      xml_content: Union[str, bytes],
+                      trusted_fingerprints: Optional[FrozenSet[str]] = None
+                      ) -> SignatureVerificationResult:
+    """
+    Verifica un XML firmado con el certificado que trae embebido
+
+    Args:
+        index: Posición del documento en el lote
+        xml_content: XML firmado
+        trusted_fingerprints: Huellas SHA-256 (hex) aceptadas; None acepta
+            cualquier certificado
+
+    Returns:
+        SignatureVerificationResult: Resultado del documento
+    """
+    start = time.perf_counter()
+
+    def result(is_valid: bool, error: Optional[str] = None,
+               fingerprint: Optional[str] = None,
+               key_cached: bool = False) -> SignatureVerificationResult:
+        return SignatureVerificationResult(
+            index, is_valid, error, fingerprint,
+            (time.perf_counter() - start) * 1000, key_cached)
+
+    try:
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode("utf-8")
+        parser = etree.XMLParser(remove_blank_text=True)
+        root = etree.fromstring(xml_content, parser)
+
+        signature = root.find(f".//{_DS}Signature")
+        if signature is None:
+            return result(False, "No se encontró firma en el XML")
+        signed_info = signature.find(f"{_DS}SignedInfo")
+        signature_value = signature.find(f"{_DS}SignatureValue")
+        digest_value = signature.find(f"{_DS}SignedInfo/{_DS}Reference/{_DS}DigestValue")
+        certificate = signature.find(f"{_DS}KeyInfo/{_DS}X509Data/{_DS}X509Certificate")
+        if (signed_info is None or signature_value is None or digest_value is None
+                or certificate is None or not certificate.text):
+            return result(False, "Firma incompleta: faltan elementos ds")
+
+        fingerprint, public_key, key_cached = get_public_key(certificate.text)
+        fingerprint_hex = fingerprint.hex()
+        if trusted_fingerprints is not None and fingerprint_hex not in trusted_fingerprints:
+            return result(False, "Certificado no confiable", fingerprint_hex, key_cached)
+
+        # Transformación enveloped: digest del documento sin la firma
+        signature.getparent().remove(signature)
+        if _ds_b64decode(digest_value.text) != exc_c14n_digest(root):
+            return result(False, "DigestValue no coincide con el documento",
+                          fingerprint_hex, key_cached)
+
+        signature_bytes = _ds_b64decode(signature_value.text)
+        if signature_bytes is None:
+            return result(False, "SignatureValue inválido", fingerprint_hex, key_cached)
+
+        try:
+            public_key.verify(
+                signature_bytes,
+                exc_c14n_digest(signed_info),
+                padding.PKCS1v15(),
+                Prehashed(hashes.SHA256())
+            )
+        except Exception:
+            return result(False, "SignatureValue inválido", fingerprint_hex, key_cached)
+
+        return result(True, None, fingerprint_hex, key_cached)
+
+    except Exception as e:
+        return result(False, f"Error al verificar firma: {str(e)}")
+
+
+# ===============================================
+# ESTADO POR PROCESO WORKER
+# ===============================================
+
+_worker_trusted: Optional[FrozenSet[str]] = None
+
+
+def _init_worker(trusted_fingerprints: Optional[FrozenSet[str]]) -> None:
+    """Inicializador del worker"""
+    global _worker_trusted
+    _worker_trusted = trusted_fingerprints
+
+
+def _verify_chunk(chunk: List[_WorkItem]) -> List[SignatureVerificationResult]:
+    """Procesa un chunk completo en el worker"""
+    return [verify_signed_xml(index, xml_content, _worker_trusted)
+            for index, xml_content in chunk]
+
+
+def _failed_chunk(chunk: List[_WorkItem], error: BaseException) -> List[SignatureVerificationResult]:
+    """Resultados para un chunk cuyo worker falló (p.ej. proceso caído)"""
+    return [SignatureVerificationResult(index, False, f"Error en worker: {error}")
+            for index, _ in chunk]
+
+
+def _iter_chunks(work_items: Iterator[_WorkItem], chunk_size: int) -> Iterator[List[_WorkItem]]:
+    """Agrupa el trabajo en chunks sin materializar la entrada"""
+    while True:
+        chunk = list(islice(work_items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ===============================================
+# API DE LOTES
+# ===============================================
+
+class VerificationRun:
+    """
+    Verificación de un lote en curso
+
+    Se itera para obtener los resultados por documento; stats acumula los
+    totales y tiempos a medida que avanza (completo al terminar la
+    iteración).
+    """
+
+    def __init__(self,
+                 xml_iterable: Iterable[Union[str, bytes]],
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 trusted_fingerprints: Optional[Iterable[str]] = None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser mayor a 0")
+
+        self._xml_iterable = xml_iterable
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.trusted_fingerprints = (frozenset(f.lower() for f in trusted_fingerprints)
+                                     if trusted_fingerprints is not None else None)
+        self._started = False
+        self.stats: Dict[str, Any] = {
+            'documents': 0,
+            'valid': 0,
+            'invalid': 0,
+            'key_cache_hits': 0,
+            'key_cache_misses': 0,
+            'verify_time_ms': 0.0,
+            'wall_time_ms': 0.0,
+            'documents_per_second': 0.0
+        }
+
+    def __iter__(self) -> Iterator[SignatureVerificationResult]:
+        if self._started:
+            raise RuntimeError("El lote ya fue iterado")
+        self._started = True
+
+        start = time.perf_counter()
+        try:
+            for result in self._results():
+                self._record(result)
+                yield result
+        finally:
+            wall_time_ms = (time.perf_counter() - start) * 1000
+            self.stats['wall_time_ms'] = wall_time_ms
+            if wall_time_ms:
+                self.stats['documents_per_second'] = (
+                    self.stats['documents'] / (wall_time_ms / 1000))
+
+    def _record(self, result: SignatureVerificationResult) -> None:
+        stats = self.stats
+        stats['documents'] += 1
+        stats['valid' if result.is_valid else 'invalid'] += 1
+        stats['verify_time_ms'] += result.verify_time_ms
+        if result.fingerprint is not None:
+            stats['key_cache_hits' if result.key_cached else 'key_cache_misses'] += 1
+
+    def _results(self) -> Iterator[SignatureVerificationResult]:
+        work_items = enumerate(self._xml_iterable)
+
+        if self.workers <= 1:
+            for index, xml_content in work_items:
+                yield verify_signed_xml(index, xml_content, self.trusted_fingerprints)
+            return
+
+        chunks = _iter_chunks(work_items, self.chunk_size)
+        max_pending = self.workers * MAX_PENDING_CHUNKS_PER_WORKER
+        pending: Dict[Future, Tuple[int, List[_WorkItem]]] = {}
+        completed: Dict[int, List[SignatureVerificationResult]] = {}
+        next_seq = 0
+        next_to_yield = 0
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.trusted_fingerprints,)
+        ) as executor:
+
+            def submit_more() -> None:
+                nonlocal next_seq
+                # Los chunks completados que esperan su turno también cuentan
+                while len(pending) + len(completed) < max_pending:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        return
+                    pending[executor.submit(_verify_chunk, chunk)] = (next_seq, chunk)
+                    next_seq += 1
+
+            try:
+                submit_more()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        seq, chunk = pending.pop(future)
+                        try:
+                            completed[seq] = future.result()
+                        except Exception as e:
+                            completed[seq] = _failed_chunk(chunk, e)
+
+                    while next_to_yield in completed:
+                        yield from completed.pop(next_to_yield)
+                        next_to_yield += 1
+
+                    submit_more()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+def verify_many(xml_iterable: Iterable[Union[str, bytes]],
+                workers: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                trusted_fingerprints: Optional[Iterable[str]] = None) -> VerificationRun:
+    """
+    Verifica muchos XML firmados en paralelo
+
+    Args:
+        xml_iterable: Iterable de XML firmados (str o bytes)
+        workers: Procesos worker. None usa todos los núcleos; 1 verifica en
+            el proceso actual sin pool
+        chunk_size: Documentos por chunk enviado a cada worker
+        trusted_fingerprints: Huellas SHA-256 (hex) de certificados
+            aceptados; None acepta el certificado embebido
+
+    Returns:
+        VerificationRun: Iterable de SignatureVerificationResult en orden de
+        entrada, con estadísticas agregadas en .stats
+    """
+    return VerificationRun(xml_iterable, workers=workers, chunk_size=chunk_size,
+                           trusted_fingerprints=trusted_fingerprints)
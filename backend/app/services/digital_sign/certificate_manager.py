@@ -8,9 +8,9 @@ from typing import Tuple, Optional, Dict, Any, List, Union
 from cryptography import x509
 from cryptography.x509.oid import ExtensionOID, ExtendedKeyUsageOID, NameOID
 from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.serialization import pkcs12
 from cryptography.hazmat.primitives.asymmetric import rsa
 from .config import CertificateConfig
+from .key_registry import get_key_registry
 
 
 class CertificateManager:
@@ -22,25 +22,20 @@ class CertificateManager:
         self._private_key: Optional[rsa.RSAPrivateKey] = None
 
     def load_certificate(self) -> Tuple[x509.Certificate, rsa.RSAPrivateKey]:
-        """Carga el certificado y clave privada desde archivo PFX"""
-        try:
-            with open(self.config.cert_path, "rb") as f:
-                private_key, certificate, additional_certificates = pkcs12.load_key_and_certificates(
-                    f.read(),
-                    self.config.cert_password.encode()
-                )
+        """
+        Carga el certificado y clave privada desde archivo PFX
 
-                if not certificate or not private_key:
-                    raise ValueError(
-                        "No se pudo cargar el certificado o la clave privada")
-
-                # Verificar que private_key sea RSAPrivateKey
-                if not isinstance(private_key, rsa.RSAPrivateKey):
-                    raise ValueError("La clave privada debe ser RSA")
+        El PFX se descifra una sola vez por proceso: las instancias que usan
+        el mismo archivo comparten la clave del registro (key_registry).
+        """
+        try:
+            cert_path = str(self.config.cert_path)
+            loaded = get_key_registry().get(
+                cert_path, cert_path, self.config.cert_password)
 
-                self._certificate = certificate
-                self._private_key = private_key
-                return certificate, private_key
+            self._certificate = loaded.certificate
+            self._private_key = loaded.private_key
+            return loaded.certificate, loaded.private_key
 
         except FileNotFoundError:
             raise ValueError("Certificado no encontrado")
@@ -17,13 +17,23 @@ DECISIONES DE ARQUITECTURA ANALIZADAS:
 - Security by Design: Logs seguros, cache limitado, validaciones robustas
 - Integration Pattern: Compatible con infrastructure existente
 """
-import secrets
 import hashlib
-import hmac
+import os
+import secrets
+import stat
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, Protocol
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, List, Protocol, Tuple
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # ANÁLISIS: Imports relativos consistentes con el proyecto
 from .exceptions import DigitalSignError
 from .config import DigitalSignConfig
@@ -99,6 +109,361 @@ class CSCGenerationError(CSCError):
         )
 
 
+# ========================================
+# SECUENCIA CSC SIN COLISIONES
+# ========================================
+
+# El espacio de 9 dígitos se reparte en slots por proceso:
+# CSC = slot (2 dígitos) + permutación del contador (7 dígitos)
+CSC_SLOTS = 100
+CSC_COUNTER_SPACE = 10 ** 7
+
+# Contadores reservados por escritura del archivo de slot: un proceso que
+# muere pierde a lo sumo este bloque, nunca reutiliza códigos ya emitidos
+CSC_RESERVE_BLOCK = 4096
+
+# Permutación Feistel sobre 24 bits (2 mitades de 12) con tablas derivadas
+# de la clave del slot
+_FEISTEL_ROUNDS = 4
+_HALF_BITS = 12
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_KEY_BYTES = 32
+
+
+def _default_slot_dir() -> Path:
+    """
+    Directorio de slots: SIFEN_CSC_SLOT_DIR o ~/.sifen/csc_slots
+
+    Debe persistir entre reinicios (guarda contador y clave de cada slot),
+    por eso no vive en el directorio temporal.
+    """
+    return Path(os.getenv(
+        "SIFEN_CSC_SLOT_DIR",
+        str(Path.home() / ".sifen" / "csc_slots")
+    ))
+
+
+def _prepare_slot_dir(slot_dir: Path) -> None:
+    """
+    Crea el directorio de slots (modo 0700) y verifica que sea privado
+
+    Raises:
+        CSCGenerationError: Si es un symlink, pertenece a otro usuario o
+            grupo/otros pueden escribir en él
+    """
+    slot_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return
+
+    info = os.lstat(slot_dir)
+    if not stat.S_ISDIR(info.st_mode):
+        raise CSCGenerationError(f"{slot_dir} no es un directorio")
+    if info.st_uid != os.getuid():
+        raise CSCGenerationError(f"{slot_dir} pertenece a otro usuario")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise CSCGenerationError(f"{slot_dir} es escribible por otros usuarios")
+
+
+def _try_lock(fd: int) -> bool:
+    """Lock exclusivo no bloqueante; se libera solo al morir el proceso"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _claim_slot(slot_dir: Path) -> Tuple[int, int]:
+    """
+    Reserva un slot libre del host con un lock de archivo
+
+    Returns:
+        Tuple[int, int]: (slot, descriptor que mantiene el lock)
+
+    Raises:
+        CSCGenerationError: Si no hay slots libres o el directorio no es privado
+    """
+    _prepare_slot_dir(slot_dir)
+    start = secrets.randbelow(CSC_SLOTS)
+    for offset in range(CSC_SLOTS):
+        slot = (start + offset) % CSC_SLOTS
+        fd = os.open(slot_dir / f"slot-{slot:02d}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        if _try_lock(fd):
+            return slot, fd
+        os.close(fd)
+    raise CSCGenerationError(f"No hay slots CSC libres en {slot_dir}")
+
+
+def _read_slot_state(fd: int) -> Tuple[int, int, bytes]:
+    """
+    Lee (época, contador, clave) del archivo de slot
+
+    Un archivo nuevo o ilegible inicia una época con clave nueva.
+    """
+    os.lseek(fd, 0, os.SEEK_SET)
+    raw = os.read(fd, 256).decode("ascii", errors="replace").split()
+    try:
+        epoch, counter, key = int(raw[0]), int(raw[1]), bytes.fromhex(raw[2])
+        if len(key) == _KEY_BYTES and epoch >= 0 and 0 <= counter <= CSC_COUNTER_SPACE:
+            return epoch, counter, key
+    except (IndexError, ValueError):
+        pass
+    if raw:
+        logger.warning("Archivo de slot CSC ilegible, se inicia una época nueva")
+    return 0, 0, secrets.token_bytes(_KEY_BYTES)
+
+
+def _write_slot_state(fd: int, epoch: int, counter: int, key: bytes) -> None:
+    """Persiste (época, contador, clave) antes de emitir códigos"""
+    data = f"{epoch} {counter} {key.hex()}\n".encode("ascii")
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.write(fd, data)
+    os.ftruncate(fd, len(data))
+    os.fsync(fd)
+
+
+def _derive_tables(key: bytes, epoch: int) -> List[List[int]]:
+    """Tablas Feistel de la época: SHAKE-256 sobre clave, época y ronda"""
+    tables = []
+    for round_ in range(_FEISTEL_ROUNDS):
+        stream = hashlib.shake_256(
+            key + f":{epoch}:{round_}".encode("ascii")).digest(2 << _HALF_BITS)
+        tables.append([
+            int.from_bytes(stream[i:i + 2], "big") & _HALF_MASK
+            for i in range(0, len(stream), 2)
+        ])
+    return tables
+
+
+class CSCSequence:
+    """
+    Generador de CSC sin colisiones entre procesos del mismo host
+
+    - Cada proceso reserva un slot (lock de archivo) que fija los 2 primeros
+      dígitos: procesos vivos nunca comparten slot.
+    - Dentro del slot un contador monotónico pasa por una permutación
+      Feistel con tablas derivadas de una clave del CSPRNG: los CSC no son
+      secuenciales ni predecibles.
+    - El archivo del slot guarda época, contador y clave; un proceso que
+      reclama el slot después de un reinicio continúa el contador con la
+      misma clave. Un CSC del slot se repite recién al agotar
+      CSC_COUNTER_SPACE códigos, cuando empieza otra época con clave nueva.
+    - Sin hash por código, sin reintentos aleatorios y sin sleep.
+    """
+
+    def __init__(
+        self,
+        slot: int,
+        lock_fd: Optional[int] = None,
+        epoch: int = 0,
+        counter: int = 0,
+        key: Optional[bytes] = None
+    ):
+        if not 0 <= slot < CSC_SLOTS:
+            raise ValueError(f"Slot CSC fuera de rango: {slot}")
+        self.slot = slot
+        self._lock_fd = lock_fd
+        self._base = slot * CSC_COUNTER_SPACE
+        self._lock = threading.Lock()
+        self._start_epoch(epoch, counter, key or secrets.token_bytes(_KEY_BYTES))
+
+    @classmethod
+    def claim(cls, slot_dir: Optional[Path] = None) -> "CSCSequence":
+        """Crea una secuencia con un slot libre del host"""
+        slot, fd = _claim_slot(slot_dir or _default_slot_dir())
+        try:
+            return cls(slot, fd, *_read_slot_state(fd))
+        except Exception:
+            os.close(fd)
+            raise
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def _start_epoch(self, epoch: int, counter: int, key: bytes) -> None:
+        if counter >= CSC_COUNTER_SPACE:
+            epoch, counter, key = epoch + 1, 0, secrets.token_bytes(_KEY_BYTES)
+        self._epoch = epoch
+        self._counter = counter
+        self._key = key
+        self._tables = _derive_tables(key, epoch)
+        self._reserved = counter
+        self._reserve()
+
+    def _reserve(self) -> None:
+        """Reserva el siguiente bloque de contadores en el archivo del slot"""
+        if self._lock_fd is None:
+            self._reserved = CSC_COUNTER_SPACE
+            return
+        self._reserved = min(self._counter + CSC_RESERVE_BLOCK, CSC_COUNTER_SPACE)
+        _write_slot_state(self._lock_fd, self._epoch, self._reserved, self._key)
+
+    def _permute(self, value: int) -> int:
+        """Biyección sobre [0, CSC_COUNTER_SPACE) por cycle-walking"""
+        tables = self._tables
+        while True:
+            left, right = value >> _HALF_BITS, value & _HALF_MASK
+            for table in tables:
+                left, right = right, left ^ table[right]
+            value = (left << _HALF_BITS) | right
+            if value < CSC_COUNTER_SPACE:
+                return value
+
+    def _next(self, excluded: str) -> str:
+        """Siguiente CSC válido (llamar con el lock tomado)"""
+        while True:
+            if self._counter >= CSC_COUNTER_SPACE:
+                self._start_epoch(self._epoch, self._counter, self._key)
+            elif self._counter >= self._reserved:
+                self._reserve()
+            value = self._base + self._permute(self._counter)
+            self._counter += 1
+            csc = f"{value:09d}"
+            # Mismas reglas que validate_csc
+            if value == 0 or (len(set(csc)) == 1 and csc != "999999999"):
+                continue
+            if excluded and excluded in csc:
+                continue
+            return csc
+
+    def next_csc(self, excluded: str = "") -> str:
+        """
+        Genera el siguiente CSC
+
+        Args:
+            excluded: Secuencia que el CSC no debe contener (RUC sin guión)
+        """
+        with self._lock:
+            return self._next(excluded)
+
+    def next_batch(self, n: int, excluded: str = "") -> List[str]:
+        """Genera n CSC con una sola toma del lock"""
+        with self._lock:
+            return [self._next(excluded) for _ in range(n)]
+
+    def close(self) -> None:
+        """Guarda el contador usado y libera el slot del host"""
+        with self._lock:
+            if self._lock_fd is not None:
+                try:
+                    _write_slot_state(self._lock_fd, self._epoch, self._counter, self._key)
+                finally:
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+
+_sequence: Optional[CSCSequence] = None
+_sequence_lock = threading.Lock()
+
+
+def get_csc_sequence() -> CSCSequence:
+    """Secuencia CSC del proceso (reserva su slot en el primer uso)"""
+    global _sequence
+    if _sequence is None:
+        with _sequence_lock:
+            if _sequence is None:
+                _sequence = CSCSequence.claim()
+    return _sequence
+
+
+def _reset_after_fork() -> None:
+    """El hijo de un fork hereda el slot del padre: debe reservar el suyo"""
+    global _sequence, _sequence_lock
+    _sequence_lock = threading.Lock()
+    if _sequence is not None and _sequence._lock_fd is not None:
+        # El lock pertenece al padre; cerrar la copia no lo libera
+        os.close(_sequence._lock_fd)
+    _sequence = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ========================================
+# CACHE DE CSCs EMITIDOS
+# ========================================
+
+# Máximo de CSCs recordados por CSCManager (~200 bytes por entrada)
+DEFAULT_CSC_CACHE_SIZE = 200_000
+
+
+class ExpiringCSCCache:
+    """
+    CSCs emitidos ordenados por hora de generación
+
+    Las entradas se guardan en orden de inserción (la hora de generación es
+    creciente), así que las expiradas y las más viejas siempre están al
+    frente: expirar y expulsar es O(1) amortizado y las búsquedas son O(1).
+    """
+
+    def __init__(self, max_age: timedelta, max_size: int = DEFAULT_CSC_CACHE_SIZE):
+        if max_size < 1:
+            raise ValueError("max_size debe ser mayor a 0")
+        self.max_age = max_age
+        self.max_size = max_size
+        self.evictions = 0
+        self._entries: "OrderedDict[str, datetime]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, csc: object) -> bool:
+        return csc in self._entries
+
+    def get(self, csc: str) -> Optional[datetime]:
+        """Hora de generación del CSC o None si no está"""
+        return self._entries.get(csc)
+
+    def add(self, csc: str, generation_time: datetime) -> None:
+        """Registra un CSC recién generado"""
+        self.add_many((csc,), generation_time)
+
+    def add_many(self, cscs: Iterable[str], generation_time: datetime) -> None:
+        """Registra un lote de CSCs generados en el mismo instante"""
+        entries = self._entries
+        for csc in cscs:
+            if csc in entries:
+                entries.move_to_end(csc)
+            entries[csc] = generation_time
+        self.expire(generation_time)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """
+        Descarta los CSCs expirados (solo recorre los del frente)
+
+        Returns:
+            int: Cantidad de CSCs descartados
+        """
+        limit = (now or datetime.now()) - self.max_age
+        entries = self._entries
+        removed = 0
+        while entries:
+            oldest = next(iter(entries.values()))
+            if oldest >= limit:
+                break
+            entries.popitem(last=False)
+            removed += 1
+        return removed
+
+    def count_expired(self, now: Optional[datetime] = None) -> int:
+        """Cantidad de CSCs expirados aún presentes, sin descartarlos"""
+        limit = (now or datetime.now()) - self.max_age
+        count = 0
+        for generation_time in self._entries.values():
+            if generation_time >= limit:
+                break
+            count += 1
+        return count
+
+
 class CSCManager:
     """
     Gestor de Código de Seguridad del Contribuyente (CSC) según SIFEN v150
@@ -119,7 +484,8 @@ class CSCManager:
     def __init__(
         self,
         cert_manager: CertificateManagerProtocol,
-        config: Optional[DigitalSignConfig] = None
+        config: Optional[DigitalSignConfig] = None,
+        cache_max_size: int = DEFAULT_CSC_CACHE_SIZE
     ):
         """
         Inicializa el gestor CSC
@@ -128,6 +494,7 @@ class CSCManager:
         - Validación temprana (fail-fast)
         - Dependencies injection para testability
         - Config opcional para backward compatibility
+        - cache_max_size acota los CSCs recordados para get_expiry_time
         """
         self._validate_certificate_manager(cert_manager)
 
@@ -135,7 +502,8 @@ class CSCManager:
         self.config = config or DigitalSignConfig()
 
         # Cache interno limitado (seguridad + performance)
-        self._csc_cache: Optional[Dict[str, datetime]] = None
+        self._csc_cache: Optional[ExpiringCSCCache] = None
+        self._cache_max_size = cache_max_size
         self._last_validation: Optional[datetime] = None
 
         # Constantes SIFEN v150
@@ -181,12 +549,8 @@ class CSCManager:
         """
         Genera CSC de 9 dígitos según especificaciones SIFEN v150
 
-        ANÁLISIS DEL ALGORITMO CORREGIDO:
-        1. Validaciones de entrada robustas
-        2. Seed determinístico pero único (timestamp + RUC + cert)
-        3. Entropía criptográfica adicional (secrets)
-        4. Validaciones de salida (self-verification)
-        5. Cache para tracking y statistics
+        El CSC sale de la secuencia del proceso (CSCSequence): único entre
+        procesos del mismo host, sin sleep ni reintentos.
 
         Args:
             ruc: RUC del contribuyente (formato: "12345678-9")
@@ -200,63 +564,11 @@ class CSCManager:
             ValueError: Si los parámetros son inválidos
         """
         try:
-            # PASO 1: Validaciones de entrada
             self._validate_ruc(ruc)
             self._validate_doc_type(doc_type)
 
-            # PASO 2: Preparar componentes únicos
-            clean_ruc = ruc.replace("-", "")
-            timestamp = datetime.now()
-            # CORRECCIÓN: Añadir más granularidad temporal + counter interno
-            timestamp_seed = int(timestamp.timestamp() *
-                                 1000000)  # Microsegundos
-
-            # Añadir un pequeño delay para evitar colisiones en rapid generation
-            import time
-            time.sleep(0.001)  # 1ms delay para garantizar timestamps únicos
-
-            # PASO 3: Crear seed combinado con más entropía
-            cert_identifier = self._get_cert_identifier()
-            # Añadir proceso ID y thread ID para más unicidad
-            import os
-            import threading
-            process_entropy = f"{os.getpid()}{threading.get_ident()}"
-            seed_string = f"{clean_ruc}{doc_type}{timestamp_seed}{cert_identifier}{process_entropy}"
-
-            # PASO 4: Hash para distribución uniforme
-            seed_hash = hashlib.sha256(seed_string.encode('utf-8')).hexdigest()
-            seed_bytes = bytes.fromhex(seed_hash[:32])
-            seed_int = int.from_bytes(seed_bytes, 'big')
-
-            # PASO 5: Generar CSC base
-            base_csc = seed_int % 1000000000  # Máximo 9 dígitos
-
-            # PASO 6: Entropía criptográfica adicional (más variación)
-            additional_entropy = secrets.randbelow(1000)  # 0-999 (más rango)
-            final_csc = (base_csc + additional_entropy) % 1000000000
-
-            # PASO 7: Asegurar rango válido (no 000000000)
-            if final_csc == 0:
-                final_csc = secrets.randbelow(999999999) + 1
-
-            # PASO 8: Formatear y validar
-            csc = f"{final_csc:09d}"  # Zero-padding a 9 dígitos
-
-            # PASO 9: Reintento si hay duplicación (safety net)
-            retry_count = 0
-            while not self.validate_csc(csc) and retry_count < 3:
-                retry_count += 1
-                additional_entropy = secrets.randbelow(
-                    1000) + retry_count * 1000
-                final_csc = (base_csc + additional_entropy) % 1000000000
-                if final_csc == 0:
-                    final_csc = secrets.randbelow(999999999) + 1
-                csc = f"{final_csc:09d}"
-
-            self._validate_generated_csc(csc, clean_ruc)
-
-            # PASO 9: Cache para tracking
-            self._cache_csc(csc, timestamp)
+            csc = get_csc_sequence().next_csc(excluded=ruc.replace("-", ""))
+            self._cache_csc(csc, datetime.now())
 
             logger.info(f"CSC generado para RUC {ruc}: {csc[:3]}***{csc[-3:]}")
             return csc
@@ -268,6 +580,44 @@ class CSCManager:
                 f"Error inesperado generando CSC para RUC {ruc}: {str(e)}")
             raise CSCGenerationError(f"Error interno: {str(e)}")
 
+    def generate_batch(self, ruc: str, doc_type: str, n: int) -> List[str]:
+        """
+        Genera n CSCs únicos para emisión masiva
+
+        Args:
+            ruc: RUC del contribuyente (formato: "12345678-9")
+            doc_type: Tipo de documento SIFEN
+            n: Cantidad de CSCs
+
+        Returns:
+            List[str]: CSCs de 9 dígitos, sin repetidos
+
+        Raises:
+            CSCGenerationError: Si no se puede generar el lote
+        """
+        try:
+            self._validate_ruc(ruc)
+            self._validate_doc_type(doc_type)
+            if n < 0:
+                raise ValueError("La cantidad de CSCs no puede ser negativa")
+
+            cscs = get_csc_sequence().next_batch(n, excluded=ruc.replace("-", ""))
+
+            self._get_csc_cache().add_many(cscs, datetime.now())
+            self._last_validation = datetime.now()
+
+            logger.info(f"Lote de {n} CSCs generado para RUC {ruc}")
+            return cscs
+
+        except ValueError as e:
+            raise CSCGenerationError(f"Error validando parámetros: {str(e)}")
+        except CSCGenerationError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"Error inesperado generando lote CSC para RUC {ruc}: {str(e)}")
+            raise CSCGenerationError(f"Error interno: {str(e)}")
+
     def validate_csc(self, csc: str) -> bool:
         """
         Valida CSC según especificaciones SIFEN v150
@@ -360,16 +710,13 @@ class CSCManager:
             "last_validation": self._last_validation.isoformat() if self._last_validation else None,
             "certificate_identifier": self._get_cert_identifier(),
             "max_age_hours": self._CACHE_MAX_AGE_HOURS,
-            "csc_length": self._CSC_LENGTH
+            "csc_length": self._CSC_LENGTH,
+            "csc_cache_max_size": self._cache_max_size
         }
 
         if self._csc_cache:
-            now = datetime.now()
-            expired_count = sum(
-                1 for gen_time in self._csc_cache.values()
-                if now > gen_time + timedelta(hours=self._CACHE_MAX_AGE_HOURS)
-            )
-            stats["expired_cscs_in_cache"] = expired_count
+            stats["expired_cscs_in_cache"] = self._csc_cache.count_expired()
+            stats["csc_cache_evictions"] = self._csc_cache.evictions
 
         return stats
 
@@ -414,20 +761,6 @@ class CSCManager:
             raise ValueError(
                 f"Tipo documento inválido: {doc_type}. Válidos: {list(valid_doc_types.keys())}")
 
-    def _validate_generated_csc(self, csc: str, ruc: str) -> None:
-        """
-        Valida un CSC recién generado
-
-        ANÁLISIS: Validaciones adicionales post-generación
-        """
-        if not self.validate_csc(csc):
-            raise CSCValidationError(csc, "CSC generado no pasa validaciones")
-
-        # No debe contener secuencia del RUC
-        if ruc in csc:
-            raise CSCValidationError(
-                csc, "CSC no debe contener dígitos del RUC")
-
     def _is_blacklisted_csc(self, csc: str) -> bool:
         """
         Verifica blacklist de CSCs problemáticos
@@ -466,38 +799,21 @@ class CSCManager:
         except Exception:
             return False
 
+    def _get_csc_cache(self) -> ExpiringCSCCache:
+        """Cache de CSCs emitidos (se crea en la primera generación)"""
+        if self._csc_cache is None:
+            self._csc_cache = ExpiringCSCCache(
+                max_age=timedelta(hours=self._CACHE_MAX_AGE_HOURS),
+                max_size=self._cache_max_size
+            )
+        return self._csc_cache
+
     def _cache_csc(self, csc: str, generation_time: datetime) -> None:
         """
         Cache CSC con gestión de memoria
 
-        ANÁLISIS: Cache limitado por seguridad y memoria
+        ANÁLISIS: Cache limitado por seguridad y memoria; la expiración
+        solo recorre las entradas viejas del frente (O(1) amortizado)
         """
-        if self._csc_cache is None:
-            self._csc_cache = {}
-
-        # Limpieza periódica para evitar memory leaks
-        if len(self._csc_cache) > 100:
-            self._cleanup_expired_cscs()
-
-        self._csc_cache[csc] = generation_time
+        self._get_csc_cache().add(csc, generation_time)
         self._last_validation = datetime.now()
-
-    def _cleanup_expired_cscs(self) -> None:
-        """Limpia CSCs expirados del cache"""
-        if self._csc_cache is None:
-            return
-
-        now = datetime.now()
-        max_age = timedelta(hours=self._CACHE_MAX_AGE_HOURS)
-
-        expired_cscs = [
-            csc for csc, gen_time in self._csc_cache.items()
-            if now > gen_time + max_age
-        ]
-
-        for csc in expired_cscs:
-            del self._csc_cache[csc]
-
-        if expired_cscs:
-            logger.debug(
-                f"Limpiados {len(expired_cscs)} CSCs expirados del cache")
@@ -0,0 +1,316 @@
+"""
+Registro de certificados y claves privadas por empresa
+
+Propósito:
+    Se firma para cientos de empresas, cada una con su PFX. Descifrar un
+    PKCS#12 es deliberadamente lento (derivación de clave PBKDF), por eso
+    las claves se cargan una sola vez y se reutilizan entre instancias de
+    CertificateManager y DigitalSigner.
+
+Diseño:
+    - Clave del registro: id de empresa, número de serie o ruta del PFX.
+    - Carga perezosa: el PFX se lee y descifra en el primer uso; las claves
+      calientes quedan en un LRU acotado (max_entries).
+    - Una empresa que vuelve dentro de stat_interval segundos no toca el
+      disco ni el KDF. Pasado ese intervalo se hace un único os.stat; si
+      cambió mtime o tamaño del archivo, se recarga.
+    - La contraseña se verifica contra un hash guardado en la entrada: una
+      contraseña distinta nunca recibe la clave cacheada.
+    - Cargas concurrentes de la misma clave esperan a una sola lectura.
+
+Uso:
+    registry = get_key_registry()
+    loaded = registry.get("empresa-42", cert_path, password)
+    loaded.private_key.sign(...)
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple, Union
+
+from cryptography import x509
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+# Claves descifradas que se mantienen en memoria
+DEFAULT_MAX_ENTRIES = 256
+
+# Segundos entre verificaciones de mtime de un mismo PFX
+DEFAULT_STAT_INTERVAL = 30.0
+
+
+@dataclass(frozen=True)
+class LoadedKey:
+    """
+    Certificado y clave privada descifrados desde un PFX
+    """
+    certificate: x509.Certificate
+    private_key: rsa.RSAPrivateKey
+    cert_path: str
+    serial_number: str
+    load_time_ms: float
+
+
+@dataclass
+class _Entry:
+    """Entrada del LRU: clave cargada más la identidad del archivo"""
+    loaded: LoadedKey
+    file_id: Tuple[int, int]
+    password_hash: bytes
+    checked_at: float
+
+
+def _password_hash(password: Optional[str]) -> bytes:
+    return hashlib.sha256((password or "").encode()).digest()
+
+
+def _file_id(cert_path: str) -> Tuple[int, int]:
+    """(mtime_ns, tamaño) del archivo: cambia al reemplazar el PFX"""
+    stat = os.stat(cert_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_pkcs12(cert_path: Union[str, Path],
+                password: Optional[str]) -> Tuple[x509.Certificate, rsa.RSAPrivateKey]:
+    """
+    Lee y descifra un PFX (operación costosa: disco + KDF)
+
+    Args:
+        cert_path: Ruta al archivo PFX
+        password: Contraseña del PFX
+
+    Returns:
+        Tuple[x509.Certificate, rsa.RSAPrivateKey]: Certificado y clave privada
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe
+        ValueError: Si el PFX no contiene un certificado con clave RSA
+    """
+    with open(cert_path, "rb") as f:
+        private_key, certificate, _ = pkcs12.load_key_and_certificates(
+            f.read(),
+            password.encode() if password else None
+        )
+
+    if not certificate or not private_key:
+        raise ValueError("No se pudo cargar el certificado o la clave privada")
+    if not isinstance(private_key, rsa.RSAPrivateKey):
+        raise ValueError("La clave privada debe ser RSA")
+    return certificate, private_key
+
+
+class KeyRegistry:
+    """
+    LRU de certificados descifrados, con recarga por cambio de archivo
+    """
+
+    def __init__(self,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 stat_interval: float = DEFAULT_STAT_INTERVAL):
+        """
+        Args:
+            max_entries: Máximo de claves descifradas en memoria
+            stat_interval: Segundos entre verificaciones de mtime por clave
+                (0 verifica en cada acceso)
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries debe ser mayor a 0")
+
+        self.max_entries = max_entries
+        self.stat_interval = stat_interval
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # Origen de cada clave: permite recargar tras una expulsión
+        self._sources: Dict[Hashable, Tuple[str, Optional[str]]] = {}
+        self._by_serial: Dict[str, Hashable] = {}
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'reloads': 0,
+            'evictions': 0,
+            'load_time_ms': 0.0
+        }
+
+    def register(self, key: Hashable, cert_path: Union[str, Path],
+                 password: Optional[str]) -> None:
+        """
+        Registra el PFX de una clave sin cargarlo
+
+        Args:
+            key: Id de empresa o número de serie
+            cert_path: Ruta al archivo PFX
+            password: Contraseña del PFX
+        """
+        with self._lock:
+            self._sources[key] = (str(cert_path), password)
+
+    def get(self, key: Hashable,
+            cert_path: Optional[Union[str, Path]] = None,
+            password: Optional[str] = None) -> LoadedKey:
+        """
+        Obtiene el certificado y la clave privada de una empresa
+
+        Args:
+            key: Id de empresa o número de serie
+            cert_path: Ruta al PFX (opcional si la clave ya fue registrada)
+            password: Contraseña del PFX
+
+        Returns:
+            LoadedKey: Certificado y clave privada descifrados
+
+        Raises:
+            ValueError: Si la clave no está registrada o el PFX es inválido
+            FileNotFoundError: Si el PFX no existe
+        """
+        with self._lock:
+            if cert_path is not None:
+                self._sources[key] = (str(cert_path), password)
+            source = self._sources.get(key)
+            if source is None:
+                raise ValueError(f"Certificado no registrado: {key}")
+
+            entry = self._fresh_entry(key, source)
+            if entry is not None:
+                self._stats['hits'] += 1
+                return entry.loaded
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # Una sola carga por clave; el resto espera y reutiliza el resultado
+        with loading:
+            with self._lock:
+                entry = self._fresh_entry(key, source)
+                if entry is not None:
+                    self._stats['hits'] += 1
+                    return entry.loaded
+            try:
+                return self._load(key, source)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+    def get_by_serial(self, serial_number: str) -> LoadedKey:
+        """
+        Obtiene una clave cargada por el número de serie de su certificado
+
+        Raises:
+            ValueError: Si ningún certificado cargado tiene ese número de serie
+        """
+        with self._lock:
+            key = self._by_serial.get(serial_number.lower())
+        if key is None:
+            raise ValueError(f"Certificado no cargado: {serial_number}")
+        return self.get(key)
+
+    def _fresh_entry(self, key: Hashable, source: Tuple[str, Optional[str]]) -> Optional[_Entry]:
+        """Entrada vigente para la clave o None (llamar con el lock tomado)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        cert_path, password = source
+        if (entry.loaded.cert_path != cert_path
+                or not hmac.compare_digest(entry.password_hash, _password_hash(password))):
+            return None
+
+        now = time.monotonic()
+        if now - entry.checked_at >= self.stat_interval:
+            try:
+                changed = _file_id(cert_path) != entry.file_id
+            except OSError:
+                changed = True
+            if changed:
+                return None
+            entry.checked_at = now
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def _load(self, key: Hashable, source: Tuple[str, Optional[str]]) -> LoadedKey:
+        """Lee y descifra el PFX, e inserta la clave en el LRU"""
+        cert_path, password = source
+        start = time.perf_counter()
+        file_id = _file_id(cert_path)
+        certificate, private_key = load_pkcs12(cert_path, password)
+        load_time_ms = (time.perf_counter() - start) * 1000
+
+        loaded = LoadedKey(
+            certificate=certificate,
+            private_key=private_key,
+            cert_path=cert_path,
+            serial_number=format(certificate.serial_number, "x"),
+            load_time_ms=load_time_ms
+        )
+        with self._lock:
+            self._stats['misses'] += 1
+            self._stats['load_time_ms'] += load_time_ms
+            if key in self._entries:
+                self._stats['reloads'] += 1
+            self._discard(key)
+            self._entries[key] = _Entry(loaded, file_id, _password_hash(password),
+                                        time.monotonic())
+            self._by_serial[loaded.serial_number] = key
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self._stats['evictions'] += 1
+        return loaded
+
+    def _discard(self, key: Hashable) -> None:
+        """Quita una entrada y su índice por serie (llamar con el lock tomado)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None and self._by_serial.get(entry.loaded.serial_number) == key:
+            del self._by_serial[entry.loaded.serial_number]
+
+    def invalidate(self, key: Hashable) -> None:
+        """Descarta la clave cargada (la próxima consulta relee el PFX)"""
+        with self._lock:
+            self._discard(key)
+
+    def clear(self) -> None:
+        """Descarta todas las claves y registros"""
+        with self._lock:
+            self._entries.clear()
+            self._sources.clear()
+            self._by_serial.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas de aciertos, fallos y tiempo de carga"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['registered'] = len(self._sources)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['avg_load_time_ms'] = (stats['load_time_ms'] / stats['misses']
+                                     if stats['misses'] else 0.0)
+        return stats
+
+
+# ===============================================
+# REGISTRO DEL PROCESO
+# ===============================================
+
+_registry: Optional[KeyRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_key_registry() -> KeyRegistry:
+    """Registro de claves compartido por el proceso"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = KeyRegistry()
+    return _registry
+
+
+def reset_key_registry() -> None:
+    """Descarta el registro del proceso (p.ej. en tests)"""
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -6,8 +6,8 @@ from datetime import datetime
 from typing import Optional, cast
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
-from cryptography.hazmat.primitives.serialization import pkcs12
 from cryptography.x509 import load_pem_x509_certificate
+from .key_registry import get_key_registry
 from .models import Certificate, SignatureResult
 
 
@@ -25,26 +25,16 @@ class DigitalSigner:
         self._load_certificate()
 
     def _load_certificate(self) -> None:
-        """Carga el certificado y la clave privada"""
+        """Carga el certificado y la clave privada (registro por número de serie)"""
         try:
-            # Cargar certificado desde archivo
-            with open(self.certificate.certificate_path, 'rb') as cert_file:
-                cert_data = cert_file.read()
-
-            # Cargar certificado y clave privada
-            private_key, certificate, additional_certificates = pkcs12.load_key_and_certificates(
-                cert_data,
-                self.certificate.password.encode() if self.certificate.password else None
+            loaded = get_key_registry().get(
+                self.certificate.serial_number,
+                self.certificate.certificate_path,
+                self.certificate.password
             )
 
-            if not certificate:
-                raise ValueError("No se pudo cargar el certificado")
-
-            self.certificate_obj = certificate
-            # Asegurarnos que la clave privada es RSA
-            if not isinstance(private_key, rsa.RSAPrivateKey):
-                raise ValueError("La clave privada debe ser RSA")
-            self.private_key = private_key
+            self.certificate_obj = loaded.certificate
+            self.private_key = loaded.private_key
 
         except Exception as e:
             raise ValueError(f"Error al cargar el certificado: {str(e)}")
@@ -0,0 +1,355 @@
+"""
+Servicio de firma XML sobre un pool de procesos
+
+Propósito:
+    La firma RSA-SHA256 es CPU-bound y XMLSigner la ejecuta en el thread
+    que llama. Para lotes grandes (cierre diario, reenvíos masivos) se
+    reparte entre núcleos con procesos worker de larga vida.
+
+Diseño:
+    - Cada worker carga el PKCS#12 UNA sola vez al iniciar, a través de
+      CertificateManager, y reutiliza su XMLSigner para todos los chunks.
+    - Entrada y salida en bytes: el XML viaja por IPC sin decodificar y
+      los resultados se entregan en el orden de entrada.
+    - Backpressure: la cantidad de chunks en vuelo está acotada, la entrada
+      puede ser un generador y nunca se materializa completa.
+    - Si un worker muere (BrokenProcessPool) el pool se recrea y los chunks
+      afectados se reenvían; un chunk que tumba el pool más de max_retries
+      veces se devuelve como fallido.
+    - Los errores por documento vuelven como SigningResult con
+      success=False, nunca abortan el lote.
+
+Uso:
+    with SigningPool(cert_config, workers=8) as pool:
+        for result in pool.sign_many(xmls):
+            if result.success:
+                guardar(result.index, result.xml)
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from multiprocessing.context import BaseContext
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from lxml import etree
+
+from .certificate_manager import CertificateManager
+from .config import CertificateConfig, DigitalSignConfig
+from .xml_signer import XMLSigner
+
+# Documentos por chunk enviado a cada worker
+DEFAULT_CHUNK_SIZE = 20
+
+# Chunks en vuelo por worker (controla memoria con entradas muy grandes)
+MAX_PENDING_CHUNKS_PER_WORKER = 2
+
+# Reenvíos de un chunk tras la caída de un worker
+DEFAULT_MAX_RETRIES = 2
+
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+class SigningResult(NamedTuple):
+    """
+    Resultado de firma de un documento dentro de un lote
+    """
+    index: int
+    success: bool
+    xml: Optional[bytes] = None
+    error: Optional[str] = None
+
+
+# Entrada de trabajo: (posición en el lote, XML)
+_WorkItem = Tuple[int, bytes]
+
+
+def sign_xml_bytes(signer: XMLSigner, xml_content: Union[str, bytes]) -> bytes:
+    """
+    Firma un documento XML recibido como bytes
+
+    Args:
+        signer: Firmador con el certificado ya cargado
+        xml_content: XML a firmar (str se codifica en UTF-8)
+
+    Returns:
+        bytes: XML firmado, igual a sign_xml() codificado en UTF-8
+    """
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode("utf-8")
+    try:
+        parser = etree.XMLParser(remove_blank_text=True)
+        root = etree.fromstring(xml_content, parser)
+    except Exception as e:
+        raise ValueError(f"Error al firmar XML: {str(e)}")
+
+    signer.sign_tree(root)
+    return XML_DECLARATION + etree.tostring(root)
+
+
+# ===============================================
+# ESTADO POR PROCESO WORKER
+# ===============================================
+
+_worker_signer: Optional[XMLSigner] = None
+_worker_error: Optional[str] = None
+
+
+def _init_worker(cert_config: CertificateConfig, sign_config: DigitalSignConfig) -> None:
+    """Inicializador del worker: carga el certificado una sola vez"""
+    global _worker_signer, _worker_error
+    try:
+        cert_manager = CertificateManager(cert_config)
+        cert_manager.load_certificate()
+        _worker_signer = XMLSigner(sign_config, cert_manager)
+    except Exception as e:
+        # Un error en el inicializador rompe el pool; se reporta por chunk
+        _worker_error = str(e)
+
+
+def _worker_ready() -> bool:
+    """Tarea vacía para forzar el arranque de los workers"""
+    return _worker_signer is not None
+
+
+def _sign_one(signer: XMLSigner, work_item: _WorkItem) -> SigningResult:
+    """Firma un documento capturando cualquier error"""
+    index, xml_content = work_item
+    try:
+        return SigningResult(index, True, sign_xml_bytes(signer, xml_content))
+    except Exception as e:
+        return SigningResult(index, False, error=str(e))
+
+
+def _sign_chunk(chunk: List[_WorkItem]) -> List[SigningResult]:
+    """Procesa un chunk completo en el worker"""
+    if _worker_signer is None:
+        raise RuntimeError(_worker_error or "Worker de firma no inicializado")
+    return [_sign_one(_worker_signer, work_item) for work_item in chunk]
+
+
+def _failed_chunk(chunk: List[_WorkItem], error: BaseException) -> List[SigningResult]:
+    """Resultados para un chunk que no pudo firmarse"""
+    return [SigningResult(index, False, error=f"Error en worker: {error}")
+            for index, _ in chunk]
+
+
+def _iter_chunks(work_items: Iterator[_WorkItem], chunk_size: int) -> Iterator[List[_WorkItem]]:
+    """Agrupa el trabajo en chunks sin materializar la entrada"""
+    while True:
+        chunk = list(islice(work_items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ===============================================
+# SERVICIO DE FIRMA
+# ===============================================
+
+class SigningPool:
+    """
+    Pool de procesos de firma con certificado precargado por worker
+
+    Los workers viven mientras el pool esté abierto: varios llamados a
+    sign_many (incluso desde distintos threads) comparten los mismos
+    procesos y el certificado ya cargado.
+    """
+
+    def __init__(self,
+                 cert_config: CertificateConfig,
+                 sign_config: Optional[DigitalSignConfig] = None,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_pending: Optional[int] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 mp_context: Optional[BaseContext] = None):
+        """
+        Inicializa el servicio de firma (los procesos arrancan en start())
+
+        Args:
+            cert_config: Certificado PKCS#12 que carga cada worker
+            sign_config: Configuración de firma (default DigitalSignConfig())
+            workers: Procesos worker. None usa todos los núcleos
+            chunk_size: Documentos por chunk enviado a cada worker
+            max_pending: Chunks en vuelo por llamada a sign_many
+                (default workers * MAX_PENDING_CHUNKS_PER_WORKER)
+            max_retries: Reenvíos de un chunk tras la caída de un worker
+            mp_context: Contexto de multiprocessing (p.ej. "spawn" para no
+                heredar el estado del proceso padre)
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser mayor a 0")
+        if max_retries < 0:
+            raise ValueError("max_retries no puede ser negativo")
+
+        self.cert_config = cert_config
+        self.sign_config = sign_config or DigitalSignConfig()
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or self.workers * MAX_PENDING_CHUNKS_PER_WORKER
+        self.max_retries = max_retries
+        self.mp_context = mp_context
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            'documents_signed': 0,
+            'documents_failed': 0,
+            'chunks': 0,
+            'restarts': 0,
+            'total_time_ms': 0.0
+        }
+
+    # ===============================================
+    # CICLO DE VIDA
+    # ===============================================
+
+    def __enter__(self) -> "SigningPool":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def start(self) -> "SigningPool":
+        """
+        Arranca los workers y espera a que carguen el certificado
+
+        Returns:
+            SigningPool: El mismo pool (para encadenar)
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(_worker_ready) for _ in range(self.workers)]
+        wait(futures)
+        return self
+
+    def close(self, wait: bool = True) -> None:
+        """Detiene los workers; el pool no puede reutilizarse después"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Executor actual, creándolo si hace falta"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("SigningPool cerrado")
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=self.mp_context,
+                    initializer=_init_worker,
+                    initargs=(self.cert_config, self.sign_config)
+                )
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Reemplaza un executor roto (otro thread puede haberlo hecho ya)"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._stats['restarts'] += 1
+                broken.shutdown(wait=False, cancel_futures=True)
+        return self._get_executor()
+
+    def _submit(self, chunk: List[_WorkItem]) -> Tuple[Future, ProcessPoolExecutor]:
+        """Envía un chunk, recreando el pool si está roto"""
+        executor = self._get_executor()
+        try:
+            return executor.submit(_sign_chunk, chunk), executor
+        except BrokenProcessPool:
+            executor = self._restart(executor)
+            return executor.submit(_sign_chunk, chunk), executor
+
+    # ===============================================
+    # API DE LOTES
+    # ===============================================
+
+    def sign_many(self,
+                  xml_iterable: Iterable[Union[str, bytes]],
+                  chunk_size: Optional[int] = None) -> Iterator[SigningResult]:
+        """
+        Firma muchos documentos en paralelo
+
+        Args:
+            xml_iterable: Iterable de documentos XML (bytes o str)
+            chunk_size: Documentos por chunk (default el del pool)
+
+        Yields:
+            SigningResult: Un resultado por documento, en orden de entrada
+        """
+        chunk_size = chunk_size or self.chunk_size
+        chunks = _iter_chunks(enumerate(xml_iterable), chunk_size)
+        start = time.perf_counter()
+
+        # future -> (secuencia, chunk, intentos, executor usado)
+        pending: Dict[Future, Tuple[int, List[_WorkItem], int, ProcessPoolExecutor]] = {}
+        completed: Dict[int, List[SigningResult]] = {}
+        next_seq = 0
+        next_to_yield = 0
+
+        def submit(seq: int, chunk: List[_WorkItem], attempts: int) -> None:
+            future, executor = self._submit(chunk)
+            pending[future] = (seq, chunk, attempts, executor)
+
+        def submit_more() -> None:
+            nonlocal next_seq
+            # Los chunks completados que esperan su turno también cuentan
+            while len(pending) + len(completed) < self.max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                submit(next_seq, chunk, 0)
+                next_seq += 1
+
+        try:
+            submit_more()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    seq, chunk, attempts, executor = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool as e:
+                        self._restart(executor)
+                        if attempts < self.max_retries:
+                            submit(seq, chunk, attempts + 1)
+                            continue
+                        results = _failed_chunk(chunk, e)
+                    except Exception as e:
+                        results = _failed_chunk(chunk, e)
+                    completed[seq] = results
+                    self._record(results)
+
+                while next_to_yield in completed:
+                    yield from completed.pop(next_to_yield)
+                    next_to_yield += 1
+
+                submit_more()
+        finally:
+            # Consumidor que abandona el lote: no dejar trabajo en cola
+            for future in pending:
+                future.cancel()
+            with self._lock:
+                self._stats['total_time_ms'] += (time.perf_counter() - start) * 1000
+
+    def _record(self, results: List[SigningResult]) -> None:
+        """Actualiza las estadísticas con un chunk terminado"""
+        signed = sum(1 for result in results if result.success)
+        with self._lock:
+            self._stats['chunks'] += 1
+            self._stats['documents_signed'] += signed
+            self._stats['documents_failed'] += len(results) - signed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas acumuladas del pool"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats['workers'] = self.workers
+        stats['running'] = self._executor is not None
+        return stats
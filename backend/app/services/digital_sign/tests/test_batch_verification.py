@@ -0,0 +1,109 @@
+"""
+Tests para la verificación de firmas por lotes
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from ..batch_verification import clear_public_keys, verify_many
+from ..config import DigitalSignConfig
+from ..xml_signer import XMLSigner
+
+
+def _signer(nombre: str) -> XMLSigner:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=1024)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, nombre)])
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        private_key.public_key()
+    ).serial_number(x509.random_serial_number()).not_valid_before(
+        datetime.utcnow()
+    ).not_valid_after(
+        datetime.utcnow() + timedelta(days=365)
+    ).sign(private_key, hashes.SHA256())
+    return XMLSigner(DigitalSignConfig(), SimpleNamespace(certificate=cert, private_key=private_key))
+
+
+@pytest.fixture(scope="module")
+def signer():
+    return _signer("empresa1")
+
+
+@pytest.fixture(autouse=True)
+def _sin_cache():
+    clear_public_keys()
+    yield
+    clear_public_keys()
+
+
+def _firmado(signer: XMLSigner, numero: int) -> str:
+    return signer.sign_xml(f"<rDE><DE><dNumDoc>{numero}</dNumDoc></DE></rDE>")
+
+
+def _huella(signer: XMLSigner) -> str:
+    return signer.cert_manager.certificate.fingerprint(hashes.SHA256()).hex()
+
+
+def test_verify_many_en_pool(signer):
+    """Test resultados en orden, documento alterado inválido y totales"""
+    documentos = [_firmado(signer, i) for i in range(9)]
+    documentos[4] = documentos[4].replace("<dNumDoc>4<", "<dNumDoc>5<")
+
+    run = signer.verify_many(documentos, workers=2, chunk_size=2)
+    results = list(run)
+
+    assert [r.index for r in results] == list(range(9))
+    assert [r.is_valid for r in results] == [i != 4 for i in range(9)]
+    assert results[4].error == "DigestValue no coincide con el documento"
+    assert {r.fingerprint for r in results} == {_huella(signer)}
+    for documento, result in zip(documentos, results):
+        assert result.is_valid == signer.verify_signature(documento)
+
+    assert run.stats["documents"] == 9
+    assert (run.stats["valid"], run.stats["invalid"]) == (8, 1)
+    assert run.stats["key_cache_misses"] <= 2
+    assert run.stats["wall_time_ms"] > 0
+
+
+def test_clave_publica_cacheada_por_huella(signer):
+    """Test el certificado embebido se parsea una vez por certificado"""
+    otro = _signer("empresa2")
+    documentos = [_firmado(signer, 1), _firmado(otro, 2), _firmado(signer, 3)]
+
+    run = verify_many(documentos, workers=1)
+    results = list(run)
+
+    assert all(r.is_valid for r in results)
+    assert [r.key_cached for r in results] == [False, False, True]
+    assert results[0].fingerprint != results[1].fingerprint
+    assert (run.stats["key_cache_hits"], run.stats["key_cache_misses"]) == (1, 2)
+
+
+def test_certificado_no_confiable(signer):
+    """Test una firma íntegra con un certificado fuera de la lista es inválida"""
+    otro = _signer("empresa2")
+    documentos = [_firmado(signer, 1), _firmado(otro, 2)]
+
+    results = list(verify_many(documentos, workers=1,
+                               trusted_fingerprints=[_huella(signer).upper()]))
+
+    assert [r.is_valid for r in results] == [True, False]
+    assert results[1].error == "Certificado no confiable"
+
+
+def test_firma_alterada_y_documentos_invalidos(signer):
+    """Test los errores por documento no abortan el lote"""
+    firmado = _firmado(signer, 1)
+    valor = firmado.split("<ds:SignatureValue>")[1][:8]
+    alterado = firmado.replace(valor, "00000000", 1)
+
+    results = list(verify_many([alterado, "<rDE>", "<rDE/>", firmado], workers=1))
+
+    assert [r.is_valid for r in results] == [False, False, False, True]
+    assert results[0].error == "SignatureValue inválido"
+    assert results[1].error.startswith("Error al verificar firma")
+    assert results[2].error == "No se encontró firma en el XML"
@@ -26,6 +26,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import secrets
 import os
+import sys
 from typing import Any, Dict
 
 # ANÁLISIS: Imports siguiendo patrón del proyecto
@@ -34,7 +35,12 @@ try:
         CSCManager,
         CSCError,
         CSCValidationError,
-        CSCGenerationError
+        CSCGenerationError,
+        CSCSequence,
+        CSC_COUNTER_SPACE,
+        CSC_RESERVE_BLOCK,
+        ExpiringCSCCache,
+        get_csc_sequence
     )
     from backend.app.services.digital_sign.certificate_manager import CertificateManager
     from backend.app.services.digital_sign.config import CertificateConfig, DigitalSignConfig
@@ -42,6 +48,8 @@ try:
 except ImportError:
     # Fallback para imports relativos en testing
     from ..csc_manager import CSCManager, CSCError, CSCValidationError, CSCGenerationError
+    from ..csc_manager import CSCSequence, CSC_COUNTER_SPACE, CSC_RESERVE_BLOCK
+    from ..csc_manager import ExpiringCSCCache, get_csc_sequence
     from ..certificate_manager import CertificateManager
     from ..config import CertificateConfig, DigitalSignConfig
     from ..exceptions import DigitalSignError
@@ -69,6 +77,19 @@ def mock_cert_manager():
     return mock_manager
 
 
+@pytest.fixture(autouse=True)
+def csc_slot_dir(tmp_path, monkeypatch):
+    """Directorio de slots aislado y secuencia del proceso reiniciada"""
+    slot_dir = tmp_path / "csc_slots"
+    monkeypatch.setenv("SIFEN_CSC_SLOT_DIR", str(slot_dir))
+    module = sys.modules[CSCSequence.__module__]
+    module._sequence = None
+    yield slot_dir
+    if module._sequence is not None:
+        module._sequence.close()
+        module._sequence = None
+
+
 @pytest.fixture
 def valid_config():
     """Configuración válida para CSC Manager"""
@@ -558,6 +579,195 @@ class TestCSCIntegration:
         assert "***" in logged_message
 
 
+# ========================================
+# TESTS DE GENERACIÓN MASIVA - Secuencia sin colisiones
+# ========================================
+
+def _generar_en_proceso(n: int) -> list:
+    """Genera CSCs en un proceso hijo (fork)"""
+    return get_csc_sequence().next_batch(n)
+
+
+class TestCSCSequence:
+    """Tests para la secuencia CSC por slot de proceso"""
+
+    def test_generate_batch_unico_y_valido(self, csc_manager):
+        """
+        Test: Un lote grande no repite CSCs y todos son válidos
+        """
+        ruc = "80016875-1"
+
+        cscs = csc_manager.generate_batch(ruc, "01", 5000)
+
+        assert len(set(cscs)) == 5000
+        assert all(csc_manager.validate_csc(csc) for csc in cscs[:500])
+        assert not any("80016875" in csc for csc in cscs)
+        assert csc_manager.get_statistics()["csc_cache_size"] == 5000
+
+        with pytest.raises(CSCGenerationError):
+            csc_manager.generate_batch(ruc, "99", 10)
+
+    def test_permutacion_sin_repetidos_en_el_slot(self):
+        """
+        Test: La permutación del contador es biyectiva dentro del slot
+        """
+        sequence = CSCSequence(slot=7)
+        values = [sequence._permute(i) for i in range(200000)]
+
+        assert len(set(values)) == len(values)
+        assert all(0 <= v < CSC_COUNTER_SPACE for v in values)
+        assert all(csc.startswith("07") for csc in sequence.next_batch(100))
+
+    def test_slots_exclusivos_por_proceso(self, tmp_path):
+        """
+        Test: Dos secuencias vivas nunca reservan el mismo slot
+        """
+        primera = CSCSequence.claim(tmp_path)
+        segunda = CSCSequence.claim(tmp_path)
+        try:
+            assert primera.slot != segunda.slot
+        finally:
+            primera.close()
+            segunda.close()
+
+        tercera = CSCSequence.claim(tmp_path)
+        tercera.close()
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="Requiere fork")
+    def test_unicidad_entre_procesos(self):
+        """
+        Test: Procesos hijos (fork) reservan su propio slot y no colisionan
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        padre = get_csc_sequence().next_batch(2000)
+        with ProcessPoolExecutor(max_workers=3,
+                                 mp_context=multiprocessing.get_context("fork")) as pool:
+            hijos = list(pool.map(_generar_en_proceso, [2000] * 3))
+
+        todos = padre + [csc for lote in hijos for csc in lote]
+        assert len(set(todos)) == len(todos)
+        # El slot heredado del padre no se reutiliza en los hijos
+        assert padre[0][:2] not in {lote[0][:2] for lote in hijos}
+
+    def test_reinicio_continua_el_slot(self, csc_slot_dir, monkeypatch):
+        """
+        Test: Un proceso que reclama el mismo slot tras otro no repite CSCs
+        """
+        monkeypatch.setattr(secrets, "randbelow", lambda n: 0)
+        primera = CSCSequence.claim(csc_slot_dir)
+        antes = primera.next_batch(1000)
+        primera.close()
+
+        segunda = CSCSequence.claim(csc_slot_dir)
+        try:
+            despues = segunda.next_batch(1000)
+        finally:
+            segunda.close()
+
+        assert segunda.slot == primera.slot == 0
+        assert segunda.epoch == 0
+        assert set(antes).isdisjoint(despues)
+
+    def test_proceso_muerto_no_reutiliza_su_bloque(self, csc_slot_dir, monkeypatch):
+        """
+        Test: Sin close() el siguiente proceso salta el bloque reservado
+        """
+        monkeypatch.setattr(secrets, "randbelow", lambda n: 0)
+        muerta = CSCSequence.claim(csc_slot_dir)
+        antes = muerta.next_batch(10)
+        # Simula la muerte del proceso: el lock se libera sin guardar
+        os.close(muerta._lock_fd)
+        muerta._lock_fd = None
+
+        nueva = CSCSequence.claim(csc_slot_dir)
+        try:
+            assert nueva._counter == CSC_RESERVE_BLOCK
+            assert set(antes).isdisjoint(nueva.next_batch(10))
+        finally:
+            nueva.close()
+
+    def test_espacio_agotado_inicia_nueva_epoca(self, csc_slot_dir, monkeypatch):
+        """
+        Test: Al agotar el contador del slot se persiste una época nueva
+        """
+        monkeypatch.setattr(secrets, "randbelow", lambda n: 0)
+        csc_slot_dir.mkdir(mode=0o700)
+        clave = "ab" * 32
+        (csc_slot_dir / "slot-00.lock").write_text(
+            f"3 {CSC_COUNTER_SPACE - 5} {clave}\n")
+
+        sequence = CSCSequence.claim(csc_slot_dir)
+        try:
+            sequence.next_batch(10)
+            assert sequence.epoch == 4
+        finally:
+            sequence.close()
+
+        epoca, contador, nueva_clave = (
+            (csc_slot_dir / "slot-00.lock").read_text().split())
+        assert int(epoca) == 4
+        assert 0 < int(contador) <= 10
+        assert nueva_clave != clave
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="Requiere permisos POSIX")
+    def test_directorio_de_slots_no_privado(self, csc_slot_dir):
+        """
+        Test: Un directorio de slots escribible por otros se rechaza
+        """
+        csc_slot_dir.mkdir()
+        csc_slot_dir.chmod(0o777)
+
+        with pytest.raises(CSCGenerationError):
+            CSCSequence.claim(csc_slot_dir)
+
+    def test_generate_batch_envuelve_errores_internos(self, csc_manager):
+        """
+        Test: Fallas de la secuencia se reportan como CSCGenerationError
+        """
+        module = sys.modules[CSCSequence.__module__]
+        with patch.object(module, "get_csc_sequence", side_effect=OSError("disco lleno")):
+            with pytest.raises(CSCGenerationError, match="disco lleno"):
+                csc_manager.generate_batch("80016875-1", "01", 10)
+
+
+class TestExpiringCSCCache:
+    """Tests para el cache de CSCs ordenado por hora de generación"""
+
+    def test_expira_solo_el_frente(self):
+        """
+        Test: Los CSCs viejos se descartan al insertar, los nuevos quedan
+        """
+        cache = ExpiringCSCCache(max_age=timedelta(hours=24))
+        inicio = datetime(2025, 1, 1, 8, 0, 0)
+        cache.add_many(["100000001", "100000002"], inicio)
+        cache.add("100000003", inicio + timedelta(hours=12))
+
+        assert cache.count_expired(inicio + timedelta(hours=25)) == 2
+        cache.add("100000004", inicio + timedelta(hours=25))
+
+        assert len(cache) == 2
+        assert "100000001" not in cache
+        assert cache.get("100000003") == inicio + timedelta(hours=12)
+
+    def test_tamano_maximo(self, mock_cert_manager):
+        """
+        Test: Al superar cache_max_size se expulsan los más viejos
+        """
+        manager = CSCManager(mock_cert_manager, cache_max_size=1000)
+
+        cscs = manager.generate_batch("80016875-1", "01", 1500)
+        ultimo = manager.generate_csc("80016875-1")
+
+        stats = manager.get_statistics()
+        assert stats["csc_cache_size"] == 1000
+        assert stats["csc_cache_evictions"] == 501
+        assert manager.get_expiry_time(cscs[0]) <= datetime.now()
+        assert manager.get_expiry_time(ultimo) > datetime.now() + timedelta(hours=23)
+        assert not manager.is_csc_expired(cscs[-1])
+
+
 # ========================================
 # CONFIGURACIÓN DE PYTEST
 # ========================================
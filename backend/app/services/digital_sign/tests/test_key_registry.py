@@ -0,0 +1,126 @@
+"""
+Tests para el registro de certificados y claves privadas por empresa
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+from .. import key_registry
+from ..certificate_manager import CertificateManager
+from ..config import CertificateConfig
+from ..key_registry import KeyRegistry, get_key_registry, reset_key_registry
+
+
+def _write_pfx(path, password=b"test123"):
+    """Escribe un PFX auto-firmado nuevo y retorna su certificado"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=1024)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, path.stem)])
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        private_key.public_key()
+    ).serial_number(x509.random_serial_number()).not_valid_before(
+        datetime.utcnow()
+    ).not_valid_after(
+        datetime.utcnow() + timedelta(days=365)
+    ).sign(private_key, hashes.SHA256())
+    path.write_bytes(pkcs12.serialize_key_and_certificates(
+        name=b"Test", key=private_key, cert=cert, cas=None,
+        encryption_algorithm=serialization.BestAvailableEncryption(password)
+    ))
+    return cert
+
+
+@pytest.fixture
+def registry():
+    return KeyRegistry(max_entries=2)
+
+
+def test_empresa_que_vuelve_no_toca_disco_ni_kdf(registry, tmp_path, monkeypatch):
+    """Test un acierto no hace stat, open ni descifrado"""
+    path = tmp_path / "empresa1.pfx"
+    cert = _write_pfx(path)
+    loaded = registry.get("empresa-1", path, "test123")
+
+    def prohibido(*args, **kwargs):
+        raise AssertionError("acceso a disco o KDF")
+
+    monkeypatch.setattr(key_registry, "_file_id", prohibido)
+    monkeypatch.setattr(key_registry, "load_pkcs12", prohibido)
+
+    assert registry.get("empresa-1") is loaded
+    assert registry.get_by_serial(format(cert.serial_number, "x")) is loaded
+    stats = registry.get_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["avg_load_time_ms"] == loaded.load_time_ms
+
+
+def test_recarga_si_cambia_el_archivo(tmp_path):
+    """Test un PFX reemplazado se recarga pasado stat_interval"""
+    registry = KeyRegistry(stat_interval=0)
+    path = tmp_path / "empresa1.pfx"
+    _write_pfx(path)
+    anterior = registry.get("empresa-1", path, "test123")
+    assert registry.get("empresa-1") is anterior
+
+    nuevo_cert = _write_pfx(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    nuevo = registry.get("empresa-1")
+    assert nuevo is not anterior
+    assert nuevo.certificate == nuevo_cert
+    assert registry.get_stats()["reloads"] == 1
+
+
+def test_lru_acotado(registry, tmp_path):
+    """Test la clave menos usada se expulsa y se recarga bajo demanda"""
+    for i in range(3):
+        path = tmp_path / f"empresa{i}.pfx"
+        _write_pfx(path)
+        registry.register(i, path, "test123")
+
+    primera = registry.get(0)
+    registry.get(1)
+    registry.get(0)
+    registry.get(2)
+
+    stats = registry.get_stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert registry.get(0) is primera
+    assert registry.get(1) is not None
+    assert registry.get_stats()["misses"] == 4
+
+
+def test_contrasena_incorrecta_no_recibe_clave_cacheada(registry, tmp_path):
+    """Test otra contraseña para el mismo PFX vuelve a pasar por el KDF"""
+    path = tmp_path / "empresa1.pfx"
+    _write_pfx(path)
+    registry.get("empresa-1", path, "test123")
+
+    with pytest.raises(ValueError):
+        registry.get("empresa-1", path, "incorrecta")
+    with pytest.raises(ValueError, match="no registrado"):
+        registry.get("desconocida")
+
+
+def test_certificate_manager_comparte_clave(tmp_path):
+    """Test instancias de CertificateManager del mismo PFX no lo re-descifran"""
+    reset_key_registry()
+    path = tmp_path / "empresa1.pfx"
+    _write_pfx(path)
+    config = CertificateConfig(cert_path=path, cert_password="test123")
+
+    primero = CertificateManager(config)
+    segundo = CertificateManager(config)
+
+    try:
+        assert primero.private_key is segundo.private_key
+        assert get_key_registry().get_stats()["misses"] == 1
+    finally:
+        reset_key_registry()
@@ -0,0 +1,121 @@
+"""
+Tests para el servicio de firma sobre un pool de procesos
+"""
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509.oid import NameOID
+
+from ..config import CertificateConfig, DigitalSignConfig
+from ..signing_pool import SigningPool, SigningResult
+from ..xml_signer import XMLSigner
+
+# Workers sin heredar los patches de CertificateManager de otros tests
+SPAWN = multiprocessing.get_context("spawn")
+
+
+@pytest.fixture(scope="module")
+def pfx(tmp_path_factory):
+    """PKCS#12 temporal con certificado auto-firmado"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test.sifen.local")])
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        private_key.public_key()
+    ).serial_number(x509.random_serial_number()).not_valid_before(
+        datetime.utcnow()
+    ).not_valid_after(
+        datetime.utcnow() + timedelta(days=365)
+    ).sign(private_key, hashes.SHA256())
+
+    path = tmp_path_factory.mktemp("pfx") / "test.pfx"
+    path.write_bytes(pkcs12.serialize_key_and_certificates(
+        name=b"Test", key=private_key, cert=cert, cas=None,
+        encryption_algorithm=serialization.BestAvailableEncryption(b"test123")
+    ))
+    return SimpleNamespace(path=path, certificate=cert, private_key=private_key)
+
+
+@pytest.fixture
+def pool(pfx):
+    config = CertificateConfig(cert_path=pfx.path, cert_password="test123")
+    with SigningPool(config, workers=2, chunk_size=2, mp_context=SPAWN) as pool:
+        yield pool
+
+
+def _xml(numero: int) -> bytes:
+    return f"<rDE><DE Id=\"{numero:044d}\"><dNumDoc>{numero}</dNumDoc></DE></rDE>".encode()
+
+
+def test_sign_many_igual_a_sign_xml(pool, pfx):
+    """Test los workers producen la misma firma que XMLSigner en el proceso"""
+    signer = XMLSigner(DigitalSignConfig(), SimpleNamespace(
+        certificate=pfx.certificate, private_key=pfx.private_key))
+    documentos = [_xml(i) for i in range(7)]
+
+    results = list(pool.sign_many(documentos))
+
+    assert [r.index for r in results] == list(range(7))
+    for documento, result in zip(documentos, results):
+        assert result.success
+        assert result.xml == signer.sign_xml(documento.decode()).encode("utf-8")
+    assert signer.verify_signature(results[0].xml.decode())
+    assert pool.get_stats()["documents_signed"] == 7
+
+
+def test_error_por_documento_no_aborta(pool):
+    """Test un XML mal formado vuelve como resultado fallido"""
+    results = list(pool.sign_many([_xml(1), b"<rDE>", _xml(2)]))
+
+    assert [r.success for r in results] == [True, False, True]
+    assert results[1] == SigningResult(1, False, error=results[1].error)
+    assert "Error al firmar XML" in results[1].error
+
+
+def test_backpressure(pool):
+    """Test la entrada se consume de a poco (chunks en vuelo acotados)"""
+    consumidos = []
+
+    def documentos():
+        for i in range(100):
+            consumidos.append(i)
+            yield _xml(i)
+
+    results = pool.sign_many(documentos())
+    next(results)
+
+    limite = pool.chunk_size * (pool.max_pending + 1)
+    assert len(consumidos) <= limite
+    assert len(list(results)) == 99
+
+
+def test_reinicia_workers_caidos(pool):
+    """Test un worker caído se reemplaza y el lote sigue"""
+    executor = pool._get_executor()
+    executor.submit(os._exit, 1).exception()
+
+    results = list(pool.sign_many([_xml(i) for i in range(4)]))
+
+    assert all(r.success for r in results)
+    assert pool.get_stats()["restarts"] == 1
+
+
+def test_certificado_invalido(pfx):
+    """Test una contraseña incorrecta falla por documento, sin reintentos"""
+    config = CertificateConfig(cert_path=pfx.path, cert_password="incorrecta")
+
+    with SigningPool(config, workers=1, mp_context=SPAWN) as pool:
+        results = list(pool.sign_many([_xml(1), _xml(2)]))
+
+    assert [r.success for r in results] == [False, False]
+    assert "Error al cargar el certificado" in results[0].error
+    assert pool.get_stats()["restarts"] == 0
+
+    with pytest.raises(RuntimeError, match="cerrado"):
+        list(pool.sign_many([_xml(1)]))
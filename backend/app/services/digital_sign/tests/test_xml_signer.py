@@ -1,14 +1,25 @@
 """
 Tests para el firmador XML de SIFEN
 """
+import base64
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
 from lxml import etree
-from datetime import datetime, timedelta
-from ..xml_signer import XMLSigner
+from datetime import datetime
+from ..xml_signer import XMLSigner, clear_signature_templates, get_signature_template
+from .. import xml_signer as xml_signer_module
 from ..config import CertificateConfig, DigitalSignConfig
 from ..certificate_manager import CertificateManager
+from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.serialization import pkcs12
+from app.services.xml_generator.generator import XMLGenerator
+from app.services.xml_generator.tree_builder import XMLTreeBuilder, SIFEN_NAMESPACE
+from app.services.xml_generator.tests.test_tree_builder import (
+    CDC_PRUEBA, _contexto_completo, _factura
+)
+
+DS = "{http://www.w3.org/2000/09/xmldsig#}"
 
 
 @pytest.fixture
@@ -112,6 +123,125 @@ def xml_signer(test_certificate):
     return XMLSigner(sign_config, cert_manager)
 
 
+@pytest.fixture
+def tree_signer(test_certificate):
+    """Fixture de XMLSigner con el certificado y la clave ya cargados"""
+    cert_manager = SimpleNamespace(
+        certificate=test_certificate['certificate'],
+        private_key=test_certificate['private_key']
+    )
+    return XMLSigner(DigitalSignConfig(), cert_manager)
+
+
+def test_sign_tree_igual_a_texto(tree_signer, test_xml, parser):
+    """Test firmar el árbol lxml da el mismo resultado que firmar el texto"""
+    tree = etree.fromstring(test_xml.encode('utf-8'), parser)
+
+    signed_from_tree = tree_signer.sign_xml(tree)
+
+    assert signed_from_tree == tree_signer.sign_xml(test_xml)
+    assert tree_signer.verify_signature(signed_from_tree)
+    # sign_xml no modifica el árbol recibido
+    assert tree.find(".//{http://www.w3.org/2000/09/xmldsig#}Signature") is None
+
+
+def test_sign_tree_en_el_lugar(tree_signer, test_xml, parser):
+    """Test sign_tree agrega la firma al mismo árbol"""
+    tree = etree.fromstring(test_xml.encode('utf-8'), parser)
+
+    signed = tree_signer.sign_tree(tree)
+
+    assert signed is tree
+    assert tree.find(".//{http://www.w3.org/2000/09/xmldsig#}SignatureValue") is not None
+
+
+def test_template_de_firma_por_certificado(tree_signer, test_xml, test_certificate, monkeypatch):
+    """Test el subárbol ds:Signature se construye una vez por certificado"""
+    clear_signature_templates()
+    builds = []
+    build = xml_signer_module.build_signature_template
+
+    def contar(certificate):
+        builds.append(certificate)
+        return build(certificate)
+
+    monkeypatch.setattr(xml_signer_module, "build_signature_template", contar)
+
+    primero = tree_signer.sign_xml(test_xml)
+    segundo = tree_signer.sign_xml(test_xml.replace("Test", "Otro"))
+
+    assert len(builds) == 1
+    template = get_signature_template(test_certificate['certificate'])
+    # El template compartido no recibe valores de ningún documento
+    assert template.find(f".//{DS}DigestValue").text is None
+    assert template.find(f".//{DS}SignatureValue").text is None
+    assert tree_signer.verify_signature(primero)
+    assert tree_signer.verify_signature(segundo)
+
+
+def test_digest_c14n_exclusivo(tree_signer, parser):
+    """Test el DigestValue es el SHA-256 del documento en C14N exclusivo"""
+    xml = '<root xmlns:x="urn:no-usado"><!-- comentario --><data>Test</data></root>'
+
+    signed = etree.fromstring(tree_signer.sign_xml(xml).encode('utf-8'), parser)
+    signature = signed.find(f"{DS}Signature")
+    digest_value = signature.find(f".//{DS}DigestValue").text
+    signed.remove(signature)
+
+    expected = hashes.Hash(hashes.SHA256())
+    expected.update(etree.tostring(signed, method="c14n", exclusive=True, with_comments=False))
+    assert digest_value == base64.b64encode(expected.finalize()).decode('ascii')
+
+
+def test_valores_en_base64(tree_signer, test_certificate, parser):
+    """Test DigestValue y SignatureValue se escriben como base64Binary"""
+    signed = etree.fromstring(tree_signer.sign_xml('<root><data>Test</data></root>').encode('utf-8'), parser)
+
+    digest = base64.b64decode(signed.find(f".//{DS}DigestValue").text, validate=True)
+    signature = base64.b64decode(signed.find(f".//{DS}SignatureValue").text, validate=True)
+
+    key_size = test_certificate['private_key'].key_size
+    assert len(digest) == 32
+    assert len(signature) == key_size // 8
+
+
+def test_firma_rde_con_namespace_sifen(tree_signer, parser):
+    """Test un rDE ya calificado en el namespace SIFEN se firma y verifica,
+    tanto el árbol de XMLTreeBuilder como su texto serializado"""
+    tree = XMLTreeBuilder().build(_contexto_completo(), "1")
+
+    signed_from_tree = tree_signer.sign_xml(tree)
+    signed_from_text = tree_signer.sign_xml(etree.tostring(tree).decode('utf-8'))
+
+    assert signed_from_tree == signed_from_text
+    assert signed_from_tree.count(f'xmlns="{SIFEN_NAMESPACE}"') == 1
+    assert tree_signer.verify_signature(signed_from_tree)
+    root = etree.fromstring(signed_from_tree.encode('utf-8'), parser)
+    assert root.tag == f"{{{SIFEN_NAMESPACE}}}rDE"
+
+
+def test_generador_firma_y_verifica_arbol(tree_signer, monkeypatch):
+    """Test de punta a punta: árbol del generador -> sign_tree -> verify_signature"""
+    generator = XMLGenerator(engine="lxml")
+    build_context = generator._build_document_context
+
+    def contexto_con_datos_fe(*args, **kwargs):
+        context = build_context(*args, **kwargs)
+        context.setdefault("datos_fe", {})
+        return context
+
+    monkeypatch.setattr(generator, "_build_document_context", contexto_con_datos_fe)
+    tree = generator.generate_document_tree(_factura(), cdc=CDC_PRUEBA)
+
+    signed = tree_signer.sign_tree(tree)
+
+    assert signed is tree
+    assert signed[-1].tag == f"{DS}Signature"
+    xml = etree.tostring(signed, xml_declaration=True, encoding="UTF-8").decode('utf-8')
+    assert tree_signer.verify_signature(xml)
+    assert not tree_signer.verify_signature(xml.replace(CDC_PRUEBA, CDC_PRUEBA[:-1] + "8"))
+
+
 def test_sign_xml(xml_signer, test_xml, parser):
     """Test que verifica que el XML se firma correctamente"""
     signed_xml = xml_signer.sign_xml(test_xml)
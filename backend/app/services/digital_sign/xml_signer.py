@@ -1,14 +1,159 @@
 """
 Firmador de documentos XML para SIFEN
+
+Optimizaciones:
+    - El subárbol ds:Signature (incluido el texto PEM de X509Certificate)
+      se construye una sola vez por certificado y se copia por documento;
+      solo se completan DigestValue y SignatureValue.
+    - Los digests se calculan sobre la serialización C14N exclusiva
+      declarada en CanonicalizationMethod, escrita directamente en el
+      objeto hash sin string intermedio.
+
+DigestValue y SignatureValue se escriben en base64 (base64Binary de
+XMLDSig), el formato que verifica SIFEN.
 """
-from typing import Optional
+import base64
+import binascii
+import threading
+from copy import deepcopy
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple, Union
 from lxml import etree
+from cryptography import x509
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
 from cryptography.hazmat.primitives.serialization import Encoding
 from .config import DigitalSignConfig
 from .certificate_manager import CertificateManager
 
+if TYPE_CHECKING:
+    from .batch_verification import VerificationRun
+
+SIFEN_NAMESPACE = "http://ekuatia.set.gov.py/sifen/xsd"
+DS_NAMESPACE = "http://www.w3.org/2000/09/xmldsig#"
+C14N_EXCLUSIVE_ALGORITHM = "http://www.w3.org/2001/10/xml-exc-c14n#"
+SIGNATURE_ALGORITHM = "http://www.w3.org/2001/04/xmldsig-more#rsa-sha256"
+ENVELOPED_TRANSFORM = "http://www.w3.org/2000/09/xmldsig#enveloped-signature"
+DIGEST_ALGORITHM = "http://www.w3.org/2001/04/xmlenc#sha256"
+
+_DS = "{%s}" % DS_NAMESPACE
+
+
+# ===============================================
+# DIGEST C14N EXCLUSIVO
+# ===============================================
+
+class _HashWriter:
+    """Destino file-like que vuelca la salida C14N en un hash"""
+
+    def __init__(self, digest: hashes.Hash):
+        self._digest = digest
+
+    def write(self, data: bytes) -> None:
+        self._digest.update(data)
+
+
+def exc_c14n_digest(element: etree._Element) -> bytes:
+    """
+    SHA-256 de la serialización C14N exclusiva (sin comentarios)
+
+    Args:
+        element: Elemento a canonicalizar (documento o SignedInfo)
+
+    Returns:
+        bytes: Digest SHA-256
+    """
+    digest = hashes.Hash(hashes.SHA256())
+    etree.ElementTree(element).write_c14n(
+        _HashWriter(digest), exclusive=True, with_comments=False)
+    return digest.finalize()
+
+
+def _ds_b64decode(text: Optional[str]) -> Optional[bytes]:
+    """
+    Decodifica un valor base64Binary de XMLDSig (admite saltos de línea)
+
+    Returns:
+        Optional[bytes]: Bytes decodificados, o None si no es base64 válido
+    """
+    try:
+        return base64.b64decode("".join((text or "").split()), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+# ===============================================
+# TEMPLATE DE FIRMA POR CERTIFICADO
+# ===============================================
+
+# Templates ds:Signature por huella SHA-256 del certificado
+_signature_templates: Dict[bytes, etree._Element] = {}
+_templates_lock = threading.Lock()
+
+
+def build_signature_template(certificate: x509.Certificate) -> etree._Element:
+    """
+    Construye el subárbol ds:Signature de un certificado
+
+    DigestValue y SignatureValue quedan vacíos; el resto (algoritmos y
+    X509Certificate) es igual para todos los documentos del certificado.
+
+    Args:
+        certificate: Certificado del firmante
+
+    Returns:
+        etree._Element: Elemento ds:Signature
+    """
+    signature = etree.Element(_DS + "Signature", nsmap={"ds": DS_NAMESPACE})
+
+    signed_info = etree.SubElement(signature, _DS + "SignedInfo")
+    etree.SubElement(signed_info, _DS + "CanonicalizationMethod",
+                     Algorithm=C14N_EXCLUSIVE_ALGORITHM)
+    etree.SubElement(signed_info, _DS + "SignatureMethod",
+                     Algorithm=SIGNATURE_ALGORITHM)
+    reference = etree.SubElement(signed_info, _DS + "Reference", URI="")
+    transforms = etree.SubElement(reference, _DS + "Transforms")
+    etree.SubElement(transforms, _DS + "Transform", Algorithm=ENVELOPED_TRANSFORM)
+    etree.SubElement(reference, _DS + "DigestMethod", Algorithm=DIGEST_ALGORITHM)
+    etree.SubElement(reference, _DS + "DigestValue")
+
+    etree.SubElement(signature, _DS + "SignatureValue")
+
+    key_info = etree.SubElement(signature, _DS + "KeyInfo")
+    x509_data = etree.SubElement(key_info, _DS + "X509Data")
+    x509_certificate = etree.SubElement(x509_data, _DS + "X509Certificate")
+    x509_certificate.text = certificate.public_bytes(encoding=Encoding.PEM).decode('utf-8')
+    return signature
+
+
+def get_signature_template(certificate: x509.Certificate) -> etree._Element:
+    """
+    Template de firma compartido por el proceso para un certificado
+
+    El template no debe modificarse: cada documento usa una copia.
+
+    Args:
+        certificate: Certificado del firmante
+
+    Returns:
+        etree._Element: Elemento ds:Signature cacheado
+    """
+    fingerprint = certificate.fingerprint(hashes.SHA256())
+    template = _signature_templates.get(fingerprint)
+    if template is None:
+        with _templates_lock:
+            template = _signature_templates.get(fingerprint)
+            if template is None:
+                template = build_signature_template(certificate)
+                _signature_templates[fingerprint] = template
+    return template
+
+
+def clear_signature_templates() -> None:
+    """Descarta los templates cacheados (p.ej. tras rotar certificados)"""
+    with _templates_lock:
+        _signature_templates.clear()
+
 
 class XMLSigner:
     """Firmador de documentos XML"""
@@ -17,161 +162,77 @@ class XMLSigner:
         """Inicializa el firmador XML"""
         self.config = config
         self.cert_manager = cert_manager
+        # (certificado, template) para evitar calcular la huella por documento
+        self._template: Optional[Tuple[x509.Certificate, etree._Element]] = None
 
-    def sign_xml(self, xml_content: str) -> str:
+    def sign_xml(self, xml_content: Union[str, etree._Element]) -> str:
         """
         Firma un documento XML
 
         Args:
-            xml_content: Contenido XML a firmar
+            xml_content: Contenido XML a firmar, o el árbol lxml generado por
+                el motor lxml (se firma una copia, sin reparsear)
 
         Returns:
             str: XML firmado
         """
-        try:
-            # Parsear XML
-            parser = etree.XMLParser(remove_blank_text=True)
-            root = etree.fromstring(xml_content.encode('utf-8'), parser)
-
-            # Agregar namespace de SIFEN al root
-            root.set("xmlns", "http://ekuatia.set.gov.py/sifen/xsd")
-
-            # Calcular digest del documento original
-            canonicalized = etree.tostring(root)
-            digest = hashes.Hash(hashes.SHA256())
-            digest.update(canonicalized)
-            digest_value = digest.finalize()
-
-            # Crear firma
-            signature = etree.SubElement(
-                root,
-                "{http://www.w3.org/2000/09/xmldsig#}Signature",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-
-            # Información de firma
-            signed_info = etree.SubElement(
-                signature,
-                "{http://www.w3.org/2000/09/xmldsig#}SignedInfo",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-
-            # Método de canonicalización
-            canonicalization_method = etree.SubElement(
-                signed_info,
-                "{http://www.w3.org/2000/09/xmldsig#}CanonicalizationMethod",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            canonicalization_method.set(
-                "Algorithm",
-                "http://www.w3.org/2001/10/xml-exc-c14n#"
-            )
+        if isinstance(xml_content, etree._Element):
+            root = deepcopy(xml_content)
+        else:
+            try:
+                # Parsear XML
+                parser = etree.XMLParser(remove_blank_text=True)
+                root = etree.fromstring(xml_content.encode('utf-8'), parser)
+            except Exception as e:
+                raise ValueError(f"Error al firmar XML: {str(e)}")
+
+        self.sign_tree(root)
+
+        # Preservar la declaración XML con encoding UTF-8
+        return '<?xml version="1.0" encoding="UTF-8"?>\n' + etree.tostring(root).decode('utf-8')
+
+    def _signature_template(self) -> etree._Element:
+        """Template del certificado actual (memorizado por instancia)"""
+        certificate = self.cert_manager.certificate
+        cached = self._template
+        if cached is None or cached[0] is not certificate:
+            cached = self._template = (certificate, get_signature_template(certificate))
+        return cached[1]
+
+    def sign_tree(self, root: etree._Element) -> etree._Element:
+        """
+        Firma un árbol XML en el lugar
 
-            # Método de firma
-            signature_method = etree.SubElement(
-                signed_info,
-                "{http://www.w3.org/2000/09/xmldsig#}SignatureMethod",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            signature_method.set(
-                "Algorithm",
-                "http://www.w3.org/2001/04/xmldsig-more#rsa-sha256"
-            )
+        Args:
+            root: Elemento raíz del documento a firmar
 
-            # Referencia
-            reference = etree.SubElement(
-                signed_info,
-                "{http://www.w3.org/2000/09/xmldsig#}Reference",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            reference.set("URI", "")
-
-            # Transformaciones
-            transforms = etree.SubElement(
-                reference,
-                "{http://www.w3.org/2000/09/xmldsig#}Transforms",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            transform = etree.SubElement(
-                transforms,
-                "{http://www.w3.org/2000/09/xmldsig#}Transform",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            transform.set(
-                "Algorithm",
-                "http://www.w3.org/2000/09/xmldsig#enveloped-signature"
-            )
+        Returns:
+            etree._Element: El mismo elemento raíz con la firma agregada
+        """
+        try:
+            # Agregar namespace de SIFEN solo a un root sin namespace; el rDE
+            # de XMLTreeBuilder ya lo trae y redeclararlo rompe el XML
+            if etree.QName(root).namespace is None:
+                root.set("xmlns", SIFEN_NAMESPACE)
 
-            # Digest
-            digest_method = etree.SubElement(
-                reference,
-                "{http://www.w3.org/2000/09/xmldsig#}DigestMethod",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            digest_method.set(
-                "Algorithm",
-                "http://www.w3.org/2001/04/xmlenc#sha256"
-            )
+            # Digest C14N exclusivo del documento original
+            digest_value = exc_c14n_digest(root)
 
-            # Agregar valor del digest
-            digest_value_elem = etree.SubElement(
-                reference,
-                "{http://www.w3.org/2000/09/xmldsig#}DigestValue",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            digest_value_elem.text = digest_value.hex()
+            # Copia del template: Signature/SignedInfo/Reference/DigestValue
+            signature = deepcopy(self._signature_template())
+            signed_info = signature[0]
+            signed_info[2][2].text = base64.b64encode(digest_value).decode('ascii')
+            root.append(signature)
 
-            # Firmar SignedInfo
-            signed_info_canonicalized = etree.tostring(signed_info)
+            # Firmar el SignedInfo canonicalizado
             signature_bytes = self.cert_manager.private_key.sign(
-                signed_info_canonicalized,
+                exc_c14n_digest(signed_info),
                 padding.PKCS1v15(),
-                hashes.SHA256()
-            )
-
-            # Agregar firma
-            signature_value = etree.SubElement(
-                signature,
-                "{http://www.w3.org/2000/09/xmldsig#}SignatureValue",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            signature_value.text = signature_bytes.hex()
-
-            # Agregar certificado
-            key_info = etree.SubElement(
-                signature,
-                "{http://www.w3.org/2000/09/xmldsig#}KeyInfo",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            x509_data = etree.SubElement(
-                key_info,
-                "{http://www.w3.org/2000/09/xmldsig#}X509Data",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
+                Prehashed(hashes.SHA256())
             )
-            x509_certificate = etree.SubElement(
-                x509_data,
-                "{http://www.w3.org/2000/09/xmldsig#}X509Certificate",
-                attrib={},
-                nsmap={"ds": "http://www.w3.org/2000/09/xmldsig#"}
-            )
-            x509_certificate.text = self.cert_manager.certificate.public_bytes(
-                encoding=Encoding.PEM
-            ).decode('utf-8')
+            signature[1].text = base64.b64encode(signature_bytes).decode('ascii')
 
-            # Preservar la declaración XML con encoding UTF-8
-            return '<?xml version="1.0" encoding="UTF-8"?>\n' + etree.tostring(root).decode('utf-8')
+            return root
 
         except Exception as e:
             raise ValueError(f"Error al firmar XML: {str(e)}")
@@ -221,27 +282,27 @@ class XMLSigner:
 
             # Remover firma para calcular digest del documento original
             root.remove(signature)
-            canonicalized = etree.tostring(root)
-            digest = hashes.Hash(hashes.SHA256())
-            digest.update(canonicalized)
-            current_digest = digest.finalize().hex()
+            current_digest = exc_c14n_digest(root)
 
             # Verificar que el digest coincida
-            if current_digest != digest_value.text:
+            if _ds_b64decode(digest_value.text) != current_digest:
+                return False
+
+            signature_bytes = _ds_b64decode(signature_value.text)
+            if signature_bytes is None:
                 return False
 
             # Verificar firma del SignedInfo
-            signed_info_canonicalized = etree.tostring(signed_info)
             public_key = self.cert_manager.certificate.public_key()
             if not isinstance(public_key, rsa.RSAPublicKey):
                 raise ValueError("El certificado no contiene una clave RSA")
 
             try:
                 public_key.verify(
-                    bytes.fromhex(signature_value.text),
-                    signed_info_canonicalized,
+                    signature_bytes,
+                    exc_c14n_digest(signed_info),
                     padding.PKCS1v15(),
-                    hashes.SHA256()
+                    Prehashed(hashes.SHA256())
                 )
                 return True
             except Exception:
@@ -249,3 +310,28 @@ class XMLSigner:
 
         except Exception as e:
             raise ValueError(f"Error al verificar firma: {str(e)}")
+
+    def verify_many(self,
+                    xml_iterable: Iterable[Union[str, bytes]],
+                    workers: Optional[int] = None,
+                    chunk_size: int = 100,
+                    trusted_fingerprints: Optional[Iterable[str]] = None) -> "VerificationRun":
+        """
+        Verifica un lote de XML firmados sobre un pool de procesos
+
+        Cada documento se verifica con el X509Certificate que trae embebido
+        (no con el certificado de este firmador); las claves públicas se
+        cachean por huella en cada worker.
+
+        Args:
+            xml_iterable: Iterable de XML firmados (str o bytes)
+            workers: Procesos worker (None = todos los núcleos, 1 = sin pool)
+            chunk_size: Documentos enviados a un worker por vez
+            trusted_fingerprints: Huellas SHA-256 (hex) aceptadas (None = todas)
+
+        Returns:
+            VerificationRun: Resultados por documento y estadísticas en .stats
+        """
+        from .batch_verification import verify_many
+        return verify_many(xml_iterable, workers=workers, chunk_size=chunk_size,
+                           trusted_fingerprints=trusted_fingerprints)
@@ -13,6 +13,11 @@ Arquitectura:
 - response_parser.py: Parser de respuestas XML SIFEN
 - error_handler.py: Mapeo códigos error a mensajes user-friendly
 - retry_manager.py: Sistema reintentos con backoff exponencial
+- ruc_lookup.py: Consulta RUC con cache en memoria y base de datos
+- transport_manager.py: Pool HTTP y SSLContext compartidos por proceso
+- concurrency.py: Límite adaptativo (AIMD) de envíos simultáneos
+- rate_limiter.py: Token bucket por servicio compartido entre procesos
+- outbox_worker.py: Workers del outbox durable de envíos (SKIP LOCKED)
 
 Uso básico:
     from .document_sender import DocumentSender
@@ -42,6 +47,11 @@ from .document_sender import DocumentSender
 from .response_parser import SifenResponseParser
 from .error_handler import SifenErrorHandler
 from .retry_manager import RetryManager
+from .ruc_lookup import RucLookupService, RucLookupResult
+from .transport_manager import get_transport_manager, get_transport_stats
+from .concurrency import AdaptiveConcurrencyLimiter
+from .rate_limiter import SifenRateLimiter, configure_rate_limit_store
+from .outbox_worker import OutboxWorker, run_outbox_workers
 from .models import (
     DocumentRequest,
     SifenResponse,
@@ -66,6 +76,25 @@ __all__ = [
     "DocumentSender",
     "SifenSOAPClient",
 
+    # Consulta RUC con cache
+    "RucLookupService",
+    "RucLookupResult",
+
+    # Pool HTTP compartido
+    "get_transport_manager",
+    "get_transport_stats",
+
+    # Concurrencia adaptativa
+    "AdaptiveConcurrencyLimiter",
+
+    # Rate limiting compartido
+    "SifenRateLimiter",
+    "configure_rate_limit_store",
+
+    # Outbox de envíos
+    "OutboxWorker",
+    "run_outbox_workers",
+
     # Configuración
     "SifenConfig",
 
@@ -16,6 +16,7 @@ Características técnicas:
 - Timeout configurables por operación
 - Logging estructurado sin datos sensibles
 - Retry automático en errores temporales
+- Rate limiting por servicio compartido entre procesos (token bucket)
 
 Basado en:
 - Manual Técnico SIFEN v150
@@ -25,7 +26,7 @@ Basado en:
 
 import ssl
 import asyncio
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional, Sequence, Union
 from datetime import datetime, timedelta
 import structlog
 
@@ -37,7 +38,11 @@ from zeep.exceptions import Fault, TransportError, ValidationError
 
 # Módulos internos
 from .config import SifenConfig, SifenEndpoints
-from .models import DocumentRequest, BatchRequest, QueryRequest, SifenResponse
+from .models import DocumentRequest, BatchRequest, QueryRequest, SifenResponse, ResponseType
+from .lote import build_lote_params
+from .wsdl_bundle import get_wsdl_document
+from .transport_manager import SifenTransportManager, get_transport_manager
+from .rate_limiter import SifenRateLimiter
 from .exceptions import (
     SifenClientError,
     SifenConnectionError,
@@ -59,16 +64,20 @@ class SifenSOAPClient:
     de SIFEN, incluyendo configuración de seguridad y manejo de errores.
     """
 
-    def __init__(self, config: SifenConfig):
+    def __init__(self, config: SifenConfig, rate_limiter: Optional[SifenRateLimiter] = None):
         """
         Inicializa el cliente SOAP con configuración SIFEN
 
         Args:
             config: Configuración del cliente SIFEN
+            rate_limiter: Token bucket por servicio (default: store configurado
+                con configure_rate_limit_store, compartido entre procesos)
         """
         self.config = config
+        self._rate_limiter = rate_limiter or SifenRateLimiter(config)
         self._clients: Dict[str, AsyncClient] = {}
         self._session: Optional[aiohttp.ClientSession] = None
+        self._transport_manager: Optional[SifenTransportManager] = None
         self._initialized = False
 
         logger.info(
@@ -93,8 +102,7 @@ class SifenSOAPClient:
         Inicializa el cliente SOAP y las conexiones HTTP
 
         Configura:
-        - Session HTTP con TLS 1.2
-        - Pool de conexiones
+        - Pool de conexiones HTTP con TLS 1.2 compartido (ver transport_manager)
         - Timeouts específicos
         - Clients SOAP para cada servicio
         """
@@ -102,37 +110,10 @@ class SifenSOAPClient:
             return
 
         try:
-            # Configurar timeout específicos
-            timeout = aiohttp.ClientTimeout(
-                total=self.config.timeout,
-                connect=self.config.connect_timeout,
-                sock_read=self.config.read_timeout
-            )
-
-            # Configurar connector con SSL y pool
-            connector = aiohttp.TCPConnector(
-                ssl=self.config.ssl_context,
-                limit=self.config.pool_maxsize,
-                limit_per_host=self.config.pool_connections,
-                enable_cleanup_closed=True,
-                keepalive_timeout=30
-            )
-
-            # Crear session HTTP
-            self._session = aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout,
-                headers={
-                    'User-Agent': 'SIFEN-Client-Python/1.5.0',
-                    'Accept': 'text/xml, application/soap+xml',
-                    'Accept-Encoding': 'gzip, deflate' if self.config.enable_compression else 'identity'
-                }
-            )
-
-            # Configurar transport SOAP con session personalizada
-            # Nota: AsyncTransport puede no aceptar session directamente
-            # Usaremos la configuración por defecto y configuraremos timeouts a nivel de AsyncClient
-            transport = AsyncTransport()
+            # Pool HTTP compartido por proceso: SSLContext y conexiones
+            # keep-alive se reutilizan entre clientes en lugar de recrearse
+            self._transport_manager = get_transport_manager(self.config)
+            transport = self._transport_manager.lease()
 
             # Configurar settings SOAP básicos
             settings = Settings()  # Usar configuración por defecto
@@ -165,6 +146,10 @@ class SifenSOAPClient:
         """
         Inicializa los clientes SOAP para cada servicio SIFEN
 
+        Por defecto cada cliente usa el WSDL publicado por SIFEN. Con
+        use_bundled_wsdl (solo pruebas offline) los WSDL se leen del paquete
+        y el Document parseado se comparte entre clientes, sin acceder a SIFEN.
+
         Args:
             transport: Transport HTTP configurado
             settings: Configuración SOAP
@@ -181,9 +166,13 @@ class SifenSOAPClient:
             try:
                 wsdl_url = self.config.get_service_url(service_path)
 
+                # WSDL parseado una vez por proceso desde el bundle local
+                wsdl = get_wsdl_document(
+                    wsdl_url) if self.config.use_bundled_wsdl else wsdl_url
+
                 # Crear cliente SOAP asíncrono
                 client = AsyncClient(
-                    wsdl=wsdl_url,
+                    wsdl=wsdl,
                     transport=transport,
                     settings=settings
                 )
@@ -207,9 +196,11 @@ class SifenSOAPClient:
                 # El error se manejará cuando se intente usar el servicio específico
 
     async def _cleanup(self):
-        """Limpia recursos y cierra conexiones"""
-        if self._session and not self._session.closed:
-            await self._session.close()
+        """Libera los recursos del cliente; el pool compartido sigue abierto"""
+        if self._transport_manager is not None:
+            self._transport_manager.release()
+            self._transport_manager = None
+        self._session = None
 
         self._clients.clear()
         self._initialized = False
@@ -255,6 +246,7 @@ class SifenSOAPClient:
         Raises:
             SifenClientError: En caso de error en el envío
         """
+        await self._rate_limiter.acquire('sync_receive')
         start_time = datetime.now()
 
         try:
@@ -349,6 +341,7 @@ class SifenSOAPClient:
         Raises:
             SifenClientError: En caso de error en el envío
         """
+        await self._rate_limiter.acquire('async_batch')
         start_time = datetime.now()
 
         try:
@@ -394,6 +387,114 @@ class SifenSOAPClient:
             # Re-lanzar con contexto de lote
             raise
 
+    async def send_lote(
+        self,
+        lote_id: str,
+        xml_documents: Sequence[Union[str, bytes]]
+    ) -> SifenResponse:
+        """
+        Envía un lote rLoteDE comprimido en una sola llamada al servicio de lotes
+
+        Args:
+            lote_id: dId del lote (hasta 15 dígitos)
+            xml_documents: Documentos rDE firmados (1-50)
+
+        Returns:
+            Respuesta de recepción del lote; protocol_number contiene el
+            número de protocolo para consultar el resultado del lote
+
+        Raises:
+            SifenValidationError: Si el lote excede 50 documentos o 10.000 KB
+            SifenConnectionError: Si hay error de transporte
+            SifenTimeoutError: Si la llamada excede el timeout
+        """
+        soap_params = build_lote_params(lote_id, xml_documents)
+        await self._rate_limiter.acquire('async_batch')
+        start_time = datetime.now()
+
+        try:
+            client = self._get_client('async_batch')
+
+            logger.info(
+                "sifen_lote_send_start",
+                lote_id=lote_id,
+                documents_count=len(xml_documents),
+                payload_length=len(soap_params['xDe'])
+            )
+
+            soap_response = await client.service.receiveBatch(**soap_params)
+            response = self._process_soap_response(soap_response, start_time)
+
+            # El protocolo de lote puede venir como dProtConsLote
+            protocol_number = response.protocol_number or getattr(
+                soap_response, 'dProtConsLote', None)
+            response = response.model_copy(update={
+                'protocol_number': protocol_number,
+                'response_type': ResponseType.BATCH,
+                'additional_data': {
+                    **response.additional_data,
+                    'lote_id': lote_id,
+                    'documents_count': len(xml_documents)
+                }
+            })
+
+            logger.info(
+                "sifen_lote_send_completed",
+                lote_id=lote_id,
+                success=response.success,
+                sifen_code=response.code,
+                protocol_number=protocol_number,
+                processing_time_ms=response.processing_time_ms
+            )
+
+            return response
+
+        except Fault as e:
+            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            fault_message = getattr(e, 'message', str(e))
+            logger.warning("soap_fault_received", fault_message=fault_message, lote_id=lote_id)
+            return SifenResponse(
+                success=False,
+                code='9999',
+                message=f"Error SOAP: {fault_message}",
+                processing_time_ms=int(processing_time),
+                errors=[fault_message],
+                observations=[],
+                response_type=ResponseType.BATCH,
+                additional_data={
+                    'fault_type': 'soap_fault',
+                    'fault_code': getattr(e, 'code', None),
+                    'lote_id': lote_id
+                }
+            )
+
+        except TransportError as e:
+            raise SifenConnectionError(
+                message=f"Error de conexión con SIFEN: {str(e)}",
+                url=self.config.effective_base_url,
+                timeout=self.config.timeout,
+                original_exception=e
+            )
+
+        except asyncio.TimeoutError as e:
+            elapsed = (datetime.now() - start_time).total_seconds() * 1000
+            raise SifenTimeoutError(
+                message="Timeout en envío de lote a SIFEN",
+                timeout_type="total",
+                timeout_value=self.config.timeout,
+                elapsed_time=elapsed,
+                original_exception=e
+            )
+
+        except Exception as e:
+            logger.error(
+                "sifen_lote_send_error",
+                lote_id=lote_id,
+                error=str(e),
+                error_type=type(e).__name__
+            )
+            raise
+
     async def query_document(self, query_request: QueryRequest) -> SifenResponse:
         """
         Consulta información de documentos en SIFEN
@@ -407,11 +508,12 @@ class SifenSOAPClient:
         Raises:
             SifenClientError: En caso de error en la consulta
         """
+        # Determinar servicio según tipo de consulta
+        service_name = 'query_ruc' if query_request.query_type == 'ruc' else 'query_document'
+        await self._rate_limiter.acquire(service_name)
         start_time = datetime.now()
 
         try:
-            # Determinar servicio según tipo de consulta
-            service_name = 'query_ruc' if query_request.query_type == 'ruc' else 'query_document'
             client = self._get_client(service_name)
 
             # Preparar parámetros SOAP
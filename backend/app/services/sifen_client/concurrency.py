@@ -0,0 +1,300 @@
+"""
+Control de concurrencia adaptativo (AIMD) para envíos a SIFEN
+
+Reemplaza el semáforo fijo de los envíos paralelos: el límite de
+requests en vuelo sube mientras SIFEN responde rápido y con códigos
+sanos, y se reduce a una fracción cuando aparecen señales de saturación.
+
+Algoritmo (Additive Increase / Multiplicative Decrease):
+- Respuesta sana y latencia <= objetivo: +increase_step por cada
+  `limit` respuestas (≈ +1 por ronda de envíos)
+- Timeout, error de conexión/servidor o código SIFEN de categoría
+  SYSTEM/NETWORK (5xxx): limit *= decrease_factor
+- Respuestas que salieron antes de la última reducción no vuelven a
+  reducir: una ráfaga de errores cuenta como una sola señal
+- Errores de validación o de negocio no afectan el límite
+
+Métricas expuestas: límite actual, requests en vuelo, profundidad de la
+cola de espera y percentiles de latencia sobre una ventana móvil.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+import structlog
+
+from .config import SifenConfig
+from .error_handler import ErrorCategory, SifenErrorHandler
+from .exceptions import (
+    SifenConnectionError,
+    SifenRetryExhaustedError,
+    SifenServerError,
+    SifenTimeoutError
+)
+
+# Logger para el control de concurrencia
+logger = structlog.get_logger(__name__)
+
+# Categorías de código SIFEN que indican saturación del servicio
+OVERLOAD_CATEGORIES = frozenset({ErrorCategory.SYSTEM, ErrorCategory.NETWORK})
+
+# Excepciones que indican saturación (el resto son errores del documento)
+OVERLOAD_EXCEPTIONS = (
+    SifenTimeoutError,
+    SifenConnectionError,
+    SifenServerError,
+    SifenRetryExhaustedError
+)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Límite de concurrencia AIMD compartido por los envíos de un DocumentSender
+
+    Uso:
+        limiter = AdaptiveConcurrencyLimiter.from_config(config)
+        async with limiter.slot() as slot:
+            result = await sender.send_document(...)
+            slot.record(response_code=result.response.code)
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        latency_target_ms: float = 3000.0,
+        decrease_factor: float = 0.5,
+        increase_step: float = 1.0,
+        window_size: int = 200,
+        error_handler: Optional[SifenErrorHandler] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor debe estar entre 0 y 1")
+
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_target_ms = latency_target_ms
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self._error_handler = error_handler or SifenErrorHandler()
+        self._clock = clock
+
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiting = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._last_decrease_at = float('-inf')
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._stats = {
+            'completed': 0,
+            'overloads': 0,
+            'increases': 0,
+            'decreases': 0,
+        }
+
+    @classmethod
+    def from_config(
+        cls,
+        config: SifenConfig,
+        error_handler: Optional[SifenErrorHandler] = None
+    ) -> "AdaptiveConcurrencyLimiter":
+        """Crea el limitador con los parámetros concurrency_* de SifenConfig"""
+        return cls(
+            initial_limit=config.concurrency_initial_limit,
+            min_limit=config.concurrency_min_limit,
+            max_limit=config.concurrency_max_limit,
+            latency_target_ms=config.concurrency_latency_target_ms,
+            decrease_factor=config.concurrency_decrease_factor,
+            error_handler=error_handler
+        )
+
+    @property
+    def limit(self) -> int:
+        """Requests en vuelo permitidos actualmente"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Envíos esperando un lugar"""
+        return self._waiting
+
+    # ------------------------------------------------------------------
+    # Adquisición
+    # ------------------------------------------------------------------
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> float:
+        """
+        Espera un lugar libre
+
+        Returns:
+            Instante de inicio (se pasa a release para medir latencia)
+        """
+        condition = self._get_condition()
+        async with condition:
+            self._waiting += 1
+            try:
+                await condition.wait_for(lambda: self._in_flight < self.limit)
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+        return self._clock()
+
+    async def release(
+        self,
+        started_at: float,
+        response_code: Optional[str] = None,
+        exception: Optional[BaseException] = None
+    ) -> None:
+        """
+        Libera el lugar y ajusta el límite según el resultado del envío
+
+        Args:
+            started_at: Valor retornado por acquire()
+            response_code: Código SIFEN de la respuesta (si hubo respuesta)
+            exception: Excepción del envío (si falló)
+        """
+        latency_ms = (self._clock() - started_at) * 1000
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            self._record(started_at, latency_ms, response_code, exception)
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator["_Slot"]:
+        """
+        Context manager de acquire/release
+
+        El resultado se informa con slot.record(...); una excepción que
+        escapa del bloque se registra automáticamente.
+        """
+        slot = _Slot(await self.acquire())
+        try:
+            yield slot
+        except BaseException as e:
+            await self.release(slot.started_at, exception=e)
+            raise
+        await self.release(slot.started_at, slot.response_code, slot.exception)
+
+    # ------------------------------------------------------------------
+    # Ajuste AIMD
+    # ------------------------------------------------------------------
+
+    def _is_overload(
+        self,
+        response_code: Optional[str],
+        exception: Optional[BaseException]
+    ) -> Optional[bool]:
+        """True = saturación, False = sano, None = no informativo"""
+        if exception is not None:
+            return True if isinstance(exception, (*OVERLOAD_EXCEPTIONS, asyncio.TimeoutError)) else None
+        if response_code is None:
+            return None
+        return self._error_handler.get_error_category(response_code) in OVERLOAD_CATEGORIES
+
+    def _record(
+        self,
+        started_at: float,
+        latency_ms: float,
+        response_code: Optional[str],
+        exception: Optional[BaseException]
+    ) -> None:
+        self._stats['completed'] += 1
+        self._latencies.append(latency_ms)
+
+        overload = self._is_overload(response_code, exception)
+        if overload is None:
+            return
+
+        previous = self.limit
+        if overload:
+            self._stats['overloads'] += 1
+            if started_at <= self._last_decrease_at or self._limit <= self.min_limit:
+                return
+            self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+            self._last_decrease_at = self._clock()
+            self._stats['decreases'] += 1
+        elif latency_ms <= self.latency_target_ms and self._in_flight + 1 >= self.limit:
+            # Solo crece si el límite se está usando: evita inflarlo en ocio
+            self._limit = min(float(self.max_limit),
+                              self._limit + self.increase_step / self._limit)
+            if self.limit > previous:
+                self._stats['increases'] += 1
+
+        if self.limit != previous:
+            logger.info(
+                "sifen_concurrency_limit_changed",
+                previous=previous,
+                limit=self.limit,
+                reason="overload" if overload else "healthy",
+                response_code=response_code,
+                latency_ms=round(latency_ms, 2)
+            )
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def latency_percentiles(self) -> Dict[str, Optional[float]]:
+        """p50/p90/p99 de latencia (ms) sobre la ventana móvil"""
+        samples = sorted(self._latencies)
+        if not samples:
+            return {'p50': None, 'p90': None, 'p99': None}
+
+        def percentile(p: float) -> float:
+            index = min(len(samples) - 1, max(0, math.ceil(p * len(samples)) - 1))
+            return round(samples[index], 2)
+
+        return {'p50': percentile(0.50), 'p90': percentile(0.90), 'p99': percentile(0.99)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado actual del limitador"""
+        return {
+            **self._stats,
+            'limit': self.limit,
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'in_flight': self._in_flight,
+            'queue_depth': self._waiting,
+            'latency_ms': self.latency_percentiles(),
+        }
+
+
+class _Slot:
+    """Lugar adquirido en el limitador; acumula el resultado del envío"""
+
+    __slots__ = ('started_at', 'response_code', 'exception')
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.response_code: Optional[str] = None
+        self.exception: Optional[BaseException] = None
+
+    def record(
+        self,
+        response_code: Optional[str] = None,
+        exception: Optional[BaseException] = None
+    ) -> None:
+        self.response_code = response_code
+        self.exception = exception
+
+
+__all__ = [
+    'AdaptiveConcurrencyLimiter',
+    'OVERLOAD_CATEGORIES',
+]
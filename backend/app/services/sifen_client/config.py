@@ -16,8 +16,9 @@ Basado en:
 
 import os
 import ssl
+import threading
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 from pydantic import BaseModel, Field, field_validator
 import structlog
@@ -25,6 +26,10 @@ import structlog
 # Logger para configuración
 logger = structlog.get_logger(__name__)
 
+# Contextos SSL compartidos por proceso (ver SifenConfig.ssl_context)
+_ssl_contexts: Dict[Tuple[Any, ...], ssl.SSLContext] = {}
+_ssl_contexts_lock = threading.Lock()
+
 
 @dataclass
 class SifenEndpoints:
@@ -205,11 +210,124 @@ class SifenConfig(BaseModel):
         description="Tamaño máximo del pool de conexiones"
     )
 
+    keepalive_expiry: float = Field(
+        default=30.0,
+        ge=1.0,
+        le=600.0,
+        description="Segundos que una conexión ociosa permanece abierta en el pool"
+    )
+
     enable_compression: bool = Field(
         default=True,
         description="Habilitar compresión gzip en requests"
     )
 
+    use_bundled_wsdl: bool = Field(
+        default=False,
+        description=("Cargar WSDL/XSD desde el paquete en lugar de descargarlos de SIFEN. "
+                     "Solo para pruebas offline: el bundle no es el contrato oficial de SET")
+    )
+
+    # ==========================================
+    # CONFIGURACIÓN DE CONCURRENCIA ADAPTATIVA
+    # ==========================================
+
+    concurrency_initial_limit: int = Field(
+        default=5,
+        ge=1,
+        le=200,
+        description="Envíos simultáneos iniciales del limitador adaptativo"
+    )
+
+    concurrency_min_limit: int = Field(
+        default=1,
+        ge=1,
+        le=200,
+        description="Envíos simultáneos mínimos ante saturación de SIFEN"
+    )
+
+    concurrency_max_limit: int = Field(
+        default=50,
+        ge=1,
+        le=200,
+        description="Envíos simultáneos máximos cuando SIFEN responde sano"
+    )
+
+    concurrency_latency_target_ms: float = Field(
+        default=3000.0,
+        gt=0,
+        description="Latencia máxima (ms) con la que el límite sigue creciendo"
+    )
+
+    concurrency_decrease_factor: float = Field(
+        default=0.5,
+        gt=0.0,
+        lt=1.0,
+        description="Factor multiplicativo del límite ante timeouts o errores 5xxx"
+    )
+
+    # ==========================================
+    # CONFIGURACIÓN DE RATE LIMITING
+    # ==========================================
+
+    rate_limit_enabled: bool = Field(
+        default=True,
+        description="Tomar un token del bucket del servicio antes de cada llamada SOAP"
+    )
+
+    rate_limit_burst: int = Field(
+        default=10,
+        ge=1,
+        le=1000,
+        description="Capacidad del token bucket (llamadas en ráfaga por servicio)"
+    )
+
+    rate_limit_refill_per_second: float = Field(
+        default=10.0,
+        gt=0.0,
+        description="Tokens repuestos por segundo en cada bucket"
+    )
+
+    rate_limit_max_wait: float = Field(
+        default=30.0,
+        ge=0.0,
+        description="Segundos máximos de espera por un token antes de fallar"
+    )
+
+    rate_limit_overrides: Dict[str, Dict[str, float]] = Field(
+        default_factory=dict,
+        description="burst/refill_per_second por servicio (ej: {'async_batch': {'burst': 2}})"
+    )
+
+    # ==========================================
+    # CONFIGURACIÓN DE CONSULTA RUC
+    # ==========================================
+
+    ruc_cache_ttl: int = Field(
+        default=86400,
+        ge=0,
+        description="Segundos de validez de un RUC encontrado en cache"
+    )
+
+    ruc_negative_cache_ttl: int = Field(
+        default=3600,
+        ge=0,
+        description="Segundos de validez de un RUC inexistente en cache"
+    )
+
+    ruc_cache_max_entries: int = Field(
+        default=10000,
+        ge=1,
+        description="Máximo de RUCs en el cache LRU en memoria"
+    )
+
+    ruc_prefetch_concurrency: int = Field(
+        default=5,
+        ge=1,
+        le=50,
+        description="Consultas RUC simultáneas durante prefetch"
+    )
+
     # ==========================================
     # VALIDADORES
     # ==========================================
@@ -236,6 +354,17 @@ class SifenConfig(BaseModel):
             raise ValueError("verify_ssl debe ser True en producción")
         return v
 
+    @field_validator('rate_limit_overrides')
+    def validate_rate_limit_overrides(cls, v):
+        """Solo burst/refill_per_second positivos por servicio"""
+        for service, limits in v.items():
+            unknown = set(limits) - {'burst', 'refill_per_second'}
+            if unknown:
+                raise ValueError(f"rate_limit_overrides[{service}]: claves inválidas {sorted(unknown)}")
+            if any(value <= 0 for value in limits.values()):
+                raise ValueError(f"rate_limit_overrides[{service}]: los valores deben ser positivos")
+        return v
+
     # ==========================================
     # PROPIEDADES COMPUTADAS
     # ==========================================
@@ -260,11 +389,44 @@ class SifenConfig(BaseModel):
     @property
     def ssl_context(self) -> ssl.SSLContext:
         """
-        Crea contexto SSL configurado según especificaciones SIFEN
+        Contexto SSL configurado según especificaciones SIFEN
+
+        Se construye una sola vez por proceso para cada combinación de
+        parámetros TLS y certificado cliente; un cambio en los archivos del
+        certificado (rotación) genera un contexto nuevo.
 
         Returns:
             Contexto SSL con TLS 1.2+ y validaciones apropiadas
         """
+        key = self._ssl_context_key()
+        context = _ssl_contexts.get(key)
+        if context is None:
+            with _ssl_contexts_lock:
+                context = _ssl_contexts.get(key)
+                if context is None:
+                    context = self._build_ssl_context()
+                    _ssl_contexts[key] = context
+        return context
+
+    def _ssl_context_key(self) -> Tuple[Any, ...]:
+        """Parámetros que determinan el contexto SSL (incluye mtime del certificado)"""
+        def mtime(path: Optional[str]) -> Optional[float]:
+            try:
+                return os.stat(path).st_mtime if path else None
+            except OSError:
+                return None
+
+        return (
+            self.tls_version,
+            self.verify_ssl,
+            self.ssl_cert_path,
+            self.ssl_key_path,
+            mtime(self.ssl_cert_path),
+            mtime(self.ssl_key_path),
+        )
+
+    def _build_ssl_context(self) -> ssl.SSLContext:
+        """Crea un contexto SSL nuevo (ver ssl_context)"""
         context = ssl.create_default_context()
 
         # TLS 1.2 mínimo (requerido por SIFEN)
@@ -330,6 +492,9 @@ class SifenConfig(BaseModel):
         - SIFEN_MAX_RETRIES: número máximo de reintentos
         - SIFEN_VERIFY_SSL: true|false
         - SIFEN_LOG_LEVEL: DEBUG|INFO|WARNING|ERROR
+        - SIFEN_BUNDLED_WSDL: true|false (WSDL empaquetados, solo pruebas offline)
+        - SIFEN_RATE_LIMIT_BURST: capacidad del token bucket por servicio
+        - SIFEN_RATE_LIMIT_REFILL: tokens repuestos por segundo
 
         Returns:
             Instancia configurada desde environment
@@ -343,6 +508,9 @@ class SifenConfig(BaseModel):
             'log_level': os.getenv('SIFEN_LOG_LEVEL', 'INFO'),
             'ssl_cert_path': os.getenv('SIFEN_SSL_CERT_PATH'),
             'ssl_key_path': os.getenv('SIFEN_SSL_KEY_PATH'),
+            'use_bundled_wsdl': os.getenv('SIFEN_BUNDLED_WSDL', 'false').lower() == 'true',
+            'rate_limit_burst': int(os.getenv('SIFEN_RATE_LIMIT_BURST', '10')),
+            'rate_limit_refill_per_second': float(os.getenv('SIFEN_RATE_LIMIT_REFILL', '10')),
         }
 
         # Filtrar valores None
@@ -7,6 +7,8 @@ una API simple y robusta para el envío de documentos electrónicos.
 Funcionalidades:
 - Envío individual con validación y reintentos automáticos
 - Envío de lotes con procesamiento paralelo y seguimiento
+- Concurrencia adaptativa (AIMD) según la latencia y los códigos de SIFEN
+- Envío de lotes rLoteDE comprimidos (una llamada SOAP por cada 50 documentos)
 - Validación previa antes del envío
 - Logging exhaustivo del proceso completo
 - Manejo inteligente de errores con recomendaciones
@@ -24,8 +26,10 @@ Basado en:
 """
 
 import asyncio
+import contextlib
+import inspect
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Union, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass, field
 import structlog
 
@@ -44,6 +48,8 @@ from .models import (
     create_batch_request
 )
 from .client import SifenSOAPClient
+from .concurrency import AdaptiveConcurrencyLimiter
+from .lote import extract_cdc, next_lote_id, split_into_lotes
 from .response_parser import SifenResponseParser
 from .error_handler import SifenErrorHandler, ErrorCategory, ErrorSeverity
 from .retry_manager import RetryManager, create_retry_manager_from_config
@@ -55,6 +61,9 @@ from .exceptions import (
     create_sifen_error_from_response
 )
 
+if TYPE_CHECKING:
+    from ..digital_sign.signing_pool import SigningPool, SigningResult
+
 # Logger para el document sender
 logger = structlog.get_logger(__name__)
 
@@ -86,6 +95,40 @@ class BatchSendResult:
     batch_summary: Dict[str, Any]
 
 
+@dataclass
+class LoteSendResult:
+    """
+    Resultado de la recepción de un lote rLoteDE
+    """
+    lote_id: str
+    success: bool
+    response: Optional[SifenResponse]
+    protocol_number: Optional[str]
+    document_indices: List[int]
+    cdcs: List[Optional[str]]
+    processing_time_ms: float
+    error: Optional[str] = None
+    callback_error: Optional[str] = None  # on_lote_sent falló para este lote
+
+
+@dataclass
+class LoteSubmissionResult:
+    """
+    Resultado de enviar una lista de documentos particionada en lotes
+    """
+    lotes: List[LoteSendResult]
+    rejected: Dict[int, str]  # índice del documento -> motivo
+    total_processing_time_ms: float
+
+    @property
+    def success(self) -> bool:
+        return not self.rejected and all(lote.success for lote in self.lotes)
+
+    @property
+    def protocol_numbers(self) -> List[str]:
+        return [lote.protocol_number for lote in self.lotes if lote.protocol_number]
+
+
 class DocumentSender:
     """
     Orquestador principal para envío de documentos a SIFEN
@@ -100,7 +143,9 @@ class DocumentSender:
         soap_client: Optional[SifenSOAPClient] = None,
         response_parser: Optional[SifenResponseParser] = None,
         error_handler: Optional[SifenErrorHandler] = None,
-        retry_manager: Optional[RetryManager] = None
+        retry_manager: Optional[RetryManager] = None,
+        signing_pool: Optional["SigningPool"] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None
     ):
         """
         Inicializa el document sender con configuración y componentes
@@ -111,6 +156,10 @@ class DocumentSender:
             response_parser: Parser de respuestas (se crea automáticamente)
             error_handler: Manejador de errores (se crea automáticamente)
             retry_manager: Gestor de reintentos (se crea automáticamente)
+            signing_pool: Pool de procesos de firma (opcional, para firmar
+                lotes antes del envío con sign_many)
+            concurrency_limiter: Limitador adaptativo de envíos simultáneos
+                (se crea desde la configuración)
         """
         # Configuración base
         self.config = config or SifenConfig.from_env()
@@ -121,6 +170,9 @@ class DocumentSender:
         self._error_handler = error_handler or SifenErrorHandler()
         self._retry_manager = retry_manager or create_retry_manager_from_config(
             self.config)
+        self._signing_pool = signing_pool
+        self._concurrency = concurrency_limiter or AdaptiveConcurrencyLimiter.from_config(
+            self.config, error_handler=self._error_handler)
 
         # Estado interno
         self._client_initialized = False
@@ -287,24 +339,57 @@ class DocumentSender:
             # Re-lanzar la excepción
             raise
 
+    async def send_document_limited(
+        self,
+        xml_content: str,
+        certificate_serial: str,
+        validate_before_send: bool = True,
+        operation_name: str = "send_document"
+    ) -> SendResult:
+        """
+        Envía un documento ocupando un lugar del limitador adaptativo
+
+        Igual que send_document, pero espera turno en el límite AIMD del
+        sender y le informa el código o la excepción del envío. Lo usan
+        send_batch y los workers del outbox.
+        """
+        async with self._concurrency.slot() as slot:
+            result = await self.send_document(
+                xml_content=xml_content,
+                certificate_serial=certificate_serial,
+                validate_before_send=validate_before_send,
+                operation_name=operation_name
+            )
+            slot.record(response_code=result.response.code)
+            return result
+
     async def send_batch(
         self,
         # [(xml_content, certificate_serial), ...]
         documents: List[Tuple[str, str]],
         batch_id: str,
         validate_before_send: bool = True,
-        max_concurrent: int = 5,
-        operation_name: str = "send_batch"
+        max_concurrent: Optional[int] = None,
+        operation_name: str = "send_batch",
+        sign_documents: bool = False
     ) -> BatchSendResult:
         """
         Envía un lote de documentos a SIFEN con procesamiento paralelo
 
+        Cada documento se envía por el servicio síncrono; para enviar los
+        documentos como lotes rLoteDE en una sola llamada usar send_lotes.
+        La cantidad de envíos simultáneos la define el limitador adaptativo
+        del sender, compartido entre lotes.
+
         Args:
             documents: Lista de tuplas (xml_content, certificate_serial)
             batch_id: Identificador único del lote
             validate_before_send: Realizar validación previa
-            max_concurrent: Máximo número de envíos concurrentes
+            max_concurrent: Tope fijo adicional de envíos concurrentes para
+                este lote (default: solo el límite adaptativo)
             operation_name: Nombre de la operación para logging
+            sign_documents: Firmar los documentos con el pool de firma antes
+                de enviarlos (los que fallan se reportan como error técnico)
 
         Returns:
             BatchSendResult con información detallada del lote
@@ -333,17 +418,31 @@ class DocumentSender:
                 operation=operation_name,
                 batch_id=batch_id,
                 documents_count=len(documents),
-                max_concurrent=max_concurrent
+                max_concurrent=max_concurrent,
+                concurrency_limit=self._concurrency.limit
             )
 
-            # Procesar documentos con concurrencia limitada
-            semaphore = asyncio.Semaphore(max_concurrent)
+            # Firmar en el pool de procesos, sin bloquear el event loop
+            signing_results: List[Optional["SigningResult"]] = [None] * len(documents)
+            if sign_documents:
+                signing_results = list(await self.sign_many(
+                    [xml_content for xml_content, _ in documents]))
+
+            # Procesar documentos con concurrencia adaptativa
+            batch_cap = asyncio.Semaphore(max_concurrent) if max_concurrent else None
             individual_results = []
 
             async def send_single_document(index: int, xml_content: str, cert_serial: str) -> SendResult:
-                async with semaphore:
+                async with batch_cap or contextlib.nullcontext():
                     try:
-                        return await self.send_document(
+                        signing_result = signing_results[index]
+                        if signing_result is not None:
+                            if not signing_result.success:
+                                raise SifenValidationError(
+                                    f"Error al firmar documento: {signing_result.error}")
+                            xml_content = signing_result.xml.decode('utf-8')
+
+                        return await self.send_document_limited(
                             xml_content=xml_content,
                             certificate_serial=cert_serial,
                             validate_before_send=validate_before_send,
@@ -414,7 +513,8 @@ class DocumentSender:
                     'success_rate': (successful_count / len(documents)) * 100,
                     'avg_processing_time_ms': sum(r.processing_time_ms for r in individual_results) / len(individual_results),
                     'total_retries': sum(r.retry_count for r in individual_results),
-                    'validation_warnings_total': sum(len(r.validation_warnings) for r in individual_results)
+                    'validation_warnings_total': sum(len(r.validation_warnings) for r in individual_results),
+                    'concurrency_limit': self._concurrency.limit
                 }
             )
 
@@ -447,6 +547,197 @@ class DocumentSender:
 
             raise
 
+    async def send_lotes(
+        self,
+        # [(xml_content, certificate_serial), ...]
+        documents: List[Tuple[str, str]],
+        validate_before_send: bool = True,
+        sign_documents: bool = False,
+        max_concurrent: Optional[int] = None,
+        on_lote_sent: Optional[Callable[[LoteSendResult], Any]] = None,
+        operation_name: str = "send_lotes"
+    ) -> LoteSubmissionResult:
+        """
+        Envía documentos como lotes rLoteDE: una llamada SOAP por cada 50
+
+        A diferencia de send_batch (un envío síncrono por documento), los
+        documentos se empaquetan en lotes comprimidos de hasta 50 y cada
+        lote se envía en una sola llamada al servicio de recepción de lotes.
+        Las listas de más de 50 documentos se particionan automáticamente.
+        Cada lote ocupa un lugar del limitador adaptativo del sender, igual
+        que los envíos individuales.
+
+        Args:
+            documents: Lista de tuplas (xml_content, certificate_serial)
+            validate_before_send: Validar cada documento antes de empaquetar
+            sign_documents: Firmar los documentos con el pool de firma antes
+                de empaquetarlos
+            max_concurrent: Tope fijo adicional de lotes enviados
+                simultáneamente (default: solo el límite adaptativo)
+            on_lote_sent: Callback (sync o async) invocado con cada
+                LoteSendResult, p. ej. para persistir el protocolo del lote
+                con DocumentoRepository.registrar_envio_lote. Si falla, el
+                error queda en LoteSendResult.callback_error y no afecta a
+                los demás lotes
+            operation_name: Nombre de la operación para logging
+
+        Returns:
+            LoteSubmissionResult con un LoteSendResult por lote y los
+            documentos rechazados antes del envío
+
+        Raises:
+            SifenValidationError: Si la lista está vacía
+        """
+        start_time = datetime.now()
+
+        if not documents:
+            raise SifenValidationError("El lote no puede estar vacío")
+
+        await self._ensure_client_initialized()
+
+        signing_results: List[Optional["SigningResult"]] = [None] * len(documents)
+        if sign_documents:
+            signing_results = list(await self.sign_many(
+                [xml_content for xml_content, _ in documents]))
+
+        # Documentos que no pasan firma o validación no entran en ningún lote
+        rejected: Dict[int, str] = {}
+        ready: List[Tuple[int, str]] = []
+        for index, (xml_content, cert_serial) in enumerate(documents):
+            try:
+                signing_result = signing_results[index]
+                if signing_result is not None:
+                    if not signing_result.success:
+                        raise SifenValidationError(
+                            f"Error al firmar documento: {signing_result.error}")
+                    xml_content = signing_result.xml.decode('utf-8')
+
+                if validate_before_send:
+                    await self._validate_document_before_send(xml_content, cert_serial)
+
+                ready.append((index, xml_content))
+            except SifenValidationError as e:
+                rejected[index] = e.message
+
+        lotes_cap = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+        async def send_one_lote(chunk: List[Tuple[int, str]]) -> LoteSendResult:
+            lote_id = ""
+            xml_documents = [xml_content for _, xml_content in chunk]
+            response: Optional[SifenResponse] = None
+            error: Optional[str] = None
+
+            async with lotes_cap or contextlib.nullcontext():
+                lote_start = datetime.now()
+                try:
+                    lote_id = await next_lote_id()
+                    async with self._concurrency.slot() as slot:
+                        response = await self._retry_manager.execute_with_retry(
+                            self._soap_client.send_lote,
+                            lote_id,
+                            xml_documents,
+                            operation_name=f"{operation_name}_lote"
+                        )
+                        slot.record(response_code=response.code)
+                except Exception as e:
+                    # Un lote que falla (SOAP, armado de parámetros, etc.)
+                    # no aborta los demás
+                    response = None
+                    error = str(e)
+                    logger.warning(
+                        "lote_send_failed",
+                        operation=operation_name,
+                        lote_id=lote_id,
+                        error=error,
+                        error_type=type(e).__name__
+                    )
+                processing_time = (datetime.now() - lote_start).total_seconds() * 1000
+
+            result = LoteSendResult(
+                lote_id=lote_id,
+                success=response is not None and response.success,
+                response=response,
+                protocol_number=response.protocol_number if response else None,
+                document_indices=[index for index, _ in chunk],
+                cdcs=[extract_cdc(xml_content) for xml_content in xml_documents],
+                processing_time_ms=processing_time,
+                error=error
+            )
+
+            if on_lote_sent is not None:
+                try:
+                    outcome = on_lote_sent(result)
+                    if inspect.isawaitable(outcome):
+                        await outcome
+                except Exception as e:
+                    # El lote ya fue enviado: se conserva su resultado y
+                    # protocolo aunque no se haya podido persistir
+                    result.callback_error = str(e)
+                    logger.error(
+                        "lote_callback_failed",
+                        operation=operation_name,
+                        lote_id=lote_id,
+                        protocol_number=result.protocol_number,
+                        error=str(e),
+                        error_type=type(e).__name__
+                    )
+
+            return result
+
+        lotes = list(await asyncio.gather(
+            *(send_one_lote(chunk) for chunk in split_into_lotes(ready))))
+
+        total_processing_time = (datetime.now() - start_time).total_seconds() * 1000
+
+        logger.info(
+            "lotes_send_completed",
+            operation=operation_name,
+            total_documents=len(documents),
+            lotes=len(lotes),
+            lotes_failed=sum(1 for lote in lotes if not lote.success),
+            callbacks_failed=sum(1 for lote in lotes if lote.callback_error),
+            rejected=len(rejected),
+            total_processing_time_ms=total_processing_time
+        )
+
+        return LoteSubmissionResult(
+            lotes=lotes,
+            rejected=rejected,
+            total_processing_time_ms=total_processing_time
+        )
+
+    async def sign_many(self, xml_documents: List[Union[str, bytes]]) -> List["SigningResult"]:
+        """
+        Firma documentos en el pool de procesos de firma
+
+        La firma es CPU-bound: se ejecuta en los workers del pool y el
+        event loop solo espera el resultado desde un thread.
+
+        Args:
+            xml_documents: Documentos XML a firmar
+
+        Returns:
+            Lista de SigningResult en el orden de entrada
+
+        Raises:
+            SifenClientError: Si el sender no tiene pool de firma
+        """
+        if self._signing_pool is None:
+            raise SifenClientError(
+                "Pool de firma no configurado. Debe proporcionarse signing_pool en el constructor.")
+
+        pool = self._signing_pool
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None, lambda: list(pool.sign_many(xml_documents)))
+
+        logger.debug(
+            "batch_signed",
+            documents_count=len(results),
+            failed=sum(1 for result in results if not result.success)
+        )
+        return results
+
     async def query_document(
         self,
         query_request: QueryRequest,
@@ -763,6 +1054,7 @@ class DocumentSender:
         return {
             'document_sender': self._stats.copy(),
             'retry_manager': retry_stats,
+            'concurrency': self._concurrency.get_stats(),
             'configuration': {
                 'environment': self.config.environment,
                 'base_url': self.config.effective_base_url,
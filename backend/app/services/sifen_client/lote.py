@@ -0,0 +1,286 @@
+"""
+Empaquetado de lotes de documentos electrónicos (rLoteDE)
+
+Arma el payload del servicio de recepción de lotes (SiRecepLoteDE_v150.xsd):
+los rDE firmados se agrupan en un rLoteDE, se comprimen en un ZIP y el ZIP
+viaja en base64 dentro de xDe junto con dId y dFecEnvio.
+
+Funcionalidades:
+- Partición de listas grandes en lotes de hasta 50 documentos
+- Concatenación de rDE sin re-serializar (la firma queda intacta)
+- Compresión ZIP y control del límite de 10.000 KB por lote
+- Identificadores de lote (dId de 15 dígitos) únicos entre procesos y
+  nodos: secuencia en la tabla sifen_lote_sequence (creada por alembic)
+
+Basado en:
+- Manual Técnico SIFEN v150 (recepción asíncrona de lotes)
+- Error 0270: "Mensaje superior a 10.000 KB"
+"""
+
+import asyncio
+import base64
+import io
+import itertools
+import re
+import threading
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TypeVar, Union
+
+import structlog
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, insert, select, update
+from sqlalchemy.engine import Engine
+
+from .exceptions import SifenValidationError
+
+# Logger para el empaquetado de lotes
+logger = structlog.get_logger(__name__)
+
+# Límites oficiales del servicio de lotes
+MAX_DOCUMENTS_PER_LOTE = 50
+MAX_LOTE_SIZE_BYTES = 10_000 * 1024
+
+SIFEN_NAMESPACE = "http://ekuatia.set.gov.py/sifen/xsd"
+LOTE_ZIP_ENTRY = "lote.xml"
+
+_XML_DECLARATION = re.compile(rb'^\s*<\?xml[^>]*\?>\s*')
+_CDC_ATTRIBUTE = re.compile(r'<(?:\w+:)?DE\b[^>]*\sId="(\d{44})"')
+
+LOTE_SEQUENCE_NAME = "lote"
+LOTE_SEQUENCE_DIGITS = 9
+
+_lote_counter = itertools.count(1)
+_lote_lock = threading.Lock()
+
+T = TypeVar('T')
+
+
+def split_into_lotes(items: Sequence[T], size: int = MAX_DOCUMENTS_PER_LOTE) -> Iterator[List[T]]:
+    """
+    Divide una secuencia en lotes consecutivos de hasta `size` elementos
+
+    Args:
+        items: Elementos a agrupar (se conserva el orden)
+        size: Tamaño máximo de lote (1-50)
+
+    Yields:
+        Listas de hasta `size` elementos
+    """
+    if not 1 <= size <= MAX_DOCUMENTS_PER_LOTE:
+        raise SifenValidationError(
+            f"El tamaño de lote debe estar entre 1 y {MAX_DOCUMENTS_PER_LOTE}",
+            field="lote_size",
+            value=str(size)
+        )
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+# ========================================
+# SECUENCIA DE dId
+# ========================================
+
+metadata = MetaData()
+
+lote_sequence_table = Table(
+    'sifen_lote_sequence',
+    metadata,
+    Column('name', String(50), primary_key=True, doc="Nombre de la secuencia"),
+    Column('value', BigInteger, nullable=False, doc="Último valor entregado"),
+)
+
+
+class DatabaseLoteSequence:
+    """
+    Secuencia de lotes en la tabla sifen_lote_sequence
+
+    El UPDATE value = value + 1 bloquea la fila hasta el commit, por lo
+    que cada proceso de cada nodo recibe un valor distinto. La fila la
+    inserta la migración de alembic (create_table=True solo en tests).
+    """
+
+    def __init__(self, engine: Engine, create_table: bool = False):
+        self.engine = engine
+        if create_table:
+            metadata.create_all(engine, tables=[lote_sequence_table], checkfirst=True)
+            with engine.begin() as conn:
+                exists = conn.execute(
+                    select(lote_sequence_table.c.name)
+                    .where(lote_sequence_table.c.name == LOTE_SEQUENCE_NAME)
+                ).first()
+                if exists is None:
+                    conn.execute(insert(lote_sequence_table).values(
+                        name=LOTE_SEQUENCE_NAME, value=0))
+
+    def next_value(self) -> int:
+        table = lote_sequence_table
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                update(table)
+                .where(table.c.name == LOTE_SEQUENCE_NAME)
+                .values(value=table.c.value + 1)
+            )
+            if updated.rowcount != 1:
+                raise RuntimeError("Secuencia de lotes no inicializada (sifen_lote_sequence)")
+            return conn.execute(
+                select(table.c.value).where(table.c.name == LOTE_SEQUENCE_NAME)
+            ).scalar_one()
+
+
+_sequence: Optional[DatabaseLoteSequence] = None
+
+
+def configure_lote_sequence(engine: Optional[Engine]) -> None:
+    """
+    Define de dónde salen los dId (llamar al arrancar la aplicación)
+
+    Args:
+        engine: Engine de la base compartida; None vuelve al contador del proceso
+    """
+    global _sequence
+    with _lote_lock:
+        _sequence = DatabaseLoteSequence(engine) if engine is not None else None
+
+    logger.info("sifen_lote_sequence_configured", shared=engine is not None)
+
+
+def generate_lote_id(now: Optional[datetime] = None) -> str:
+    """
+    Genera un dId de 15 dígitos
+
+    Con la secuencia de la base configurada: AAMMDD + 9 dígitos de la
+    secuencia, único entre todos los procesos y nodos que comparten la
+    base. Sin ella (scripts, tests): AAMMDDhhmmss + contador de 3 dígitos
+    del proceso, único solo dentro de este proceso.
+
+    Con la base configurada hace una consulta: desde código asíncrono
+    usar next_lote_id().
+    """
+    now = now or datetime.now()
+    sequence = _sequence
+    if sequence is not None:
+        value = sequence.next_value() % 10 ** LOTE_SEQUENCE_DIGITS
+        return f"{now:%y%m%d}{value:0{LOTE_SEQUENCE_DIGITS}d}"
+
+    with _lote_lock:
+        counter = next(_lote_counter) % 1000
+    return f"{now:%y%m%d%H%M%S}{counter:03d}"
+
+
+async def next_lote_id() -> str:
+    """generate_lote_id sin bloquear el event loop cuando consulta la base"""
+    if _sequence is None:
+        return generate_lote_id()
+    return await asyncio.to_thread(generate_lote_id)
+
+
+def extract_cdc(xml_content: Union[str, bytes]) -> Optional[str]:
+    """CDC (atributo Id del elemento DE) o None si no se encuentra"""
+    if isinstance(xml_content, bytes):
+        xml_content = xml_content[:4096].decode('utf-8', errors='ignore')
+    match = _CDC_ATTRIBUTE.search(xml_content)
+    return match.group(1) if match else None
+
+
+def build_lote_xml(xml_documents: Sequence[Union[str, bytes]]) -> bytes:
+    """
+    Agrupa documentos rDE firmados en un elemento rLoteDE
+
+    Cada documento se copia byte a byte (sin la declaración XML) para no
+    alterar el contenido firmado.
+
+    Args:
+        xml_documents: rDE firmados
+
+    Returns:
+        XML del lote en UTF-8
+
+    Raises:
+        SifenValidationError: Si el lote está vacío o supera 50 documentos
+    """
+    if not xml_documents:
+        raise SifenValidationError("El lote no puede estar vacío")
+    if len(xml_documents) > MAX_DOCUMENTS_PER_LOTE:
+        raise SifenValidationError(
+            f"El lote no puede tener más de {MAX_DOCUMENTS_PER_LOTE} documentos")
+
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?><rLoteDE xmlns="{SIFEN_NAMESPACE}">'.encode()]
+    for xml_content in xml_documents:
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        parts.append(_XML_DECLARATION.sub(b'', xml_content, count=1).strip())
+    parts.append(b'</rLoteDE>')
+    return b''.join(parts)
+
+
+def pack_lote(xml_documents: Sequence[Union[str, bytes]]) -> str:
+    """
+    Comprime el rLoteDE en un ZIP y lo codifica en base64 (contenido de xDe)
+
+    Raises:
+        SifenValidationError: Si el ZIP supera el límite de 10.000 KB
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(LOTE_ZIP_ENTRY, build_lote_xml(xml_documents))
+
+    size = buffer.tell()
+    if size > MAX_LOTE_SIZE_BYTES:
+        raise SifenValidationError(
+            f"Lote comprimido de {size / 1024:.0f} KB supera el máximo de 10.000 KB",
+            field="xDe",
+            validation_errors=["0270"]
+        )
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+def unpack_lote(xde: str) -> bytes:
+    """Inverso de pack_lote: XML rLoteDE contenido en xDe"""
+    with zipfile.ZipFile(io.BytesIO(base64.b64decode(xde))) as archive:
+        return archive.read(LOTE_ZIP_ENTRY)
+
+
+def build_lote_params(
+    lote_id: str,
+    xml_documents: Sequence[Union[str, bytes]],
+    fecha_envio: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    Parámetros SOAP de rEnviLoteDe para el servicio de recepción de lotes
+
+    Args:
+        lote_id: dId del lote (1 a 15 dígitos)
+        xml_documents: rDE firmados (1-50)
+        fecha_envio: dFecEnvio (default: ahora)
+
+    Returns:
+        Diccionario con dId, dFecEnvio y xDe
+    """
+    if not (str(lote_id).isdigit() and 1 <= len(str(lote_id)) <= 15 and int(lote_id) > 0):
+        raise SifenValidationError(
+            "dId del lote debe ser un entero positivo de hasta 15 dígitos",
+            field="dId",
+            value=str(lote_id)
+        )
+    return {
+        'dId': str(lote_id),
+        'dFecEnvio': (fecha_envio or datetime.now()).strftime('%Y-%m-%dT%H:%M:%S'),
+        'xDe': pack_lote(xml_documents)
+    }
+
+
+__all__ = [
+    'MAX_DOCUMENTS_PER_LOTE',
+    'MAX_LOTE_SIZE_BYTES',
+    'split_into_lotes',
+    'lote_sequence_table',
+    'DatabaseLoteSequence',
+    'configure_lote_sequence',
+    'generate_lote_id',
+    'next_lote_id',
+    'extract_cdc',
+    'build_lote_xml',
+    'pack_lote',
+    'unpack_lote',
+    'build_lote_params',
+]
@@ -0,0 +1,373 @@
+"""
+Workers del outbox durable de envíos a SIFEN
+
+Consumen la tabla sifen_outbox (app/repositories/sifen_outbox.py): cada
+worker reclama filas con FOR UPDATE SKIP LOCKED, envía el documento con
+DocumentSender (limitador AIMD y rate limit compartido incluidos) y
+registra la respuesta con procesar_respuesta_sifen. Se pueden correr
+tantos workers, procesos y nodos como haga falta: las filas no se
+comparten y un worker caído solo retrasa sus filas hasta que vence el lease.
+Mientras procesa una fila el worker renueva el lease cada lease_seconds/3,
+por largo que sea el envío (reintentos del RetryManager incluidos).
+
+Por cada fila:
+- firmado / error_envio -> marcar_como_enviado y envío
+- enviado (worker anterior caído a mitad de envío) -> se reenvía
+- aprobado, rechazado, cancelado, anulado -> ya resuelto, fila done
+- Respuesta SIFEN definitiva -> procesar_respuesta_sifen, fila done
+- Error transitorio (timeout, conexión, 5xxx) -> documento en
+  error_envio y reintento con backoff exponencial en available_at
+- Error definitivo o max_attempts agotado -> fila failed
+
+Uso:
+    async with DocumentSender(config, soap_client=SifenSOAPClient(config)) as sender:
+        worker = OutboxWorker(SifenOutboxStore(engine), sender)
+        await worker.run(stop_event)
+"""
+
+import asyncio
+import os
+import random
+import socket
+import uuid
+from contextlib import asynccontextmanager, contextmanager, suppress
+from typing import Any, AsyncIterator, Callable, ContextManager, Dict, Iterator, List, Optional
+
+import structlog
+
+from app.repositories.sifen_outbox import SifenOutboxStore
+
+from .concurrency import OVERLOAD_CATEGORIES, OVERLOAD_EXCEPTIONS
+from .config import SifenConfig
+from .document_sender import DocumentSender, SendResult
+from .error_handler import SifenErrorHandler
+
+# Logger para los workers del outbox
+logger = structlog.get_logger(__name__)
+
+# Estados del documento (EstadoDocumentoSifenEnum) que ya no requieren envío
+RESOLVED_STATES = frozenset({
+    'aprobado', 'aprobado_observacion', 'rechazado', 'cancelado', 'anulado'
+})
+SENDABLE_STATES = frozenset({'firmado', 'error_envio'})
+SENT_STATE = 'enviado'
+ERROR_STATE = 'error_envio'
+
+
+@contextmanager
+def _default_repository() -> Iterator[Any]:
+    """Repository de documentos sobre una sesión nueva de la aplicación"""
+    from app.core.database import SessionLocal
+    from app.repositories.document.base import DocumentoRepositoryBase
+    from app.repositories.document.sifen_state_mixin import SifenStateMixin
+    from app.repositories.document.validation_mixin import DocumentoValidationMixin
+
+    class OutboxDocumentoRepository(SifenStateMixin, DocumentoValidationMixin,
+                                    DocumentoRepositoryBase):
+        pass
+
+    session = SessionLocal()
+    try:
+        yield OutboxDocumentoRepository(session)
+    finally:
+        session.close()
+
+
+class OutboxWorker:
+    """
+    Worker que envía a SIFEN los documentos encolados en sifen_outbox
+    """
+
+    def __init__(
+        self,
+        store: SifenOutboxStore,
+        sender: DocumentSender,
+        repository_factory: Callable[[], ContextManager[Any]] = _default_repository,
+        worker_id: Optional[str] = None,
+        batch_size: int = 10,
+        lease_seconds: float = 300,
+        poll_interval: float = 1.0,
+        max_attempts: int = 8,
+        backoff_base: float = 5.0,
+        backoff_max: float = 900.0,
+        jitter: float = 0.1,
+        error_handler: Optional[SifenErrorHandler] = None
+    ):
+        """
+        Args:
+            store: Acceso a la tabla sifen_outbox
+            sender: DocumentSender inicializado (cliente SOAP listo)
+            repository_factory: Context manager que entrega un repository con
+                SifenStateMixin (default: sesión nueva de SessionLocal)
+            worker_id: Identificador del worker en locked_by (default: host:pid:uuid)
+            batch_size: Filas reclamadas por vuelta
+            lease_seconds: Tiempo sin renovación tras el cual una fila tomada
+                se considera abandonada (se renueva cada lease_seconds/3)
+            poll_interval: Segundos de espera cuando no hay filas
+            max_attempts: Envíos antes de marcar la fila failed
+            backoff_base: Primer reintento en segundos (se duplica por intento)
+            backoff_max: Tope del backoff en segundos
+            jitter: Variación aleatoria relativa del backoff
+        """
+        self.store = store
+        self.sender = sender
+        self._repository = repository_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._error_handler = error_handler or SifenErrorHandler()
+        self._stats = {'claimed': 0, 'sent': 0, 'done': 0, 'retried': 0, 'failed': 0}
+
+    # ------------------------------------------------------------------
+    # Operaciones sobre el documento (sync, se ejecutan en un thread)
+    # ------------------------------------------------------------------
+
+    def _prepare_document(self, documento_id: int, outbox_id: int) -> Dict[str, Any]:
+        with self._repository() as repository:
+            documento = repository.get_by_id(documento_id)
+            if documento is None:
+                return {'action': 'failed', 'error': f"Documento {documento_id} no existe"}
+
+            estado = str(getattr(documento, 'estado', '') or '')
+            if estado in RESOLVED_STATES:
+                return {'action': 'done', 'estado': estado}
+            if estado not in SENDABLE_STATES and estado != SENT_STATE:
+                return {'action': 'failed', 'error': f"Estado '{estado}' no permite envío"}
+
+            xml_firmado = getattr(documento, 'xml_firmado', None)
+            if not xml_firmado:
+                return {'action': 'failed', 'error': "Documento sin XML firmado"}
+
+            if estado in SENDABLE_STATES:
+                repository.marcar_como_enviado(documento_id, request_id=f"outbox-{outbox_id}")
+            return {'action': 'send', 'xml': xml_firmado}
+
+    def _record_response(self, documento_id: int, result: SendResult) -> None:
+        response = result.response
+        with self._repository() as repository:
+            repository.procesar_respuesta_sifen(
+                documento_id,
+                response.code,
+                response.message,
+                numero_protocolo=response.protocol_number,
+                observaciones="; ".join(response.observations) or None,
+                tiempo_respuesta=(response.processing_time_ms or 0) / 1000 or None
+            )
+
+    def _record_error(self, documento_id: int, message: str,
+                      codigo: Optional[str] = None) -> None:
+        datos: Dict[str, Any] = {"mensaje_sifen": message[:500]}
+        if codigo:
+            datos["codigo_respuesta_sifen"] = codigo
+        with self._repository() as repository:
+            repository.actualizar_estado_documento(documento_id, ERROR_STATE, datos)
+
+    # ------------------------------------------------------------------
+    # Procesamiento
+    # ------------------------------------------------------------------
+
+    def backoff_delay(self, attempts: int) -> float:
+        """Segundos hasta el próximo intento tras `attempts` envíos fallidos"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** max(0, attempts - 1))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def _retry_or_fail(self, fila: Dict[str, Any], error: str,
+                             codigo: Optional[str] = None) -> str:
+        if fila['attempts'] >= self.max_attempts:
+            await asyncio.to_thread(self.store.mark_failed, fila['id'], self.worker_id,
+                                    f"Reintentos agotados: {error}", codigo)
+            self._stats['failed'] += 1
+            return 'failed'
+
+        delay = self.backoff_delay(fila['attempts'])
+        await asyncio.to_thread(self.store.schedule_retry, fila['id'], self.worker_id,
+                                delay, error, codigo)
+        self._stats['retried'] += 1
+        logger.info("outbox_retry_scheduled", outbox_id=fila['id'],
+                    documento_id=fila['documento_id'], attempts=fila['attempts'],
+                    delay_s=round(delay, 1), codigo=codigo)
+        return 'retry'
+
+    async def _fail(self, fila: Dict[str, Any], error: str, codigo: Optional[str] = None) -> str:
+        await asyncio.to_thread(self.store.mark_failed, fila['id'], self.worker_id, error, codigo)
+        self._stats['failed'] += 1
+        logger.warning("outbox_failed", outbox_id=fila['id'],
+                       documento_id=fila['documento_id'], error=error, codigo=codigo)
+        return 'failed'
+
+    @asynccontextmanager
+    async def _holding_lease(self, fila: Dict[str, Any]) -> AsyncIterator[None]:
+        """Renueva el lease de la fila mientras dure el bloque"""
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(self.lease_seconds / 3)
+                try:
+                    renewed = await asyncio.to_thread(
+                        self.store.renew_lease, fila['id'], self.worker_id, self.lease_seconds)
+                except Exception as e:
+                    logger.warning("outbox_lease_renew_error", outbox_id=fila['id'],
+                                   error=str(e), error_type=type(e).__name__)
+                    continue
+                if not renewed:
+                    logger.warning("outbox_lease_lost", outbox_id=fila['id'],
+                                   documento_id=fila['documento_id'])
+                    return
+
+        task = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def process(self, fila: Dict[str, Any]) -> str:
+        """
+        Procesa una fila tomada, renovando su lease hasta terminar
+
+        Returns:
+            'done', 'retry' o 'failed'
+        """
+        async with self._holding_lease(fila):
+            return await self._process(fila)
+
+    async def _process(self, fila: Dict[str, Any]) -> str:
+        documento_id = fila['documento_id']
+
+        try:
+            preparado = await asyncio.to_thread(self._prepare_document, documento_id, fila['id'])
+        except Exception as e:
+            return await self._retry_or_fail(fila, f"Error preparando documento: {e}")
+
+        if preparado['action'] == 'failed':
+            return await self._fail(fila, preparado['error'])
+        if preparado['action'] == 'done':
+            await asyncio.to_thread(self.store.mark_done, fila['id'], self.worker_id)
+            self._stats['done'] += 1
+            return 'done'
+
+        try:
+            result = await self.sender.send_document_limited(
+                xml_content=preparado['xml'],
+                certificate_serial=fila['certificado_serial'] or '',
+                operation_name=f"outbox_{fila['id']}"
+            )
+        except OVERLOAD_EXCEPTIONS as e:
+            await asyncio.to_thread(self._record_error, documento_id, str(e))
+            return await self._retry_or_fail(fila, str(e))
+        except Exception as e:
+            await asyncio.to_thread(self._record_error, documento_id, str(e))
+            return await self._fail(fila, str(e))
+
+        self._stats['sent'] += 1
+        codigo = result.response.code
+
+        # 5xxx: SIFEN no procesó el documento, se reintenta más tarde
+        # (is_retryable del handler implica corregir y reenviar, no reintento automático)
+        if (not result.success
+                and self._error_handler.get_error_category(codigo) in OVERLOAD_CATEGORIES):
+            await asyncio.to_thread(self._record_error, documento_id,
+                                    result.response.message, codigo)
+            return await self._retry_or_fail(fila, result.response.message, codigo)
+
+        try:
+            await asyncio.to_thread(self._record_response, documento_id, result)
+        except Exception as e:
+            # La respuesta no quedó registrada: se reintenta (SIFEN responde
+            # por CDC duplicado con el resultado ya emitido)
+            return await self._retry_or_fail(fila, f"Error registrando respuesta: {e}", codigo)
+
+        await asyncio.to_thread(self.store.mark_done, fila['id'], self.worker_id, codigo)
+        self._stats['done'] += 1
+        return 'done'
+
+    async def run_once(self) -> int:
+        """Reclama un lote de filas y las procesa; retorna cuántas tomó"""
+        filas = await asyncio.to_thread(
+            self.store.claim, self.worker_id, self.batch_size, self.lease_seconds)
+        if not filas:
+            return 0
+
+        self._stats['claimed'] += len(filas)
+        results = await asyncio.gather(*(self.process(fila) for fila in filas),
+                                       return_exceptions=True)
+        for fila, result in zip(filas, results):
+            if isinstance(result, Exception):
+                # La fila sigue en processing y se retoma al vencer el lease
+                logger.error("outbox_process_error", outbox_id=fila['id'],
+                             documento_id=fila['documento_id'], error=str(result),
+                             error_type=type(result).__name__)
+        return len(filas)
+
+    async def run(self, stop_event: Optional[asyncio.Event] = None) -> None:
+        """Procesa el outbox hasta que se active stop_event"""
+        stop_event = stop_event or asyncio.Event()
+        logger.info("outbox_worker_started", worker_id=self.worker_id,
+                    batch_size=self.batch_size)
+
+        while not stop_event.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logger.error("outbox_worker_error", worker_id=self.worker_id,
+                             error=str(e), error_type=type(e).__name__)
+                processed = 0
+
+            if processed == 0:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        logger.info("outbox_worker_stopped", worker_id=self.worker_id, **self._stats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores del worker"""
+        return {'worker_id': self.worker_id, **self._stats}
+
+
+async def run_outbox_workers(
+    workers: int = 2,
+    stop_event: Optional[asyncio.Event] = None,
+    config: Optional[SifenConfig] = None,
+    engine=None,
+    **worker_kwargs: Any
+) -> List[Dict[str, Any]]:
+    """
+    Corre `workers` workers en este proceso con un DocumentSender compartido
+
+    Args:
+        workers: Cantidad de workers concurrentes
+        stop_event: Evento de parada (shutdown de la aplicación)
+        config: Configuración SIFEN (default: from_env)
+        engine: Engine de la base (default: el de la aplicación)
+        **worker_kwargs: Parámetros de OutboxWorker
+
+    Returns:
+        Estadísticas de cada worker al terminar
+    """
+    from .client import SifenSOAPClient
+
+    if engine is None:
+        from app.core.database import engine as app_engine
+        engine = app_engine
+
+    config = config or SifenConfig.from_env()
+    stop_event = stop_event or asyncio.Event()
+    store = SifenOutboxStore(engine)
+
+    async with DocumentSender(config, soap_client=SifenSOAPClient(config)) as sender:
+        pool = [OutboxWorker(store, sender, **worker_kwargs) for _ in range(workers)]
+        await asyncio.gather(*(worker.run(stop_event) for worker in pool))
+    return [worker.get_stats() for worker in pool]
+
+
+__all__ = [
+    'OutboxWorker',
+    'run_outbox_workers',
+]
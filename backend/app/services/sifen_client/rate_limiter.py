@@ -0,0 +1,297 @@
+"""
+Rate limiting por token bucket compartido entre procesos y nodos
+
+Cada DocumentSender/RetryManager limitaba sus envíos por separado, por
+lo que la suma de procesos API y workers superaba los límites de SIFEN.
+SifenSOAPClient toma un token del bucket del servicio antes de cada
+llamada SOAP; el estado del bucket vive en la base de datos, así todos
+los procesos de todos los nodos consumen del mismo bucket.
+
+Componentes:
+- DatabaseBucketStore: tabla sifen_rate_limit_buckets (creada por
+  alembic); en PostgreSQL cada toma se serializa con
+  pg_advisory_xact_lock (SQLite en tests)
+- MemoryBucketStore: bucket por proceso cuando no hay base configurada
+- SifenRateLimiter: espera el token respetando rate_limit_max_wait
+
+Si la base no responde, el limitador no bloquea los envíos: registra un
+warning y toma el token de un bucket en memoria del proceso hasta que la
+base vuelva (fail-open, con el límite aplicado por proceso).
+
+Parámetros (SifenConfig):
+- rate_limit_burst: capacidad del bucket (envíos en ráfaga)
+- rate_limit_refill_per_second: tokens repuestos por segundo
+- rate_limit_overrides: burst/refill por servicio (sync_receive,
+  async_batch, query_document, query_ruc, events)
+
+El tiempo se toma del reloj local de cada nodo; se asume NTP.
+"""
+
+import asyncio
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import structlog
+from sqlalchemy import Column, Float, MetaData, String, Table, insert, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import SifenConfig
+from .exceptions import SifenTimeoutError
+
+# Logger para el rate limiter
+logger = structlog.get_logger(__name__)
+
+
+# ========================================
+# TABLA DE BUCKETS
+# ========================================
+
+metadata = MetaData()
+
+rate_limit_table = Table(
+    'sifen_rate_limit_buckets',
+    metadata,
+    Column('bucket', String(100), primary_key=True, doc="Ambiente y servicio SIFEN"),
+    Column('tokens', Float, nullable=False, doc="Tokens disponibles al momento updated_at"),
+    Column('updated_at', Float, nullable=False, doc="Epoch de la última toma"),
+)
+
+
+@dataclass(frozen=True)
+class BucketLimits:
+    """Capacidad y reposición de un bucket"""
+    burst: int
+    refill_per_second: float
+
+
+def _take(tokens: float, updated_at: float, now: float, limits: BucketLimits) -> Tuple[float, float]:
+    """
+    Repone el bucket hasta `now` e intenta tomar un token
+
+    Returns:
+        (tokens restantes, segundos a esperar; 0 si se tomó el token)
+    """
+    elapsed = max(0.0, now - updated_at)
+    tokens = min(float(limits.burst), tokens + elapsed * limits.refill_per_second)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / limits.refill_per_second
+
+
+class MemoryBucketStore:
+    """Buckets en memoria, compartidos solo dentro del proceso"""
+
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, bucket: str, limits: BucketLimits, now: float) -> float:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(bucket, (float(limits.burst), now))
+            tokens, wait = _take(tokens, updated_at, now, limits)
+            self._buckets[bucket] = (tokens, now)
+        return wait
+
+
+class DatabaseBucketStore:
+    """
+    Buckets en la tabla sifen_rate_limit_buckets
+
+    Cada toma es una transacción corta: en PostgreSQL el advisory lock
+    del bucket serializa a todos los procesos (incluida la primera
+    inserción de la fila); en otros motores se usa SELECT ... FOR UPDATE
+    donde esté disponible.
+    """
+
+    blocking = True
+
+    def __init__(self, engine: Engine, create_table: bool = False):
+        self.engine = engine
+        if create_table:
+            metadata.create_all(engine, tables=[rate_limit_table], checkfirst=True)
+
+    @staticmethod
+    def _lock_key(bucket: str) -> int:
+        # Clave estable entre procesos (hash() de Python varía por proceso)
+        return zlib.crc32(f"sifen_rate_limit:{bucket}".encode())
+
+    def take(self, bucket: str, limits: BucketLimits, now: float) -> float:
+        table = rate_limit_table
+        with self.engine.begin() as conn:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"),
+                             {'key': self._lock_key(bucket)})
+
+            row = conn.execute(
+                select(table.c.tokens, table.c.updated_at)
+                .where(table.c.bucket == bucket)
+                .with_for_update()
+            ).first()
+
+            if row is None:
+                tokens, wait = _take(float(limits.burst), now, now, limits)
+                conn.execute(insert(table).values(bucket=bucket, tokens=tokens, updated_at=now))
+            else:
+                tokens, wait = _take(row.tokens, row.updated_at, now, limits)
+                conn.execute(
+                    update(table)
+                    .where(table.c.bucket == bucket)
+                    .values(tokens=tokens, updated_at=max(now, row.updated_at))
+                )
+        return wait
+
+
+class SifenRateLimiter:
+    """
+    Token bucket por servicio SIFEN, aplicado antes de cada llamada SOAP
+
+    Uso:
+        limiter = SifenRateLimiter(config)
+        await limiter.acquire('sync_receive')
+    """
+
+    def __init__(
+        self,
+        config: SifenConfig,
+        store: Optional[Union[MemoryBucketStore, DatabaseBucketStore]] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.config = config
+        self.store = store or get_rate_limit_store()
+        self._clock = clock
+        self._fallback_store = MemoryBucketStore()
+        self._store_failed = False
+        self._stats = {'acquired': 0, 'throttled': 0, 'wait_time_ms': 0.0, 'rejected': 0,
+                       'store_fallbacks': 0}
+
+    def limits_for(self, service_name: str) -> BucketLimits:
+        override = self.config.rate_limit_overrides.get(service_name, {})
+        return BucketLimits(
+            burst=int(override.get('burst', self.config.rate_limit_burst)),
+            refill_per_second=float(override.get(
+                'refill_per_second', self.config.rate_limit_refill_per_second))
+        )
+
+    def bucket_name(self, service_name: str) -> str:
+        return f"{self.config.environment}:{service_name}"
+
+    async def _take(self, bucket: str, limits: BucketLimits) -> float:
+        if not self.store.blocking:
+            return self.store.take(bucket, limits, self._clock())
+
+        try:
+            wait = await asyncio.to_thread(self.store.take, bucket, limits, self._clock())
+        except SQLAlchemyError as e:
+            # Sin base no se corta el envío: bucket en memoria del proceso
+            self._stats['store_fallbacks'] += 1
+            if not self._store_failed:
+                self._store_failed = True
+                logger.warning("sifen_rate_limit_store_unavailable", bucket=bucket,
+                               error=str(e), error_type=type(e).__name__)
+            return self._fallback_store.take(bucket, limits, self._clock())
+
+        if self._store_failed:
+            self._store_failed = False
+            logger.info("sifen_rate_limit_store_recovered", bucket=bucket)
+        return wait
+
+    async def acquire(self, service_name: str) -> float:
+        """
+        Espera hasta obtener un token del servicio
+
+        Args:
+            service_name: Servicio SIFEN (sync_receive, async_batch, ...)
+
+        Returns:
+            Segundos esperados
+
+        Raises:
+            SifenTimeoutError: Si el token no llega dentro de rate_limit_max_wait
+        """
+        if not self.config.rate_limit_enabled:
+            return 0.0
+
+        bucket = self.bucket_name(service_name)
+        limits = self.limits_for(service_name)
+        waited = 0.0
+
+        while True:
+            wait = await self._take(bucket, limits)
+            if wait <= 0:
+                break
+
+            if waited + wait > self.config.rate_limit_max_wait:
+                self._stats['rejected'] += 1
+                raise SifenTimeoutError(
+                    message=f"Límite de envíos a SIFEN alcanzado para {service_name}",
+                    timeout_type="rate_limit",
+                    timeout_value=int(self.config.rate_limit_max_wait),
+                    elapsed_time=waited * 1000
+                )
+
+            if waited == 0:
+                self._stats['throttled'] += 1
+                logger.debug("sifen_rate_limit_wait", bucket=bucket, wait_s=round(wait, 3))
+            await asyncio.sleep(wait)
+            waited += wait
+
+        self._stats['acquired'] += 1
+        self._stats['wait_time_ms'] += waited * 1000
+        return waited
+
+    def get_stats(self) -> Dict[str, float]:
+        """Tokens tomados, esperas y rechazos de este proceso"""
+        return {
+            **self._stats,
+            'wait_time_ms': round(self._stats['wait_time_ms'], 2),
+            'shared': self.store.blocking,
+        }
+
+
+# ========================================
+# STORE DEL PROCESO
+# ========================================
+
+_store: Optional[Union[MemoryBucketStore, DatabaseBucketStore]] = None
+_store_lock = threading.Lock()
+
+
+def configure_rate_limit_store(engine: Optional[Engine]) -> None:
+    """
+    Define dónde viven los buckets (llamar al arrancar la aplicación)
+
+    Args:
+        engine: Engine de la base compartida; None vuelve a buckets en memoria
+    """
+    global _store
+    with _store_lock:
+        _store = DatabaseBucketStore(engine) if engine is not None else MemoryBucketStore()
+
+    logger.info("sifen_rate_limit_store_configured", shared=engine is not None)
+
+
+def get_rate_limit_store() -> Union[MemoryBucketStore, DatabaseBucketStore]:
+    """Store configurado; por defecto buckets en memoria del proceso"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryBucketStore()
+    return _store
+
+
+__all__ = [
+    'rate_limit_table',
+    'BucketLimits',
+    'MemoryBucketStore',
+    'DatabaseBucketStore',
+    'SifenRateLimiter',
+    'configure_rate_limit_store',
+    'get_rate_limit_store',
+]
@@ -0,0 +1,453 @@
+"""
+Consulta de RUC contra SIFEN con cache de dos niveles
+
+Envuelve el servicio query_ruc de SifenSOAPClient para que las consultas
+repetidas de un mismo RUC no viajen a SIFEN en cada factura.
+
+Niveles de cache:
+- Memoria: LRU por proceso con expiración por entrada
+- Base de datos: tabla sifen_ruc_cache compartida entre procesos
+  (creada por alembic)
+
+Características:
+- TTL separado para RUCs encontrados e inexistentes
+- Consultas concurrentes del mismo RUC comparten una sola llamada SOAP
+- prefetch() para precalentar el cache con concurrencia acotada
+- Errores técnicos de SIFEN nunca se cachean
+
+Basado en:
+- Manual Técnico SIFEN v150 (siConsRUC: 0500 inexistente, 0502 encontrado)
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import structlog
+from sqlalchemy import (
+    JSON, Boolean, Column, DateTime, MetaData, String, Table, delete, select
+)
+from sqlalchemy.engine import Engine
+
+from .client import SifenSOAPClient
+from .config import SifenConfig
+from .exceptions import SifenClientError
+from .models import QueryRequest, SifenResponse
+
+# Logger para consultas RUC
+logger = structlog.get_logger(__name__)
+
+# Códigos de respuesta siConsRUC
+RUC_FOUND_CODES = frozenset({'0502'})
+RUC_NOT_FOUND_CODES = frozenset({'0500'})
+
+
+# ========================================
+# TABLA DE CACHE
+# ========================================
+
+metadata = MetaData()
+
+ruc_cache_table = Table(
+    'sifen_ruc_cache',
+    metadata,
+    Column('ruc', String(20), primary_key=True, doc="RUC sin DV"),
+    Column('found', Boolean, nullable=False, doc="RUC existente en SET"),
+    Column('code', String(10), nullable=False, doc="Código de respuesta SIFEN"),
+    Column('message', String(500), nullable=False, doc="Mensaje de respuesta SIFEN"),
+    Column('razon_social', String(255), nullable=True, doc="Razón social informada"),
+    Column('data', JSON, nullable=False, doc="Datos del contribuyente"),
+    Column('queried_at', DateTime, nullable=False, doc="Fecha de consulta (UTC)"),
+    Column('expires_at', DateTime, nullable=False, index=True, doc="Vencimiento (UTC)"),
+)
+
+
+@dataclass(frozen=True)
+class RucLookupResult:
+    """
+    Resultado de una consulta RUC (cacheada o remota)
+    """
+    ruc: str
+    found: bool
+    code: str
+    message: str
+    razon_social: Optional[str]
+    data: Dict[str, Any]
+    queried_at: float
+    expires_at: float
+    source: str = 'sifen'  # 'memory' | 'db' | 'sifen'
+
+    def is_expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+
+def normalize_ruc(ruc: str) -> str:
+    """
+    Clave de cache de un RUC: número base sin DV ni ceros a la izquierda
+
+    Args:
+        ruc: RUC con o sin DV (80012345-6, 80012345)
+
+    Returns:
+        RUC base normalizado
+
+    Raises:
+        SifenClientError: Si el RUC no es numérico
+    """
+    base = str(ruc).strip().split('-')[0].lstrip('0')
+    if not base.isdigit():
+        raise SifenClientError(
+            message=f"RUC inválido para consulta: {ruc!r}",
+            error_code="RUC_FORMAT"
+        )
+    return base
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def _to_timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+# ========================================
+# NIVEL BASE DE DATOS
+# ========================================
+
+class RucCacheStore:
+    """
+    Persistencia del cache RUC en la tabla sifen_ruc_cache
+
+    Usa SQLAlchemy Core sobre un Engine síncrono; RucLookupService lo
+    invoca desde un thread para no bloquear el event loop.
+    """
+
+    def __init__(self, engine: Engine, create_table: bool = False):
+        self.engine = engine
+        if create_table:
+            metadata.create_all(engine, tables=[ruc_cache_table], checkfirst=True)
+
+    def load_many(self, rucs: Iterable[str], now: float) -> Dict[str, RucLookupResult]:
+        """Entradas vigentes para los RUCs indicados (una sola consulta)"""
+        rucs = list(rucs)
+        if not rucs:
+            return {}
+
+        query = select(ruc_cache_table).where(
+            ruc_cache_table.c.ruc.in_(rucs),
+            ruc_cache_table.c.expires_at > _to_datetime(now)
+        )
+        with self.engine.connect() as conn:
+            rows = conn.execute(query).mappings().all()
+
+        return {
+            row['ruc']: RucLookupResult(
+                ruc=row['ruc'],
+                found=row['found'],
+                code=row['code'],
+                message=row['message'],
+                razon_social=row['razon_social'],
+                data=row['data'] or {},
+                queried_at=_to_timestamp(row['queried_at']),
+                expires_at=_to_timestamp(row['expires_at']),
+                source='db'
+            )
+            for row in rows
+        }
+
+    def save(self, result: RucLookupResult) -> None:
+        """Inserta o reemplaza la entrada del RUC"""
+        with self.engine.begin() as conn:
+            conn.execute(delete(ruc_cache_table).where(ruc_cache_table.c.ruc == result.ruc))
+            conn.execute(ruc_cache_table.insert().values(
+                ruc=result.ruc,
+                found=result.found,
+                code=result.code,
+                message=result.message[:500],
+                razon_social=result.razon_social,
+                data=result.data,
+                queried_at=_to_datetime(result.queried_at),
+                expires_at=_to_datetime(result.expires_at)
+            ))
+
+    def purge_expired(self, now: float) -> int:
+        """Elimina entradas vencidas; retorna la cantidad borrada"""
+        with self.engine.begin() as conn:
+            return conn.execute(
+                delete(ruc_cache_table).where(ruc_cache_table.c.expires_at <= _to_datetime(now))
+            ).rowcount
+
+
+# ========================================
+# SERVICIO DE CONSULTA
+# ========================================
+
+@dataclass
+class RucLookupStats:
+    """Contadores del servicio de consulta RUC"""
+    memory_hits: int = 0
+    db_hits: int = 0
+    remote_calls: int = 0
+    coalesced: int = 0
+    not_found: int = 0
+    errors: int = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class RucLookupService:
+    """
+    Consulta RUC con cache en memoria y en base de datos
+
+    Uso:
+        async with SifenSOAPClient(config) as client:
+            lookup = RucLookupService(client, engine=engine)
+            result = await lookup.lookup("80012345-6")
+            await lookup.prefetch(rucs_clientes)
+    """
+
+    def __init__(
+        self,
+        client: SifenSOAPClient,
+        engine: Optional[Engine] = None,
+        config: Optional[SifenConfig] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Args:
+            client: Cliente SOAP inicializado
+            engine: Engine SQLAlchemy para el cache persistente (opcional)
+            config: Configuración de TTLs y concurrencia (default: client.config)
+            clock: Fuente de tiempo en segundos (inyectable en tests)
+        """
+        self.client = client
+        self.config = config or client.config
+        self.store = RucCacheStore(engine) if engine is not None else None
+        self._clock = clock
+        self._memory: "OrderedDict[str, RucLookupResult]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[RucLookupResult]"] = {}
+        self.stats = RucLookupStats()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    async def lookup(self, ruc: str, force_refresh: bool = False) -> RucLookupResult:
+        """
+        Consulta un RUC usando memoria, luego base de datos, luego SIFEN
+
+        Args:
+            ruc: RUC con o sin DV
+            force_refresh: Ignorar el cache y consultar SIFEN
+
+        Returns:
+            RucLookupResult con found=False si el RUC no existe en SET
+
+        Raises:
+            SifenClientError: Si SIFEN responde con un error técnico
+        """
+        key = normalize_ruc(ruc)
+
+        if not force_refresh:
+            cached = self._memory_get(key)
+            if cached is not None:
+                return cached
+
+            if self.store is not None:
+                stored = (await asyncio.to_thread(self.store.load_many, [key], self._clock())).get(key)
+                if stored is not None:
+                    self.stats.db_hits += 1
+                    self._memory_put(stored)
+                    return stored
+
+        return await self._fetch(key, ruc)
+
+    async def prefetch(self, rucs: Iterable[str], concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Precalienta el cache para una lista de RUCs
+
+        Los RUCs ya cacheados se resuelven con una sola consulta a la base
+        de datos; el resto se consulta a SIFEN con a lo sumo `concurrency`
+        llamadas simultáneas. Un error en un RUC no detiene al resto.
+
+        Args:
+            rucs: RUCs a precalentar (se ignoran duplicados)
+            concurrency: Consultas simultáneas (default: ruc_prefetch_concurrency)
+
+        Returns:
+            Resumen con total, cached, fetched, not_found, errors y elapsed_ms
+        """
+        start = time.perf_counter()
+        pending: Dict[str, str] = {}
+        invalid = 0
+        for ruc in rucs:
+            try:
+                pending.setdefault(normalize_ruc(ruc), ruc)
+            except SifenClientError:
+                invalid += 1
+
+        total = len(pending)
+        for key in list(pending):
+            if self._memory_get(key) is not None:
+                del pending[key]
+
+        if pending and self.store is not None:
+            stored = await asyncio.to_thread(self.store.load_many, pending.keys(), self._clock())
+            for key, result in stored.items():
+                self.stats.db_hits += 1
+                self._memory_put(result)
+                del pending[key]
+
+        cached = total - len(pending)
+        semaphore = asyncio.Semaphore(concurrency or self.config.ruc_prefetch_concurrency)
+
+        async def fetch_one(key: str, ruc: str) -> Optional[RucLookupResult]:
+            async with semaphore:
+                try:
+                    return await self._fetch(key, ruc)
+                except SifenClientError:
+                    return None
+
+        results: List[Optional[RucLookupResult]] = await asyncio.gather(
+            *(fetch_one(key, ruc) for key, ruc in pending.items())
+        )
+
+        summary = {
+            'total': total,
+            'cached': cached,
+            'fetched': sum(1 for r in results if r is not None),
+            'not_found': sum(1 for r in results if r is not None and not r.found),
+            'errors': sum(1 for r in results if r is None) + invalid,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+        logger.info("ruc_prefetch_completed", **summary)
+        return summary
+
+    def invalidate(self, ruc: str) -> None:
+        """Quita un RUC del cache en memoria"""
+        self._memory.pop(normalize_ruc(ruc), None)
+
+    def clear_memory(self) -> None:
+        """Vacía el cache en memoria (el cache persistente se mantiene)"""
+        self._memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de uso y tamaño del cache"""
+        return {
+            **self.stats.to_dict(),
+            'memory_entries': len(self._memory),
+            'inflight': len(self._inflight),
+            'persistent': self.store is not None,
+        }
+
+    # ------------------------------------------------------------------
+    # Cache en memoria
+    # ------------------------------------------------------------------
+
+    def _memory_get(self, key: str) -> Optional[RucLookupResult]:
+        result = self._memory.get(key)
+        if result is None:
+            return None
+        if result.is_expired(self._clock()):
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self.stats.memory_hits += 1
+        return replace(result, source='memory')
+
+    def _memory_put(self, result: RucLookupResult) -> None:
+        self._memory[result.ruc] = result
+        self._memory.move_to_end(result.ruc)
+        while len(self._memory) > self.config.ruc_cache_max_entries:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Consulta remota con coalescing
+    # ------------------------------------------------------------------
+
+    async def _fetch(self, key: str, ruc: str) -> RucLookupResult:
+        """Consulta SIFEN; llamadas concurrentes del mismo RUC comparten la tarea"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._query_and_store(key, ruc))
+            self._inflight[key] = task
+            task.add_done_callback(
+                lambda done: self._inflight.pop(key) if self._inflight.get(key) is done else None)
+        else:
+            self.stats.coalesced += 1
+
+        # shield: cancelar a un llamador no cancela la consulta compartida
+        return await asyncio.shield(task)
+
+    async def _query_and_store(self, key: str, ruc: str) -> RucLookupResult:
+        self.stats.remote_calls += 1
+        try:
+            response = await self.client.query_document(
+                QueryRequest(query_type='ruc', ruc=str(ruc).strip())
+            )
+            result = self._build_result(key, response)
+        except Exception:
+            self.stats.errors += 1
+            raise
+
+        if not result.found:
+            self.stats.not_found += 1
+
+        self._memory_put(result)
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.save, result)
+            except Exception as e:
+                # El cache persistente es una optimización: no falla la consulta
+                logger.warning("ruc_cache_store_failed", error=str(e))
+        return result
+
+    def _build_result(self, key: str, response: SifenResponse) -> RucLookupResult:
+        """Convierte la respuesta siConsRUC; errores técnicos no se cachean"""
+        if response.code in RUC_NOT_FOUND_CODES:
+            found = False
+        elif response.success or response.code in RUC_FOUND_CODES:
+            found = True
+        else:
+            raise SifenClientError(
+                message=f"Error en consulta RUC: {response.message}",
+                error_code=response.code,
+                details={'ruc': SifenSOAPClient._mask_ruc(key)}
+            )
+
+        data = {}
+        if found:
+            extra = response.additional_data or {}
+            data = dict(extra.get('contribuyente') or extra.get('emisor_info') or {})
+
+        now = self._clock()
+        ttl = self.config.ruc_cache_ttl if found else self.config.ruc_negative_cache_ttl
+        return RucLookupResult(
+            ruc=key,
+            found=found,
+            code=response.code,
+            message=response.message,
+            razon_social=data.get('razonSocial') or data.get('dRazCons'),
+            data=data,
+            queried_at=now,
+            expires_at=now + ttl
+        )
+
+
+# ========================================
+# EXPORTS
+# ========================================
+
+__all__ = [
+    'RucLookupService',
+    'RucLookupResult',
+    'RucLookupStats',
+    'RucCacheStore',
+    'ruc_cache_table',
+    'normalize_ruc',
+]
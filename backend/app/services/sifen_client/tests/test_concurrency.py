@@ -0,0 +1,110 @@
+"""
+Tests para el limitador de concurrencia adaptativo (AIMD)
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.sifen_client.concurrency import AdaptiveConcurrencyLimiter
+from app.services.sifen_client.config import SifenConfig
+from app.services.sifen_client.document_sender import DocumentSender, SendResult
+from app.services.sifen_client.exceptions import SifenTimeoutError, SifenValidationError
+from app.services.sifen_client.models import SifenResponse
+
+
+async def _enviar(limiter: AdaptiveConcurrencyLimiter, code: str = "0260", delay: float = 0.001):
+    async with limiter.slot() as slot:
+        await asyncio.sleep(delay)
+        slot.record(response_code=code)
+
+
+@pytest.mark.asyncio
+async def test_limite_crece_con_respuestas_sanas():
+    """Test el límite sube aditivamente mientras el límite está en uso"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=6)
+
+    await asyncio.gather(*(_enviar(limiter) for _ in range(60)))
+
+    stats = limiter.get_stats()
+    assert limiter.limit == 6
+    assert stats['increases'] == 4
+    assert stats['decreases'] == 0
+    assert stats['in_flight'] == 0 and stats['queue_depth'] == 0
+
+
+@pytest.mark.asyncio
+async def test_limite_baja_ante_saturacion():
+    """Test 5xxx y timeouts reducen a la mitad; una ráfaga cuenta una vez"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=2)
+
+    # Ocho errores 5001 en vuelo a la vez: una sola reducción
+    await asyncio.gather(*(_enviar(limiter, code="5001") for _ in range(8)))
+    assert limiter.limit == 4
+    assert limiter.get_stats()['overloads'] == 8
+
+    with pytest.raises(SifenTimeoutError):
+        async with limiter.slot():
+            raise SifenTimeoutError("timeout", timeout_type="read", timeout_value=30)
+    assert limiter.limit == 2
+
+    await _enviar(limiter, code="5000")
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_errores_del_documento_no_afectan():
+    """Test errores de validación o negocio no cambian el límite"""
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=3)
+
+    with pytest.raises(SifenValidationError):
+        async with limiter.slot():
+            raise SifenValidationError("XML inválido")
+    await _enviar(limiter, code="1000")
+
+    assert limiter.limit == 3
+    assert limiter.get_stats()['completed'] == 2
+
+
+@pytest.mark.asyncio
+async def test_cola_y_percentiles():
+    """Test profundidad de cola y percentiles sobre la ventana de latencias"""
+    reloj = iter(range(0, 10_000, 1))
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1,
+                                         clock=lambda: next(reloj) / 1000)
+
+    primero = await limiter.acquire()
+    esperando = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+
+    await limiter.release(primero, response_code="0260")
+    segundo = await esperando
+    assert limiter.queue_depth == 0 and limiter.in_flight == 1
+    await limiter.release(segundo, response_code="0260")
+
+    percentiles = limiter.latency_percentiles()
+    assert percentiles['p50'] is not None
+    assert percentiles['p50'] <= percentiles['p90'] <= percentiles['p99']
+
+
+@pytest.mark.asyncio
+async def test_send_batch_usa_limitador():
+    """Test send_batch informa los códigos al limitador compartido del sender"""
+    config = SifenConfig(environment="test", concurrency_initial_limit=4)
+    sender = DocumentSender(config=config, soap_client=AsyncMock())
+    sender._client_initialized = True
+
+    async def send_document(**kwargs):
+        await asyncio.sleep(0.001)
+        response = SifenResponse(success=False, code="5001", message="Servicio no disponible")
+        return SendResult(success=False, response=response, processing_time_ms=1,
+                          retry_count=0, enhanced_info={})
+
+    with patch.object(sender, "send_document", side_effect=send_document):
+        result = await sender.send_batch([("<rDE/>", "CERT12345678")] * 8, batch_id="AIMD")
+
+    # 4 en vuelo fallan -> 2; los que salen después también fallan -> 1
+    assert result.batch_summary['concurrency_limit'] == 1
+    assert sender.get_stats()['concurrency']['decreases'] == 2
@@ -666,6 +666,57 @@ class TestDocumentSenderBatch:
 
         print("✅ Validación de parámetros de lote funciona")
 
+    @pytest.mark.asyncio
+    async def test_send_batch_with_signing_pool(
+        self,
+        test_config,
+        mock_successful_sifen_response,
+        test_certificate_serial
+    ):
+        """Test: Lote firmado en el pool de firma antes del envío"""
+        from app.services.digital_sign.signing_pool import SigningResult
+
+        def sign_many(xml_documents):
+            for index, xml_content in enumerate(xml_documents):
+                if "INVALIDO" in xml_content:
+                    yield SigningResult(index, False, error="XML mal formado")
+                else:
+                    yield SigningResult(index, True, xml=(xml_content + "<Signature/>").encode())
+
+        signing_pool = Mock()
+        signing_pool.sign_many.side_effect = sign_many
+        sender = DocumentSender(config=test_config, signing_pool=signing_pool)
+        sender._soap_client = AsyncMock()
+        sent_xml = []
+
+        async def mock_send_document(xml_content, **kwargs):
+            sent_xml.append(xml_content)
+            return SendResult(
+                success=True,
+                response=mock_successful_sifen_response,
+                processing_time_ms=10,
+                retry_count=0,
+                enhanced_info={}
+            )
+
+        documents = [("<DE>1</DE>", test_certificate_serial),
+                     ("INVALIDO", test_certificate_serial),
+                     ("<DE>3</DE>", test_certificate_serial)]
+        with patch.object(sender, 'send_document', side_effect=mock_send_document):
+            result = await sender.send_batch(
+                documents=documents,
+                batch_id="SIGNED_BATCH",
+                sign_documents=True
+            )
+
+        assert sorted(sent_xml) == ["<DE>1</DE><Signature/>", "<DE>3</DE><Signature/>"]
+        assert result.successful_documents == 2
+        assert "Error al firmar documento" in result.individual_results[1].response.message
+
+        # Sin pool configurado no se puede firmar
+        with pytest.raises(SifenClientError, match="Pool de firma no configurado"):
+            await DocumentSender(config=test_config).sign_many(["<DE/>"])
+
     @pytest.mark.asyncio
     async def test_send_batch_concurrency_control(
         self,
@@ -0,0 +1,252 @@
+"""
+Tests para el envío de lotes rLoteDE (empaquetado, SOAP y DocumentSender.send_lotes)
+"""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from lxml import etree
+from sqlalchemy import create_engine
+
+from app.services.sifen_client.client import SifenSOAPClient
+from app.services.sifen_client.concurrency import AdaptiveConcurrencyLimiter
+from app.services.sifen_client.config import SifenConfig
+from app.services.sifen_client.document_sender import DocumentSender, LoteSendResult
+from app.services.sifen_client.exceptions import SifenConnectionError, SifenValidationError
+from app.services.sifen_client.lote import (
+    DatabaseLoteSequence,
+    build_lote_params,
+    build_lote_xml,
+    configure_lote_sequence,
+    extract_cdc,
+    generate_lote_id,
+    split_into_lotes,
+    unpack_lote,
+)
+from app.services.sifen_client.models import SifenResponse
+
+SIFEN_NS = "http://ekuatia.set.gov.py/sifen/xsd"
+
+
+def _rde(numero: int) -> str:
+    cdc = f"{numero:044d}"
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<rDE xmlns="{SIFEN_NS}"><dVerFor>150</dVerFor>'
+            f'<DE Id="{cdc}"><gDE><dNumDoc>{numero}</dNumDoc></gDE></DE></rDE>')
+
+
+@pytest.fixture
+def test_config():
+    return SifenConfig(environment="test")
+
+
+def _respuesta_lote(protocolo: str) -> SifenResponse:
+    return SifenResponse(success=True, code="0300", message="Lote recibido",
+                         protocol_number=protocolo)
+
+
+def test_build_lote_xml_conserva_documentos():
+    """Test el rLoteDE contiene los rDE sin declaración XML ni cambios"""
+    documentos = [_rde(i) for i in range(1, 4)]
+    lote = build_lote_xml(documentos)
+
+    root = etree.fromstring(lote)
+    assert root.tag == f"{{{SIFEN_NS}}}rLoteDE"
+    assert len(root) == 3
+    assert documentos[1].split("\n", 1)[1].encode() in lote
+
+    with pytest.raises(SifenValidationError):
+        build_lote_xml([_rde(1)] * 51)
+
+
+def test_build_lote_params_zip_base64():
+    """Test xDe es el rLoteDE comprimido y dId se valida"""
+    documentos = [_rde(i) for i in range(1, 51)]
+    params = build_lote_params("250101120000001", documentos)
+
+    assert params["dId"] == "250101120000001"
+    assert "T" in params["dFecEnvio"]
+    assert unpack_lote(params["xDe"]) == build_lote_xml(documentos)
+    assert len(params["xDe"]) < len(build_lote_xml(documentos))
+
+    with pytest.raises(SifenValidationError):
+        build_lote_params("1234567890123456", documentos)
+
+
+def test_split_e_identificadores():
+    """Test partición en lotes de 50 y dId únicos de 15 dígitos"""
+    assert [len(chunk) for chunk in split_into_lotes(list(range(120)))] == [50, 50, 20]
+    ids = {generate_lote_id() for _ in range(100)}
+    assert len(ids) == 100 and all(len(i) == 15 and i.isdigit() for i in ids)
+    assert extract_cdc(_rde(7)) == f"{7:044d}"
+
+
+def test_lote_id_unico_entre_procesos(tmp_path):
+    """Test dos engines (dos procesos o nodos) no repiten dId en el mismo segundo"""
+    database_url = f"sqlite:///{tmp_path / 'lotes.db'}"
+    DatabaseLoteSequence(create_engine(database_url), create_table=True)
+    ahora = datetime(2025, 1, 1, 12, 0, 0)
+    ids = []
+    try:
+        for _ in range(3):
+            for engine in (create_engine(database_url), create_engine(database_url)):
+                configure_lote_sequence(engine)
+                ids.append(generate_lote_id(ahora))
+    finally:
+        configure_lote_sequence(None)
+
+    assert ids == [f"250101{n:09d}" for n in range(1, 7)]
+
+
+@pytest.mark.asyncio
+async def test_client_send_lote_una_llamada(test_config):
+    """Test send_lote usa receiveBatch una vez y devuelve el protocolo del lote"""
+    client = SifenSOAPClient(test_config)
+
+    soap_response = Mock(success=True, responseCode="0300", responseMessage="Lote recibido",
+                         cdc=None, protocolNumber=None, dProtConsLote="987654321",
+                         errors=[], observations=[])
+    soap_client = AsyncMock()
+    soap_client.service.receiveBatch.return_value = soap_response
+
+    with patch.object(client, "_get_client", return_value=soap_client):
+        response = await client.send_lote("250101120000001", [_rde(1), _rde(2)])
+
+    soap_client.service.receiveBatch.assert_awaited_once()
+    kwargs = soap_client.service.receiveBatch.await_args.kwargs
+    assert len(etree.fromstring(unpack_lote(kwargs["xDe"]))) == 2
+    assert response.protocol_number == "987654321"
+    assert response.additional_data["documents_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_send_lotes_particiona_y_persiste(test_config):
+    """Test 120 documentos -> 3 llamadas; callback recibe cada protocolo"""
+    soap_client = AsyncMock()
+    protocolos = iter(["P1", "P2", "P3"])
+    soap_client.send_lote.side_effect = lambda lote_id, docs: _respuesta_lote(next(protocolos))
+    sender = DocumentSender(config=test_config, soap_client=soap_client)
+
+    persistidos = {}
+
+    async def registrar(lote: LoteSendResult):
+        persistidos[lote.protocol_number] = lote.document_indices
+
+    documentos = [(_rde(i), "CERT12345678") for i in range(1, 121)]
+    documentos[10] = ("<rDE/>", "CERT12345678")
+    result = await sender.send_lotes(documentos, on_lote_sent=registrar, max_concurrent=1)
+
+    assert soap_client.send_lote.await_count == 3
+    assert [len(lote.document_indices) for lote in result.lotes] == [50, 50, 19]
+    assert set(result.rejected) == {10}
+    assert result.protocol_numbers == ["P1", "P2", "P3"]
+    assert persistidos["P1"][:11] == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 11]
+    assert result.lotes[0].cdcs[0] == f"{1:044d}"
+    assert not result.success
+
+
+@pytest.mark.asyncio
+async def test_send_lotes_error_de_lote(test_config):
+    """Test un lote que falla no aborta los demás"""
+    soap_client = AsyncMock()
+    respuestas = [SifenConnectionError("sin conexión"), _respuesta_lote("P2")]
+
+    async def send_lote(lote_id, docs):
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    soap_client.send_lote.side_effect = send_lote
+    retry_manager = Mock()
+    retry_manager.max_retries = 0
+
+    async def sin_reintentos(func, *args, **kwargs):
+        return await func(*args)
+
+    retry_manager.execute_with_retry = sin_reintentos
+    sender = DocumentSender(config=test_config, soap_client=soap_client,
+                            retry_manager=retry_manager)
+
+    documentos = [(_rde(i), "CERT12345678") for i in range(1, 61)]
+    result = await sender.send_lotes(documentos, max_concurrent=1)
+
+    assert [lote.success for lote in result.lotes] == [False, True]
+    assert "sin conexión" in result.lotes[0].error
+    assert result.protocol_numbers == ["P2"]
+
+    with pytest.raises(SifenValidationError):
+        await sender.send_lotes([])
+
+
+@pytest.mark.asyncio
+async def test_send_lotes_callback_fallido_no_pierde_lotes(test_config):
+    """Test si persistir un lote falla, los demás resultados y protocolos se conservan"""
+    soap_client = AsyncMock()
+    protocolos = iter(["P1", "P2", "P3"])
+    soap_client.send_lote.side_effect = lambda lote_id, docs: _respuesta_lote(next(protocolos))
+    sender = DocumentSender(config=test_config, soap_client=soap_client)
+
+    persistidos = []
+
+    async def registrar(lote: LoteSendResult):
+        if lote.protocol_number == "P2":
+            raise RuntimeError("BD no disponible")
+        persistidos.append(lote.protocol_number)
+
+    documentos = [(_rde(i), "CERT12345678") for i in range(1, 121)]
+    result = await sender.send_lotes(documentos, on_lote_sent=registrar, max_concurrent=1)
+
+    assert result.protocol_numbers == ["P1", "P2", "P3"]
+    assert all(lote.success for lote in result.lotes)
+    assert persistidos == ["P1", "P3"]
+    assert [lote.callback_error for lote in result.lotes] == [None, "BD no disponible", None]
+
+
+@pytest.mark.asyncio
+async def test_send_lotes_error_inesperado_no_aborta(test_config):
+    """Test excepciones que no son SifenClientError quedan en el lote"""
+    soap_client = AsyncMock()
+    respuestas = [ValueError("dId inválido"), _respuesta_lote("P2")]
+
+    async def send_lote(lote_id, docs):
+        respuesta = respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    soap_client.send_lote.side_effect = send_lote
+    retry_manager = Mock()
+
+    async def sin_reintentos(func, *args, **kwargs):
+        return await func(*args)
+
+    retry_manager.execute_with_retry = sin_reintentos
+    sender = DocumentSender(config=test_config, soap_client=soap_client,
+                            retry_manager=retry_manager)
+
+    documentos = [(_rde(i), "CERT12345678") for i in range(1, 61)]
+    result = await sender.send_lotes(documentos, max_concurrent=1)
+
+    assert [lote.success for lote in result.lotes] == [False, True]
+    assert result.lotes[0].error == "dId inválido"
+    assert result.protocol_numbers == ["P2"]
+
+
+@pytest.mark.asyncio
+async def test_send_lotes_usa_limitador_adaptativo(test_config):
+    """Test los lotes ocupan lugares del limitador AIMD del sender"""
+    soap_client = AsyncMock()
+    soap_client.send_lote.return_value = _respuesta_lote("P1")
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=4)
+    sender = DocumentSender(config=test_config, soap_client=soap_client,
+                            concurrency_limiter=limiter)
+
+    documentos = [(_rde(i), "CERT12345678") for i in range(1, 151)]
+    result = await sender.send_lotes(documentos)
+
+    assert len(result.lotes) == 3
+    stats = limiter.get_stats()
+    assert stats['completed'] == 3
+    assert stats['in_flight'] == 0
@@ -0,0 +1,178 @@
+"""
+Tests para el outbox durable de envíos y sus workers
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from app.repositories.sifen_outbox import SifenOutboxStore, encolar_envio, outbox_table
+from app.services.sifen_client.document_sender import SendResult
+from app.services.sifen_client.exceptions import SifenConnectionError
+from app.services.sifen_client.models import SifenResponse
+from app.services.sifen_client.outbox_worker import OutboxWorker
+
+
+class FakeRepository:
+    """Documentos en memoria con la interfaz de SifenStateMixin usada por el worker"""
+
+    def __init__(self):
+        self.documentos = {}
+        self.respuestas = []
+
+    @contextmanager
+    def __call__(self):
+        yield self
+
+    def get_by_id(self, documento_id):
+        return self.documentos.get(documento_id)
+
+    def marcar_como_enviado(self, documento_id, request_id=None):
+        self.documentos[documento_id].estado = 'enviado'
+
+    def actualizar_estado_documento(self, documento_id, estado, datos=None):
+        self.documentos[documento_id].estado = estado
+
+    def procesar_respuesta_sifen(self, documento_id, codigo, mensaje, **kwargs):
+        self.respuestas.append((documento_id, codigo))
+        self.documentos[documento_id].estado = 'aprobado' if codigo == '0260' else 'rechazado'
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SifenOutboxStore(create_engine(f"sqlite:///{tmp_path / 'outbox.db'}"), create_table=True)
+
+
+@pytest.fixture
+def repository():
+    repo = FakeRepository()
+    for documento_id in (1, 2):
+        repo.documentos[documento_id] = SimpleNamespace(estado='firmado', xml_firmado='<rDE/>')
+    return repo
+
+
+def enqueue(store, *documento_ids):
+    with store.engine.begin() as conn:
+        return [encolar_envio(conn, documento_id, "CERT12345678") for documento_id in documento_ids]
+
+
+def send_result(code, success):
+    response = SifenResponse(success=success, code=code, message=f"Código {code}")
+    return SendResult(success=success, response=response, processing_time_ms=10.0,
+                      retry_count=0, enhanced_info={})
+
+
+def make_worker(store, repository, sender, **kwargs):
+    return OutboxWorker(store, sender, repository_factory=repository,
+                        backoff_base=60.0, jitter=0.0, **kwargs)
+
+
+def test_encolar_idempotente_y_claim_sin_duplicados(store):
+    """Test la fila no se duplica y dos workers nunca toman la misma"""
+    assert enqueue(store, 1, 2, 3) == [True, True, True]
+    assert enqueue(store, 1) == [False]
+
+    primero = store.claim("worker-a", limit=2)
+    segundo = store.claim("worker-b", limit=2)
+
+    assert [fila['documento_id'] for fila in primero] == [1, 2]
+    assert [fila['documento_id'] for fila in segundo] == [3]
+    assert store.claim("worker-c") == []
+    assert store.get_stats()['processing'] == 3
+
+
+def test_lease_vencido_se_retoma(store):
+    """Test una fila de un worker caído vuelve a tomarse al vencer el lease"""
+    enqueue(store, 1)
+    [fila] = store.claim("worker-caido", lease_seconds=30)
+
+    assert store.claim("worker-b") == []
+    [retomada] = store.claim("worker-b", now=datetime.now() + timedelta(seconds=31))
+
+    assert retomada['id'] == fila['id'] and retomada['attempts'] == 2
+    assert not store.mark_done(fila['id'], "worker-caido")
+    assert store.mark_done(fila['id'], "worker-b", "0260")
+
+
+@pytest.mark.asyncio
+async def test_envio_exitoso_registra_respuesta(store, repository):
+    """Test el worker envía, registra la respuesta y cierra la fila"""
+    enqueue(store, 1, 2)
+    sender = Mock(send_document_limited=AsyncMock(side_effect=[
+        send_result("0260", True), send_result("1000", False)]))
+    worker = make_worker(store, repository, sender)
+
+    assert await worker.run_once() == 2
+
+    assert sorted(repository.respuestas) == [(1, '0260'), (2, '1000')]
+    assert repository.documentos[1].estado == 'aprobado'
+    assert repository.documentos[2].estado == 'rechazado'
+    llamada = sender.send_document_limited.await_args.kwargs
+    assert llamada['xml_content'] == '<rDE/>'
+    assert llamada['certificate_serial'] == "CERT12345678"
+    assert store.get_stats()['done'] == 2
+    assert worker.get_stats()['sent'] == 2
+
+
+@pytest.mark.asyncio
+async def test_envio_largo_renueva_el_lease(store, repository):
+    """Test mientras el envío sigue en curso ningún otro worker retoma la fila"""
+    enqueue(store, 1)
+    reclamos = []
+
+    async def envio_lento(**kwargs):
+        for _ in range(2):
+            await asyncio.sleep(0.5)
+            reclamos.append(await asyncio.to_thread(store.claim, "worker-b"))
+        return send_result("0260", True)
+
+    sender = Mock(send_document_limited=AsyncMock(side_effect=envio_lento))
+    worker = make_worker(store, repository, sender, lease_seconds=0.3)
+    [fila] = store.claim(worker.worker_id, lease_seconds=0.3)
+
+    assert await worker.process(fila) == 'done'
+    assert reclamos == [[], []]
+    assert repository.respuestas == [(1, '0260')]
+
+
+@pytest.mark.asyncio
+async def test_error_transitorio_reintenta_con_backoff(store, repository):
+    """Test errores de conexión y 5xxx reprograman la fila hasta max_attempts"""
+    enqueue(store, 1)
+    sender = Mock(send_document_limited=AsyncMock(side_effect=[
+        SifenConnectionError("sin conexión"), send_result("5001", False)]))
+    worker = make_worker(store, repository, sender, max_attempts=2)
+
+    [fila] = store.claim(worker.worker_id)
+    assert await worker.process(fila) == 'retry'
+    assert repository.documentos[1].estado == 'error_envio'
+
+    with store.engine.connect() as conn:
+        row = conn.execute(select(outbox_table)).mappings().one()
+    assert row['status'] == 'pending' and row['attempts'] == 1
+    assert row['available_at'] > datetime.now() + timedelta(seconds=55)
+
+    [fila] = store.claim(worker.worker_id, now=datetime.now() + timedelta(seconds=61))
+    assert await worker.process(fila) == 'failed'
+    assert repository.respuestas == []
+
+    stats = store.get_stats()
+    assert stats['failed'] == 1 and stats['pending'] == 0
+
+
+@pytest.mark.asyncio
+async def test_documento_resuelto_no_se_reenvia(store, repository):
+    """Test un documento ya aprobado cierra la fila sin llamar a SIFEN"""
+    repository.documentos[1].estado = 'aprobado'
+    enqueue(store, 1)
+    sender = Mock(send_document_limited=AsyncMock())
+    worker = make_worker(store, repository, sender)
+
+    assert await worker.run_once() == 1
+    sender.send_document_limited.assert_not_awaited()
+    assert store.get_stats()['done'] == 1
@@ -0,0 +1,118 @@
+"""
+Tests para el token bucket por servicio compartido entre procesos
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+
+from app.services.sifen_client.client import SifenSOAPClient
+from app.services.sifen_client.config import SifenConfig
+from app.services.sifen_client.exceptions import SifenTimeoutError
+from app.services.sifen_client.models import DocumentRequest
+from app.services.sifen_client.rate_limiter import (
+    BucketLimits,
+    DatabaseBucketStore,
+    MemoryBucketStore,
+    SifenRateLimiter,
+)
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'rate_limit.db'}"
+
+
+def test_bucket_en_memoria_rafaga_y_reposicion():
+    """Test burst inmediato, espera calculada y reposición por tiempo"""
+    store = MemoryBucketStore()
+    limits = BucketLimits(burst=3, refill_per_second=2.0)
+
+    assert [store.take("test:sync_receive", limits, 0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("test:sync_receive", limits, 0.0) == pytest.approx(0.5)
+    assert store.take("test:query_ruc", limits, 0.0) == 0.0
+    assert store.take("test:sync_receive", limits, 0.5) == 0.0
+
+
+def test_bucket_compartido_entre_procesos(database_url):
+    """Test dos engines (dos procesos) consumen del mismo bucket"""
+    proceso_a = DatabaseBucketStore(create_engine(database_url), create_table=True)
+    proceso_b = DatabaseBucketStore(create_engine(database_url), create_table=True)
+    limits = BucketLimits(burst=4, refill_per_second=1.0)
+
+    esperas = [store.take("test:sync_receive", limits, 100.0)
+               for store in (proceso_a, proceso_b) * 3]
+
+    assert esperas[:4] == [0.0] * 4
+    assert all(espera > 0 for espera in esperas[4:])
+    assert proceso_b.take("test:sync_receive", limits, 101.0) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_acquire_espera_y_rechaza():
+    """Test acquire duerme hasta el próximo token y falla pasado max_wait"""
+    config = SifenConfig(environment="test", rate_limit_burst=1,
+                         rate_limit_refill_per_second=50.0,
+                         rate_limit_overrides={'async_batch': {'refill_per_second': 0.01}},
+                         rate_limit_max_wait=1.0)
+    limiter = SifenRateLimiter(config, store=MemoryBucketStore())
+
+    assert await limiter.acquire('sync_receive') == 0.0
+    assert await limiter.acquire('sync_receive') == pytest.approx(0.02, abs=0.015)
+
+    await limiter.acquire('async_batch')
+    with pytest.raises(SifenTimeoutError):
+        await limiter.acquire('async_batch')
+
+    stats = limiter.get_stats()
+    assert stats['acquired'] == 3 and stats['throttled'] == 1 and stats['rejected'] == 1
+
+    with pytest.raises(ValidationError):
+        SifenConfig(environment="test", rate_limit_overrides={'query_ruc': {'rps': 1}})
+
+
+@pytest.mark.asyncio
+async def test_acquire_sin_base_usa_bucket_en_memoria(database_url):
+    """Test un error de la base no corta los envíos: se limita por proceso"""
+    config = SifenConfig(environment="test", rate_limit_burst=2,
+                         rate_limit_refill_per_second=0.01, rate_limit_max_wait=0.1)
+    # Sin la tabla cada toma falla con OperationalError
+    limiter = SifenRateLimiter(config, store=DatabaseBucketStore(create_engine(database_url)))
+
+    assert await limiter.acquire('sync_receive') == 0.0
+    assert await limiter.acquire('sync_receive') == 0.0
+    with pytest.raises(SifenTimeoutError):
+        await limiter.acquire('sync_receive')
+
+    stats = limiter.get_stats()
+    assert stats['store_fallbacks'] == 3 and stats['acquired'] == 2
+
+
+@pytest.mark.asyncio
+async def test_cliente_toma_token_antes_de_cada_llamada():
+    """Test SifenSOAPClient pasa por el limitador con el nombre del servicio"""
+    config = SifenConfig(environment="test")
+    limiter = Mock(acquire=AsyncMock(return_value=0.0))
+    client = SifenSOAPClient(config, rate_limiter=limiter)
+
+    soap_client = AsyncMock()
+    soap_client.service.receiveDocument.return_value = Mock(
+        success=True, responseCode="0260", responseMessage="Aprobado",
+        cdc=None, protocolNumber=None, errors=[], observations=[])
+
+    xml = ('<rDE xmlns="http://ekuatia.set.gov.py/sifen/xsd"><dVerFor>150</dVerFor>'
+           f'<DE Id="{1:044d}"><gDE><dNumDoc>1</dNumDoc></gDE></DE></rDE>')
+    request = DocumentRequest(xml_content=xml, certificate_serial="CERT12345678")
+    with patch.object(client, "_get_client", return_value=soap_client):
+        await client.send_document(request)
+
+    limiter.acquire.assert_awaited_once_with('sync_receive')
+
+    limiter.acquire.side_effect = SifenTimeoutError(
+        "rate limit", timeout_type="rate_limit", timeout_value=30)
+    with patch.object(client, "_get_client", return_value=soap_client):
+        with pytest.raises(SifenTimeoutError):
+            await client.send_document(request)
+    assert soap_client.service.receiveDocument.await_count == 1
@@ -0,0 +1,167 @@
+"""
+Tests para la consulta RUC con cache de dos niveles
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.services.sifen_client.config import SifenConfig
+from app.services.sifen_client.exceptions import SifenClientError
+from app.services.sifen_client.models import SifenResponse
+from app.services.sifen_client.ruc_lookup import RucCacheStore, RucLookupService, normalize_ruc
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_750_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _respuesta(code: str, success: bool = False) -> SifenResponse:
+    return SifenResponse(
+        success=success,
+        code=code,
+        message="RUC encontrado" if success else "RUC inexistente",
+        additional_data={'contribuyente': {'ruc': '80012345', 'razonSocial': 'EMPRESA SA'}}
+    )
+
+
+@pytest.fixture
+def config():
+    return SifenConfig(environment="test", ruc_cache_ttl=600, ruc_negative_cache_ttl=60,
+                       ruc_prefetch_concurrency=3)
+
+
+@pytest.fixture
+def client(config):
+    async def query_document(request):
+        await asyncio.sleep(0.01)
+        if request.ruc.startswith('9'):
+            return _respuesta('0500')
+        if request.ruc.startswith('7'):
+            return _respuesta('0160')
+        return _respuesta('0502', success=True)
+
+    client = Mock(config=config)
+    client.query_document = AsyncMock(side_effect=query_document)
+    return client
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ruc_cache.db'}")
+    RucCacheStore(engine, create_table=True)
+    return engine
+
+
+def test_normalize_ruc():
+    """Test clave de cache sin DV ni ceros a la izquierda"""
+    assert normalize_ruc("80012345-6") == normalize_ruc(" 080012345 ") == "80012345"
+    with pytest.raises(SifenClientError):
+        normalize_ruc("ABC-1")
+
+
+@pytest.mark.asyncio
+async def test_cache_en_memoria_y_ttl(client, config):
+    """Test hit en memoria, TTL positivo y negativo"""
+    clock = FakeClock()
+    lookup = RucLookupService(client, config=config, clock=clock)
+
+    result = await lookup.lookup("80012345-6")
+    assert result.found and result.razon_social == 'EMPRESA SA'
+    assert result.source == 'sifen'
+    assert (await lookup.lookup("80012345")).source == 'memory'
+
+    inexistente = await lookup.lookup("90000001")
+    assert not inexistente.found
+
+    clock.now += 61
+    await lookup.lookup("90000001")
+    await lookup.lookup("80012345")
+    assert client.query_document.await_count == 3
+
+    clock.now += 600
+    assert (await lookup.lookup("80012345")).source == 'sifen'
+    assert lookup.get_stats()['not_found'] == 2
+
+
+@pytest.mark.asyncio
+async def test_consultas_concurrentes_comparten_llamada(client, config):
+    """Test coalescing de consultas simultáneas del mismo RUC"""
+    lookup = RucLookupService(client, config=config)
+
+    results = await asyncio.gather(*(lookup.lookup("80012345-6") for _ in range(10)))
+
+    assert client.query_document.await_count == 1
+    assert {r.ruc for r in results} == {"80012345"}
+    assert lookup.get_stats()['coalesced'] == 9
+    assert lookup.get_stats()['inflight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_error_tecnico_no_se_cachea(client, config):
+    """Test errores de SIFEN se propagan y no quedan en cache"""
+    lookup = RucLookupService(client, config=config)
+
+    for _ in range(2):
+        with pytest.raises(SifenClientError) as exc_info:
+            await lookup.lookup("70000001")
+        assert exc_info.value.error_code == '0160'
+
+    assert client.query_document.await_count == 2
+    assert lookup.get_stats()['memory_entries'] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_persistente_compartido(client, config, engine):
+    """Test un segundo proceso resuelve desde la base de datos"""
+    clock = FakeClock()
+    await RucLookupService(client, engine=engine, config=config, clock=clock).lookup("80012345")
+
+    otro = RucLookupService(client, engine=engine, config=config, clock=clock)
+    result = await otro.lookup("80012345-6")
+    assert result.source == 'db' and result.razon_social == 'EMPRESA SA'
+    assert client.query_document.await_count == 1
+
+    clock.now += 601
+    assert (await otro.lookup("80012345")).source == 'sifen'
+    assert otro.store.purge_expired(clock.now + 601) == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_con_concurrencia_acotada(client, config, engine):
+    """Test prefetch deduplica, usa el cache y respeta la concurrencia"""
+    activos = maximo = 0
+    original = client.query_document.side_effect
+
+    async def query_document(request):
+        nonlocal activos, maximo
+        activos += 1
+        maximo = max(maximo, activos)
+        try:
+            return await original(request)
+        finally:
+            activos -= 1
+
+    client.query_document.side_effect = query_document
+    lookup = RucLookupService(client, engine=engine, config=config)
+    await lookup.lookup("80000000")
+
+    rucs = [f"8{i:07d}" for i in range(12)] + ["80000001-5", "90000001", "70000001", "XX"]
+    summary = await lookup.prefetch(rucs)
+
+    assert maximo <= 3
+    assert summary['total'] == 14
+    assert summary['cached'] == 1
+    assert summary['fetched'] == 12
+    assert summary['not_found'] == 1
+    assert summary['errors'] == 2
+
+    lookup.clear_memory()
+    again = await lookup.prefetch(rucs)
+    assert (again['cached'], again['fetched']) == (13, 0)
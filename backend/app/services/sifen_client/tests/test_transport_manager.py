@@ -0,0 +1,125 @@
+"""
+Tests para el pool HTTP compartido y el SSLContext cacheado
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.sifen_client.client import SifenSOAPClient
+from app.services.sifen_client.config import SifenConfig
+from app.services.sifen_client.transport_manager import (
+    close_transport_managers,
+    get_transport_manager,
+    get_transport_stats,
+    reset_transport_managers,
+)
+from app.services.sifen_client.wsdl_bundle import clear_wsdl_cache
+
+
+@pytest.fixture(autouse=True)
+def _managers_limpios():
+    reset_transport_managers()
+    yield
+    reset_transport_managers()
+    clear_wsdl_cache()
+
+
+@pytest.fixture
+def test_config():
+    return SifenConfig(environment="test", pool_connections=5, pool_maxsize=10,
+                       use_bundled_wsdl=True)
+
+
+def test_ssl_context_se_construye_una_vez(test_config):
+    """Test configs equivalentes comparten SSLContext y manager"""
+    otra = SifenConfig(environment="test", pool_connections=5, pool_maxsize=10)
+
+    assert test_config.ssl_context is test_config.ssl_context
+    assert test_config.ssl_context is otra.ssl_context
+    assert get_transport_manager(test_config) is get_transport_manager(otra)
+
+    produccion = SifenConfig(environment="production")
+    assert get_transport_manager(produccion) is not get_transport_manager(test_config)
+
+
+@pytest.mark.asyncio
+async def test_pool_con_limites_y_keepalive(test_config):
+    """Test el transport zeep usa el httpx.AsyncClient con los límites configurados"""
+    manager = get_transport_manager(test_config)
+    transport = manager.get_transport()
+
+    pool = transport.client._transport._pool
+    assert pool._max_connections == 10
+    assert pool._max_keepalive_connections == 5
+    assert pool._keepalive_expiry == test_config.keepalive_expiry
+    assert transport.client.headers["User-Agent"].startswith("SIFEN-Client-Python")
+
+    await close_transport_managers()
+    assert transport.client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_rotacion_de_certificado_reconstruye_pool(test_config, monkeypatch):
+    """Test un certificado nuevo en disco crea otro pool; el anterior se
+    cierra recién al cerrar el manager"""
+    version = {"mtime": 1.0}
+    monkeypatch.setattr(SifenConfig, "_ssl_context_key",
+                        lambda self: ("1.2", True, "cert.pem", "key.pem", version["mtime"], 1.0))
+    manager = get_transport_manager(test_config)
+    anterior = manager.get_transport()
+    assert manager.get_transport() is anterior
+
+    version["mtime"] = 2.0
+    nuevo = manager.get_transport()
+
+    assert nuevo is not anterior
+    assert nuevo.client is not anterior.client
+    assert manager.get_stats()['certificate_rotations'] == 1
+    assert not anterior.client.is_closed
+
+    await close_transport_managers()
+    assert anterior.client.is_closed and nuevo.client.is_closed
+
+
+def test_cambio_de_event_loop_no_pierde_clientes(test_config):
+    """Test el cliente del loop anterior se conserva y se cierra en aclose()"""
+    manager = get_transport_manager(test_config)
+
+    async def transport():
+        return manager.get_transport()
+
+    primero = asyncio.run(transport())
+    segundo = asyncio.run(transport())
+
+    assert segundo is not primero
+    assert not primero.client.is_closed
+    asyncio.run(manager.aclose())
+    assert primero.client.is_closed and segundo.client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_clientes_comparten_pool(test_config):
+    """Test varios SifenSOAPClient reutilizan el transport"""
+    clientes = [SifenSOAPClient(test_config) for _ in range(3)]
+    for client in clientes:
+        await client._initialize()
+
+    try:
+        transports = {id(c._clients['query_ruc'].transport) for c in clientes}
+        assert len(transports) == 1
+
+        stats = get_transport_stats()
+        assert stats['leases_active'] == 3
+        assert stats['pools'][0]['pools_created'] == 1
+        assert stats['pools'][0]['utilization'] == 0
+    finally:
+        for client in clientes:
+            await client._cleanup()
+
+    manager = get_transport_manager(test_config)
+    assert manager.get_stats()['leases_active'] == 0
+    assert manager.get_stats()['peak_leases'] == 3
+    # Cerrar un cliente no cierra el pool compartido
+    assert not manager.get_transport().client.is_closed
+    await close_transport_managers()
@@ -0,0 +1,111 @@
+"""
+Tests para los WSDL empaquetados y el cache de documentos parseados
+"""
+
+import time
+
+import pytest
+from zeep import AsyncClient
+
+from app.services.sifen_client.client import SifenSOAPClient
+from app.services.sifen_client.config import SifenConfig
+from app.services.sifen_client.exceptions import SifenConnectionError
+from app.services.sifen_client.lote import build_lote_params
+from app.services.sifen_client.wsdl_bundle import (
+    BUNDLED_SERVICES,
+    LocalWsdlTransport,
+    bundled_path,
+    clear_wsdl_cache,
+    get_wsdl_cache_stats,
+    get_wsdl_document,
+    preload_wsdl_documents,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cache_limpio():
+    clear_wsdl_cache()
+    yield
+    clear_wsdl_cache()
+
+
+@pytest.fixture
+def test_config():
+    return SifenConfig(environment="test", use_bundled_wsdl=True)
+
+
+def test_bundle_deshabilitado_por_defecto(monkeypatch):
+    """Test el bundle no oficial solo se usa si se habilita explícitamente"""
+    monkeypatch.delenv("SIFEN_BUNDLED_WSDL", raising=False)
+    assert SifenConfig(environment="production").use_bundled_wsdl is False
+    assert SifenConfig.from_env().use_bundled_wsdl is False
+
+    monkeypatch.setenv("SIFEN_BUNDLED_WSDL", "true")
+    assert SifenConfig.from_env().use_bundled_wsdl is True
+
+
+def test_bundle_resuelve_servicios_e_imports(test_config):
+    """Test cada servicio y su XSD importado están en el paquete"""
+    for service_path in BUNDLED_SERVICES.values():
+        assert bundled_path(test_config.get_service_url(service_path)) is not None
+
+    assert bundled_path("https://sifen-test.set.gov.py/de/ws/sifen-client-types.xsd") is not None
+    assert bundled_path("https://sifen-test.set.gov.py/de/ws/../../etc/passwd") is None
+    assert bundled_path("https://otro-host.com/servicio.wsdl") is None
+
+    with pytest.raises(SifenConnectionError):
+        LocalWsdlTransport(offline=True).load("https://sifen-test.set.gov.py/de/ws/otro.wsdl")
+
+
+def test_documento_compartido_por_url(test_config):
+    """Test el WSDL se parsea una vez por URL y la dirección depende del ambiente"""
+    assert preload_wsdl_documents(test_config) == len(BUNDLED_SERVICES)
+
+    url = test_config.get_service_url(BUNDLED_SERVICES['query_ruc'])
+    assert get_wsdl_document(url) is get_wsdl_document(url)
+    assert get_wsdl_cache_stats()['misses'] == len(BUNDLED_SERVICES)
+
+    produccion = SifenConfig(environment="production")
+    url_prod = produccion.get_service_url(BUNDLED_SERVICES['query_ruc'])
+    direcciones = {
+        AsyncClient(wsdl=get_wsdl_document(u)).service._binding_options['address']
+        for u in (url, url_prod)
+    }
+    assert direcciones == {
+        "https://sifen-test.set.gov.py/de/ws/consultas/consulta-ruc",
+        "https://sifen.set.gov.py/de/ws/consultas/consulta-ruc",
+    }
+
+
+def test_operaciones_coinciden_con_el_cliente(test_config):
+    """Test los parámetros que arma SifenSOAPClient son válidos para el WSDL"""
+    preload_wsdl_documents(test_config)
+
+    def mensaje(service: str, operation: str, **params):
+        url = test_config.get_service_url(BUNDLED_SERVICES[service])
+        client = AsyncClient(wsdl=get_wsdl_document(url))
+        return client.create_message(client.service, operation, **params)
+
+    mensaje('sync_receive', 'receiveDocument', xmlDocument='<rDE/>',
+            certificateSerial='12345678', timestamp='2025-01-01T00:00:00')
+    mensaje('async_batch', 'receiveBatch',
+            **build_lote_params("1", ['<rDE xmlns="http://ekuatia.set.gov.py/sifen/xsd"/>']))
+    mensaje('query_ruc', 'queryRuc', queryType='ruc', page=1, pageSize=50, ruc='80012345-6')
+    mensaje('query_document', 'queryDocument', queryType='cdc', page=1, pageSize=50, cdc='0' * 44)
+
+
+@pytest.mark.asyncio
+async def test_inicializacion_sin_red(test_config):
+    """Test el cliente crea los cinco servicios desde el bundle en milisegundos"""
+    preload_wsdl_documents(test_config)
+
+    start = time.perf_counter()
+    client = SifenSOAPClient(test_config)
+    await client._initialize()
+    elapsed = time.perf_counter() - start
+
+    try:
+        assert set(client._clients) == set(BUNDLED_SERVICES)
+        assert elapsed < 1.0
+    finally:
+        await client._cleanup()
@@ -0,0 +1,291 @@
+"""
+Pool de conexiones HTTP compartido para todo el tráfico SIFEN
+
+Cada SifenSOAPClient abría su propia sesión HTTP y el transport de zeep
+creaba otro cliente httpx por instancia, por lo que cada DocumentSender
+pagaba el handshake TLS de nuevo. SifenTransportManager mantiene por
+proceso (y por configuración) un único juego de conexiones:
+
+- SSLContext construido una vez (SifenConfig.ssl_context)
+- httpx.AsyncClient para el transport SOAP de zeep, con límites de pool
+  y keep-alive: las conexiones TLS abiertas se reutilizan entre clientes
+- Métricas de uso del pool para dimensionarlo
+
+Si el certificado cliente cambia en disco (rotación) o el event loop
+cambia, el pool se reconstruye; los clientes httpx anteriores pueden
+seguir en uso por clientes SOAP ya creados, así que se cierran recién en
+aclose().
+
+Los clientes toman el transport con lease() y lo devuelven con release();
+el pool se cierra solo con close_transport_managers() al apagar la app.
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import httpx
+import structlog
+from zeep.transports import AsyncTransport
+
+from .config import SifenConfig
+
+# Logger para el transport manager
+logger = structlog.get_logger(__name__)
+
+USER_AGENT = 'SIFEN-Client-Python/1.5.0'
+
+
+class SifenTransportManager:
+    """
+    Conexiones HTTP compartidas por todos los clientes SIFEN de una configuración
+    """
+
+    def __init__(self, config: SifenConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._wsdl_client: Optional[httpx.Client] = None
+        self._transport: Optional[AsyncTransport] = None
+        self._ssl_key: Optional[Tuple[Any, ...]] = None
+        # Clientes reemplazados que pueden seguir en uso; se cierran en aclose()
+        self._retired: List[Union[httpx.AsyncClient, httpx.Client]] = []
+        self._stats = {
+            'leases_active': 0,
+            'leases_total': 0,
+            'peak_leases': 0,
+            'pools_created': 0,
+            'certificate_rotations': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Recursos compartidos
+    # ------------------------------------------------------------------
+
+    @property
+    def ssl_context(self):
+        return self.config.ssl_context
+
+    def _bind_loop(self) -> None:
+        """
+        Los clientes async quedan atados al event loop que los creó; si el
+        loop cambió (otro loop en tests o un worker nuevo) se crean de nuevo.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if self._loop is not None and loop is not None and loop is not self._loop:
+            logger.debug("sifen_transport_loop_changed")
+            self._retire(wsdl_client=False)
+        if loop is not None:
+            self._loop = loop
+
+    def _bind_certificate(self) -> None:
+        """Reconstruye el pool si el certificado cliente cambió en disco"""
+        ssl_key = self.config._ssl_context_key()
+        if self._transport is not None and ssl_key != self._ssl_key:
+            logger.info("sifen_transport_certificate_rotated",
+                        base_url=self.config.effective_base_url)
+            self._stats['certificate_rotations'] += 1
+            self._retire(wsdl_client=True)
+        self._ssl_key = ssl_key
+
+    def _retire(self, wsdl_client: bool) -> None:
+        """Deja de entregar los clientes actuales sin cerrarlos todavía"""
+        if self._http_client is not None:
+            self._retired.append(self._http_client)
+        self._http_client = None
+        self._transport = None
+        if wsdl_client and self._wsdl_client is not None:
+            self._retired.append(self._wsdl_client)
+            self._wsdl_client = None
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        config = self.config
+        return httpx.AsyncClient(
+            verify=self.ssl_context,
+            limits=httpx.Limits(
+                max_connections=config.pool_maxsize,
+                max_keepalive_connections=config.pool_connections,
+                keepalive_expiry=config.keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                config.timeout,
+                connect=config.connect_timeout,
+                read=config.read_timeout
+            ),
+        )
+
+    def _http_headers(self) -> Dict[str, str]:
+        return {
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'gzip, deflate' if self.config.enable_compression else 'identity'
+        }
+
+    def get_transport(self) -> AsyncTransport:
+        """Transport zeep sobre el pool httpx compartido"""
+        with self._lock:
+            self._bind_loop()
+            self._bind_certificate()
+            if self._transport is None:
+                self._http_client = self._create_http_client()
+                if self._wsdl_client is None:
+                    self._wsdl_client = httpx.Client(
+                        verify=self.ssl_context, timeout=self.config.timeout)
+                self._transport = AsyncTransport(
+                    client=self._http_client,
+                    wsdl_client=self._wsdl_client,
+                    timeout=self.config.timeout,
+                    operation_timeout=self.config.timeout
+                )
+                # AsyncTransport reemplaza los headers con su User-Agent
+                self._http_client.headers = self._http_headers()
+                self._stats['pools_created'] += 1
+
+                logger.info(
+                    "sifen_transport_pool_created",
+                    base_url=self.config.effective_base_url,
+                    max_connections=self.config.pool_maxsize,
+                    max_keepalive=self.config.pool_connections
+                )
+            return self._transport
+
+    # ------------------------------------------------------------------
+    # Leases
+    # ------------------------------------------------------------------
+
+    def lease(self) -> AsyncTransport:
+        """Registra un cliente usuario del pool y retorna el transport"""
+        transport = self.get_transport()
+        with self._lock:
+            self._stats['leases_active'] += 1
+            self._stats['leases_total'] += 1
+            self._stats['peak_leases'] = max(
+                self._stats['peak_leases'], self._stats['leases_active'])
+        return transport
+
+    def release(self) -> None:
+        """Libera el lease de un cliente; las conexiones quedan en el pool"""
+        with self._lock:
+            self._stats['leases_active'] = max(0, self._stats['leases_active'] - 1)
+
+    async def aclose(self) -> None:
+        """Cierra todas las conexiones del pool"""
+        with self._lock:
+            self._retire(wsdl_client=True)
+            clients, self._retired = self._retired, []
+
+        for client in clients:
+            try:
+                if isinstance(client, httpx.AsyncClient):
+                    await client.aclose()
+                else:
+                    client.close()
+            except Exception as e:
+                # Cliente atado a un event loop ya cerrado
+                logger.debug("sifen_transport_close_failed", error=str(e),
+                             error_type=type(e).__name__)
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Uso del pool: leases, conexiones abiertas/ociosas y límites"""
+        stats: Dict[str, Any] = {
+            **self._stats,
+            'base_url': self.config.effective_base_url,
+            'max_connections': self.config.pool_maxsize,
+            'max_keepalive_connections': self.config.pool_connections,
+            'http_connections': 0,
+            'http_connections_idle': 0,
+            'http_connections_active': 0,
+        }
+
+        # httpcore no expone métricas públicas; se leen del pool de conexiones
+        pool = getattr(getattr(self._http_client, '_transport', None), '_pool', None)
+        connections = list(getattr(pool, 'connections', []) or [])
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats['http_connections'] = len(connections)
+        stats['http_connections_idle'] = idle
+        stats['http_connections_active'] = len(connections) - idle
+
+        stats['utilization'] = round(
+            stats['http_connections_active'] / self.config.pool_maxsize, 3)
+        return stats
+
+
+# ========================================
+# REGISTRO POR PROCESO
+# ========================================
+
+_managers: Dict[Tuple[Any, ...], SifenTransportManager] = {}
+_managers_lock = threading.Lock()
+
+
+def _config_key(config: SifenConfig) -> Tuple[Any, ...]:
+    return (
+        config.effective_base_url,
+        config.verify_ssl,
+        config.tls_version,
+        config.ssl_cert_path,
+        config.ssl_key_path,
+        config.pool_connections,
+        config.pool_maxsize,
+        config.keepalive_expiry,
+        config.timeout,
+        config.connect_timeout,
+        config.read_timeout,
+        config.enable_compression,
+    )
+
+
+def get_transport_manager(config: SifenConfig) -> SifenTransportManager:
+    """Manager compartido para una configuración (mismo host, TLS y límites)"""
+    key = _config_key(config)
+    manager = _managers.get(key)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                manager = SifenTransportManager(config)
+                _managers[key] = manager
+    return manager
+
+
+def get_transport_stats() -> Dict[str, Any]:
+    """Métricas agregadas y por pool de todos los managers del proceso"""
+    pools = [manager.get_stats() for manager in list(_managers.values())]
+    return {
+        'pools': pools,
+        'leases_active': sum(pool['leases_active'] for pool in pools),
+        'http_connections': sum(pool['http_connections'] for pool in pools),
+        'http_connections_active': sum(pool['http_connections_active'] for pool in pools),
+    }
+
+
+async def close_transport_managers() -> None:
+    """Cierra los pools del proceso (shutdown de la aplicación)"""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        await manager.aclose()
+
+
+def reset_transport_managers() -> None:
+    """Olvida los managers sin cerrarlos (tests)"""
+    with _managers_lock:
+        _managers.clear()
+
+
+__all__ = [
+    'SifenTransportManager',
+    'get_transport_manager',
+    'get_transport_stats',
+    'close_transport_managers',
+    'reset_transport_managers',
+]
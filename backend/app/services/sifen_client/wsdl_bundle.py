@@ -0,0 +1,200 @@
+"""
+WSDL empaquetados y cache de WSDL parseados para SifenSOAPClient
+
+Los WSDL de los servicios SIFEN y los XSD que importan se distribuyen en
+el directorio wsdl/ del paquete, con la misma estructura de rutas que
+SifenEndpoints (/de/ws/<tipo>/<servicio>.wsdl). Así la creación de
+clientes no descarga ni parsea nada desde el host SIFEN.
+
+El bundle no es el contrato oficial de SET (siRecepDE, siRecepLoteDE,
+siConsDE, siConsRUC, siRecepEvento): sus operaciones y binding son
+propios y sirven para pruebas offline. Por eso use_bundled_wsdl está
+deshabilitado por defecto y los clientes usan el WSDL publicado por
+SIFEN; habilitarlo contra SIFEN real enviaría sobres que SET no acepta.
+
+Componentes:
+- LocalWsdlTransport: Transport zeep que resuelve URLs SIFEN contra wsdl/
+- get_wsdl_document: Document zeep parseado una vez por proceso y URL
+- preload_wsdl_documents: Precarga de todos los servicios al arrancar
+
+El Document parseado es inmutable para zeep (definiciones, bindings y
+tipos), por lo que se comparte entre todos los AsyncClient del proceso;
+cada cliente sigue usando su propio transport para las operaciones.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import structlog
+from zeep import Settings
+from zeep.transports import Transport
+from zeep.wsdl import Document
+
+from .config import SifenConfig, SifenEndpoints
+from .exceptions import SifenConnectionError
+
+# Logger para el bundle WSDL
+logger = structlog.get_logger(__name__)
+
+WSDL_BUNDLE_DIR = Path(__file__).parent / "wsdl"
+SERVICE_PATH_PREFIX = "/de/ws/"
+BASE_URL_PLACEHOLDER = b"{{SIFEN_BASE_URL}}"
+
+# Servicios que crea SifenSOAPClient._initialize_soap_clients
+BUNDLED_SERVICES = {
+    'sync_receive': SifenEndpoints.SYNC_RECEIVE,
+    'async_batch': SifenEndpoints.ASYNC_RECEIVE_BATCH,
+    'query_document': SifenEndpoints.QUERY_DOCUMENT,
+    'query_ruc': SifenEndpoints.QUERY_RUC,
+    'events': SifenEndpoints.EVENTS_RECEIVE,
+}
+
+
+def bundled_path(url: str) -> Optional[Path]:
+    """
+    Archivo del bundle que corresponde a una URL de SIFEN
+
+    Args:
+        url: URL de un WSDL o XSD (https://<host>/de/ws/...)
+
+    Returns:
+        Ruta local o None si el recurso no está empaquetado
+    """
+    path = urlparse(url).path
+    if not path.startswith(SERVICE_PATH_PREFIX):
+        return None
+
+    candidate = (WSDL_BUNDLE_DIR / path[len(SERVICE_PATH_PREFIX):]).resolve()
+    if WSDL_BUNDLE_DIR.resolve() not in candidate.parents or not candidate.is_file():
+        return None
+    return candidate
+
+
+class LocalWsdlTransport(Transport):
+    """
+    Transport zeep que sirve WSDL/XSD desde el paquete
+
+    Los imports relativos del WSDL (../sifen-client-types.xsd) se resuelven
+    contra la URL del WSDL y por lo tanto también caen dentro del bundle.
+    En modo offline un recurso no empaquetado es un error; si no, se
+    descarga con el transport estándar de zeep.
+    """
+
+    def __init__(self, offline: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.offline = offline
+
+    def load(self, url: str) -> bytes:
+        path = bundled_path(url)
+        if path is not None:
+            parsed = urlparse(url)
+            base_url = f"{parsed.scheme}://{parsed.netloc}".encode()
+            return path.read_bytes().replace(BASE_URL_PLACEHOLDER, base_url)
+
+        if self.offline:
+            raise SifenConnectionError(
+                message=f"Recurso WSDL no incluido en el paquete: {url}",
+                url=url
+            )
+        return super().load(url)
+
+
+# ========================================
+# CACHE DE DOCUMENTOS PARSEADOS
+# ========================================
+
+_documents: Dict[Tuple[str, bool], Document] = {}
+_documents_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'load_time_ms': 0.0}
+
+
+def get_wsdl_document(wsdl_url: str, offline: bool = True) -> Document:
+    """
+    Document zeep parseado para una URL, compartido por todo el proceso
+
+    Args:
+        wsdl_url: URL completa del WSDL (la URL base define la dirección
+            del servicio, por lo que test y producción se cachean aparte)
+        offline: No acceder a la red para recursos fuera del bundle
+
+    Returns:
+        Document listo para AsyncClient(wsdl=...)
+
+    Raises:
+        SifenConnectionError: Si el WSDL no está empaquetado en modo offline
+    """
+    key = (wsdl_url, offline)
+    document = _documents.get(key)
+    if document is not None:
+        _stats['hits'] += 1
+        return document
+
+    with _documents_lock:
+        document = _documents.get(key)
+        if document is None:
+            start = time.perf_counter()
+            document = Document(wsdl_url, LocalWsdlTransport(offline=offline), settings=Settings())
+            elapsed = (time.perf_counter() - start) * 1000
+
+            _documents[key] = document
+            _stats['misses'] += 1
+            _stats['load_time_ms'] += elapsed
+
+            logger.debug("wsdl_document_loaded", wsdl_url=wsdl_url, load_time_ms=round(elapsed, 2))
+        else:
+            _stats['hits'] += 1
+
+    return document
+
+
+def preload_wsdl_documents(
+    config: Optional[SifenConfig] = None,
+    services: Optional[Iterable[str]] = None
+) -> int:
+    """
+    Parsea los WSDL de los servicios al arrancar (sin acceder a SIFEN)
+
+    Args:
+        config: Configuración SIFEN (define la URL base; default: from_env)
+        services: Servicios a precargar (default: todos los de BUNDLED_SERVICES)
+
+    Returns:
+        Cantidad de documentos disponibles en cache
+    """
+    config = config or SifenConfig.from_env()
+    for name in services or BUNDLED_SERVICES:
+        get_wsdl_document(config.get_service_url(BUNDLED_SERVICES[name]))
+    return len(_documents)
+
+
+def clear_wsdl_cache() -> None:
+    """Descarta los documentos parseados (tests o cambio de bundle)"""
+    with _documents_lock:
+        _documents.clear()
+        _stats.update(hits=0, misses=0, load_time_ms=0.0)
+
+
+def get_wsdl_cache_stats() -> Dict[str, Any]:
+    """Estadísticas del cache de WSDL parseados"""
+    return {
+        'documents': len(_documents),
+        'hits': _stats['hits'],
+        'misses': _stats['misses'],
+        'load_time_ms': round(_stats['load_time_ms'], 2),
+        'bundle_dir': str(WSDL_BUNDLE_DIR),
+    }
+
+
+__all__ = [
+    'WSDL_BUNDLE_DIR',
+    'BUNDLED_SERVICES',
+    'LocalWsdlTransport',
+    'bundled_path',
+    'get_wsdl_document',
+    'preload_wsdl_documents',
+    'clear_wsdl_cache',
+    'get_wsdl_cache_stats',
+]
@@ -0,0 +1,265 @@
+"""
+Generación XML por lotes sobre un pool de procesos
+
+Propósito:
+    Renderizar lotes grandes (p.ej. cierre diario de 50k documentos)
+    repartiendo el trabajo entre núcleos. El render Jinja2 es CPU-bound y
+    no escala con threads por el GIL, por eso se usa ProcessPoolExecutor.
+
+Diseño:
+    - Cada proceso worker crea UN XMLGenerator al iniciar y hace warmup de
+      sus templates; todos los chunks que procesa reutilizan ese generador.
+    - Los documentos se envían en chunks para amortizar el costo de IPC.
+    - La cantidad de chunks en vuelo está acotada: la entrada puede ser un
+      generador y nunca se materializa completa.
+    - Los errores por documento vuelven como XMLGenerationResult con
+      success=False, nunca abortan el lote. Si un worker muere el pool
+      queda roto: los chunks en vuelo y los que faltan enviar vuelven como
+      fallidos en lugar de cortar la iteración.
+
+Uso:
+    generator = XMLGenerator()
+    for result in generator.generate_many(documentos, workers=8, chunk_size=100):
+        if result.success:
+            guardar(result.index, result.xml)
+"""
+import os
+import time
+from concurrent.futures import BrokenExecutor, FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from .generator import XMLGenerator
+from .template_registry import TemplateRegistry
+
+# Documentos por chunk enviado a cada worker
+DEFAULT_CHUNK_SIZE = 50
+
+# Chunks en vuelo por worker (controla memoria con entradas muy grandes)
+MAX_PENDING_CHUNKS_PER_WORKER = 2
+
+R = TypeVar("R")
+
+
+@dataclass
+class XMLGenerationResult:
+    """
+    Resultado de generación de un documento dentro de un lote
+    """
+    index: int
+    success: bool
+    xml: Optional[str] = None
+    cdc: Optional[str] = None
+    error: Optional[str] = None
+    processing_time_ms: float = 0.0
+
+
+# Entrada de trabajo: (posición en el lote, documento, cdc opcional)
+_WorkItem = Tuple[int, Any, Optional[str]]
+
+
+# ===============================================
+# ESTADO POR PROCESO WORKER
+# ===============================================
+
+_worker_generator: Optional[XMLGenerator] = None
+
+
+def _init_worker(templates_dir: str,
+                 bytecode_cache_dir: Optional[str],
+                 engine: str,
+                 prevalidate: bool = False) -> None:
+    """Inicializador del worker: crea y calienta su generador"""
+    global _worker_generator
+    registry = TemplateRegistry(
+        templates_dir=Path(templates_dir),
+        bytecode_cache_dir=Path(bytecode_cache_dir) if bytecode_cache_dir else None
+    )
+    registry.warmup()
+    prevalidator = None
+    if prevalidate:
+        # Las reglas compiladas son closures (no serializables): cada worker
+        # compila el motor por defecto
+        from .prevalidation import get_prevalidator
+        prevalidator = get_prevalidator()
+    _worker_generator = XMLGenerator(registry=registry, engine=engine,
+                                     prevalidator=prevalidator)
+
+
+def _generate_one(generator: XMLGenerator, work_item: _WorkItem) -> XMLGenerationResult:
+    """Genera un documento capturando cualquier error"""
+    index, document, cdc = work_item
+    start = time.perf_counter()
+    try:
+        xml = generator.generate_document_xml(document, cdc=cdc)
+        return XMLGenerationResult(
+            index=index,
+            success=True,
+            xml=xml,
+            cdc=cdc,
+            processing_time_ms=(time.perf_counter() - start) * 1000
+        )
+    except Exception as e:
+        return XMLGenerationResult(
+            index=index,
+            success=False,
+            cdc=cdc,
+            error=str(e),
+            processing_time_ms=(time.perf_counter() - start) * 1000
+        )
+
+
+def _generate_chunk(chunk: List[_WorkItem]) -> List[XMLGenerationResult]:
+    """Procesa un chunk completo en el worker"""
+    if _worker_generator is None:
+        raise RuntimeError("Worker de generación XML no inicializado")
+    return [_generate_one(_worker_generator, work_item) for work_item in chunk]
+
+
+# ===============================================
+# API DE LOTES
+# ===============================================
+
+def _iter_work_items(documents: Iterable[Any]) -> Iterator[_WorkItem]:
+    """Normaliza la entrada: documentos o tuplas (documento, cdc)"""
+    for index, entry in enumerate(documents):
+        if isinstance(entry, tuple):
+            document, cdc = entry
+        else:
+            document, cdc = entry, None
+        yield index, document, cdc
+
+
+def _iter_chunks(work_items: Iterator[_WorkItem], chunk_size: int) -> Iterator[List[_WorkItem]]:
+    """Agrupa el trabajo en chunks sin materializar la entrada"""
+    while True:
+        chunk = list(islice(work_items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _failed_chunk(chunk: List[_WorkItem], error: BaseException) -> List[XMLGenerationResult]:
+    """Resultados para un chunk cuyo worker falló (p.ej. proceso caído)"""
+    return [
+        XMLGenerationResult(index=index, success=False, cdc=cdc,
+                            error=f"Error en worker: {error}")
+        for index, _, cdc in chunk
+    ]
+
+
+def generate_many(generator: XMLGenerator,
+                  documents: Iterable[Any],
+                  workers: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  ordered: bool = True) -> Iterator[XMLGenerationResult]:
+    """
+    Genera XML para muchos documentos en paralelo
+
+    Args:
+        generator: Generador de referencia (define el directorio de templates
+            y el motor de generación)
+        documents: Iterable de documentos o tuplas (documento, cdc)
+        workers: Procesos worker. None usa todos los núcleos; 1 genera en el
+            proceso actual sin pool
+        chunk_size: Documentos por chunk enviado a cada worker
+        ordered: True entrega resultados en el orden de entrada; False a
+            medida que se completan
+
+    Yields:
+        XMLGenerationResult: Un resultado por documento de entrada
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size debe ser mayor a 0")
+
+    workers = workers or os.cpu_count() or 1
+    work_items = _iter_work_items(documents)
+
+    if workers <= 1:
+        for work_item in work_items:
+            yield _generate_one(generator, work_item)
+        return
+
+    registry = generator.registry
+    chunks = _iter_chunks(work_items, chunk_size)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            str(registry.templates_dir),
+            str(registry.bytecode_cache_dir) if registry.bytecode_cache_dir else None,
+            generator.engine,
+            generator.prevalidator is not None,
+        )
+    ) as executor:
+        yield from run_chunks(executor, chunks, _generate_chunk, _failed_chunk,
+                              max_pending=workers * MAX_PENDING_CHUNKS_PER_WORKER,
+                              ordered=ordered)
+
+
+def run_chunks(executor: ProcessPoolExecutor,
+               chunks: Iterator[List[Any]],
+               func: Callable[[List[Any]], List[R]],
+               on_failure: Callable[[List[Any], BaseException], List[R]],
+               max_pending: int,
+               ordered: bool = True) -> Iterator[R]:
+    """
+    Reparte chunks en el pool con una cantidad acotada en vuelo
+
+    Args:
+        executor: Pool de procesos ya inicializado
+        chunks: Chunks de trabajo (se consumen de a poco)
+        func: Función que procesa un chunk en el worker
+        on_failure: Resultados para un chunk cuyo worker falló
+        max_pending: Chunks en vuelo o esperando su turno
+        ordered: Entregar en orden de entrada o al completarse
+
+    Yields:
+        Resultados individuales de cada chunk
+    """
+    pending: Dict[Future, Tuple[int, List[Any]]] = {}
+    completed: Dict[int, List[R]] = {}
+    next_seq = 0
+    next_to_yield = 0
+
+    def submit_more() -> None:
+        nonlocal next_seq
+        # Los chunks completados que esperan su turno también cuentan
+        while len(pending) + len(completed) < max_pending:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            try:
+                future = executor.submit(func, chunk)
+            except BrokenExecutor as e:
+                # Pool roto por un worker caído: el chunk se reporta como
+                # fallido igual que si hubiera fallado en el worker
+                future = Future()
+                future.set_exception(e)
+            pending[future] = (next_seq, chunk)
+            next_seq += 1
+
+    submit_more()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            seq, chunk = pending.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                results = on_failure(chunk, e)
+
+            if ordered:
+                completed[seq] = results
+            else:
+                yield from results
+
+        if ordered:
+            while next_to_yield in completed:
+                yield from completed.pop(next_to_yield)
+                next_to_yield += 1
+
+        submit_more()
@@ -0,0 +1,150 @@
+"""
+Validación XSD por lotes sobre un pool de procesos
+
+Propósito:
+    Validar decenas de miles de documentos generados antes del envío. La
+    validación XSD de lxml es CPU-bound, por eso se reparte entre procesos
+    igual que la generación (batch.py).
+
+Diseño:
+    - Cada proceso worker crea UN XMLValidator al iniciar; el esquema se
+      compila una sola vez por worker (registro de esquemas del proceso).
+    - Los resultados se entregan como tuplas (index, is_valid, errors) a
+      medida que están disponibles; la entrada nunca se materializa.
+    - max_errors acota los errores devueltos por documento: un documento
+      patológico no puede inflar la memoria ni el IPC.
+    - fail_fast detiene el lote en el primer documento inválido y cancela
+      los chunks que aún no empezaron.
+
+Uso:
+    validator = XMLValidator()
+    for index, is_valid, errors in validator.validate_many(xmls, workers=8):
+        if not is_valid:
+            registrar(index, errors)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .batch import DEFAULT_CHUNK_SIZE, MAX_PENDING_CHUNKS_PER_WORKER, _iter_chunks, run_chunks
+from .validators import SifenValidationError, XMLValidator
+
+# Errores formateados por documento (el resto se resume en una línea)
+DEFAULT_MAX_ERRORS = 50
+
+
+class XMLValidationResult(NamedTuple):
+    """
+    Resultado de validación de un documento dentro de un lote
+    """
+    index: int
+    is_valid: bool
+    errors: List[str]
+
+
+# Entrada de trabajo: (posición en el lote, XML)
+_WorkItem = Tuple[int, Union[str, bytes]]
+
+
+# ===============================================
+# ESTADO POR PROCESO WORKER
+# ===============================================
+
+_worker_validator: Optional[XMLValidator] = None
+_worker_max_errors: Optional[int] = None
+
+
+def _init_worker(schema_path: str, max_errors: Optional[int]) -> None:
+    """Inicializador del worker: crea su validador y compila el esquema"""
+    global _worker_validator, _worker_max_errors
+    _worker_validator = XMLValidator(schema_path=schema_path)
+    _worker_max_errors = max_errors
+
+
+def _validate_one(validator: XMLValidator,
+                  work_item: _WorkItem,
+                  max_errors: Optional[int]) -> XMLValidationResult:
+    """Valida un documento; los errores de sintaxis se devuelven como resultado"""
+    index, xml_content = work_item
+    try:
+        is_valid, errors = validator.validate_xml(xml_content, max_errors=max_errors)
+    except SifenValidationError as e:
+        is_valid, errors = False, [e.message]
+    except Exception as e:
+        is_valid, errors = False, [f"Error validando XML: {e}"]
+    return XMLValidationResult(index, is_valid, errors)
+
+
+def _validate_chunk(chunk: List[_WorkItem]) -> List[XMLValidationResult]:
+    """Procesa un chunk completo en el worker"""
+    if _worker_validator is None:
+        raise RuntimeError("Worker de validación XML no inicializado")
+    return [_validate_one(_worker_validator, work_item, _worker_max_errors)
+            for work_item in chunk]
+
+
+def _failed_chunk(chunk: List[_WorkItem], error: BaseException) -> List[XMLValidationResult]:
+    """Resultados para un chunk cuyo worker falló (p.ej. proceso caído)"""
+    return [XMLValidationResult(index, False, [f"Error en worker: {error}"])
+            for index, _ in chunk]
+
+
+# ===============================================
+# API DE LOTES
+# ===============================================
+
+def validate_many(validator: XMLValidator,
+                  xml_iterable: Iterable[Union[str, bytes]],
+                  workers: Optional[int] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  ordered: bool = True,
+                  fail_fast: bool = False,
+                  max_errors: Optional[int] = DEFAULT_MAX_ERRORS) -> Iterator[XMLValidationResult]:
+    """
+    Valida muchos documentos XML en paralelo
+
+    Args:
+        validator: Validador de referencia (define el XSD)
+        xml_iterable: Iterable de documentos XML (str o bytes)
+        workers: Procesos worker. None usa todos los núcleos; 1 valida en
+            el proceso actual sin pool
+        chunk_size: Documentos por chunk enviado a cada worker
+        ordered: True entrega resultados en el orden de entrada; False a
+            medida que se completan
+        fail_fast: Detener tras entregar el primer documento inválido
+        max_errors: Máximo de errores por documento (None = sin límite)
+
+    Yields:
+        XMLValidationResult: (index, is_valid, errors) por documento
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size debe ser mayor a 0")
+    if max_errors is not None and max_errors < 1:
+        raise ValueError("max_errors debe ser mayor a 0")
+
+    workers = workers or os.cpu_count() or 1
+    work_items = enumerate(xml_iterable)
+
+    if workers <= 1:
+        for work_item in work_items:
+            result = _validate_one(validator, work_item, max_errors)
+            yield result
+            if fail_fast and not result.is_valid:
+                return
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(str(validator.schema_path), max_errors)
+    ) as executor:
+        results = run_chunks(executor, _iter_chunks(work_items, chunk_size),
+                             _validate_chunk, _failed_chunk,
+                             max_pending=workers * MAX_PENDING_CHUNKS_PER_WORKER,
+                             ordered=ordered)
+        for result in results:
+            yield result
+            if fail_fast and not result.is_valid:
+                results.close()
+                executor.shutdown(wait=True, cancel_futures=True)
+                return
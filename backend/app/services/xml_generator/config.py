@@ -1,6 +1,8 @@
 """
 Configuración específica del módulo XML Generator
 """
+import os
+import tempfile
 from pathlib import Path
 
 # Directorio base del módulo
@@ -12,5 +14,15 @@ SCHEMAS_DIR = MODULE_DIR / "schemas"
 # Directorio de templates XML
 TEMPLATES_DIR = MODULE_DIR / "templates"
 
+# Cache persistente de bytecode Jinja2 (compartido entre procesos del
+# mismo usuario). El directorio es por usuario y TemplateRegistry lo rechaza
+# si no es propio o si otros usuarios pueden escribir en él: Jinja2 ejecuta
+# el bytecode que encuentra ahí.
+_USER_SUFFIX = f"-{os.getuid()}" if hasattr(os, "getuid") else ""
+TEMPLATES_BYTECODE_CACHE_DIR = Path(os.getenv(
+    "SIFEN_XML_BYTECODE_CACHE_DIR",
+    str(Path(tempfile.gettempdir()) / f"sifen_xml_templates{_USER_SUFFIX}")
+))
+
 # Versión del Manual Técnico SIFEN
 SIFEN_VERSION = "1.5.0"
@@ -0,0 +1,250 @@
+"""
+Cache de fragmentos XML estáticos por empresa (emisor y timbrado)
+
+Propósito:
+    Los grupos gEmis y gTimb son iguales en todos los documentos que emite
+    una empresa con el mismo timbrado. En lugar de renderizar
+    _grupo_emisor.xml y _grupo_timbrado.xml en cada factura, el fragmento
+    ya escapado se guarda y se reutiliza.
+
+Clave de cache:
+    (empresa, grupo, timbrado, hash de los datos del grupo). El hash cubre
+    cualquier cambio en los datos, por lo que un fragmento nunca queda
+    desactualizado; la invalidación explícita libera los fragmentos de
+    una empresa o timbrado modificados.
+
+Invalidación:
+    register_model_invalidation() conecta listeners de SQLAlchemy sobre
+    Empresa y Timbrado. Los cambios de numeración del timbrado
+    (ultimo_numero_usado) no invalidan, porque no forman parte de gTimb.
+
+Uso:
+    cache = get_fragment_cache()
+    xml = cache.get_or_create(ruc, "emisor", emisor, lambda: render(emisor))
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Fragmentos máximos en memoria (LRU)
+DEFAULT_MAX_FRAGMENTS = 4096
+
+# Columnas de Timbrado que se reflejan en gTimb
+TIMBRADO_FRAGMENT_FIELDS = (
+    "numero_timbrado", "tipo_timbrado", "descripcion_tipo", "establecimiento",
+    "punto_expedicion", "fecha_inicio_vigencia", "fecha_fin_vigencia",
+)
+
+# (empresa, grupo, timbrado, hash de datos)
+_FragmentKey = Tuple[str, Hashable, Optional[str], str]
+
+
+def data_fingerprint(data: Mapping[str, Any]) -> str:
+    """
+    Hash estable de los datos de un grupo
+
+    Args:
+        data: Datos del grupo (p.ej. emisor.model_dump())
+
+    Returns:
+        str: Digest hexadecimal
+    """
+    payload = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FragmentCache:
+    """
+    Cache LRU thread-safe de fragmentos pre-renderizados por empresa
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_FRAGMENTS):
+        """
+        Args:
+            max_entries: Fragmentos máximos antes de desalojar el menos usado
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries debe ser mayor a 0")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[_FragmentKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get_or_create(self,
+                      empresa: str,
+                      group: Hashable,
+                      data: Mapping[str, Any],
+                      factory: Callable[[], T],
+                      timbrado: Optional[str] = None) -> T:
+        """
+        Obtiene un fragmento o lo genera con factory()
+
+        Args:
+            empresa: Identificador de la empresa (RUC sin DV)
+            group: Grupo del fragmento (p.ej. "emisor", "timbrado")
+            data: Datos con los que se genera el fragmento
+            factory: Función que genera el fragmento si no está en cache
+            timbrado: Número de timbrado asociado, si aplica
+
+        Returns:
+            Fragmento cacheado o recién generado
+        """
+        key = (str(empresa), group, timbrado, data_fingerprint(data))
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+            self._misses += 1
+
+        # Se genera fuera del lock; dos threads pueden generar el mismo
+        # fragmento a la vez, el resultado es idéntico
+        fragment = factory()
+
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def invalidate_empresa(self, empresa: str) -> int:
+        """
+        Descarta todos los fragmentos de una empresa
+
+        Args:
+            empresa: Identificador de la empresa (RUC sin DV)
+
+        Returns:
+            int: Fragmentos descartados
+        """
+        return self._invalidate(lambda key: key[0] == str(empresa))
+
+    def invalidate_timbrado(self, numero_timbrado: str) -> int:
+        """
+        Descarta los fragmentos asociados a un timbrado
+
+        Args:
+            numero_timbrado: Número de timbrado modificado
+
+        Returns:
+            int: Fragmentos descartados
+        """
+        return self._invalidate(lambda key: key[2] == str(numero_timbrado))
+
+    def _invalidate(self, predicate: Callable[[_FragmentKey], bool]) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Descarta todos los fragmentos"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Estadísticas del cache
+
+        Returns:
+            Dict con entradas, hits, misses e invalidaciones
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
+
+
+# ===============================================
+# CACHE GLOBAL DEL PROCESO
+# ===============================================
+
+_fragment_cache: Optional[FragmentCache] = None
+_fragment_cache_lock = threading.Lock()
+_listeners_registered = False
+
+
+def get_fragment_cache() -> FragmentCache:
+    """
+    Obtiene el cache de fragmentos del proceso (singleton)
+
+    Returns:
+        FragmentCache: Cache compartido
+    """
+    global _fragment_cache
+    if _fragment_cache is None:
+        with _fragment_cache_lock:
+            if _fragment_cache is None:
+                _fragment_cache = FragmentCache()
+    return _fragment_cache
+
+
+def register_model_invalidation() -> None:
+    """
+    Hook de invalidación: conecta listeners sobre Empresa y Timbrado
+
+    Cada modificación o baja de una Empresa descarta sus fragmentos. En
+    Timbrado solo invalidan los cambios en columnas que forman parte de
+    gTimb. Es idempotente; llamar al iniciar la aplicación. Si los modelos
+    no se pueden importar se registra un warning y el cache queda sin
+    invalidación por eventos en lugar de impedir el arranque.
+    """
+    global _listeners_registered
+    with _fragment_cache_lock:
+        if _listeners_registered:
+            return
+
+        from sqlalchemy import event, inspect
+        try:
+            from app.models.empresa import Empresa
+            from app.models.timbrado import Timbrado
+        except Exception as e:
+            logger.warning(f"Invalidación de fragmentos XML deshabilitada: {e}")
+            return
+
+        def on_empresa_change(mapper, connection, target) -> None:
+            get_fragment_cache().invalidate_empresa(target.ruc_sin_dv)
+
+        def on_timbrado_update(mapper, connection, target) -> None:
+            state = inspect(target)
+            if not any(state.attrs[name].history.has_changes()
+                       for name in TIMBRADO_FRAGMENT_FIELDS):
+                return
+            # También el número anterior si el timbrado fue renumerado
+            numeros = set(state.attrs["numero_timbrado"].history.deleted or ())
+            numeros.add(target.numero_timbrado)
+            for numero in numeros:
+                get_fragment_cache().invalidate_timbrado(numero)
+
+        def on_timbrado_delete(mapper, connection, target) -> None:
+            get_fragment_cache().invalidate_timbrado(target.numero_timbrado)
+
+        event.listen(Empresa, "after_update", on_empresa_change)
+        event.listen(Empresa, "after_delete", on_empresa_change)
+        event.listen(Timbrado, "after_update", on_timbrado_update)
+        event.listen(Timbrado, "after_delete", on_timbrado_delete)
+        _listeners_registered = True
+        logger.info("Invalidación de fragmentos XML registrada para Empresa y Timbrado")
+
+
+def reset_fragment_cache() -> None:
+    """Descarta el cache global (usado en tests)"""
+    global _fragment_cache
+    with _fragment_cache_lock:
+        _fragment_cache = None
@@ -2,16 +2,96 @@
 Generador principal de XML para documentos SIFEN v150
 Arquitectura escalable para múltiples tipos de documentos
 """
+from itertools import chain
 from pathlib import Path
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
-from typing import Union, Dict, Any, Optional
+from typing import Union, Dict, Any, Optional, Iterable, Iterator, BinaryIO, Callable, Mapping, Tuple, TYPE_CHECKING
+from jinja2 import Template
+from lxml import etree
+from markupsafe import escape
 from .models import (
     FacturaSimple, NotaCreditoElectronica, NotaDebitoElectronica,
     AutofacturaElectronica, NotaRemisionElectronica,
     get_document_type_code, get_document_description
 )
-from .config import TEMPLATES_DIR, SIFEN_VERSION
+from .config import SIFEN_VERSION
+from .template_registry import TemplateRegistry, get_template_registry
+from .fragment_cache import FragmentCache, get_fragment_cache
+from .tree_builder import XMLTreeBuilder, serialize_tree
+from .validators import SifenValidationError
+
+if TYPE_CHECKING:
+    from .batch import XMLGenerationResult
+    from .prevalidation import PreValidator
+
+# Tamaño de buffer (en eventos de template) para el modo streaming
+DEFAULT_STREAM_BUFFER_SIZE = 64
+
+# Motores de generación: templates Jinja2 (texto) o árbol lxml directo
+ENGINE_JINJA = "jinja"
+ENGINE_LXML = "lxml"
+SUPPORTED_ENGINES = (ENGINE_JINJA, ENGINE_LXML)
+
+# Partials cuyos fragmentos se cachean por empresa
+EMISOR_PARTIAL = "partials/_grupo_emisor.xml"
+TIMBRADO_PARTIAL = "partials/_grupo_timbrado.xml"
+
+# Marca que ocupa el lugar de dNumDoc en el fragmento de timbrado cacheado
+_NUMERO_DOCUMENTO_MARK = "__SIFEN_NUMERO_DOCUMENTO__"
+
+
+class ItemStream:
+    """
+    Iterable perezoso de items para los templates
+
+    Convierte cada item a dict recién al momento de renderizarlo, de modo que
+    nunca existe en memoria la lista completa de items serializados. Admite
+    modelos Pydantic (ItemFactura) o dicts, y cualquier iterable de origen
+    (lista, generador, cursor de base de datos).
+    """
+
+    def __init__(self, items: Iterable[Any]):
+        self._iterator = iter(items)
+        self._head: list = []
+        self._consumed = False
+
+    def __bool__(self) -> bool:
+        # {% if items %} solo necesita saber si hay al menos un item
+        if not self._head:
+            try:
+                self._head.append(next(self._iterator))
+            except StopIteration:
+                return False
+        return True
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self._consumed:
+            raise RuntimeError("Los items de un ItemStream solo pueden recorrerse una vez")
+        self._consumed = True
+
+        head, self._head = self._head, []
+        for item in chain(head, self._iterator):
+            yield item.model_dump() if hasattr(item, "model_dump") else dict(item)
+
+
+class LazyFragment:
+    """
+    Fragmento XML ya escapado que se resuelve recién al renderizarse
+
+    Los templates que no incluyen el grupo (p.ej. gEmis en los templates
+    por tipo) no pagan el costo de obtenerlo del cache.
+    """
+
+    def __init__(self, render: Callable[[], str]):
+        self._render = render
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __html__(self) -> str:
+        return self._render()
+
+    __str__ = __html__
 
 
 class XMLGenerator:
@@ -23,15 +103,35 @@ class XMLGenerator:
     - Templates específicos por tipo de documento
     - Partials reutilizables para grupos comunes
     - Context builders especializados por tipo
+    - Templates compilados compartidos por proceso (TemplateRegistry)
+    - Motor alternativo que construye el árbol lxml sin templates
+      (XMLTreeBuilder), con salida idéntica en XML canónico
+    - Fragmentos gEmis/gTimb cacheados por empresa (FragmentCache)
+    - Pre-validación opcional con reglas compiladas (PreValidator)
     """
 
-    def __init__(self):
-        self.env = Environment(
-            loader=FileSystemLoader(TEMPLATES_DIR),
-            trim_blocks=True,
-            lstrip_blocks=True,
-            autoescape=True
-        )
+    def __init__(self, registry: Optional[TemplateRegistry] = None,
+                 engine: str = ENGINE_JINJA,
+                 fragment_cache: Optional[FragmentCache] = None,
+                 prevalidator: Optional["PreValidator"] = None):
+        """
+        Args:
+            registry: Registro de templates a usar. Por defecto el registro
+                global del proceso, compartido por todas las instancias.
+            engine: Motor por defecto de generate_document_xml():
+                "jinja" (templates) o "lxml" (árbol directo)
+            fragment_cache: Cache de fragmentos emisor/timbrado. Por
+                defecto el cache global del proceso.
+            prevalidator: Motor de pre-validación. Si se indica, los
+                documentos que no pasan sus reglas se rechazan antes de
+                renderizar (p.ej. get_prevalidator())
+        """
+        self.registry = registry or get_template_registry()
+        self.env = self.registry.env
+        self.engine = self._check_engine(engine)
+        self.fragment_cache = fragment_cache or get_fragment_cache()
+        self.tree_builder = XMLTreeBuilder(fragment_cache=self.fragment_cache)
+        self.prevalidator = prevalidator
 
         # Mapeo de tipos de documento a templates específicos
         self.document_templates = {
@@ -52,7 +152,8 @@ class XMLGenerator:
                                               NotaDebitoElectronica, AutofacturaElectronica,
                                               NotaRemisionElectronica],
                               cdc: Optional[str] = None,
-                              use_base_template: bool = True) -> str:
+                              use_base_template: bool = True,
+                              engine: Optional[str] = None) -> str:
         """
         Genera XML para cualquier tipo de documento SIFEN
 
@@ -60,14 +161,21 @@ class XMLGenerator:
             document: Instancia del modelo de documento
             cdc: Código de Control (44 dígitos). Si no se proporciona, se genera automáticamente
             use_base_template: Si usar base_document.xml + partials (True) o template monolítico (False)
+            engine: Motor de generación ("jinja" o "lxml"). Por defecto el
+                del generador. El motor lxml siempre usa la arquitectura base
 
         Returns:
             str: XML generado
 
         Raises:
             ValueError: Si el tipo de documento no es soportado
+            SifenValidationError: Si el documento no pasa la pre-validación
             RuntimeError: Si hay errores en la generación
         """
+        engine = self._check_engine(engine or self.engine)
+        if self.prevalidator is not None:
+            self.prevalidator.validate(document)
+        document_type = None
         try:
             # 1. Determinar tipo de documento
             document_type = get_document_type_code(document)
@@ -83,7 +191,9 @@ class XMLGenerator:
             context = self._build_document_context(
                 document, document_type, cdc)
 
-            # 5. Generar XML según arquitectura elegida
+            # 5. Generar XML según motor y arquitectura elegidos
+            if engine == ENGINE_LXML:
+                return serialize_tree(self.tree_builder.build(context, document_type))
             if use_base_template:
                 return self._generate_with_base_template(context, document_type)
             else:
@@ -93,6 +203,46 @@ class XMLGenerator:
             raise RuntimeError(
                 f"Error generando XML para documento tipo {document_type}: {e}")
 
+    def generate_document_tree(self,
+                               document: Union[FacturaSimple, NotaCreditoElectronica,
+                                               NotaDebitoElectronica, AutofacturaElectronica,
+                                               NotaRemisionElectronica],
+                               cdc: Optional[str] = None) -> etree._Element:
+        """
+        Genera el documento como árbol lxml (motor lxml)
+
+        El árbol puede pasarse directamente a XMLValidator.validate_xml() y
+        XMLSigner.sign_xml(); solo se serializa al enviarlo.
+
+        Args:
+            document: Instancia del modelo de documento
+            cdc: Código de Control (44 dígitos). Si no se proporciona, se genera automáticamente
+
+        Returns:
+            etree._Element: Elemento raíz rDE
+
+        Raises:
+            SifenValidationError: Si el documento no pasa la pre-validación
+            RuntimeError: Si hay errores en la generación
+        """
+        if self.prevalidator is not None:
+            self.prevalidator.validate(document)
+        document_type = None
+        try:
+            document_type = get_document_type_code(document)
+
+            if not cdc:
+                cdc = self._generate_cdc(document, document_type)
+            self._validate_cdc(cdc)
+
+            context = self._build_document_context(
+                document, document_type, cdc)
+            return self.tree_builder.build(context, document_type)
+
+        except Exception as e:
+            raise RuntimeError(
+                f"Error generando árbol XML para documento tipo {document_type}: {e}")
+
     def generate_simple_invoice_xml(self, factura: FacturaSimple) -> str:
         """
         Método de compatibilidad para generar facturas simples
@@ -105,7 +255,142 @@ class XMLGenerator:
         """
         return self.generate_document_xml(factura, use_base_template=False)
 
-    def _build_document_context(self, document: Any, document_type: str, cdc: str) -> Dict[str, Any]:
+    def generate_many(self,
+                      documents: Iterable[Any],
+                      workers: Optional[int] = None,
+                      chunk_size: int = 50,
+                      ordered: bool = True) -> Iterator["XMLGenerationResult"]:
+        """
+        Genera XML para un lote de documentos sobre un pool de procesos
+
+        Cada worker mantiene su propio generador con templates precompilados.
+        Los errores por documento se devuelven como resultados, no abortan
+        el lote.
+
+        Args:
+            documents: Iterable de documentos o tuplas (documento, cdc)
+            workers: Procesos worker (None = todos los núcleos, 1 = sin pool)
+            chunk_size: Documentos enviados a un worker por vez
+            ordered: Entregar en orden de entrada (True) o al completarse (False)
+
+        Returns:
+            Iterator[XMLGenerationResult]: Un resultado por documento
+        """
+        from .batch import generate_many
+        return generate_many(self, documents, workers=workers,
+                             chunk_size=chunk_size, ordered=ordered)
+
+    def stream_document_xml(self,
+                            document: Union[FacturaSimple, NotaCreditoElectronica,
+                                            NotaDebitoElectronica, AutofacturaElectronica,
+                                            NotaRemisionElectronica],
+                            output: BinaryIO,
+                            cdc: Optional[str] = None,
+                            items: Optional[Iterable[Any]] = None,
+                            buffer_size: int = DEFAULT_STREAM_BUFFER_SIZE) -> int:
+        """
+        Genera el XML escribiendo chunks UTF-8 directamente en un archivo
+
+        Pensado para documentos con miles de items (gCamItem): el XML nunca
+        se arma completo en memoria y los items se serializan de a uno.
+
+        Args:
+            document: Instancia del modelo de documento
+            output: Objeto file-like binario (archivo, BytesIO, socket)
+            cdc: Código de Control. Si no se proporciona, se genera automáticamente
+            items: Iterable opcional de items (ItemFactura o dicts) que
+                reemplaza a document.items, p.ej. un generador sobre la BD.
+                Se pre-validan al consumirse (ver iter_document_xml)
+            buffer_size: Eventos de template agrupados por escritura
+
+        Returns:
+            int: Cantidad de bytes escritos
+
+        Raises:
+            SifenValidationError: Si el documento o un item no pasa la pre-validación
+            RuntimeError: Si hay errores en la generación
+        """
+        written = 0
+        for chunk in self.iter_document_xml(document, cdc=cdc, items=items,
+                                            buffer_size=buffer_size):
+            output.write(chunk)
+            written += len(chunk)
+        return written
+
+    def iter_document_xml(self,
+                          document: Union[FacturaSimple, NotaCreditoElectronica,
+                                          NotaDebitoElectronica, AutofacturaElectronica,
+                                          NotaRemisionElectronica],
+                          cdc: Optional[str] = None,
+                          items: Optional[Iterable[Any]] = None,
+                          buffer_size: int = DEFAULT_STREAM_BUFFER_SIZE) -> Iterator[bytes]:
+        """
+        Genera el XML como iterador de chunks UTF-8
+
+        Produce el mismo contenido que generate_document_xml() con la
+        arquitectura base + partials.
+
+        Args:
+            document: Instancia del modelo de documento
+            cdc: Código de Control. Si no se proporciona, se genera automáticamente
+            items: Iterable opcional de items que reemplaza a document.items.
+                Con pre-validador cada item se valida al consumirse: un item
+                inválido corta el stream con los chunks previos ya emitidos
+            buffer_size: Eventos de template agrupados por chunk
+
+        Yields:
+            bytes: Fragmentos consecutivos del XML codificados en UTF-8
+
+        Raises:
+            SifenValidationError: Si el documento o un item no pasa la pre-validación
+            RuntimeError: Si hay errores en la generación
+        """
+        if self.prevalidator is not None:
+            self.prevalidator.validate(document)
+            if items is not None:
+                items = self._prevalidated_items(items)
+        document_type = None
+        try:
+            document_type = get_document_type_code(document)
+
+            if not cdc:
+                cdc = self._generate_cdc(document, document_type)
+            self._validate_cdc(cdc)
+
+            context = self._build_document_context(
+                document, document_type, cdc,
+                items=ItemStream(document.items if items is None else items))
+            self._add_static_fragments(context)
+
+            stream = self._get_document_template(
+                document_type).stream(**context)
+            stream.enable_buffering(buffer_size)
+
+            for chunk in stream:
+                yield chunk.encode("utf-8")
+
+        except SifenValidationError:
+            raise
+        except Exception as e:
+            raise RuntimeError(
+                f"Error generando XML (streaming) para documento tipo {document_type}: {e}")
+
+    def _prevalidated_items(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Valida cada item del iterable recién cuando el template lo pide"""
+        for index, item in enumerate(items):
+            self.prevalidator.validate_item(item, index)
+            yield item
+
+    def _check_engine(self, engine: str) -> str:
+        """Valida el nombre del motor de generación"""
+        if engine not in SUPPORTED_ENGINES:
+            raise ValueError(
+                f"Motor de generación no soportado: {engine}. "
+                f"Opciones: {', '.join(SUPPORTED_ENGINES)}")
+        return engine
+
+    def _build_document_context(self, document: Any, document_type: str, cdc: str,
+                                items: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Construye el contexto específico para el tipo de documento
 
@@ -113,6 +398,8 @@ class XMLGenerator:
             document: Instancia del modelo
             document_type: Código del tipo de documento
             cdc: Código de Control
+            items: Items ya preparados para el template (p.ej. ItemStream).
+                Por defecto se serializan todos los items del documento.
 
         Returns:
             Dict con contexto para el template
@@ -132,10 +419,11 @@ class XMLGenerator:
             "numero_documento": document.numero_documento,
             "fecha_emision": fecha_emision,
             "csc": document.csc,
+            "timbrado": self._build_timbrado_context(document),
 
             # === PARTICIPANTES ===
             "emisor": document.emisor.model_dump(),
-            "items": [item.model_dump() for item in document.items],
+            "items": items if items is not None else [item.model_dump() for item in document.items],
 
             # === TOTALES ===
             "total_exenta": str(document.total_exenta),
@@ -163,6 +451,30 @@ class XMLGenerator:
             raise ValueError(
                 f"Tipo de documento no soportado: {document_type}")
 
+    def _build_timbrado_context(self, document: Any) -> Dict[str, Any]:
+        """
+        Datos de gTimb del documento
+
+        Establecimiento, punto de expedición y número salen de
+        numero_documento (EEE-PPP-NNNNNNN). Todo salvo dNumDoc es igual para
+        los documentos del mismo timbrado y se sirve del cache de fragmentos.
+        """
+        partes = document.numero_documento.split("-")
+        if len(partes) == 3:
+            establecimiento, punto_expedicion, numero = partes
+        else:
+            establecimiento, punto_expedicion, numero = "", "", document.numero_documento
+
+        timbrado = {
+            "establecimiento": establecimiento,
+            "punto_expedicion": punto_expedicion,
+            "numero_documento": numero,
+        }
+        numero_timbrado = getattr(document, "numero_timbrado", None)
+        if numero_timbrado:
+            timbrado["numero_timbrado"] = numero_timbrado
+        return timbrado
+
     def _build_factura_context(self, factura: FacturaSimple, base_context: Dict) -> Dict[str, Any]:
         """Construye contexto específico para Factura Electrónica"""
         context = base_context.copy()
@@ -260,32 +572,107 @@ class XMLGenerator:
             str: XML generado
         """
         try:
-            # Obtener template específico del tipo de documento
-            template_name = self.document_templates.get(document_type)
-
-            if not template_name:
-                raise ValueError(
-                    f"No hay template para tipo de documento {document_type}")
+            template = self._get_document_template(document_type)
 
-            # Intentar cargar template específico
-            try:
-                template = self.env.get_template(template_name)
-            except Exception:
-                # Fallback a template simple si el específico no existe
-                fallback_name = self.fallback_templates.get(document_type)
-                if fallback_name:
-                    template = self.env.get_template(fallback_name)
-                else:
-                    raise RuntimeError(
-                        f"No se encontró template para tipo {document_type}")
-
-            # Renderizar
+            # Renderizar (gEmis/gTimb desde el cache de fragmentos)
+            self._add_static_fragments(context)
             xml = template.render(**context)
             return xml
 
         except Exception as e:
             raise RuntimeError(f"Error generando con base template: {e}")
 
+    # ===============================================
+    # FRAGMENTOS ESTÁTICOS POR EMPRESA
+    # ===============================================
+
+    def _add_static_fragments(self, context: Dict[str, Any]) -> None:
+        """
+        Agrega al contexto los fragmentos gEmis/gTimb cacheados
+
+        Solo se agregan si el contexto trae los datos; en caso contrario
+        los templates incluyen los partials como siempre.
+
+        Args:
+            context: Contexto del documento (se modifica en el lugar)
+        """
+        emisor = context.get("emisor")
+        if not isinstance(emisor, Mapping):
+            return
+        empresa = str(emisor.get("ruc"))
+
+        context["emisor_fragment"] = LazyFragment(
+            lambda: self._emisor_fragment(empresa, emisor))
+
+        timbrado = context.get("timbrado")
+        if isinstance(timbrado, Mapping):
+            context["timbrado_fragment"] = LazyFragment(
+                lambda: self._timbrado_fragment(empresa, timbrado))
+
+    def _emisor_fragment(self, empresa: str, emisor: Mapping[str, Any]) -> str:
+        """gEmis renderizado (desde cache)"""
+        return self.fragment_cache.get_or_create(
+            empresa, ("emisor", str(self.registry.templates_dir)), emisor,
+            lambda: self.env.get_template(EMISOR_PARTIAL).render(emisor=emisor))
+
+    def _timbrado_fragment(self, empresa: str, timbrado: Mapping[str, Any]) -> str:
+        """
+        gTimb renderizado (desde cache)
+
+        dNumDoc cambia en cada documento: se cachea el fragmento con una
+        marca en su lugar y solo se inserta el número escapado.
+        """
+        static = {key: value for key, value in timbrado.items()
+                  if key != "numero_documento"}
+        numero_timbrado = static.get("numero_timbrado")
+
+        head, tail = self.fragment_cache.get_or_create(
+            empresa, ("timbrado", str(self.registry.templates_dir)), static,
+            lambda: self._split_timbrado_fragment(static),
+            timbrado=None if numero_timbrado is None else str(numero_timbrado))
+
+        # Igual que {{ timbrado.numero_documento }}: vacío si no está definido
+        numero = timbrado.get("numero_documento", "")
+        return head + str(escape(numero)) + tail
+
+    def _split_timbrado_fragment(self, static: Mapping[str, Any]) -> Tuple[str, str]:
+        """Renderiza gTimb y lo divide en el lugar de dNumDoc"""
+        rendered = self.env.get_template(TIMBRADO_PARTIAL).render(
+            timbrado={**static, "numero_documento": _NUMERO_DOCUMENTO_MARK})
+        if rendered.count(_NUMERO_DOCUMENTO_MARK) != 1:
+            raise RuntimeError(
+                f"{TIMBRADO_PARTIAL} debe contener dNumDoc exactamente una vez")
+        head, tail = rendered.split(_NUMERO_DOCUMENTO_MARK)
+        return head, tail
+
+    def _get_document_template(self, document_type: str) -> Template:
+        """
+        Obtiene el template compilado para el tipo de documento
+
+        Args:
+            document_type: Tipo de documento
+
+        Returns:
+            Template: Template específico (o fallback si no existe)
+        """
+        # Obtener template específico del tipo de documento
+        template_name = self.document_templates.get(document_type)
+
+        if not template_name:
+            raise ValueError(
+                f"No hay template para tipo de documento {document_type}")
+
+        # Intentar cargar template específico
+        try:
+            return self.env.get_template(template_name)
+        except Exception:
+            # Fallback a template simple si el específico no existe
+            fallback_name = self.fallback_templates.get(document_type)
+            if fallback_name:
+                return self.env.get_template(fallback_name)
+            raise RuntimeError(
+                f"No se encontró template para tipo {document_type}")
+
     def _generate_with_specific_template(self, context: Dict[str, Any], document_type: str) -> str:
         """
         Genera XML usando template específico monolítico (compatibilidad)
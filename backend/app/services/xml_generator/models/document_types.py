@@ -14,6 +14,7 @@ class FacturaSimple(BaseModel):
     """Factura Electrónica Simple - Tipo de Documento 1"""
 
     numero_documento: str = Field(..., min_length=15, max_length=15)
+    numero_timbrado: Optional[str] = Field(default=None, pattern=r"^\d{8}$")
     emisor: Contribuyente = Field(...)
     receptor: Contribuyente = Field(...)
     items: List[ItemFactura] = Field(..., min_length=1, max_length=999)
@@ -57,6 +58,7 @@ class NotaCreditoElectronica(BaseModel):
     """Nota de Crédito Electrónica - Tipo de Documento 5"""
 
     numero_documento: str = Field(..., min_length=15, max_length=15)
+    numero_timbrado: Optional[str] = Field(default=None, pattern=r"^\d{8}$")
     emisor: Contribuyente = Field(...)
     receptor: Contribuyente = Field(...)
     items: List[ItemFactura] = Field(..., min_length=1)
@@ -87,6 +89,7 @@ class NotaDebitoElectronica(BaseModel):
     """Nota de Débito Electrónica - Tipo de Documento 6"""
 
     numero_documento: str = Field(..., min_length=15, max_length=15)
+    numero_timbrado: Optional[str] = Field(default=None, pattern=r"^\d{8}$")
     emisor: Contribuyente = Field(...)
     receptor: Contribuyente = Field(...)
     items: List[ItemFactura] = Field(..., min_length=1)
@@ -117,6 +120,7 @@ class AutofacturaElectronica(BaseModel):
     """Autofactura Electrónica - Tipo de Documento 4"""
 
     numero_documento: str = Field(..., min_length=15, max_length=15)
+    numero_timbrado: Optional[str] = Field(default=None, pattern=r"^\d{8}$")
     emisor: Contribuyente = Field(...)
     items: List[ItemFactura] = Field(..., min_length=1)
     total_gravada: Decimal = Field(..., ge=Decimal("0"))
@@ -146,6 +150,7 @@ class NotaRemisionElectronica(BaseModel):
     """Nota de Remisión Electrónica - Tipo de Documento 7"""
 
     numero_documento: str = Field(..., min_length=15, max_length=15)
+    numero_timbrado: Optional[str] = Field(default=None, pattern=r"^\d{8}$")
     emisor: Contribuyente = Field(...)
     receptor: Contribuyente = Field(...)
     items: List[ItemFactura] = Field(..., min_length=1)
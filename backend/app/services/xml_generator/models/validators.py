@@ -114,10 +114,8 @@ class XMLValidator:
             xsd_path = Path(__file__).parent / "schemas" / \
                 "v150" / "DE_v150.xsd"
             if xsd_path.exists():
-                with open(xsd_path, 'r', encoding='utf-8') as f:
-                    parser = etree.XMLParser()
-                    schema_doc = etree.parse(f, parser)
-                self._xsd_schema = etree.XMLSchema(schema_doc)
+                from ..schema_registry import get_schema_registry
+                self._xsd_schema = get_schema_registry().get_schema(xsd_path)
         except Exception:
             self._xsd_schema = None
 
@@ -0,0 +1,510 @@
+"""
+Pre-validación rápida de documentos SIFEN antes de generar el XML
+
+Propósito:
+    La mayoría de los rechazos son errores simples: RUC/DV, formato de
+    fechas, longitudes, códigos fuera de catálogo o totales que no cierran.
+    Detectarlos recién en la validación XSD obliga a renderizar el XML
+    completo. PreValidator compila las reglas de campo una sola vez en
+    funciones Python planas que se ejecutan directamente sobre el modelo
+    Pydantic o el dict del documento, en microsegundos. La validación XSD
+    queda reservada para los documentos que pasan.
+
+Reglas:
+    - Longitudes, patrones y catálogos de app/utils/constants.py
+      (LONGITUDES_CAMPO, VALIDATION_PATTERNS, TIPOS_DOCUMENTO,
+      MONEDAS_SIFEN, DEPARTAMENTOS_PARAGUAY, TASAS_IVA_VALIDAS,
+      LIMITES_NUMERICOS)
+    - RUC/DV con el algoritmo módulo 11 de app/utils/ruc_utils.py
+    - Receptor registrado y activo en el registro SET local
+      (app/utils/ruc_registry.py), si está configurado
+    - Aritmética de totales: cantidad × precio por item, suma de items y
+      totales del modelo; subtotales y total general en los dicts del
+      repositorio (mismas reglas que _validate_amount_calculations)
+
+Uso:
+    prevalidator = get_prevalidator()
+    issues = prevalidator.check(factura)
+    prevalidator.validate(factura)  # SifenValidationError si hay errores
+"""
+import re
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils.constants import (
+    DEPARTAMENTOS_PARAGUAY,
+    LIMITES_NUMERICOS,
+    LONGITUDES_CAMPO,
+    MONEDAS_SIFEN,
+    TASAS_IVA_VALIDAS,
+    TIPOS_DOCUMENTO,
+    VALIDATION_PATTERNS,
+)
+from app.utils.ruc_registry import get_ruc_registry
+from app.utils.ruc_utils import calculate_dv
+
+from .validators import SifenValidationError
+
+# Diferencia máxima aceptada al comparar montos (redondeo)
+TOTALES_TOLERANCIA = Decimal("0.01")
+
+# RUC sin DV tal como lo aceptan los modelos (8-9 dígitos)
+RUC_PATTERN = re.compile(r"^\d{8,9}$")
+NUMERO_DOCUMENTO_PATTERN = re.compile(r"^\d{3}-\d{3}-\d{7}$")
+
+
+@dataclass
+class PreValidationIssue:
+    """
+    Error detectado por la pre-validación
+    """
+    field: str
+    message: str
+    value: Any = None
+
+    def __str__(self) -> str:
+        return f"{self.field}: {self.message}"
+
+
+# Check compilado: recibe el valor (nunca None) y devuelve el mensaje de error
+Check = Callable[[Any], Optional[str]]
+# Regla de campo: (campo, requerido, checks)
+FieldRule = Tuple[str, bool, Tuple[Check, ...]]
+
+
+# ===============================================
+# CHECKS DE CAMPO
+# ===============================================
+
+def _fields(obj: Any) -> Mapping:
+    """
+    Campos de un dict o de un modelo como mapping
+
+    En los modelos Pydantic los campos viven en __dict__; leerlos de ahí
+    evita el costo de getattr sobre campos inexistentes.
+    """
+    if isinstance(obj, Mapping):
+        return obj
+    return vars(obj)
+
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    """Convierte a Decimal; None si no es numérico"""
+    if isinstance(value, Decimal):
+        return value
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def max_length(limit: int) -> Check:
+    def check(value: Any) -> Optional[str]:
+        if len(str(value)) > limit:
+            return f"no puede exceder {limit} caracteres"
+        return None
+    return check
+
+
+def matches(pattern: "re.Pattern[str]", description: str = "Formato inválido") -> Check:
+    fullmatch = pattern.fullmatch
+
+    def check(value: Any) -> Optional[str]:
+        if not fullmatch(str(value)):
+            return description
+        return None
+    return check
+
+
+def one_of(values: Iterable[Any],
+           normalize: Callable[[Any], Any] = str,
+           description: str = "Valor no permitido") -> Check:
+    allowed = frozenset(values)
+
+    def check(value: Any) -> Optional[str]:
+        try:
+            if normalize(value) in allowed:
+                return None
+        except (TypeError, ValueError, InvalidOperation):
+            pass
+        return description
+    return check
+
+
+def between(limits: Mapping[str, Decimal]) -> Check:
+    minimum, maximum = limits["min"], limits["max"]
+
+    def check(value: Any) -> Optional[str]:
+        number = _decimal(value)
+        if number is None:
+            return "Debe ser numérico"
+        if not minimum <= number <= maximum:
+            return f"Debe estar entre {minimum} y {maximum}"
+        return None
+    return check
+
+
+def sifen_date() -> Check:
+    datetime_pattern = VALIDATION_PATTERNS["datetime_sifen"].match
+    date_pattern = VALIDATION_PATTERNS["fecha_sifen"].match
+
+    def check(value: Any) -> Optional[str]:
+        if isinstance(value, (datetime, date)):
+            return None
+        text = str(value)
+        if not (datetime_pattern(text) or date_pattern(text)):
+            return "Formato de fecha inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS)"
+        try:
+            datetime.fromisoformat(text)
+        except ValueError:
+            return "Fecha inexistente"
+        return None
+    return check
+
+
+def _tipo_documento(value: Any) -> str:
+    return str(value).zfill(2)
+
+
+def _tasa_iva(value: Any) -> Decimal:
+    return Decimal(str(value))
+
+
+# ===============================================
+# REGLAS (especificación declarativa)
+# ===============================================
+
+CAMPOS_CONTRIBUYENTE: Sequence[FieldRule] = (
+    ("ruc", True, (matches(RUC_PATTERN, "RUC debe tener 8 o 9 dígitos"),)),
+    ("dv", True, (matches(VALIDATION_PATTERNS["dv"], "DV debe ser un dígito"),)),
+    ("razon_social", True, (max_length(LONGITUDES_CAMPO["razon_social"]),)),
+    ("nombre_fantasia", False, (max_length(LONGITUDES_CAMPO["nombre_fantasia"]),)),
+    ("direccion", False, (max_length(LONGITUDES_CAMPO["direccion"]),)),
+    ("numero_casa", False, (max_length(LONGITUDES_CAMPO["numero_casa"]),)),
+    ("telefono", False, (max_length(LONGITUDES_CAMPO["telefono"]),)),
+    ("email", False, (max_length(LONGITUDES_CAMPO["email"]),
+                      matches(VALIDATION_PATTERNS["email"], "Email inválido"))),
+    ("codigo_departamento", False, (one_of(DEPARTAMENTOS_PARAGUAY,
+                                           description="Departamento inexistente"),)),
+)
+
+CAMPOS_ITEM: Sequence[FieldRule] = (
+    ("descripcion", True, (max_length(LONGITUDES_CAMPO["descripcion_producto"]),)),
+    ("cantidad", True, (between(LIMITES_NUMERICOS["cantidad_item"]),)),
+    ("precio_unitario", True, (between(LIMITES_NUMERICOS["precio_unitario"]),)),
+    ("monto_total", False, (between(LIMITES_NUMERICOS["monto_total"]),)),
+    ("iva", False, (one_of(TASAS_IVA_VALIDAS, normalize=_tasa_iva,
+                           description="Tasa de IVA no permitida"),)),
+)
+
+CAMPOS_DOCUMENTO: Sequence[FieldRule] = (
+    ("tipo_documento", False, (one_of(TIPOS_DOCUMENTO, normalize=_tipo_documento,
+                                      description="Tipo de documento no válido"),)),
+    ("establecimiento", False, (matches(VALIDATION_PATTERNS["establecimiento"]),)),
+    ("punto_expedicion", False, (matches(VALIDATION_PATTERNS["punto_expedicion"]),)),
+    ("numero_timbrado", False, (matches(VALIDATION_PATTERNS["timbrado"]),)),
+    ("cdc", False, (matches(VALIDATION_PATTERNS["cdc"], "CDC debe tener 44 dígitos"),)),
+    ("fecha_emision", True, (sifen_date(),)),
+    ("moneda", False, (one_of(MONEDAS_SIFEN, description="Moneda no válida para SIFEN"),)),
+    ("total_general", True, (between(LIMITES_NUMERICOS["monto_total"]),)),
+    ("observaciones", False, (max_length(LONGITUDES_CAMPO["observaciones"]),)),
+    ("motivo_emision", False, (max_length(LONGITUDES_CAMPO["motivo_emision"]),)),
+    ("motivo_credito", False, (max_length(LONGITUDES_CAMPO["motivo_emision"]),)),
+    ("motivo_debito", False, (max_length(LONGITUDES_CAMPO["motivo_emision"]),)),
+)
+
+# Grupos contribuyente presentes según el tipo de documento
+GRUPOS_CONTRIBUYENTE = ("emisor", "receptor")
+
+
+# ===============================================
+# COMPILACIÓN
+# ===============================================
+
+# Regla compilada: agrega los errores de los campos a la lista; el prefijo
+# identifica el grupo (p.ej. "emisor." o "items[3].")
+CompiledRule = Callable[[Mapping, str, List[PreValidationIssue]], None]
+
+
+def compile_field_rules(rules: Sequence[FieldRule]) -> CompiledRule:
+    """
+    Compila una lista de reglas de campo en una única función
+
+    Args:
+        rules: Reglas (campo, requerido, checks)
+
+    Returns:
+        CompiledRule: Función que valida un objeto completo
+    """
+    fields = tuple((name, required, tuple(checks)) for name, required, checks in rules)
+
+    def run(data: Mapping, prefix: str, issues: List[PreValidationIssue]) -> None:
+        get = data.get
+        for name, required, checks in fields:
+            value = get(name)
+            if value is None or value == "":
+                if required:
+                    issues.append(PreValidationIssue(prefix + name, "Campo requerido"))
+                continue
+            for check in checks:
+                message = check(value)
+                if message is not None:
+                    issues.append(PreValidationIssue(prefix + name, message, value))
+                    break
+    return run
+
+
+# Vista del documento: campos, grupos contribuyente e items ya como mappings
+_Vista = Tuple[Mapping, Mapping[str, Mapping], List[Mapping]]
+
+
+def _check_numero_documento(vista: _Vista, issues: List[PreValidationIssue]) -> None:
+    """Número con formato XXX-XXX-XXXXXXX (modelos) o correlativo (repositorio)"""
+    numero = vista[0].get("numero_documento")
+    if numero is None:
+        return
+    text = str(numero)
+    pattern = NUMERO_DOCUMENTO_PATTERN if "-" in text else VALIDATION_PATTERNS["numero_documento"]
+    if not pattern.fullmatch(text):
+        issues.append(PreValidationIssue("numero_documento", "Formato inválido", numero))
+
+
+def _check_ruc_dv(vista: _Vista, issues: List[PreValidationIssue]) -> None:
+    """DV calculado con módulo 11 para emisor y receptor"""
+    for group, contribuyente in vista[1].items():
+        ruc, dv = contribuyente.get("ruc"), contribuyente.get("dv")
+        if not ruc or not dv or not RUC_PATTERN.fullmatch(str(ruc)):
+            continue
+        esperado = calculate_dv(str(ruc)[-8:])
+        if esperado != str(dv):
+            issues.append(PreValidationIssue(
+                f"{group}.dv", f"DV incorrecto para RUC {ruc} (esperado {esperado})", dv))
+
+
+def _check_receptor_registrado(vista: _Vista, issues: List[PreValidationIssue]) -> None:
+    """Receptor registrado y activo en la SET, según el registro local"""
+    registry = get_ruc_registry()
+    receptor = vista[1].get("receptor")
+    if registry is None or not registry.ready or receptor is None:
+        return
+    ruc = receptor.get("ruc")
+    if not ruc or not RUC_PATTERN.fullmatch(str(ruc)):
+        return
+    valido, motivo = registry.verify(str(ruc)[-8:], receptor.get("dv"))
+    if not valido:
+        issues.append(PreValidationIssue("receptor.ruc", motivo, ruc))
+
+
+def _check_totales(vista: _Vista, issues: List[PreValidationIssue]) -> None:
+    """Consistencia aritmética de totales e items"""
+    data, _, items = vista
+    total_general = _decimal(data.get("total_general"))
+    if total_general is None:
+        return
+
+    def amount(name: str) -> Decimal:
+        return _decimal(data.get(name) or 0) or Decimal(0)
+
+    # Modelos del generador: gravada + exenta + IVA = general = suma de items
+    if data.get("total_gravada") is not None:
+        calculado = amount("total_gravada") + amount("total_exenta") + amount("total_iva")
+        if abs(calculado - total_general) > TOTALES_TOLERANCIA:
+            issues.append(PreValidationIssue(
+                "total_general",
+                f"No coincide con gravada + exenta + IVA ({calculado})", total_general))
+
+    montos = [_decimal(item.get("monto_total")) for item in items]
+    if montos and None not in montos:
+        suma = sum(montos, Decimal(0))
+        if abs(suma - total_general) > TOTALES_TOLERANCIA:
+            issues.append(PreValidationIssue(
+                "total_general", f"No coincide con la suma de items ({suma})", total_general))
+
+    # Dicts del repositorio: subtotales y total operación
+    total_operacion = amount("total_operacion")
+    if total_operacion > 0:
+        subtotales = amount("subtotal_exento") + amount("subtotal_exonerado") + \
+            amount("subtotal_gravado_5") + amount("subtotal_gravado_10")
+        if abs(total_operacion - subtotales) > TOTALES_TOLERANCIA:
+            issues.append(PreValidationIssue(
+                "total_operacion",
+                f"No coincide con la suma de subtotales ({subtotales})", total_operacion))
+
+        esperado = total_operacion + amount("total_iva")
+        if abs(total_general - esperado) > TOTALES_TOLERANCIA:
+            issues.append(PreValidationIssue(
+                "total_general",
+                f"No coincide con total operación + IVA ({esperado})", total_general))
+
+
+def _check_item_aritmetica(item: Mapping, prefix: str, issues: List[PreValidationIssue]) -> None:
+    """cantidad × precio unitario = monto total del item"""
+    monto = item.get("monto_total")
+    if monto is None:
+        return
+    cantidad = _decimal(item.get("cantidad"))
+    precio = _decimal(item.get("precio_unitario"))
+    total = _decimal(monto)
+    if cantidad is None or precio is None or total is None:
+        return
+    if abs(cantidad * precio - total) > TOTALES_TOLERANCIA:
+        issues.append(PreValidationIssue(
+            prefix + "monto_total",
+            f"No coincide con cantidad × precio unitario ({cantidad * precio})", monto))
+
+
+# ===============================================
+# MOTOR
+# ===============================================
+
+class PreValidator:
+    """
+    Motor de pre-validación con reglas compiladas
+
+    Las reglas se compilan una sola vez al crear la instancia; check()
+    solo ejecuta funciones planas sobre los campos del documento.
+    """
+
+    def __init__(self,
+                 document_rules: Sequence[FieldRule] = CAMPOS_DOCUMENTO,
+                 contribuyente_rules: Sequence[FieldRule] = CAMPOS_CONTRIBUYENTE,
+                 item_rules: Sequence[FieldRule] = CAMPOS_ITEM):
+        """
+        Args:
+            document_rules: Reglas de campos del documento
+            contribuyente_rules: Reglas de emisor/receptor
+            item_rules: Reglas de cada item
+        """
+        self._document = compile_field_rules(document_rules)
+        self._contribuyente = compile_field_rules(contribuyente_rules)
+        self._item = compile_field_rules(item_rules)
+        self._cross_checks = (_check_numero_documento, _check_ruc_dv,
+                              _check_receptor_registrado, _check_totales)
+
+    @staticmethod
+    def _vista(document: Any) -> _Vista:
+        data = _fields(document)
+        contribuyentes = {group: _fields(data[group])
+                          for group in GRUPOS_CONTRIBUYENTE if data.get(group) is not None}
+        items = data.get("items")
+        if not items or isinstance(items, (str, bytes)):
+            items = ()
+        return data, contribuyentes, [_fields(item) for item in items]
+
+    def check(self, document: Any, fail_fast: bool = False) -> List[PreValidationIssue]:
+        """
+        Ejecuta todas las reglas sobre un documento
+
+        Args:
+            document: Modelo del documento (FacturaSimple, etc.) o dict
+            fail_fast: Devolver apenas se detecta el primer grupo con errores
+
+        Returns:
+            List[PreValidationIssue]: Errores encontrados (vacía si es válido)
+        """
+        issues: List[PreValidationIssue] = []
+        vista = self._vista(document)
+        data, contribuyentes, items = vista
+
+        self._document(data, "", issues)
+        if fail_fast and issues:
+            return issues
+
+        for group, contribuyente in contribuyentes.items():
+            self._contribuyente(contribuyente, group + ".", issues)
+        if fail_fast and issues:
+            return issues
+
+        for index, item in enumerate(items):
+            prefix = f"items[{index}]."
+            self._item(item, prefix, issues)
+            _check_item_aritmetica(item, prefix, issues)
+            if fail_fast and issues:
+                return issues
+
+        for cross_check in self._cross_checks:
+            cross_check(vista, issues)
+            if fail_fast and issues:
+                return issues
+        return issues
+
+    def validate_item(self, item: Any, index: int) -> None:
+        """
+        Valida un item suelto con las reglas de items
+
+        Para items que no vienen en document.items (p.ej. el iterable de
+        iter_document_xml), que se validan a medida que se consumen.
+
+        Args:
+            item: ItemFactura o dict
+            index: Posición del item, para el campo del error
+
+        Raises:
+            SifenValidationError: Si alguna regla del item falla
+        """
+        issues: List[PreValidationIssue] = []
+        data = _fields(item)
+        prefix = f"items[{index}]."
+        self._item(data, prefix, issues)
+        _check_item_aritmetica(data, prefix, issues)
+        if issues:
+            raise SifenValidationError(
+                f"Pre-validación fallida: {issues[0]}",
+                errors=[str(issue) for issue in issues]
+            )
+
+    def is_valid(self, document: Any) -> bool:
+        """
+        Indica si el documento pasa todas las reglas
+
+        Args:
+            document: Modelo del documento o dict
+
+        Returns:
+            bool: True si no hay errores
+        """
+        return not self.check(document, fail_fast=True)
+
+    def validate(self, document: Any) -> None:
+        """
+        Valida el documento y lanza un error con todos los problemas
+
+        Args:
+            document: Modelo del documento o dict
+
+        Raises:
+            SifenValidationError: Si alguna regla falla
+        """
+        issues = self.check(document)
+        if issues:
+            raise SifenValidationError(
+                f"Pre-validación fallida: {issues[0]}",
+                errors=[str(issue) for issue in issues]
+            )
+
+
+# ===============================================
+# MOTOR GLOBAL DEL PROCESO
+# ===============================================
+
+_prevalidator: Optional[PreValidator] = None
+_prevalidator_lock = threading.Lock()
+
+
+def get_prevalidator() -> PreValidator:
+    """
+    Obtiene el motor de pre-validación del proceso (singleton)
+
+    Returns:
+        PreValidator: Motor con las reglas por defecto ya compiladas
+    """
+    global _prevalidator
+    if _prevalidator is None:
+        with _prevalidator_lock:
+            if _prevalidator is None:
+                _prevalidator = PreValidator()
+    return _prevalidator
@@ -0,0 +1,238 @@
+"""
+Registro compartido de esquemas XSD compilados para XML Generator SIFEN v150
+
+Propósito:
+    XMLValidator y OfficialValidator parseaban y compilaban DE_v150.xsd (y
+    los esquemas del set oficial) en cada instanciación. El registro
+    compila cada esquema una sola vez y lo reutiliza en todo el proceso.
+
+Threads:
+    Los objetos etree.XMLSchema de lxml no deben usarse desde varios threads
+    a la vez, por lo que el registro mantiene una instancia compilada por
+    thread. preload_schemas() compila al arrancar las instancias que luego
+    adoptan los threads del pool en su primera validación; así ninguna
+    validación paga el costo de compilación después del warmup.
+
+Invalidación:
+    La clave es (ruta, mtime). Un XSD modificado en disco se recompila en
+    la siguiente llamada a get_schema(), igual que auto_reload en los
+    templates.
+
+Uso:
+    from app.services.xml_generator.schema_registry import get_schema_registry
+
+    schema = get_schema_registry().get_schema(SCHEMAS_DIR / "v150" / "DE_v150.xsd")
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from lxml import etree
+
+from .config import SCHEMAS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Esquemas que se precompilan al iniciar la aplicación
+DEFAULT_SCHEMA_PATHS = (
+    SCHEMAS_DIR / "v150" / "DE_v150.xsd",
+)
+
+# Instancias precompiladas por esquema (una por thread que valida en paralelo)
+DEFAULT_PRELOAD_COPIES = 4
+
+# (ruta resuelta, mtime)
+_SchemaKey = Tuple[str, float]
+
+
+class SchemaRegistry:
+    """
+    Registro de esquemas XSD compilados, una instancia por thread
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        # Instancias compiladas en preload() que todavía no adoptó ningún thread
+        self._spare: Dict[_SchemaKey, List[etree.XMLSchema]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._compilations = 0
+        self._hits = 0
+        self._adopted = 0
+        self._last_preload: Dict[str, Any] = {}
+
+    @staticmethod
+    def _key(path: Union[str, Path]) -> _SchemaKey:
+        resolved = Path(path).resolve()
+        return str(resolved), os.stat(resolved).st_mtime
+
+    @staticmethod
+    def _compile(path: str) -> etree.XMLSchema:
+        """Parsea y compila un XSD"""
+        parser = etree.XMLParser(remove_blank_text=True)
+        schema_doc = etree.parse(path, parser)
+        return etree.XMLSchema(schema_doc)
+
+    def _thread_schemas(self) -> Dict[str, Tuple[float, etree.XMLSchema]]:
+        schemas = getattr(self._local, "schemas", None)
+        if schemas is None:
+            schemas = self._local.schemas = {}
+        return schemas
+
+    def get_schema(self, path: Union[str, Path]) -> etree.XMLSchema:
+        """
+        Obtiene el esquema compilado para el thread actual
+
+        Args:
+            path: Ruta del archivo XSD
+
+        Returns:
+            etree.XMLSchema: Esquema exclusivo del thread que llama
+
+        Raises:
+            OSError: Si el archivo no existe
+            etree.XMLSchemaParseError: Si el XSD no compila
+        """
+        key = self._key(path)
+        resolved, mtime = key
+        schemas = self._thread_schemas()
+
+        cached = schemas.get(resolved)
+        if cached is not None and cached[0] == mtime:
+            with self._lock:
+                self._hits += 1
+            return cached[1]
+
+        with self._lock:
+            spare = self._spare.get(key)
+            schema = spare.pop() if spare else None
+            if schema is not None:
+                self._adopted += 1
+
+        if schema is None:
+            schema = self._compile(resolved)
+            with self._lock:
+                self._compilations += 1
+            logger.debug("Esquema XSD compilado para thread %s: %s",
+                         threading.current_thread().name, resolved)
+
+        schemas[resolved] = (mtime, schema)
+        return schema
+
+    def preload(self,
+                paths: Iterable[Union[str, Path]] = DEFAULT_SCHEMA_PATHS,
+                copies: int = DEFAULT_PRELOAD_COPIES) -> Dict[str, Any]:
+        """
+        Precompila esquemas para los threads que validarán
+
+        El thread que llama queda con su propia instancia y se reservan
+        copies - 1 instancias adicionales para otros threads.
+
+        Args:
+            paths: Archivos XSD a precompilar
+            copies: Instancias por esquema (threads concurrentes esperados)
+
+        Returns:
+            Dict con esquemas compilados, errores y tiempo empleado
+        """
+        if copies < 1:
+            raise ValueError("copies debe ser mayor a 0")
+
+        start = time.perf_counter()
+        compiled: List[str] = []
+        errors: Dict[str, str] = {}
+
+        for path in paths:
+            try:
+                self.get_schema(path)
+                key = self._key(path)
+                with self._lock:
+                    missing = copies - 1 - len(self._spare[key])
+                for _ in range(missing):
+                    schema = self._compile(key[0])
+                    with self._lock:
+                        self._spare[key].append(schema)
+                        self._compilations += 1
+                compiled.append(key[0])
+            except Exception as e:
+                errors[str(path)] = str(e)
+                logger.error("Error compilando esquema XSD %s: %s", path, e)
+
+        self._last_preload = {
+            "compiled": compiled,
+            "errors": errors,
+            "copies": copies,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+        logger.info("Preload de esquemas XSD: %d compilados, %d errores en %sms",
+                    len(compiled), len(errors), self._last_preload["elapsed_ms"])
+        return self._last_preload
+
+    def clear(self) -> None:
+        """Descarta las instancias de reserva y las del thread actual"""
+        with self._lock:
+            self._spare.clear()
+        self._local.schemas = {}
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Estadísticas del registro
+
+        Returns:
+            Dict con compilaciones, hits, instancias adoptadas y de reserva
+        """
+        with self._lock:
+            return {
+                "compilations": self._compilations,
+                "hits": self._hits,
+                "adopted": self._adopted,
+                "spare": sum(len(spare) for spare in self._spare.values()),
+            }
+
+
+# ===============================================
+# REGISTRO GLOBAL DEL PROCESO
+# ===============================================
+
+_registry: Optional[SchemaRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_schema_registry() -> SchemaRegistry:
+    """
+    Obtiene el registro de esquemas del proceso (singleton)
+
+    Returns:
+        SchemaRegistry: Registro compartido
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SchemaRegistry()
+    return _registry
+
+
+def preload_schemas(paths: Iterable[Union[str, Path]] = DEFAULT_SCHEMA_PATHS,
+                    copies: int = DEFAULT_PRELOAD_COPIES) -> Dict[str, Any]:
+    """
+    Hook de arranque: precompila los esquemas del registro global
+
+    Args:
+        paths: Archivos XSD a precompilar
+        copies: Instancias por esquema
+
+    Returns:
+        Dict con resultado del preload
+    """
+    return get_schema_registry().preload(paths, copies=copies)
+
+
+def reset_schema_registry() -> None:
+    """Descarta el registro global (usado en tests y tras un fork)"""
+    global _registry
+    with _registry_lock:
+        _registry = None
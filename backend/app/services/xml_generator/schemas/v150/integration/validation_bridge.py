@@ -53,6 +53,9 @@ except ImportError:
     CoreXSDValidator = None
     ValidationError = Exception
 
+# Registro de esquemas XSD compilados compartido por el proceso
+from ....schema_registry import get_schema_registry
+
 # Import del schema_mapper
 from .schema_mapper import (
     SchemaMapper,
@@ -361,21 +364,24 @@ class OfficialValidator:
     def __init__(self, official_schemas_path: Optional[Path] = None):
         self.schemas_path = official_schemas_path or Path(
             __file__).parent.parent / "official_set"
-        self._schema_cache = {}
+        self.schema_files: List[Path] = []
         self._initialize_schemas()
 
     def _initialize_schemas(self):
-        """Inicializa los schemas oficiales"""
+        """
+        Inicializa los schemas oficiales
+
+        Solo registra los archivos disponibles; la compilación la hace el
+        registro compartido (get_schema_registry) una vez por proceso.
+        """
         try:
-            # Aquí se cargarían los schemas XSD oficiales
-            # Por ahora, implementación básica
             logger.debug(
                 f"Inicializando schemas oficiales desde {self.schemas_path}")
 
             if self.schemas_path.exists():
-                schema_files = list(self.schemas_path.glob("**/*.xsd"))
+                self.schema_files = sorted(self.schemas_path.glob("**/*.xsd"))
                 logger.info(
-                    f"Encontrados {len(schema_files)} schemas oficiales")
+                    f"Encontrados {len(self.schema_files)} schemas oficiales")
             else:
                 logger.warning(
                     f"Ruta de schemas oficiales no encontrada: {self.schemas_path}")
@@ -383,6 +389,18 @@ class OfficialValidator:
         except Exception as e:
             logger.error(f"Error inicializando schemas oficiales: {str(e)}")
 
+    def get_schema(self, relative_path: str = "DE_v150.xsd"):
+        """
+        Obtiene un schema oficial compilado desde el registro compartido
+
+        Args:
+            relative_path: Ruta del XSD relativa al set oficial
+
+        Returns:
+            etree.XMLSchema: Schema compilado para el thread actual
+        """
+        return get_schema_registry().get_schema(self.schemas_path / relative_path)
+
     def validate(self, xml_content: str, document_type: DocumentType) -> SchemaValidationResult:
         """
         Valida contenido XML contra schemas oficiales SET
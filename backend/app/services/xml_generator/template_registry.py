@@ -0,0 +1,253 @@
+"""
+Registro compartido de templates Jinja2 compilados para XML Generator SIFEN v150
+
+Propósito:
+    Un único Environment Jinja2 por proceso, compartido por todas las
+    instancias de XMLGenerator. Los templates (base, específicos por tipo y
+    partials) se compilan una sola vez y quedan en memoria; el bytecode se
+    persiste en disco para que workers nuevos y jobs batch de vida corta no
+    vuelvan a compilar.
+
+Invalidación:
+    - Bytecode en disco: Jinja2 lo asocia al checksum del código fuente del
+      template, un template modificado se recompila automáticamente.
+
+Seguridad:
+    Jinja2 deserializa y ejecuta el bytecode del directorio de cache. El
+    directorio se crea con modo 0700 y se rechaza (se compila solo en
+    memoria) si pertenece a otro usuario, es un symlink o tiene permisos
+    de escritura para grupo u otros.
+    - Cache en memoria: auto_reload compara el mtime del archivo en cada
+      get_template(), un template editado en disco se recarga.
+
+Uso:
+    from app.services.xml_generator.template_registry import warmup_templates
+
+    # Al iniciar la aplicación (FastAPI lifespan, worker, script batch)
+    warmup_templates()
+"""
+import logging
+import os
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from .config import TEMPLATES_BYTECODE_CACHE_DIR, TEMPLATES_DIR
+
+logger = logging.getLogger(__name__)
+
+# Directorios de templates renderizables (los de validation/ son utilitarios
+# con filtros propios y no forman parte del pipeline de generación)
+PRECOMPILED_TEMPLATE_DIRS = ("", "partials")
+
+
+class TemplateRegistry:
+    """
+    Registro de templates compilados con cache de bytecode en disco
+
+    Encapsula la configuración del Environment que antes se creaba en cada
+    XMLGenerator() para que todos compartan la misma compilación.
+    """
+
+    def __init__(self,
+                 templates_dir: Path = TEMPLATES_DIR,
+                 bytecode_cache_dir: Optional[Path] = TEMPLATES_BYTECODE_CACHE_DIR):
+        """
+        Inicializa el registro
+
+        Args:
+            templates_dir: Directorio raíz de templates
+            bytecode_cache_dir: Directorio para bytecode persistente.
+                None deshabilita el cache en disco.
+        """
+        self.templates_dir = Path(templates_dir)
+        self.bytecode_cache_dir = Path(
+            bytecode_cache_dir) if bytecode_cache_dir else None
+        self._lock = threading.Lock()
+        self._warmed_up = False
+        self._last_warmup: Dict[str, Any] = {}
+        self.env = self._create_environment()
+
+    def _create_environment(self) -> Environment:
+        """Crea el Environment Jinja2 compartido"""
+        bytecode_cache = None
+        if self.bytecode_cache_dir is not None:
+            try:
+                _prepare_private_dir(self.bytecode_cache_dir)
+                bytecode_cache = FileSystemBytecodeCache(
+                    str(self.bytecode_cache_dir), "sifen_%s.cache")
+            except OSError as e:
+                # Sin cache en disco se sigue compilando en memoria
+                logger.warning(
+                    "No se pudo usar cache de bytecode en %s: %s",
+                    self.bytecode_cache_dir, e)
+                self.bytecode_cache_dir = None
+
+        return Environment(
+            loader=FileSystemLoader(self.templates_dir),
+            trim_blocks=True,
+            lstrip_blocks=True,
+            autoescape=True,
+            bytecode_cache=bytecode_cache,
+            auto_reload=True,
+            # Nunca desalojar templates compilados de memoria
+            cache_size=-1
+        )
+
+    def get_template(self, name: str) -> Template:
+        """
+        Obtiene un template compilado
+
+        Args:
+            name: Nombre relativo al directorio de templates
+
+        Returns:
+            Template: Template compilado (desde memoria si ya se cargó)
+        """
+        return self.env.get_template(name)
+
+    def list_precompiled_templates(self) -> List[str]:
+        """
+        Lista los templates que forman parte del pipeline de generación
+
+        Returns:
+            List[str]: Nombres de templates base, por tipo y partials
+        """
+        def is_renderable(name: str) -> bool:
+            parent = name.rpartition("/")[0]
+            return name.endswith(".xml") and parent in PRECOMPILED_TEMPLATE_DIRS
+
+        return self.env.list_templates(filter_func=is_renderable)
+
+    def warmup(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Precompila todos los templates y partials
+
+        Llamar al iniciar el proceso elimina el costo de compilación del
+        primer documento que renderiza cada worker.
+
+        Args:
+            force: Recompilar aunque ya se haya hecho warmup
+
+        Returns:
+            Dict con templates compilados, errores y tiempo empleado
+        """
+        with self._lock:
+            if self._warmed_up and not force:
+                return self._last_warmup
+
+            start = time.perf_counter()
+            compiled: List[str] = []
+            errors: Dict[str, str] = {}
+
+            for name in self.list_precompiled_templates():
+                try:
+                    self.env.get_template(name)
+                    compiled.append(name)
+                except Exception as e:
+                    errors[name] = str(e)
+                    logger.error("Error compilando template %s: %s", name, e)
+
+            self._last_warmup = {
+                "compiled": compiled,
+                "errors": errors,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+                "bytecode_cache_dir": str(self.bytecode_cache_dir) if self.bytecode_cache_dir else None,
+            }
+            self._warmed_up = True
+
+            logger.info("Warmup de templates XML: %d compilados, %d errores en %sms",
+                        len(compiled), len(errors), self._last_warmup["elapsed_ms"])
+            return self._last_warmup
+
+    @property
+    def is_warmed_up(self) -> bool:
+        """Indica si ya se ejecutó el warmup"""
+        return self._warmed_up
+
+    def clear(self, include_bytecode: bool = False) -> None:
+        """
+        Descarta los templates compilados en memoria
+
+        Args:
+            include_bytecode: También borrar el bytecode persistido en disco
+        """
+        with self._lock:
+            if self.env.cache is not None:
+                self.env.cache.clear()
+            if include_bytecode and self.env.bytecode_cache is not None:
+                self.env.bytecode_cache.clear()
+            self._warmed_up = False
+            self._last_warmup = {}
+
+
+def _prepare_private_dir(path: Path) -> None:
+    """
+    Crea el directorio de cache (modo 0700) y verifica que sea privado
+
+    Raises:
+        PermissionError: Si es un symlink, pertenece a otro usuario o
+            grupo/otros pueden escribir en él
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        # Windows: el directorio temporal ya es privado del perfil
+        return
+
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} no es un directorio")
+    if info.st_uid != os.getuid():
+        raise PermissionError(
+            f"{path} pertenece a otro usuario (uid {info.st_uid})")
+    if info.st_mode & 0o022:
+        raise PermissionError(
+            f"{path} tiene permisos de escritura para grupo u otros "
+            f"({stat.filemode(info.st_mode)})")
+
+
+# ===============================================
+# REGISTRO GLOBAL DEL PROCESO
+# ===============================================
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """
+    Obtiene el registro de templates del proceso (singleton)
+
+    Returns:
+        TemplateRegistry: Registro compartido
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry()
+    return _registry
+
+
+def warmup_templates(force: bool = False) -> Dict[str, Any]:
+    """
+    Hook de arranque: precompila los templates del registro global
+
+    Args:
+        force: Recompilar aunque ya se haya hecho warmup
+
+    Returns:
+        Dict con resultado del warmup
+    """
+    return get_template_registry().warmup(force=force)
+
+
+def reset_template_registry() -> None:
+    """Descarta el registro global (usado en tests y tras un fork)"""
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,129 @@
+"""
+Tests para la generación XML por lotes (pool de procesos)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from ..batch import XMLGenerationResult, run_chunks
+from ..generator import XMLGenerator
+from ..models import FacturaSimple, Contribuyente, ItemFactura
+from ..template_registry import TemplateRegistry
+
+DOC_TEMPLATE = """<rDE Id="{{ cdc }}"><dNumDoc>{{ numero_documento }}</dNumDoc>
+{% for item in items %}<gCamItem>{{ item.codigo }}</gCamItem>{% endfor %}</rDE>"""
+
+
+@pytest.fixture
+def generator(tmp_path):
+    """Generador con un template mínimo para factura"""
+    (tmp_path / "factura_electronica.xml").write_text(DOC_TEMPLATE, encoding="utf-8")
+    return XMLGenerator(registry=TemplateRegistry(templates_dir=tmp_path,
+                                                  bytecode_cache_dir=tmp_path / "bytecode"))
+
+
+def _contribuyente(ruc: str, dv: str) -> Contribuyente:
+    return Contribuyente(
+        ruc=ruc,
+        dv=dv,
+        razon_social="EMPRESA DE PRUEBA S.A.",
+        direccion="Av. Principal",
+        numero_casa="123",
+        codigo_departamento="11",
+        codigo_ciudad="1",
+        descripcion_ciudad="ASUNCION",
+        telefono="021123456",
+        email="test@empresa.com"
+    )
+
+
+def _factura(numero: int) -> FacturaSimple:
+    return FacturaSimple(
+        numero_documento=f"001-001-{numero:07d}",
+        emisor=_contribuyente("80069563", "1"),
+        receptor=_contribuyente("80012345", "6"),
+        items=[ItemFactura(
+            codigo=f"P{numero}",
+            descripcion="Producto",
+            cantidad=Decimal("1"),
+            precio_unitario=Decimal("1100"),
+            iva=Decimal("10"),
+            monto_total=Decimal("1100")
+        )],
+        total_gravada=Decimal("1000"),
+        total_iva=Decimal("100"),
+        total_general=Decimal("1100"),
+        fecha_emision=datetime(2025, 1, 2, 10, 0, 0),
+        csc="ABCD12345"
+    )
+
+
+def test_generate_many_ordenado(generator):
+    """Test los resultados salen en el orden de entrada y coinciden con el render individual"""
+    documentos = [_factura(i) for i in range(1, 21)]
+
+    results = list(generator.generate_many(documentos, workers=2, chunk_size=3))
+
+    assert [r.index for r in results] == list(range(20))
+    assert all(r.success for r in results)
+    for documento, result in zip(documentos, results):
+        assert result.xml == generator.generate_document_xml(documento)
+
+
+def test_generate_many_al_completar(generator):
+    """Test en modo no ordenado se entregan todos los documentos"""
+    documentos = (_factura(i) for i in range(1, 11))
+
+    results = list(generator.generate_many(
+        documentos, workers=2, chunk_size=2, ordered=False))
+
+    assert sorted(r.index for r in results) == list(range(10))
+
+
+def test_generate_many_errores_por_documento(generator):
+    """Test un documento inválido no aborta el lote"""
+    documentos = [
+        _factura(1),
+        (_factura(2), "CDC-INVALIDO"),
+        _factura(3),
+    ]
+
+    results = list(generator.generate_many(documentos, workers=2, chunk_size=1))
+
+    assert [r.success for r in results] == [True, False, True]
+    assert isinstance(results[1], XMLGenerationResult)
+    assert "CDC" in results[1].error
+
+
+def _procesar_o_morir(chunk):
+    if "muere" in chunk:
+        os._exit(1)
+    return chunk
+
+
+def test_run_chunks_pool_roto_no_aborta():
+    """Test tras la muerte de un worker los chunks restantes vuelven fallidos"""
+    chunks = iter([["a"], ["muere"], ["b"], ["c"]])
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        results = list(run_chunks(executor, chunks, _procesar_o_morir,
+                                  lambda chunk, e: [f"falla:{item}" for item in chunk],
+                                  max_pending=1))
+
+    assert results == ["a", "falla:muere", "falla:b", "falla:c"]
+
+
+def test_generate_many_sin_pool(generator):
+    """Test workers=1 genera en el proceso actual"""
+    results = list(generator.generate_many([_factura(1), _factura(2)], workers=1))
+
+    assert [r.index for r in results] == [0, 1]
+    assert all(r.success for r in results)
+
+
+def test_generate_many_chunk_invalido(generator):
+    """Test chunk_size debe ser positivo"""
+    with pytest.raises(ValueError):
+        list(generator.generate_many([_factura(1)], workers=2, chunk_size=0))
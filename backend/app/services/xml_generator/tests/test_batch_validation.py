@@ -0,0 +1,81 @@
+"""
+Tests para la validación XSD por lotes (pool de procesos)
+"""
+import pytest
+from ..batch_validation import XMLValidationResult
+from ..validators import XMLValidator
+
+XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="rDE">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:element name="dNumDoc" type="xs:integer" maxOccurs="unbounded"/>
+      </xs:sequence>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>"""
+
+
+@pytest.fixture
+def validator(tmp_path):
+    """Validador con un XSD mínimo (rDE con dNumDoc numéricos)"""
+    path = tmp_path / "prueba.xsd"
+    path.write_text(XSD, encoding="utf-8")
+    return XMLValidator(schema_path=path)
+
+
+def _xml(*numeros: str) -> str:
+    return "<rDE>" + "".join(f"<dNumDoc>{n}</dNumDoc>" for n in numeros) + "</rDE>"
+
+
+def test_validate_many_ordenado(validator):
+    """Test los resultados salen en orden y coinciden con validate_xml"""
+    documentos = [_xml(str(i)) if i % 3 else _xml("X") for i in range(12)]
+
+    results = list(validator.validate_many(documentos, workers=2, chunk_size=2))
+
+    assert [r.index for r in results] == list(range(12))
+    for documento, (index, is_valid, errors) in zip(documentos, results):
+        assert (is_valid, errors) == validator.validate_xml(documento)
+    assert not results[0].is_valid
+    assert results[0].errors[0].startswith("Línea 1: ")
+
+
+def test_validate_many_al_completar(validator):
+    """Test en modo no ordenado se entregan todos los documentos"""
+    results = list(validator.validate_many(
+        (_xml("1") for _ in range(9)), workers=2, chunk_size=2, ordered=False))
+
+    assert sorted(r.index for r in results) == list(range(9))
+    assert all(isinstance(r, XMLValidationResult) for r in results)
+
+
+def test_limite_de_errores_por_documento(validator):
+    """Test un documento con muchos errores devuelve solo max_errors"""
+    patologico = _xml(*["X"] * 20)
+
+    [(_, is_valid, errors)] = validator.validate_many([patologico], workers=1, max_errors=3)
+
+    assert not is_valid
+    assert len(errors) == 4
+    assert errors[-1] == "... 17 errores adicionales omitidos"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fail_fast(validator, workers):
+    """Test fail_fast corta el lote en el primer documento inválido"""
+    documentos = [_xml("1"), _xml("2"), _xml("X")] + [_xml("1")] * 50
+
+    results = list(validator.validate_many(
+        documentos, workers=workers, chunk_size=1, fail_fast=True))
+
+    assert [r.is_valid for r in results] == [True, True, False]
+
+
+def test_xml_mal_formado_es_resultado(validator):
+    """Test un error de sintaxis no aborta el lote"""
+    results = list(validator.validate_many(["<rDE>", _xml("1")], workers=2, chunk_size=1))
+
+    assert [r.is_valid for r in results] == [False, True]
+    assert "sintaxis" in results[0].errors[0]
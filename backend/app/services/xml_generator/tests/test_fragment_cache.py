@@ -0,0 +1,168 @@
+"""
+Tests para el cache de fragmentos emisor/timbrado por empresa
+"""
+import sys
+
+import pytest
+from sqlalchemy import inspect
+
+from .. import fragment_cache as fragment_cache_module
+from ..fragment_cache import (
+    FragmentCache, register_model_invalidation, get_fragment_cache, reset_fragment_cache
+)
+from ..generator import XMLGenerator
+from ..template_registry import TemplateRegistry
+from ..tree_builder import XMLTreeBuilder, canonicalize_xml
+from .test_tree_builder import CDC_PRUEBA, _contexto_completo, _factura
+
+EMISOR = {"ruc": "80069563", "dv": "1", "razon_social": "EMPRESA S.A."}
+
+
+@pytest.fixture
+def cache():
+    return FragmentCache(max_entries=8)
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return TemplateRegistry(bytecode_cache_dir=None)
+
+
+def test_fragmento_se_reutiliza(cache):
+    """Test datos iguales de la misma empresa no vuelven a renderizarse"""
+    renders = []
+
+    def render():
+        renders.append(1)
+        return "<gEmis/>"
+
+    for _ in range(3):
+        assert cache.get_or_create("80069563", "emisor", EMISOR, render) == "<gEmis/>"
+
+    assert len(renders) == 1
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_cambio_de_datos_genera_nuevo_fragmento(cache):
+    """Test el hash de datos forma parte de la clave"""
+    cache.get_or_create("80069563", "emisor", EMISOR, lambda: "v1")
+
+    modificado = {**EMISOR, "razon_social": "OTRA S.A."}
+
+    assert cache.get_or_create("80069563", "emisor", modificado, lambda: "v2") == "v2"
+
+
+def test_invalidacion_por_empresa_y_timbrado(cache):
+    """Test los hooks descartan solo los fragmentos afectados"""
+    cache.get_or_create("80069563", "emisor", EMISOR, lambda: "a")
+    cache.get_or_create("80069563", "timbrado", {"n": 1}, lambda: "b", timbrado="12345678")
+    cache.get_or_create("80012345", "timbrado", {"n": 2}, lambda: "c", timbrado="87654321")
+
+    assert cache.invalidate_timbrado("12345678") == 1
+    assert cache.invalidate_empresa("80012345") == 1
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_limite_lru(cache):
+    """Test el cache no supera max_entries"""
+    for i in range(20):
+        cache.get_or_create(str(i), "emisor", EMISOR, lambda: "x")
+
+    assert cache.get_stats()["entries"] == 8
+
+
+def test_render_con_fragmentos_igual_a_partials(registry, cache):
+    """Test gEmis/gTimb cacheados producen el mismo XML que los partials"""
+    generator = XMLGenerator(registry=registry, fragment_cache=cache)
+    context = _contexto_completo()
+    template = registry.get_template("base_document.xml")
+    xml_partials = template.render(**context)
+
+    for numero in ("0000001", "0000002"):
+        context = _contexto_completo()
+        context["timbrado"]["numero_documento"] = numero
+        generator._add_static_fragments(context)
+        xml = template.render(**context)
+
+        assert f"<dNumDoc>{numero}</dNumDoc>" in xml
+    assert canonicalize_xml(xml.replace("0000002</dNumDoc>", "0000001</dNumDoc>")) == \
+        canonicalize_xml(xml_partials)
+    # El segundo documento reutiliza emisor y timbrado
+    assert cache.get_stats() == {"entries": 2, "hits": 2, "misses": 2, "invalidations": 0}
+
+
+def test_fragmentos_escapados(registry, cache):
+    """Test el fragmento cacheado conserva el escape del template"""
+    generator = XMLGenerator(registry=registry, fragment_cache=cache)
+    context = _contexto_completo()
+    context["timbrado"]["numero_documento"] = "<1>"
+    generator._add_static_fragments(context)
+
+    xml = registry.get_template("base_document.xml").render(**context)
+
+    assert "EMPRESA &lt;PRUEBA&gt; S.A." in xml
+    assert "<dNumDoc>&lt;1&gt;</dNumDoc>" in xml
+
+
+def test_generate_document_xml_usa_cache_de_timbrado(registry, cache, monkeypatch):
+    """Test la generación real arma gTimb desde el cache de fragmentos"""
+    generator = XMLGenerator(registry=registry, fragment_cache=cache)
+    build_context = generator._build_document_context
+    monkeypatch.setattr(generator, "_build_document_context",
+                        lambda *args: {"datos_fe": {}, **build_context(*args)})
+    factura = _factura()
+    siguiente = factura.model_copy(update={"numero_documento": "001-001-0000002"})
+
+    primero = generator.generate_document_xml(factura, cdc=CDC_PRUEBA)
+    segundo = generator.generate_document_xml(siguiente, cdc=CDC_PRUEBA)
+
+    assert "<dNumTim>12345678</dNumTim>" in primero
+    assert "<dEst>001</dEst>" in primero
+    assert "<dNumDoc>0000001</dNumDoc>" in primero
+    assert "<dNumDoc>0000002</dNumDoc>" in segundo
+    # gTimb se renderiza una vez; el segundo documento solo cambia dNumDoc
+    assert cache.get_stats()["misses"] == 1
+    assert cache.get_stats()["hits"] == 1
+    assert cache.invalidate_timbrado("12345678") == 1
+
+
+def test_motor_lxml_con_fragmentos(cache):
+    """Test el árbol con sub-árboles cacheados es igual al construido completo"""
+    builder = XMLTreeBuilder(fragment_cache=cache)
+    esperado = canonicalize_xml(XMLTreeBuilder().build(_contexto_completo(), "0"))
+
+    primero = builder.build(_contexto_completo(), "0")
+    segundo = builder.build(_contexto_completo(), "0")
+
+    assert canonicalize_xml(primero) == canonicalize_xml(segundo) == esperado
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_hook_de_modelos_invalida():
+    """Test los eventos de Empresa/Timbrado invalidan el cache global"""
+    empresa_module = pytest.importorskip("app.models.empresa")
+    timbrado_module = pytest.importorskip("app.models.timbrado")
+    register_model_invalidation()
+    reset_fragment_cache()
+    cache = get_fragment_cache()
+    cache.get_or_create("80016875", "emisor", EMISOR, lambda: "a")
+    cache.get_or_create("80016875", "timbrado", {}, lambda: "b", timbrado="12345678")
+
+    Empresa = empresa_module.Empresa
+    Timbrado = timbrado_module.Timbrado
+    timbrado = Timbrado(numero_timbrado="12345678")
+    empresa = Empresa(ruc="80016875-5", dv="5")
+    Timbrado.__mapper__.dispatch.after_update(Timbrado.__mapper__, None, inspect(timbrado))
+    Empresa.__mapper__.dispatch.after_update(Empresa.__mapper__, None, inspect(empresa))
+
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_hook_sin_modelos_no_impide_arranque(monkeypatch):
+    """Test si los modelos no importan el hook solo registra un warning"""
+    monkeypatch.setattr(fragment_cache_module, "_listeners_registered", False)
+    monkeypatch.setitem(sys.modules, "app.models.timbrado", None)
+
+    register_model_invalidation()
+
+    assert fragment_cache_module._listeners_registered is False
@@ -0,0 +1,197 @@
+"""
+Tests para el motor de pre-validación (reglas compiladas)
+"""
+import io
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from ..batch import XMLGenerationResult
+from ..generator import XMLGenerator
+from ..models import FacturaSimple, Contribuyente, ItemFactura
+from ..prevalidation import PreValidator, get_prevalidator
+from ..template_registry import TemplateRegistry
+from ..validators import SifenValidationError
+from .test_streaming import BASE_TEMPLATE, ITEM_PARTIAL
+from app.utils.ruc_registry import configure_ruc_registry, reset_ruc_registry
+
+
+@pytest.fixture
+def prevalidator():
+    return PreValidator()
+
+
+def _factura(**cambios) -> FacturaSimple:
+    contribuyente = Contribuyente(
+        ruc="80069563", dv="9", razon_social="EMPRESA DE PRUEBA S.A.",
+        direccion="Av. Principal", numero_casa="123", codigo_departamento="11",
+        codigo_ciudad="1", descripcion_ciudad="ASUNCION",
+        telefono="021123456", email="test@empresa.com"
+    )
+    datos = dict(
+        numero_documento="001-001-0000001",
+        emisor=contribuyente,
+        receptor=contribuyente,
+        items=[ItemFactura(codigo="P1", descripcion="Producto", cantidad=Decimal("2"),
+                           precio_unitario=Decimal("550"), iva=Decimal("10"),
+                           monto_total=Decimal("1100"))],
+        total_gravada=Decimal("1000"),
+        total_iva=Decimal("100"),
+        total_general=Decimal("1100"),
+        fecha_emision=datetime(2025, 1, 2, 10, 0, 0),
+        csc="ABCD12345"
+    )
+    datos.update(cambios)
+    return FacturaSimple.model_construct(**datos)
+
+
+def _campos(issues):
+    return [issue.field for issue in issues]
+
+
+def test_modelo_valido(prevalidator):
+    """Test una factura correcta no genera errores"""
+    assert prevalidator.check(_factura()) == []
+    assert prevalidator.is_valid(_factura())
+
+
+def test_dv_incorrecto(prevalidator):
+    """Test el DV se verifica con módulo 11"""
+    emisor = _factura().emisor.model_copy(update={"dv": "1"})
+
+    issues = prevalidator.check(_factura(emisor=emisor))
+
+    assert _campos(issues) == ["emisor.dv"]
+    assert "esperado 9" in issues[0].message
+
+
+def test_receptor_en_registro_ruc(prevalidator, tmp_path):
+    """Test con registro SET configurado el receptor debe existir y estar activo"""
+    listado = tmp_path / "ruc8.txt"
+    listado.write_text("80069563|EMPRESA DE PRUEBA S.A.|9||ACTIVO|\n"
+                       "80012345|OTRA S.A.|6||CANCELADO|\n", encoding="utf-8")
+    configure_ruc_registry(tmp_path / "ruc.idx").refresh([listado])
+    try:
+        assert prevalidator.check(_factura()) == []
+
+        cancelado = _factura().receptor.model_copy(update={"ruc": "80012345", "dv": "6"})
+        issues = prevalidator.check(_factura(receptor=cancelado))
+        assert [i.message for i in issues if i.field == "receptor.ruc"] == [
+            "Contribuyente en estado CANCELADO"]
+
+        inexistente = _factura().receptor.model_copy(update={"ruc": "80099999"})
+        issues = prevalidator.check(_factura(receptor=inexistente))
+        assert "receptor.ruc" in _campos(issues)
+    finally:
+        reset_ruc_registry()
+
+
+def test_longitudes_y_catalogos(prevalidator):
+    """Test longitudes de LONGITUDES_CAMPO y catálogos de constants"""
+    receptor = _factura().receptor.model_copy(
+        update={"razon_social": "X" * 61, "codigo_departamento": "99"})
+    item = _factura().items[0].model_copy(update={"iva": Decimal("7")})
+
+    issues = prevalidator.check(_factura(receptor=receptor, items=[item]))
+
+    assert _campos(issues) == ["receptor.razon_social", "receptor.codigo_departamento",
+                               "items[0].iva"]
+
+
+def test_totales_que_no_cierran(prevalidator):
+    """Test aritmética de items y totales del modelo"""
+    item = _factura().items[0].model_copy(update={"monto_total": Decimal("1200")})
+
+    issues = prevalidator.check(_factura(items=[item], total_general=Decimal("1150")))
+
+    assert _campos(issues) == ["items[0].monto_total", "total_general", "total_general"]
+
+
+def test_dict_del_repositorio(prevalidator):
+    """Test reglas sobre el dict de validate_document_data"""
+    datos = {
+        "tipo_documento": "1", "establecimiento": "001", "punto_expedicion": "01",
+        "numero_documento": "0000001", "numero_timbrado": "12345678",
+        "fecha_emision": "2025-02-30", "moneda": "XXX",
+        "total_operacion": Decimal("1000"), "subtotal_gravado_10": Decimal("900"),
+        "total_iva": Decimal("100"), "total_general": Decimal("1100"),
+    }
+
+    issues = prevalidator.check(datos)
+
+    assert _campos(issues) == ["punto_expedicion", "fecha_emision", "moneda",
+                               "total_operacion"]
+    assert prevalidator.check(datos, fail_fast=True) == issues[:3]
+
+
+def test_campo_requerido(prevalidator):
+    """Test los campos requeridos ausentes se reportan"""
+    issues = prevalidator.check({"total_general": "10"})
+
+    assert _campos(issues) == ["fecha_emision"]
+    assert issues[0].message == "Campo requerido"
+
+
+def test_validate_lanza_error_con_todos_los_problemas(prevalidator):
+    """Test validate() reúne los errores en SifenValidationError"""
+    with pytest.raises(SifenValidationError) as exc_info:
+        prevalidator.validate({"fecha_emision": "ayer", "total_general": "-1"})
+
+    assert exc_info.value.errors == [
+        "fecha_emision: Formato de fecha inválido (YYYY-MM-DD o YYYY-MM-DDTHH:MM:SS)",
+        "total_general: Debe estar entre 0.00 y 999999999999.99",
+    ]
+
+
+def test_generador_rechaza_antes_de_renderizar(tmp_path):
+    """Test con prevalidator el documento inválido no llega al template"""
+    registry = TemplateRegistry(templates_dir=tmp_path, bytecode_cache_dir=None)
+    generator = XMLGenerator(registry=registry, prevalidator=get_prevalidator())
+    emisor = _factura().emisor.model_copy(update={"dv": "1"})
+
+    with pytest.raises(SifenValidationError, match="emisor.dv"):
+        generator.generate_document_xml(_factura(emisor=emisor))
+
+    [result] = generator.generate_many([_factura(emisor=emisor)], workers=1)
+    assert isinstance(result, XMLGenerationResult)
+    assert not result.success
+    assert "emisor.dv" in result.error
+
+
+def test_streaming_rechaza_antes_de_escribir(tmp_path):
+    """Test el modo streaming también pre-valida antes del primer chunk"""
+    registry = TemplateRegistry(templates_dir=tmp_path, bytecode_cache_dir=None)
+    generator = XMLGenerator(registry=registry, prevalidator=get_prevalidator())
+    emisor = _factura().emisor.model_copy(update={"dv": "1"})
+
+    with pytest.raises(SifenValidationError, match="emisor.dv"):
+        next(generator.iter_document_xml(_factura(emisor=emisor)))
+
+    output = io.BytesIO()
+    with pytest.raises(SifenValidationError, match="emisor.dv"):
+        generator.stream_document_xml(_factura(emisor=emisor), output)
+    assert output.getvalue() == b""
+
+
+def test_streaming_valida_items_del_iterable(tmp_path):
+    """Test los items pasados por items= se pre-validan al consumirse"""
+    (tmp_path / "partials").mkdir()
+    (tmp_path / "factura_electronica.xml").write_text(BASE_TEMPLATE, encoding="utf-8")
+    (tmp_path / "partials" / "_item.xml").write_text(ITEM_PARTIAL, encoding="utf-8")
+    registry = TemplateRegistry(templates_dir=tmp_path, bytecode_cache_dir=None)
+    generator = XMLGenerator(registry=registry, prevalidator=get_prevalidator())
+    factura = _factura()
+    consumidos = []
+
+    def items():
+        for monto in ("1100", "999"):
+            consumidos.append(monto)
+            yield {"codigo": "P1", "descripcion": "Producto", "cantidad": "2",
+                   "precio_unitario": "550", "iva": "10", "monto_total": monto}
+
+    with pytest.raises(SifenValidationError, match=r"items\[1\]\.monto_total"):
+        generator.stream_document_xml(factura, io.BytesIO(), items=items())
+    assert consumidos == ["1100", "999"]
+
+    xml = io.BytesIO()
+    generator.stream_document_xml(factura, xml, items=iter(factura.items))
+    assert b"gCamItem" in xml.getvalue()
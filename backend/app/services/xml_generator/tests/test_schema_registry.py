@@ -0,0 +1,89 @@
+"""
+Tests para el registro compartido de esquemas XSD compilados
+"""
+import os
+import threading
+import pytest
+from lxml import etree
+from ..schema_registry import SchemaRegistry
+
+XSD = """<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+  <xs:element name="rDE" type="xs:{tipo}"/>
+</xs:schema>"""
+
+
+@pytest.fixture
+def xsd_path(tmp_path):
+    path = tmp_path / "prueba.xsd"
+    path.write_text(XSD.format(tipo="integer"), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def registry():
+    return SchemaRegistry()
+
+
+def _en_otro_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_mismo_thread_reutiliza_esquema(registry, xsd_path):
+    """Test el esquema se compila una vez por thread"""
+    schema = registry.get_schema(xsd_path)
+
+    assert registry.get_schema(str(xsd_path)) is schema
+    assert schema.validate(etree.fromstring("<rDE>1</rDE>"))
+    assert registry.get_stats()["compilations"] == 1
+    assert registry.get_stats()["hits"] == 1
+
+
+def test_instancia_distinta_por_thread(registry, xsd_path):
+    """Test los threads no comparten el mismo etree.XMLSchema"""
+    schema = registry.get_schema(xsd_path)
+
+    assert _en_otro_thread(lambda: registry.get_schema(xsd_path)) is not schema
+
+
+def test_preload_evita_compilar_en_threads(registry, xsd_path):
+    """Test los threads adoptan las instancias precompiladas en preload"""
+    result = registry.preload([xsd_path], copies=3)
+    assert result["errors"] == {}
+    assert registry.get_stats()["compilations"] == 3
+
+    schemas = [_en_otro_thread(lambda: registry.get_schema(xsd_path)) for _ in range(2)]
+
+    assert schemas[0] is not schemas[1]
+    stats = registry.get_stats()
+    assert stats["compilations"] == 3
+    assert stats["adopted"] == 2
+    assert stats["spare"] == 0
+
+
+def test_cambio_de_mtime_recompila(registry, xsd_path):
+    """Test un XSD modificado en disco se recompila"""
+    schema = registry.get_schema(xsd_path)
+    xsd_path.write_text(XSD.format(tipo="string"), encoding="utf-8")
+    stat = os.stat(xsd_path)
+    os.utime(xsd_path, (stat.st_atime, stat.st_mtime + 10))
+
+    nuevo = registry.get_schema(xsd_path)
+
+    assert nuevo is not schema
+    assert nuevo.validate(etree.fromstring("<rDE>texto</rDE>"))
+
+
+def test_preload_registra_errores(registry, tmp_path):
+    """Test un XSD inválido no aborta el preload"""
+    invalido = tmp_path / "invalido.xsd"
+    invalido.write_text("<xs:schema", encoding="utf-8")
+
+    result = registry.preload([invalido, tmp_path / "no_existe.xsd"])
+
+    assert result["compiled"] == []
+    assert len(result["errors"]) == 2
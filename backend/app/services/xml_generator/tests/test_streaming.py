@@ -0,0 +1,164 @@
+"""
+Tests para el modo streaming del generador XML
+"""
+import io
+import tracemalloc
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from ..generator import XMLGenerator, ItemStream
+from ..models import FacturaSimple, Contribuyente, ItemFactura
+from ..template_registry import TemplateRegistry
+
+CDC_PRUEBA = "01800695631001001000000012025010210000000019"
+
+BASE_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<rDE Id="{{ cdc }}"><DE>
+<dNumDoc>{{ numero_documento }}</dNumDoc>
+{% if items %}{% for item in items %}{% include 'partials/_item.xml' %}{% endfor %}{% endif %}
+<dTotGralOpe>{{ total_general }}</dTotGralOpe>
+</DE></rDE>
+"""
+
+ITEM_PARTIAL = "<gCamItem><dCodInt>{{ item.codigo }}</dCodInt><dDesProSer>{{ item.descripcion }}</dDesProSer></gCamItem>\n"
+
+
+@pytest.fixture
+def generator(tmp_path):
+    """Generador con templates mínimos de estructura equivalente"""
+    (tmp_path / "partials").mkdir()
+    (tmp_path / "factura_electronica.xml").write_text(BASE_TEMPLATE, encoding="utf-8")
+    (tmp_path / "partials" / "_item.xml").write_text(ITEM_PARTIAL, encoding="utf-8")
+    return XMLGenerator(registry=TemplateRegistry(templates_dir=tmp_path,
+                                                  bytecode_cache_dir=None))
+
+
+def _contribuyente(ruc: str, dv: str) -> Contribuyente:
+    return Contribuyente(
+        ruc=ruc,
+        dv=dv,
+        razon_social="EMPRESA DE PRUEBA S.A.",
+        direccion="Av. Principal",
+        numero_casa="123",
+        codigo_departamento="11",
+        codigo_ciudad="1",
+        descripcion_ciudad="ASUNCION",
+        telefono="021123456",
+        email="test@empresa.com"
+    )
+
+
+def _item(i: int) -> ItemFactura:
+    return ItemFactura(
+        codigo=f"P{i:05d}",
+        descripcion=f"Producto {i} & cia",
+        cantidad=Decimal("1"),
+        precio_unitario=Decimal("1100"),
+        iva=Decimal("10"),
+        monto_total=Decimal("1100")
+    )
+
+
+@pytest.fixture
+def factura():
+    """Factura con tres items"""
+    return FacturaSimple(
+        numero_documento="001-001-0000001",
+        emisor=_contribuyente("80069563", "1"),
+        receptor=_contribuyente("80012345", "6"),
+        items=[_item(i) for i in range(3)],
+        total_gravada=Decimal("3000"),
+        total_iva=Decimal("300"),
+        total_general=Decimal("3300"),
+        fecha_emision=datetime(2025, 1, 2, 10, 0, 0),
+        csc="ABCD12345"
+    )
+
+
+class CountingSink:
+    """Destino que solo cuenta bytes (no retiene el XML)"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+
+
+def test_stream_igual_a_render(generator, factura):
+    """Test el XML en streaming es idéntico al render completo"""
+    xml = generator.generate_document_xml(factura, cdc=CDC_PRUEBA)
+    buffer = io.BytesIO()
+
+    written = generator.stream_document_xml(factura, buffer, cdc=CDC_PRUEBA)
+
+    assert buffer.getvalue() == xml.encode("utf-8")
+    assert written == len(buffer.getvalue())
+    assert "&amp; CIA" in xml
+
+
+def test_iter_document_xml_produce_chunks(generator, factura):
+    """Test iter_document_xml entrega bytes UTF-8 en varios chunks"""
+    chunks = list(generator.iter_document_xml(
+        factura, cdc=CDC_PRUEBA, buffer_size=2))
+
+    assert len(chunks) > 1
+    assert all(isinstance(chunk, bytes) for chunk in chunks)
+
+
+def test_items_desde_iterador(generator, factura):
+    """Test los items se pueden leer de un generador externo"""
+    buffer = io.BytesIO()
+    items = ({"codigo": f"X{i}", "descripcion": f"Item {i}"} for i in range(5))
+
+    generator.stream_document_xml(factura, buffer, cdc=CDC_PRUEBA, items=items)
+
+    xml = buffer.getvalue().decode("utf-8")
+    assert xml.count("<gCamItem>") == 5
+    assert "<dCodInt>X4</dCodInt>" in xml
+
+
+def test_items_vacios(generator, factura):
+    """Test un iterador vacío no genera gCamItem"""
+    buffer = io.BytesIO()
+
+    generator.stream_document_xml(factura, buffer, cdc=CDC_PRUEBA, items=iter([]))
+
+    assert b"<gCamItem>" not in buffer.getvalue()
+
+
+def test_memoria_constante_con_miles_de_items(generator, factura):
+    """Test el pico de memoria no crece con la cantidad de items"""
+    def items(n):
+        for i in range(n):
+            yield {"codigo": f"P{i:05d}", "descripcion": "Producto mayorista " * 4}
+
+    def peak_for(n):
+        sink = CountingSink()
+        tracemalloc.start()
+        generator.stream_document_xml(factura, sink, cdc=CDC_PRUEBA, items=items(n))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak, sink.size
+
+    peak_small, size_small = peak_for(1_000)
+    peak_large, size_large = peak_for(20_000)
+
+    assert size_large > 15 * size_small
+    assert peak_large < peak_small * 2 + 256 * 1024
+
+
+def test_item_stream_solo_una_pasada():
+    """Test ItemStream no permite recorrer los items dos veces"""
+    stream = ItemStream([{"codigo": "1"}])
+
+    assert stream
+    assert list(stream) == [{"codigo": "1"}]
+    with pytest.raises(RuntimeError):
+        list(stream)
+
+
+def test_stream_error_se_reporta(generator, factura):
+    """Test errores de generación se propagan como RuntimeError"""
+    with pytest.raises(RuntimeError):
+        generator.stream_document_xml(factura, io.BytesIO(), cdc="123")
@@ -0,0 +1,124 @@
+"""
+Tests para el registro compartido de templates compilados
+"""
+import os
+import pytest
+from ..generator import XMLGenerator
+from ..template_registry import TemplateRegistry, get_template_registry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Fixture con un registro aislado y cache de bytecode temporal"""
+    return TemplateRegistry(bytecode_cache_dir=tmp_path / "bytecode")
+
+
+def test_warmup_compila_templates_y_partials(registry):
+    """Test warmup precompila base, templates por tipo y partials"""
+    result = registry.warmup()
+
+    assert result["errors"] == {}
+    assert "base_document.xml" in result["compiled"]
+    assert "factura_electronica.xml" in result["compiled"]
+    assert "partials/_grupo_emisor.xml" in result["compiled"]
+    # Los utilitarios de validation/ no forman parte del pipeline
+    assert not any(name.startswith("validation/")
+                   for name in result["compiled"])
+    assert registry.is_warmed_up
+
+
+def test_warmup_es_idempotente(registry):
+    """Test un segundo warmup reutiliza el resultado anterior"""
+    first = registry.warmup()
+    second = registry.warmup()
+
+    assert first is second
+
+
+def test_bytecode_persistido_en_disco(registry, tmp_path):
+    """Test el bytecode compilado queda en el directorio de cache"""
+    registry.warmup()
+
+    cached = list((tmp_path / "bytecode").glob("sifen_*.cache"))
+    assert len(cached) == len(registry.warmup()["compiled"])
+
+
+def test_templates_compilados_en_memoria(registry):
+    """Test get_template devuelve la misma instancia compilada"""
+    registry.warmup()
+
+    assert registry.get_template("base_document.xml") is \
+        registry.get_template("base_document.xml")
+
+
+def test_template_modificado_se_recompila(tmp_path):
+    """Test un template editado en disco se recarga"""
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    template_file = templates_dir / "doc.xml"
+    template_file.write_text("<a>{{ valor }}</a>", encoding="utf-8")
+
+    registry = TemplateRegistry(templates_dir=templates_dir,
+                                bytecode_cache_dir=tmp_path / "bytecode")
+    assert registry.get_template("doc.xml").render(valor=1) == "<a>1</a>"
+
+    template_file.write_text("<b>{{ valor }}</b>", encoding="utf-8")
+    stat = template_file.stat()
+    os.utime(template_file, (stat.st_atime, stat.st_mtime + 10))
+
+    assert registry.get_template("doc.xml").render(valor=1) == "<b>1</b>"
+
+
+def test_generadores_comparten_registro_global():
+    """Test todas las instancias de XMLGenerator usan el mismo Environment"""
+    assert XMLGenerator().env is XMLGenerator().env
+    assert XMLGenerator().registry is get_template_registry()
+
+
+def test_clear_descarta_compilados(registry):
+    """Test clear obliga a un nuevo warmup"""
+    registry.warmup()
+    registry.clear()
+
+    assert not registry.is_warmed_up
+    assert registry.warmup()["errors"] == {}
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="Permisos POSIX")
+def test_directorio_de_bytecode_privado(tmp_path):
+    """Test el directorio de cache se crea con modo 0700"""
+    cache_dir = tmp_path / "bytecode"
+    registry = TemplateRegistry(bytecode_cache_dir=cache_dir)
+
+    assert registry.env.bytecode_cache is not None
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="Permisos POSIX")
+def test_directorio_de_bytecode_inseguro_se_rechaza(tmp_path):
+    """Test un directorio escribible por otros o un symlink no se usa como cache"""
+    compartido = tmp_path / "compartido"
+    compartido.mkdir()
+    compartido.chmod(0o777)
+    enlace = tmp_path / "enlace"
+    enlace.symlink_to(tmp_path / "destino", target_is_directory=True)
+    (tmp_path / "destino").mkdir(mode=0o700)
+
+    for cache_dir in (compartido, enlace):
+        registry = TemplateRegistry(bytecode_cache_dir=cache_dir)
+        assert registry.env.bytecode_cache is None
+        assert registry.bytecode_cache_dir is None
+        # Sin cache en disco se sigue compilando en memoria
+        assert registry.get_template("base_document.xml") is not None
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="Permisos POSIX")
+def test_directorio_de_bytecode_de_otro_usuario_se_rechaza(tmp_path, monkeypatch):
+    """Test un directorio creado por otro usuario no se usa como cache"""
+    cache_dir = tmp_path / "bytecode"
+    cache_dir.mkdir(mode=0o700)
+    monkeypatch.setattr(os, "getuid", lambda: cache_dir.stat().st_uid + 1)
+
+    registry = TemplateRegistry(bytecode_cache_dir=cache_dir)
+
+    assert registry.env.bytecode_cache is None
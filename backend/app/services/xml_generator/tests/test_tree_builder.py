@@ -0,0 +1,216 @@
+"""
+Tests para el motor lxml (XMLTreeBuilder) y su equivalencia con los templates
+"""
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from lxml import etree
+from ..generator import XMLGenerator
+from ..models import FacturaSimple, Contribuyente, ItemFactura
+from ..template_registry import TemplateRegistry
+from ..tree_builder import XMLTreeBuilder, canonicalize_xml, SIFEN_NAMESPACE
+
+CDC_PRUEBA = "01800695631001001000000012025010210000000019"
+
+TEMPLATES_POR_TIPO = {
+    "1": "factura_electronica.xml",
+    "4": "autofactura_electronica.xml",
+    "5": "nota_credito_electronica.xml",
+    "6": "nota_debito_electronica.xml",
+    "7": "nota_remision_electronica.xml",
+}
+
+
+@pytest.fixture(scope="module")
+def registry():
+    """Registro con los templates reales y sin cache en disco"""
+    return TemplateRegistry(bytecode_cache_dir=None)
+
+
+@pytest.fixture
+def builder():
+    return XMLTreeBuilder()
+
+
+def _contexto_completo() -> dict:
+    """Contexto con todos los grupos que consumen los templates"""
+    return {
+        "cdc": CDC_PRUEBA,
+        "version": "150",
+        "tipo_documento": "1",
+        "descripcion_tipo_documento": "Factura electrónica",
+        "fecha_emision": "2025-01-02T10:00:00",
+        "codigo_seguridad": "123456789",
+        "informacion_adicional": "Entrega en depósito & oficina",
+        "timbrado": {
+            "numero_timbrado": "12345678",
+            "establecimiento": "001",
+            "punto_expedicion": "001",
+            "numero_documento": "0000001",
+            "fecha_inicio_vigencia": "2025-01-01",
+        },
+        "emisor": {
+            "ruc": "80069563", "dv": "1", "razon_social": "EMPRESA <PRUEBA> S.A.",
+            "direccion": "Av. Principal", "numero_casa": "123",
+            "codigo_departamento": "11", "telefono": None,
+        },
+        "receptor": {"razon_social": "CLIENTE S.A.", "codigo_pais": "PRY"},
+        "items": [
+            {"descripcion": "Producto 1", "cantidad": Decimal("2"),
+             "precio_unitario": Decimal("1100"), "total_operacion": "2200",
+             "afectacion_iva": 1, "descripcion_afectacion_iva": "Gravado IVA",
+             "descuentos": [{"descripcion": "Promo", "porcentaje": "5", "monto": "110"}]},
+            {"descripcion": "Producto 2", "cantidad": 1, "precio_unitario": 500,
+             "tasa_iva": 10},
+        ],
+        "totales": {"total_operacion": "2700", "total_general": "2700",
+                    "total_iva": "245", "codigo_moneda": "PYG"},
+        "condiciones_pago": True,
+        "condiciones": {
+            "modalidad_venta": 2,
+            "cuotas": [{"modalidad": 1, "descripcion_modalidad": "Plazo", "plazo": "30 días"}],
+            "pagos_contado": [{"modalidad": 3, "descripcion": "Tarjeta", "monto": "2700",
+                               "datos_tarjeta": {"codigo_procesamiento": 1},
+                               "datos_cheque": None}],
+        },
+        "transporte": {"tipo_responsable": 1, "fecha_inicio_traslado": "2025-01-03",
+                       "distancia_km": 12},
+        "vehiculos": [{"tipo_vehiculo": 1, "numero_chapa": "ABC123"}],
+        "conductores": [{"nombre_conductor": "Juan Pérez", "telefono": "0981"}],
+        "datos_fe": {"indicador_entrega": 1, "usuario_responsable": "cajero"},
+        "extension_sectorial": {"tipo": "SUPERMERCADOS", "nombre_cajero": "Ana",
+                                "vuelto": "300"},
+        "datos_afe": {"naturaleza_vendedor": 1, "nombre_vendedor": "Vendedor",
+                      "email_vendedor": "v@mail.com"},
+        "documento_asociado": {"tipo_documento_ref": 1, "cdc_ref": CDC_PRUEBA,
+                               "numero_documento_ref": "0000001", "serie_ref": "AB"},
+        "datos_nce": {"motivo_emision": 1, "descripcion_motivo": "Devolución"},
+        "datos_nde": {"motivo_emision": 2, "tipo_cargo": 1},
+        "datos_nre": {"motivo_traslado": 1, "fecha_estimada_entrega": "2025-01-04"},
+    }
+
+
+@pytest.mark.parametrize("document_type", sorted(TEMPLATES_POR_TIPO))
+def test_salida_identica_a_templates(registry, builder, document_type):
+    """Test ambos motores producen el mismo XML canónico por tipo de documento"""
+    context = _contexto_completo()
+    context["tipo_documento"] = document_type
+
+    xml_jinja = registry.get_template(TEMPLATES_POR_TIPO[document_type]).render(**context)
+    tree = builder.build(context, document_type)
+
+    assert canonicalize_xml(tree) == canonicalize_xml(xml_jinja)
+
+
+@pytest.mark.parametrize("extras", [
+    {"include_signature": True, "include_qr": True, "codigo_qr": "https://qr",
+     "x509_issuer_name": "CN=PSC", "x509_serial_number": "42"},
+    {"extension_sectorial": {"tipo": "GASOLINERAS", "numero_surtidor": 3}},
+    {"extension_sectorial": {"tipo": "OTRO"}},
+])
+def test_firma_qr_y_extensiones(registry, builder, extras):
+    """Test bloques opcionales de base_document.xml y extensiones sectoriales"""
+    context = {**_contexto_completo(), **extras}
+
+    xml_jinja = registry.get_template("factura_electronica.xml").render(**context)
+
+    assert canonicalize_xml(builder.build(context, "1")) == canonicalize_xml(xml_jinja)
+
+
+def test_contenido_base_con_grupos_comunes(registry, builder):
+    """Test el bloque por defecto (emisor, receptor, items, totales) coincide"""
+    context = _contexto_completo()
+
+    xml_jinja = registry.get_template("base_document.xml").render(**context)
+
+    assert canonicalize_xml(builder.build(context, "0")) == canonicalize_xml(xml_jinja)
+
+
+def test_grupo_no_definido_es_error(builder):
+    """Test como en Jinja2, acceder a un grupo ausente del contexto falla"""
+    context = _contexto_completo()
+    del context["timbrado"]
+
+    with pytest.raises(ValueError, match="timbrado"):
+        builder.build(context, "1")
+
+
+def test_arbol_con_namespace_sifen(builder):
+    """Test el árbol generado es un rDE en el namespace SIFEN"""
+    root = builder.build(_contexto_completo(), "1")
+
+    assert root.tag == f"{{{SIFEN_NAMESPACE}}}rDE"
+    assert root.get("Id") == CDC_PRUEBA
+    assert root.find(f"{{{SIFEN_NAMESPACE}}}DE").get("Id") == CDC_PRUEBA
+
+
+# ===============================================
+# SELECCIÓN DE MOTOR EN XMLGenerator
+# ===============================================
+
+def _factura() -> FacturaSimple:
+    """Factura mínima válida con timbrado"""
+    contribuyente = Contribuyente(
+        ruc="80069563", dv="1", razon_social="EMPRESA DE PRUEBA S.A.",
+        direccion="Av. Principal", numero_casa="123", codigo_departamento="11",
+        codigo_ciudad="1", descripcion_ciudad="ASUNCION",
+        telefono="021123456", email="test@empresa.com"
+    )
+    return FacturaSimple(
+        numero_documento="001-001-0000001",
+        numero_timbrado="12345678",
+        emisor=contribuyente,
+        receptor=contribuyente,
+        items=[ItemFactura(codigo="P1", descripcion="Producto", cantidad=Decimal("1"),
+                           precio_unitario=Decimal("1100"), iva=Decimal("10"),
+                           monto_total=Decimal("1100"))],
+        total_gravada=Decimal("1000"),
+        total_iva=Decimal("100"),
+        total_general=Decimal("1100"),
+        fecha_emision=datetime(2025, 1, 2, 10, 0, 0),
+        csc="ABCD12345"
+    )
+
+
+@pytest.fixture
+def factura():
+    return _factura()
+
+
+@pytest.fixture
+def generator(registry, monkeypatch):
+    """Generador cuyo contexto incluye los grupos que exigen los templates"""
+    generator = XMLGenerator(registry=registry)
+    build_context = generator._build_document_context
+
+    def contexto_con_datos_fe(*args, **kwargs):
+        context = build_context(*args, **kwargs)
+        context.setdefault("datos_fe", {})
+        return context
+
+    monkeypatch.setattr(generator, "_build_document_context", contexto_con_datos_fe)
+    return generator
+
+
+def test_generate_document_xml_por_motor(generator, factura):
+    """Test generate_document_xml produce el mismo documento con ambos motores"""
+    xml_jinja = generator.generate_document_xml(factura, cdc=CDC_PRUEBA)
+    xml_lxml = generator.generate_document_xml(factura, cdc=CDC_PRUEBA, engine="lxml")
+
+    assert xml_lxml.startswith('<?xml version="1.0" encoding="UTF-8"?>')
+    assert canonicalize_xml(xml_lxml) == canonicalize_xml(xml_jinja)
+
+
+def test_generate_document_tree(generator, factura):
+    """Test generate_document_tree devuelve el árbol sin serializar"""
+    tree = generator.generate_document_tree(factura, cdc=CDC_PRUEBA)
+
+    assert isinstance(tree, etree._Element)
+    assert canonicalize_xml(tree) == canonicalize_xml(
+        generator.generate_document_xml(factura, cdc=CDC_PRUEBA))
+
+
+def test_motor_invalido():
+    """Test un motor desconocido se rechaza"""
+    with pytest.raises(ValueError):
+        XMLGenerator(engine="xslt")
@@ -0,0 +1,775 @@
+"""
+Motor de generación XML directo sobre lxml (sin templates de texto)
+
+Propósito:
+    Construir el documento SIFEN como árbol lxml.etree a partir del mismo
+    contexto que usa el motor Jinja2. El árbol se entrega tal cual a
+    XMLValidator.validate_xml() y XMLSigner.sign_xml(), de modo que el
+    documento no se serializa ni se vuelve a parsear hasta salir a la red.
+
+Equivalencia con los templates:
+    Cada método _grupo_* replica el partial homónimo de templates/ y
+    aplica las mismas reglas que Jinja2 en el render:
+    - `{{ campo | default(x) }}` usa x solo si el campo no está definido
+    - `{% if campo %}` evalúa la veracidad del valor
+    - acceder a un atributo de un valor no definido es un error
+    El resultado es idéntico al del motor Jinja2 en XML canónico (C14N);
+    solo difieren los espacios de indentación y los comentarios de los
+    templates. Un cambio en un template debe reflejarse aquí.
+
+Uso:
+    builder = XMLTreeBuilder()
+    root = builder.build(context, document_type="1")
+"""
+from collections.abc import Mapping
+from copy import deepcopy
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
+
+from lxml import etree
+
+from .fragment_cache import FragmentCache
+
+# Namespaces del documento electrónico
+SIFEN_NAMESPACE = "http://ekuatia.set.gov.py/sifen/xsd"
+XSI_NAMESPACE = "http://www.w3.org/2001/XMLSchema-instance"
+XMLDSIG_NAMESPACE = "http://www.w3.org/2000/09/xmldsig#"
+
+SCHEMA_LOCATION = f"{SIFEN_NAMESPACE} DE_v150.xsd"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+class _Undefined:
+    """Marca de valor ausente en el contexto (equivale a jinja2.Undefined)"""
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return "UNDEFINED"
+
+
+UNDEFINED = _Undefined()
+
+# Marca de campo opcional: solo se emite si el valor es verdadero
+OPTIONAL = object()
+
+
+class _Value:
+    """
+    Valor del contexto con la semántica de acceso de los templates
+    """
+    __slots__ = ("value", "name")
+
+    def __init__(self, value: Any, name: str):
+        self.value = value
+        self.name = name
+
+    def __getitem__(self, key: str) -> "_Value":
+        if self.value is UNDEFINED:
+            raise ValueError(f"'{self.name}' no está definido en el contexto")
+        if isinstance(self.value, Mapping):
+            child = self.value.get(key, UNDEFINED)
+        else:
+            child = getattr(self.value, key, UNDEFINED)
+        return _Value(child, f"{self.name}.{key}" if self.name else key)
+
+    def __bool__(self) -> bool:
+        return bool(self.value)
+
+    def __iter__(self) -> Iterator["_Value"]:
+        if self.value is UNDEFINED:
+            return
+        for index, entry in enumerate(self.value):
+            yield _Value(entry, f"{self.name}[{index}]")
+
+    def text(self, default: Any = UNDEFINED) -> str:
+        """Texto renderizado del valor ({{ valor | default(...) }})"""
+        value = default if self.value is UNDEFINED else self.value
+        return "" if value is UNDEFINED else str(value)
+
+
+class Repeat:
+    """Grupo repetido por cada elemento de una lista ({% for %})"""
+
+    def __init__(self, fields: Tuple):
+        self.fields = fields
+
+
+class Nested:
+    """Campos de un sub-objeto emitidos en el mismo grupo ({% if obj %})"""
+
+    def __init__(self, fields: Tuple):
+        self.fields = fields
+
+
+# ===============================================
+# DEFINICIÓN DE CAMPOS POR GRUPO
+# ===============================================
+# Cada campo es (tag, clave[, default]):
+#   - sin default: obligatorio, texto vacío si no está definido
+#   - OPTIONAL: se emite solo si el valor es verdadero
+#   - Repeat/Nested: sub-grupos
+#   - otro valor: obligatorio con default
+
+CAMPOS_OPERACION = (
+    ("iTipDE", "tipo_documento"),
+    ("dDesTipDE", "descripcion_tipo_documento"),
+    ("dFecEmiDE", "fecha_emision"),
+    ("dNumSer", "certificado_serie", OPTIONAL),
+    ("dEmiTer", "codigo_control_emision", OPTIONAL),
+)
+
+CAMPOS_TIMBRADO = (
+    ("iTiTim", "tipo", 1),
+    ("dDesTiTim", "descripcion_tipo", "Timbrado electrónico SET"),
+    ("dNumTim", "numero_timbrado"),
+    ("dEst", "establecimiento"),
+    ("dPunExp", "punto_expedicion"),
+    ("dNumDoc", "numero_documento"),
+    ("dPunExpDoc", "punto_expedicion_documento", OPTIONAL),
+    ("dFeIniT", "fecha_inicio_vigencia", OPTIONAL),
+    ("dFeFinT", "fecha_fin_vigencia", OPTIONAL),
+)
+
+CAMPOS_DATOS_GENERALES = (
+    ("dFeEmiDE", "fecha_emision"),
+    ("iTipEmi", "tipo_emision", 1),
+    ("dDesTipEmi", "descripcion_tipo_emision", "Normal"),
+    ("dCodSeg", "codigo_seguridad", OPTIONAL),
+    ("dInfoEmi", "informacion_adicional", OPTIONAL),
+    ("dInfoFisc", "informacion_fisco", OPTIONAL),
+)
+
+CAMPOS_EMISOR = (
+    ("dDVEmi", "dv"),
+    ("iTipCont", "tipo_contribuyente", 1),
+    ("dDesTipCont", "descripcion_tipo_contribuyente", "Persona física"),
+    ("dNomEmi", "razon_social"),
+    ("dNomFanEmi", "nombre_fantasia", OPTIONAL),
+    ("dDirEmi", "direccion"),
+    ("dNumCasEmi", "numero_casa", OPTIONAL),
+    ("dCompDir1", "complemento_direccion1", OPTIONAL),
+    ("dCompDir2", "complemento_direccion2", OPTIONAL),
+    ("cDepEmi", "codigo_departamento", OPTIONAL),
+    ("dDesDepEmi", "descripcion_departamento", OPTIONAL),
+    ("cDisEmi", "codigo_distrito", OPTIONAL),
+    ("dDesDisEmi", "descripcion_distrito", OPTIONAL),
+    ("cCiuEmi", "codigo_ciudad", OPTIONAL),
+    ("dDesCiuEmi", "descripcion_ciudad", OPTIONAL),
+    ("dTelEmi", "telefono", OPTIONAL),
+    ("dEmailE", "email", OPTIONAL),
+    ("dCodAcEco", "codigo_actividad_economica", OPTIONAL),
+    ("dDesAcEco", "descripcion_actividad_economica", OPTIONAL),
+)
+
+CAMPOS_RECEPTOR = (
+    ("iNatRec", "naturaleza", 1),
+    ("dDesNatRec", "descripcion_naturaleza", "No contribuyente"),
+    ("iTiOpe", "tipo_operacion", OPTIONAL),
+    ("dDesTiOpe", "descripcion_tipo_operacion", OPTIONAL),
+    ("cPaisRec", "codigo_pais", OPTIONAL),
+    ("dDesPaisRe", "descripcion_pais", OPTIONAL),
+    ("iTiContRec", "tipo_documento", OPTIONAL),
+    ("dDesTiConRec", "descripcion_tipo_documento", OPTIONAL),
+    ("dNumIDRec", "numero_documento", OPTIONAL),
+    ("dNomRec", "razon_social"),
+    ("dNomFanRec", "nombre_fantasia", OPTIONAL),
+    ("dDirRec", "direccion", OPTIONAL),
+    ("dNumCasRec", "numero_casa", OPTIONAL),
+    ("cDepRec", "codigo_departamento", OPTIONAL),
+    ("dDesDepRec", "descripcion_departamento", OPTIONAL),
+    ("cDisRec", "codigo_distrito", OPTIONAL),
+    ("dDesDisRec", "descripcion_distrito", OPTIONAL),
+    ("cCiuRec", "codigo_ciudad", OPTIONAL),
+    ("dDesCiuRec", "descripcion_ciudad", OPTIONAL),
+    ("dTelRec", "telefono", OPTIONAL),
+    ("dEmailRec", "email", OPTIONAL),
+)
+
+CAMPOS_ITEM = (
+    ("dCodInt", "codigo_interno", OPTIONAL),
+    ("dParAranc", "codigo_barras", OPTIONAL),
+    ("dNCM", "codigo_ncm", OPTIONAL),
+    ("dDncpE", "descripcion_ncm", OPTIONAL),
+    ("dGtin", "codigo_gtin", OPTIONAL),
+    ("dGtinPq", "codigo_gtin_receptor", OPTIONAL),
+    ("dDesProSer", "descripcion"),
+    ("cUniMed", "codigo_unidad_medida", OPTIONAL),
+    ("dDesUniMed", "descripcion_unidad_medida", "Unidad"),
+    ("dCantProSer", "cantidad"),
+    ("cPaisOrig", "codigo_pais_origen", OPTIONAL),
+    ("dDesPaisOrig", "descripcion_pais_origen", OPTIONAL),
+    ("dObsComItem", "observacion", OPTIONAL),
+    ("dNumSerie", "numero_serie", OPTIONAL),
+    ("dNumLote", "numero_lote", OPTIONAL),
+    ("dVencMerc", "fecha_vencimiento", OPTIONAL),
+    ("dNumSenacsa", "numero_senacsa", OPTIONAL),
+    ("dNumSenave", "numero_senave", OPTIONAL),
+    ("iTipOpItem", "tipo_item", OPTIONAL),
+    ("dDesTipOpItem", "descripcion_tipo_item", OPTIONAL),
+    ("dPUniProSer", "precio_unitario"),
+    ("dTiCamIt", "tipo_cambio", OPTIONAL),
+    ("dTotBruOpeItem", "total_descuento", OPTIONAL),
+    ("gCamDEsc", "descuentos", Repeat((
+        ("dDescdIt", "descripcion"),
+        ("dPorcDesIt", "porcentaje"),
+        ("dMontoDescIt", "monto"),
+    ))),
+    ("dTotOpeItem", "total_anticipo", OPTIONAL),
+    ("gCamAnt", "anticipos", Repeat((
+        ("dDesantIt", "descripcion"),
+        ("dPorcAntIt", "porcentaje"),
+        ("dMontoAntIt", "monto"),
+    ))),
+    ("dTotOpeIt", "total_operacion"),
+    ("iAfecIVA", "afectacion_iva"),
+    ("dDesAfecIVA", "descripcion_afectacion_iva"),
+    ("dPropIVA", "proporcion_gravada", OPTIONAL),
+    ("dTasaIVA", "tasa_iva", OPTIONAL),
+    ("dBasGravIVA", "base_gravable", OPTIONAL),
+    ("dLiqIVAItem", "liquidacion_iva", OPTIONAL),
+    ("dBasExe", "base_exenta", OPTIONAL),
+)
+
+CAMPOS_TOTALES = (
+    ("dSubGrav", "subtotal_gravado", OPTIONAL),
+    ("dSubNoGrav", "subtotal_no_gravado", OPTIONAL),
+    ("dSubExe", "subtotal_exento", OPTIONAL),
+    ("dSubExo", "subtotal_exportacion", OPTIONAL),
+    ("dTotDesc", "total_descuentos", OPTIONAL),
+    ("dTotAntGlobal", "total_anticipos", OPTIONAL),
+    ("dTotAnt", "total_anticipos_particulares", OPTIONAL),
+    ("dPagAnt", "pagos_anticipados", OPTIONAL),
+    ("dTotOpe", "total_operacion"),
+    ("dTotIVA", "total_iva", OPTIONAL),
+    ("dLiqTotIVA5", "liquidacion_iva_5", OPTIONAL),
+    ("dLiqTotIVA10", "liquidacion_iva_10", OPTIONAL),
+    ("dTotIEPS", "total_ieps", OPTIONAL),
+    ("dTotISC", "total_isc", OPTIONAL),
+    ("dTotOtros", "total_otros_tributos", OPTIONAL),
+    ("dIVAInc", "total_iva_incluido", OPTIONAL),
+    ("dTotGralOpe", "total_general"),
+    ("dTotGralOpeGs", "total_letras", OPTIONAL),
+    ("cMoneOpe", "codigo_moneda", OPTIONAL),
+    ("dDesMoneOpe", "descripcion_moneda", OPTIONAL),
+    ("dCondOpe", "condicion_operacion", OPTIONAL),
+    ("dTiCam", "tipo_cambio", OPTIONAL),
+    ("dTotGralOpeME", "total_moneda_extranjera", OPTIONAL),
+)
+
+CAMPOS_CONDICIONES = (
+    ("iFormCancPag", "modalidad_venta", OPTIONAL),
+    ("dDesFormCancPag", "descripcion_modalidad", OPTIONAL),
+    ("iTipOpeCred", "tipo_credito", OPTIONAL),
+    ("dDesTipOpeCred", "descripcion_credito", OPTIONAL),
+    ("dMonEnt", "monto_entrega_inicial", OPTIONAL),
+    ("gPagCred", "cuotas", Repeat((
+        ("iCondCred", "modalidad"),
+        ("dDesCondCred", "descripcion_modalidad"),
+        ("dPlazoCred", "plazo", OPTIONAL),
+        ("dCuotas", "numero_cuotas", OPTIONAL),
+        ("dMontoCuota", "monto_cuota", OPTIONAL),
+        ("dVencCuota", "fecha_vencimiento", OPTIONAL),
+    ))),
+    ("gPagCont", "pagos_contado", Repeat((
+        ("iTiPago", "modalidad"),
+        ("dDesTiPag", "descripcion"),
+        ("dMonTiPag", "monto"),
+        ("cMoneTiPag", "codigo_moneda", OPTIONAL),
+        ("dDeMoneTiPag", "descripcion_moneda", OPTIONAL),
+        ("dTiCamTiPag", "tipo_cambio", OPTIONAL),
+        (None, "datos_tarjeta", Nested((
+            ("iDenTarj", "codigo_procesamiento", OPTIONAL),
+            ("dDesDenTarj", "descripcion_procesamiento", OPTIONAL),
+            ("dRSeg", "ruc_procesador", OPTIONAL),
+            ("dDVSeg", "dv_procesador", OPTIONAL),
+            ("iCodAut", "codigo_autorizacion", OPTIONAL),
+            ("dCodAut", "codigo_seguridad", OPTIONAL),
+        ))),
+        (None, "datos_cheque", Nested((
+            ("dNumCheq", "numero", OPTIONAL),
+            ("dBcoEmiCheq", "banco", OPTIONAL),
+        ))),
+    ))),
+)
+
+CAMPOS_TRANSPORTE = (
+    ("iTipTrans", "tipo_responsable"),
+    ("dDesTipTrans", "descripcion_tipo_responsable"),
+    ("iModTrans", "modalidad_transporte"),
+    ("dDesModTrans", "descripcion_modalidad_transporte"),
+    ("iTipImpTrans", "tipo_transporte"),
+    ("dDesTipImpTrans", "descripcion_tipo_transporte"),
+    ("dFecEniTrans", "fecha_inicio_traslado"),
+    ("dFecFinTrans", "fecha_fin_traslado", OPTIONAL),
+    ("dDirLoc", "direccion_salida"),
+    ("dDirDes", "direccion_llegada"),
+    ("dObsTrans", "observaciones_transporte", OPTIONAL),
+    ("dKmTrans", "distancia_km", OPTIONAL),
+    ("dNumManif", "numero_manifiesto", OPTIONAL),
+    ("dNumCont", "numero_contenedor", OPTIONAL),
+)
+
+# Vehículos y conductores se leen del contexto raíz, no de transporte
+CAMPOS_TRANSPORTE_RAIZ = (
+    ("gCamVeh", "vehiculos", Repeat((
+        ("iTipVeh", "tipo_vehiculo"),
+        ("dDesTipVeh", "descripcion_tipo_vehiculo"),
+        ("dMarVeh", "marca", OPTIONAL),
+        ("dNumChapa", "numero_chapa"),
+        ("dNumSenacsa", "numero_senacsa", OPTIONAL),
+        ("dCapVeh", "capacidad_carga", OPTIONAL),
+        ("dObsVeh", "observaciones", OPTIONAL),
+    ))),
+    ("gCamCond", "conductores", Repeat((
+        ("iTipDocCond", "tipo_documento"),
+        ("dDesTipDocCond", "descripcion_tipo_documento"),
+        ("dNumDocCond", "numero_documento"),
+        ("dNomCond", "nombre_conductor"),
+        ("dNumLicCond", "numero_licencia"),
+        ("dTelCond", "telefono", OPTIONAL),
+        ("dDirCond", "direccion", OPTIONAL),
+    ))),
+)
+
+CAMPOS_QR = (
+    ("dCarQR", "codigo_qr", OPTIONAL),
+    ("dInfoAdicQR", "url_consulta", OPTIONAL),
+    ("dDatAdicQR", "datos_adicionales_qr", OPTIONAL),
+)
+
+CAMPOS_DOCUMENTO_ASOCIADO = (
+    ("iTipDocAso", "tipo_documento_ref"),
+    ("dDesTipDocAso", "descripcion_tipo_ref"),
+    ("dCDCREf", "cdc_ref"),
+    ("dNTimbre", "numero_timbrado_ref", OPTIONAL),
+    ("dEstDocAso", "establecimiento_ref", OPTIONAL),
+    ("dPExpDocAso", "punto_expedicion_ref", OPTIONAL),
+    ("dNumDocAso", "numero_documento_ref"),
+    ("dFecEmiDocAso", "fecha_documento_ref"),
+    ("dNumComRet", "numero_completo_ref", OPTIONAL),
+    ("dSerieNum", "serie_ref", OPTIONAL),
+)
+
+# === CAMPOS ESPECÍFICOS POR TIPO DE DOCUMENTO ===
+
+CAMPOS_FE = (
+    ("iIndPres", "indicador_presencia", 1),
+    ("dDesIndPres", "descripcion_presencia", "Operación presencial"),
+    ("iIndRec", "indicador_entrega", OPTIONAL),
+    ("dDesIndRec", "descripcion_entrega", OPTIONAL),
+    ("dUsRespDE", "usuario_responsable", OPTIONAL),
+    ("dInfoTrazabilidad", "informacion_trazabilidad", OPTIONAL),
+)
+
+# tipo de extensión -> (grupo, campos opcionales)
+EXTENSIONES_SECTORIALES = {
+    "SUPERMERCADOS": ("gSupermercados", (
+        ("dNomCaj", "nombre_cajero", OPTIONAL),
+        ("dEfectivo", "efectivo", OPTIONAL),
+        ("dVuelto", "vuelto", OPTIONAL),
+        ("dDonac", "donacion", OPTIONAL),
+        ("dDesDonac", "descripcion_donacion", OPTIONAL),
+    )),
+    "GASOLINERAS": ("gGasolineras", (
+        ("dNumSurt", "numero_surtidor", OPTIONAL),
+        ("dLectIni", "lectura_inicial", OPTIONAL),
+        ("dLectFin", "lectura_final", OPTIONAL),
+    )),
+    "SEGUROS": ("gSeguros", (
+        ("dNumPol", "numero_poliza", OPTIONAL),
+        ("dFecIniVig", "fecha_inicio_vigencia", OPTIONAL),
+        ("dFecFinVig", "fecha_fin_vigencia", OPTIONAL),
+    )),
+}
+
+CAMPOS_AFE = (
+    ("iNatVen", "naturaleza_vendedor"),
+    ("dDesNatVen", "descripcion_naturaleza_vendedor"),
+    ("iTipIDVen", "tipo_documento_vendedor"),
+    ("dDTipIDVen", "descripcion_tipo_documento_vendedor"),
+    ("dNumIDVen", "numero_documento_vendedor"),
+    ("dNomVen", "nombre_vendedor"),
+    ("dDirVen", "direccion_vendedor"),
+    ("dNumCasVen", "numero_casa_vendedor", OPTIONAL),
+    ("dCompDirVen1", "complemento_direccion1_vendedor", OPTIONAL),
+    ("dCompDirVen2", "complemento_direccion2_vendedor", OPTIONAL),
+    ("cDepVen", "codigo_departamento_vendedor"),
+    ("dDesDepVen", "descripcion_departamento_vendedor"),
+    ("cDisVen", "codigo_distrito_vendedor"),
+    ("dDesDisVen", "descripcion_distrito_vendedor"),
+    ("cCiuVen", "codigo_ciudad_vendedor"),
+    ("dDesCiuVen", "descripcion_ciudad_vendedor"),
+    ("dDirEmailVen", "email_vendedor", OPTIONAL),
+    ("cDepTrans", "codigo_departamento_transaccion"),
+    ("dDesDepTrans", "descripcion_departamento_transaccion"),
+    ("cDisTrans", "codigo_distrito_transaccion"),
+    ("dDesDisTrans", "descripcion_distrito_transaccion"),
+    ("cCiuTrans", "codigo_ciudad_transaccion"),
+    ("dDesCiuTrans", "descripcion_ciudad_transaccion"),
+)
+
+CAMPOS_NCE = (
+    ("iMotEmi", "motivo_emision"),
+    ("dDesMotEmi", "descripcion_motivo"),
+    ("dObsNCE", "observaciones_motivo", OPTIONAL),
+    ("dUsResp", "usuario_responsable", OPTIONAL),
+    ("dInfoTraz", "informacion_trazabilidad", OPTIONAL),
+)
+
+CAMPOS_NDE = (
+    ("iMotEmi", "motivo_emision"),
+    ("dDesMotEmi", "descripcion_motivo"),
+    ("dObsNDE", "observaciones_motivo", OPTIONAL),
+    ("dUsResp", "usuario_responsable", OPTIONAL),
+    ("dInfoTraz", "informacion_trazabilidad", OPTIONAL),
+    ("dFecVencCargo", "fecha_vencimiento_cargo", OPTIONAL),
+    ("iTipCargo", "tipo_cargo", OPTIONAL),
+    ("dDesTipCargo", "descripcion_tipo_cargo", OPTIONAL),
+)
+
+CAMPOS_NRE = (
+    ("iMotTras", "motivo_traslado"),
+    ("dDesMotTras", "descripcion_motivo"),
+    ("dObsTraslado", "observaciones_traslado", OPTIONAL),
+    ("dUsRespTraslado", "usuario_responsable", OPTIONAL),
+    ("dInfoTrazTraslado", "informacion_trazabilidad", OPTIONAL),
+    ("dFecEstEntrega", "fecha_estimada_entrega", OPTIONAL),
+    ("dNumOrdenTraslado", "numero_orden_traslado", OPTIONAL),
+    ("iTipOpLogistica", "tipo_operacion_logistica", OPTIONAL),
+    ("dDesTipOpLogistica", "descripcion_operacion_logistica", OPTIONAL),
+)
+
+
+def _tag(name: str, namespace: str = SIFEN_NAMESPACE) -> str:
+    """Nombre calificado de un elemento"""
+    return f"{{{namespace}}}{name}"
+
+
+class XMLTreeBuilder:
+    """
+    Construye documentos SIFEN v150 como árboles lxml
+
+    Recibe el contexto de XMLGenerator._build_document_context() y produce
+    la misma estructura que base_document.xml + template específico.
+    """
+
+    def __init__(self, fragment_cache: Optional[FragmentCache] = None):
+        """
+        Args:
+            fragment_cache: Cache de los sub-árboles gEmis/gTimb por
+                empresa. None construye siempre los grupos.
+        """
+        self.fragment_cache = fragment_cache
+        # Contenido de document_specific_content por tipo de documento.
+        # Los tipos sin template propio usan el bloque de base_document.xml
+        self.document_contents: Dict[str, Callable[[etree._Element, _Value], None]] = {
+            "1": self._contenido_factura,
+            "4": self._contenido_autofactura,
+            "5": self._contenido_nota_credito,
+            "6": self._contenido_nota_debito,
+            "7": self._contenido_nota_remision,
+        }
+
+    def build(self, context: Dict[str, Any], document_type: str) -> etree._Element:
+        """
+        Construye el árbol del documento
+
+        Args:
+            context: Contexto del documento (mismo que reciben los templates)
+            document_type: Código del tipo de documento
+
+        Returns:
+            etree._Element: Elemento raíz rDE
+
+        Raises:
+            ValueError: Si el documento accede a un grupo no definido
+        """
+        ctx = _Value(context, "")
+        cdc = ctx["cdc"].text()
+
+        root = etree.Element(
+            _tag("rDE"),
+            nsmap={None: SIFEN_NAMESPACE, "xsi": XSI_NAMESPACE}
+        )
+        root.set(_tag("schemaLocation", XSI_NAMESPACE), SCHEMA_LOCATION)
+        root.set("version", "1.5.0")
+        root.set("Id", cdc)
+
+        self._add(root, "dVerFor", ctx["version"], "150")
+        de = etree.SubElement(root, _tag("DE"))
+        de.set("Id", cdc)
+
+        self._add_fields(etree.SubElement(de, _tag("gOpeDE")), ctx, CAMPOS_OPERACION)
+        self._grupo_timbrado(de, ctx)
+        # _grupo_datos_generales.xml contiene el grupo dos veces
+        for _ in range(2):
+            self._add_fields(etree.SubElement(de, _tag("gDatGralOpe")), ctx,
+                             CAMPOS_DATOS_GENERALES)
+
+        content = self.document_contents.get(document_type, self._contenido_base)
+        content(de, ctx)
+
+        if ctx["include_signature"]:
+            self._grupo_firma(root, ctx)
+        if ctx["include_qr"] and (ctx["codigo_qr"] or ctx["url_consulta"]):
+            self._add_fields(etree.SubElement(root, _tag("gCamFuFD")), ctx, CAMPOS_QR)
+
+        return root
+
+    # ===============================================
+    # EMISIÓN DE CAMPOS
+    # ===============================================
+
+    def _add(self, parent: etree._Element, tag: str, value: _Value,
+             default: Any = UNDEFINED) -> etree._Element:
+        """Agrega un elemento hoja con el texto del valor"""
+        element = etree.SubElement(parent, _tag(tag))
+        element.text = value.text(default)
+        return element
+
+    def _add_fields(self, parent: etree._Element, source: _Value, fields: Tuple) -> None:
+        """Agrega los campos de un grupo en el orden definido"""
+        for field in fields:
+            tag, key = field[0], field[1]
+            spec = field[2] if len(field) > 2 else UNDEFINED
+            value = source[key]
+
+            if spec is OPTIONAL:
+                if value:
+                    self._add(parent, tag, value)
+            elif isinstance(spec, Repeat):
+                if value:
+                    for entry in value:
+                        self._add_fields(etree.SubElement(parent, _tag(tag)),
+                                         entry, spec.fields)
+            elif isinstance(spec, Nested):
+                if value:
+                    self._add_fields(parent, value, spec.fields)
+            else:
+                self._add(parent, tag, value, spec)
+
+    # ===============================================
+    # GRUPOS (equivalentes a templates/partials)
+    # ===============================================
+
+    def _cached_fragment(self, empresa: Any, group: str, data: Mapping[str, Any],
+                         build: Callable[[etree._Element], None],
+                         timbrado: Optional[str] = None) -> etree._Element:
+        """
+        Copia de un sub-árbol cacheado por empresa
+
+        El original queda en el cache; cada documento recibe su copia.
+        """
+        def factory() -> etree._Element:
+            holder = etree.Element(_tag("DE"), nsmap={None: SIFEN_NAMESPACE})
+            build(holder)
+            return holder[0]
+
+        fragment = self.fragment_cache.get_or_create(
+            str(empresa), (group, "lxml"), data, factory, timbrado=timbrado)
+        return deepcopy(fragment)
+
+    def _grupo_timbrado(self, parent: etree._Element, ctx: _Value) -> None:
+        """gTimb (_grupo_timbrado.xml)"""
+        timbrado = ctx["timbrado"]
+        if self.fragment_cache is None or not isinstance(timbrado.value, Mapping) \
+                or not isinstance(ctx["emisor"].value, Mapping):
+            self._add_fields(etree.SubElement(parent, _tag("gTimb")),
+                             timbrado, CAMPOS_TIMBRADO)
+            return
+
+        # dNumDoc cambia en cada documento: se completa sobre la copia
+        static = {key: value for key, value in timbrado.value.items()
+                  if key != "numero_documento"}
+        numero_timbrado = static.get("numero_timbrado")
+        group = self._cached_fragment(
+            ctx["emisor"].value.get("ruc"), "timbrado", static,
+            lambda holder: self._add_fields(
+                etree.SubElement(holder, _tag("gTimb")),
+                _Value(static, "timbrado"), CAMPOS_TIMBRADO),
+            timbrado=None if numero_timbrado is None else str(numero_timbrado))
+        group.find(_tag("dNumDoc")).text = timbrado["numero_documento"].text()
+        parent.append(group)
+
+    def _grupo_emisor(self, parent: etree._Element, emisor: _Value) -> None:
+        """gEmis (_grupo_emisor.xml)"""
+        def build(holder: etree._Element) -> None:
+            group = etree.SubElement(holder, _tag("gEmis"))
+            ruc = etree.SubElement(group, _tag("dRucEm"))
+            ruc.text = emisor["ruc"].text() + emisor["dv"].text()
+            self._add_fields(group, emisor, CAMPOS_EMISOR)
+
+        if self.fragment_cache is None or not isinstance(emisor.value, Mapping):
+            build(parent)
+            return
+        parent.append(self._cached_fragment(
+            emisor.value.get("ruc"), "emisor", emisor.value, build))
+
+    def _grupo_documento_asociado(self, parent: etree._Element, ctx: _Value) -> None:
+        """gDocAso (_documento_asociado.xml)"""
+        documento = ctx["documento_asociado"]
+        if documento:
+            self._add_fields(etree.SubElement(parent, _tag("gDocAso")),
+                             documento, CAMPOS_DOCUMENTO_ASOCIADO)
+
+    def _grupo_transporte(self, parent: etree._Element, ctx: _Value) -> None:
+        """gCamTrans (_grupo_transporte.xml)"""
+        transporte = ctx["transporte"]
+        if transporte:
+            group = etree.SubElement(parent, _tag("gCamTrans"))
+            self._add_fields(group, transporte, CAMPOS_TRANSPORTE)
+            self._add_fields(group, ctx, CAMPOS_TRANSPORTE_RAIZ)
+
+    def _grupo_firma(self, root: etree._Element, ctx: _Value) -> None:
+        """Signature con placeholders (bloque digital_signature)"""
+        def ds(parent: etree._Element, name: str, **attrib: str) -> etree._Element:
+            return etree.SubElement(parent, _tag(name, XMLDSIG_NAMESPACE), attrib)
+
+        signature = etree.SubElement(
+            root, _tag("Signature", XMLDSIG_NAMESPACE),
+            nsmap={None: XMLDSIG_NAMESPACE})
+        signed_info = ds(signature, "SignedInfo")
+        ds(signed_info, "CanonicalizationMethod",
+           Algorithm="http://www.w3.org/2001/10/xml-exc-c14n#")
+        ds(signed_info, "SignatureMethod",
+           Algorithm="http://www.w3.org/2001/04/xmldsig-more#rsa-sha256")
+        reference = ds(signed_info, "Reference", URI="#" + ctx["cdc"].text())
+        transforms = ds(reference, "Transforms")
+        ds(transforms, "Transform",
+           Algorithm="http://www.w3.org/2000/09/xmldsig#enveloped-signature")
+        ds(transforms, "Transform",
+           Algorithm="http://www.w3.org/2001/10/xml-exc-c14n#")
+        ds(reference, "DigestMethod",
+           Algorithm="http://www.w3.org/2001/04/xmlenc#sha256")
+        ds(reference, "DigestValue").text = \
+            ctx["digest_value"].text("[DIGEST_PLACEHOLDER]")
+        ds(signature, "SignatureValue").text = \
+            ctx["signature_value"].text("[SIGNATURE_PLACEHOLDER]")
+
+        x509_data = ds(ds(signature, "KeyInfo"), "X509Data")
+        ds(x509_data, "X509Certificate").text = \
+            ctx["x509_certificate"].text("[CERT_PLACEHOLDER]")
+        if ctx["x509_issuer_name"] and ctx["x509_serial_number"]:
+            issuer_serial = ds(x509_data, "X509IssuerSerial")
+            ds(issuer_serial, "X509IssuerName").text = ctx["x509_issuer_name"].text()
+            ds(issuer_serial, "X509SerialNumber").text = ctx["x509_serial_number"].text()
+
+    # ===============================================
+    # CONTENIDO ESPECÍFICO (block document_specific_content)
+    # ===============================================
+
+    def _contenido_base(self, de: etree._Element, ctx: _Value) -> None:
+        """Bloque por defecto de base_document.xml"""
+        etree.SubElement(de, _tag("gDtipDE"))
+        self._grupo_emisor(de, ctx["emisor"])
+        self._add_fields(etree.SubElement(de, _tag("gDatRec")),
+                         ctx["receptor"], CAMPOS_RECEPTOR)
+
+        if ctx["items"]:
+            for item in ctx["items"]:
+                self._add_fields(etree.SubElement(de, _tag("gCamItem")),
+                                 item, CAMPOS_ITEM)
+
+        # _grupo_totales.xml contiene el grupo dos veces
+        for _ in range(2):
+            self._add_fields(etree.SubElement(de, _tag("gTotSub")),
+                             ctx["totales"], CAMPOS_TOTALES)
+
+        if (ctx["condiciones_pago"] or ctx["forma_pago"]) and ctx["condiciones"]:
+            self._add_fields(etree.SubElement(de, _tag("gCamGen")),
+                             ctx["condiciones"], CAMPOS_CONDICIONES)
+
+        if ctx["tipo_documento"].value == "7" or ctx["transporte"]:
+            self._grupo_transporte(de, ctx)
+
+    def _contenido_factura(self, de: etree._Element, ctx: _Value) -> None:
+        """factura_electronica.xml"""
+        gdtip = etree.SubElement(de, _tag("gDtipDE"))
+        self._add_fields(etree.SubElement(gdtip, _tag("gCamFE")),
+                         ctx["datos_fe"], CAMPOS_FE)
+
+        extension = ctx["extension_sectorial"]
+        if extension:
+            group = etree.SubElement(de, _tag("gExtSec"))
+            tipo = extension["tipo"].value
+            if tipo in EXTENSIONES_SECTORIALES:
+                tag, fields = EXTENSIONES_SECTORIALES[tipo]
+                sector = etree.SubElement(group, _tag(tag), tipo=tipo)
+                meta = etree.SubElement(sector, _tag("gMetaExt"))
+                etree.SubElement(meta, _tag("dCodSector")).text = tipo
+                self._add(meta, "dVerExt", extension["version"], "1.0")
+                self._add(meta, "dEstExt", extension["estado"], "ACTIVA")
+                self._add_fields(sector, extension, fields)
+
+    def _contenido_autofactura(self, de: etree._Element, ctx: _Value) -> None:
+        """autofactura_electronica.xml"""
+        gdtip = etree.SubElement(de, _tag("gDtipDE"))
+        self._add_fields(etree.SubElement(gdtip, _tag("gCamAE")),
+                         ctx["datos_afe"], CAMPOS_AFE)
+
+    def _contenido_nota_credito(self, de: etree._Element, ctx: _Value) -> None:
+        """nota_credito_electronica.xml"""
+        self._grupo_documento_asociado(de, ctx)
+        gdtip = etree.SubElement(de, _tag("gDtipDE"))
+        self._add_fields(etree.SubElement(gdtip, _tag("gCamNCE")),
+                         ctx["datos_nce"], CAMPOS_NCE)
+
+    def _contenido_nota_debito(self, de: etree._Element, ctx: _Value) -> None:
+        """nota_debito_electronica.xml"""
+        self._grupo_documento_asociado(de, ctx)
+        gdtip = etree.SubElement(de, _tag("gDtipDE"))
+        self._add_fields(etree.SubElement(gdtip, _tag("gCamNDE")),
+                         ctx["datos_nde"], CAMPOS_NDE)
+
+    def _contenido_nota_remision(self, de: etree._Element, ctx: _Value) -> None:
+        """nota_remision_electronica.xml"""
+        gdtip = etree.SubElement(de, _tag("gDtipDE"))
+        self._add_fields(etree.SubElement(gdtip, _tag("gCamNRE")),
+                         ctx["datos_nre"], CAMPOS_NRE)
+
+
+# ===============================================
+# UTILIDADES
+# ===============================================
+
+def serialize_tree(root: etree._Element) -> str:
+    """
+    Serializa el árbol con la misma declaración XML que los templates
+
+    Args:
+        root: Elemento raíz rDE
+
+    Returns:
+        str: Documento XML
+    """
+    return XML_DECLARATION + etree.tostring(root, encoding="unicode")
+
+
+def canonicalize_xml(xml: Union[str, bytes, etree._Element]) -> bytes:
+    """
+    Forma canónica (C14N) de un documento para comparar ambos motores
+
+    Descarta espacios de indentación (y antes de la declaración XML) y
+    comentarios, que dependen del formato de los templates y no del
+    contenido. Un texto formado solo por espacios se trata como vacío.
+
+    Args:
+        xml: Documento como texto, bytes o árbol lxml
+
+    Returns:
+        bytes: XML canónico
+    """
+    if isinstance(xml, etree._Element):
+        xml = etree.tostring(xml)
+    elif isinstance(xml, str):
+        xml = xml.encode("utf-8")
+    xml = xml.lstrip()
+
+    parser = etree.XMLParser(remove_blank_text=True, remove_comments=True)
+    root = etree.fromstring(xml, parser)
+    # remove_blank_text conserva el espacio de grupos vacíos (<gDtipDE>)
+    for element in root.iter():
+        if element.text is not None and not element.text.strip():
+            element.text = None
+    return etree.tostring(root, method="c14n")
@@ -2,9 +2,13 @@
 Validador XML para documentos SIFEN
 """
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
+from typing import Iterable, Iterator, List, Tuple, Dict, Optional, Union, TYPE_CHECKING
 from lxml import etree
 from .config import SCHEMAS_DIR
+from .schema_registry import get_schema_registry
+
+if TYPE_CHECKING:
+    from .batch_validation import XMLValidationResult
 
 
 class SifenValidationError(Exception):
@@ -17,16 +21,24 @@ class SifenValidationError(Exception):
 
 
 class XMLValidator:
-    def __init__(self):
-        self.schema_path = SCHEMAS_DIR / "v150" / "DE_v150.xsd"
-        self.schema = self._load_schema()
+    def __init__(self, schema_path: Optional[Path] = None):
+        """
+        Args:
+            schema_path: XSD contra el que se valida. Por defecto DE_v150.xsd
+        """
+        self.schema_path = Path(schema_path) if schema_path else SCHEMAS_DIR / "v150" / "DE_v150.xsd"
+        # Falla al instanciar si el XSD no compila, como antes del registro
+        self._load_schema()
         self._error_mappings = self._load_error_mappings()
 
+    @property
+    def schema(self) -> etree.XMLSchema:
+        """Esquema compilado del thread actual (registro compartido del proceso)"""
+        return self._load_schema()
+
     def _load_schema(self) -> etree.XMLSchema:
-        """Carga el esquema XSD"""
-        parser = etree.XMLParser(remove_blank_text=True)
-        schema_doc = etree.parse(str(self.schema_path), parser)
-        return etree.XMLSchema(schema_doc)
+        """Obtiene el esquema XSD del registro, compilándolo solo la primera vez"""
+        return get_schema_registry().get_schema(self.schema_path)
 
     def _load_error_mappings(self) -> Dict[str, str]:
         """Carga mapeo de errores comunes de SIFEN"""
@@ -51,35 +63,79 @@ class XMLValidator:
 
         return f"Línea {error.line}: {error_msg}"
 
-    def validate_xml(self, xml_content: str) -> Tuple[bool, List[str]]:
+    def validate_xml(self,
+                     xml_content: Union[str, bytes, etree._Element],
+                     max_errors: Optional[int] = None) -> Tuple[bool, List[str]]:
         """
         Valida un documento XML contra el esquema XSD de SIFEN
 
         Args:
-            xml_content: Contenido XML a validar
+            xml_content: Contenido XML a validar, o el árbol lxml generado
+                por el motor lxml (se valida sin serializar ni reparsear)
+            max_errors: Máximo de errores formateados a devolver. Si se
+                supera, el último elemento indica cuántos se omitieron
 
         Returns:
             Tuple[bool, List[str]]: (es_válido, lista_de_errores)
         """
         try:
-            # Parsear el XML
-            parser = etree.XMLParser(remove_blank_text=True)
-            xml_doc = etree.fromstring(xml_content.encode('utf-8'), parser)
+            if isinstance(xml_content, etree._Element):
+                xml_doc = xml_content
+            else:
+                # Parsear el XML
+                if isinstance(xml_content, str):
+                    xml_content = xml_content.encode('utf-8')
+                parser = etree.XMLParser(remove_blank_text=True)
+                xml_doc = etree.fromstring(xml_content, parser)
 
             # Validar contra el esquema
-            is_valid = self.schema.validate(xml_doc)
+            schema = self.schema
+            is_valid = schema.validate(xml_doc)
 
             if is_valid:
                 return True, []
 
             # Si no es válido, recolectar errores
+            error_log = schema.error_log
+            if max_errors is None or len(error_log) <= max_errors:
+                return False, [self._format_error(error) for error in error_log]
+
             errors = [self._format_error(error)
-                      for error in self.schema.error_log]
+                      for _, error in zip(range(max_errors), error_log)]
+            errors.append(f"... {len(error_log) - max_errors} errores adicionales omitidos")
             return False, errors
 
         except etree.XMLSyntaxError as e:
             raise SifenValidationError(f"Error de sintaxis XML: {str(e)}")
 
+    def validate_many(self,
+                      xml_iterable: Iterable[Union[str, bytes]],
+                      workers: Optional[int] = None,
+                      chunk_size: int = 50,
+                      ordered: bool = True,
+                      fail_fast: bool = False,
+                      max_errors: Optional[int] = 50) -> Iterator["XMLValidationResult"]:
+        """
+        Valida un lote de documentos XML sobre un pool de procesos
+
+        Cada worker compila el esquema una sola vez. Los resultados se
+        entregan a medida que están disponibles, sin materializar el lote.
+
+        Args:
+            xml_iterable: Iterable de documentos XML (str o bytes)
+            workers: Procesos worker (None = todos los núcleos, 1 = sin pool)
+            chunk_size: Documentos enviados a un worker por vez
+            ordered: Entregar en orden de entrada (True) o al completarse (False)
+            fail_fast: Detener el lote en el primer documento inválido
+            max_errors: Máximo de errores por documento (None = sin límite)
+
+        Returns:
+            Iterator[XMLValidationResult]: Tuplas (index, is_valid, errors)
+        """
+        from .batch_validation import validate_many
+        return validate_many(self, xml_iterable, workers=workers, chunk_size=chunk_size,
+                             ordered=ordered, fail_fast=fail_fast, max_errors=max_errors)
+
     def validate_ruc(self, ruc: str) -> bool:
         """
         Valida formato de RUC
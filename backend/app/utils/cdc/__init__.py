@@ -11,6 +11,7 @@ ARQUITECTURA MODULAR:
 ├── validator.py    - Validación completa de CDCs
 ├── components.py   - Extracción y manejo de componentes
 ├── utils.py        - Utilidades de formateo y presentación
+├── batch.py        - Cálculo y validación vectorizada por lotes (numpy)
 └── testing.py      - Funciones de testing y debugging (TODO)
 
 CARACTERÍSTICAS PRINCIPALES:
@@ -80,6 +81,7 @@ from .types import (
     # Enumeraciones
     TipoDocumento,
     TipoEmision,
+    TipoContribuyente,
 
     # Clases de datos
     CdcComponents,
@@ -98,6 +100,7 @@ from .types import (
 from .generator import (
     # Función principal
     generate_cdc,
+    generate_cdc_range,
 
     # Funciones auxiliares
     calculate_cdc_dv,
@@ -148,6 +151,14 @@ from .utils import (
     validate_and_format_cdc_list,
 )
 
+# Procesamiento vectorizado (requiere numpy al usarse)
+from .batch import (
+    CdcBatchValidation,
+    cdc_digit_matrix,
+    calculate_cdc_dv_array,
+    validate_cdc_array,
+)
+
 
 # ===================================================================
 # INFORMACIÓN DEL MÓDULO
@@ -170,6 +181,7 @@ __module_info__ = {
         "validator": "Validación completa de CDCs",
         "components": "Extracción y manejo de componentes",
         "utils": "Utilidades de formateo y presentación",
+        "batch": "Cálculo y validación vectorizada por lotes",
         "testing": "Funciones de testing (TODO)"
     },
     "features": [
@@ -209,7 +221,7 @@ def get_module_status() -> dict:
         'generator': {
             'status': 'implemented',
             'version': '1.0.0',
-            'functions': ['generate_cdc', 'calculate_cdc_dv', 'generate_security_code'],
+            'functions': ['generate_cdc', 'generate_cdc_range', 'calculate_cdc_dv', 'generate_security_code'],
             'description': 'Generación completa de CDCs con validación'
         },
         'validator': {
@@ -230,6 +242,12 @@ def get_module_status() -> dict:
             'functions': ['format_cdc_display', 'get_cdc_info', 'create_cdc_report'],
             'description': 'Utilidades de formateo y presentación'
         },
+        'batch': {
+            'status': 'implemented',
+            'version': '1.0.0',
+            'functions': ['calculate_cdc_dv_array', 'validate_cdc_array', 'cdc_digit_matrix'],
+            'description': 'Cálculo y validación vectorizada de CDCs (numpy)'
+        },
         'testing': {
             'status': 'pending',
             'priority': 'low',
@@ -426,6 +444,7 @@ __all__ = [
     # Enumeraciones
     'TipoDocumento',
     'TipoEmision',
+    'TipoContribuyente',
 
     # Clases de datos
     'CdcComponents',
@@ -440,6 +459,7 @@ __all__ = [
     'extract_cdc_components',
 
     # Funciones auxiliares de generación
+    'generate_cdc_range',
     'calculate_cdc_dv',
     'generate_security_code',
 
@@ -452,6 +472,12 @@ __all__ = [
     'validate_cdc_batch',
     'get_cdc_statistics',
 
+    # Funciones vectorizadas por lotes
+    'CdcBatchValidation',
+    'cdc_digit_matrix',
+    'calculate_cdc_dv_array',
+    'validate_cdc_array',
+
     # Funciones de utilidades
     'format_cdc_display',
     'get_cdc_info',
@@ -0,0 +1,306 @@
+"""
+Cálculo y validación vectorizada de CDCs por lotes (NumPy).
+
+Este módulo procesa millones de CDCs (conciliaciones, auditorías) sin
+iterar en Python por CDC: los CDCs se convierten en una matriz de dígitos
+y los dígitos verificadores se calculan con un único producto matricial.
+
+RESPONSABILIDADES:
+- Convertir listas de CDCs (43 o 44 dígitos) en matrices de dígitos
+- Calcular DVs módulo 11 para todas las filas a la vez
+- Validar RUC, tipo de documento, fecha y tipo de emisión como máscaras
+- Devolver resultados como arrays alineados con la entrada
+
+DEPENDENCIAS:
+- numpy (opcional): sin numpy las funciones lanzan ImportError; el resto
+  del módulo CDC sigue funcionando
+- types.py: Longitudes de componentes, factores y catálogos
+- ../ruc_utils.py: Factores y RUCs reservados del DV de RUC
+
+Las reglas son las mismas que validate_cdc y calculate_cdc_dv: factores
+cíclicos de izquierda a derecha y DV en el último dígito del CDC.
+
+Autor: Sistema de Gestión de Documentos
+Versión: 1.0.0
+Fecha: 2025-07-01
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy es opcional
+    np = None
+
+from .types import (
+    TipoDocumento,
+    TipoEmision,
+    CdcErrorCode,
+    CDC_LENGTH,
+    CDC_COMPONENT_LENGTHS,
+    CDC_MODULO_11_BASE_FACTORS,
+)
+from ..ruc_utils import MODULO_11_FACTORS, INVALID_RUCS
+
+
+# ===================================================================
+# POSICIONES DE COMPONENTES
+# ===================================================================
+
+def _component_slices() -> Dict[str, slice]:
+    """Posición de cada componente según CDC_COMPONENT_LENGTHS."""
+    slices = {}
+    pos = 0
+    for name, length in CDC_COMPONENT_LENGTHS.items():
+        slices[name] = slice(pos, pos + length)
+        pos += length
+    return slices
+
+
+_SLICES = _component_slices()
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "La validación CDC por lotes requiere numpy (pip install numpy)")
+
+
+def _weights(factors: Sequence[int], length: int) -> "np.ndarray":
+    """Factores cíclicos para una fila de `length` dígitos."""
+    return np.array([factors[i % len(factors)] for i in range(length)], dtype=np.uint16)
+
+
+def _to_int(digits: "np.ndarray") -> "np.ndarray":
+    """Interpreta cada fila de dígitos como un entero decimal."""
+    powers = 10 ** np.arange(digits.shape[1] - 1, -1, -1, dtype=np.int64)
+    return digits.astype(np.int64) @ powers
+
+
+def _mod11_dv(digits: "np.ndarray", factors: Sequence[int]) -> "np.ndarray":
+    """DV módulo 11 de cada fila (reglas SET: resto < 2 -> 0)."""
+    total = digits.astype(np.uint16) @ _weights(factors, digits.shape[1])
+    remainder = total % 11
+    return np.where(remainder < 2, 0, 11 - remainder).astype(np.int8)
+
+
+# ===================================================================
+# MATRIZ DE DÍGITOS
+# ===================================================================
+
+def _digit_matrix(cdcs: Sequence[Any], length: int):
+    """Matriz de dígitos más máscaras de tipo, longitud y formato."""
+    _require_numpy()
+
+    # Como validate_cdc: la cadena vacía cuenta como tipo inválido
+    is_str = np.fromiter((isinstance(cdc, str) and cdc != "" for cdc in cdcs),
+                         dtype=bool, count=len(cdcs))
+    values = [cdc if ok else "" for cdc, ok in zip(cdcs, is_str)]
+    length_ok = np.fromiter(map(len, values), dtype=np.int64, count=len(values)) == length
+
+    try:
+        codes = np.array(values, dtype=f"S{length}").view(np.uint8)
+    except UnicodeEncodeError:
+        codes = np.array(values, dtype=f"U{length}").view(np.uint32)
+    codes = codes.reshape(len(values), length)
+
+    # El padding (\0) y cualquier no-dígito quedan fuera de 0..9
+    digits = (codes - ord("0")).astype(np.uint8, copy=False)
+    in_range = (codes >= ord("0")) & (codes <= ord("9"))
+    well_formed = is_str & length_ok & in_range.all(axis=1)
+    digits[~well_formed] = 0
+    return digits, is_str, length_ok, well_formed
+
+
+def cdc_digit_matrix(cdcs: Sequence[Any], length: int = CDC_LENGTH) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Convierte CDCs en una matriz de dígitos.
+
+    Args:
+        cdcs: CDCs (strings); valores que no son string cuentan como mal formados
+        length: Dígitos esperados por CDC (44, o 43 sin DV)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Matriz uint8 (n, length) con los dígitos
+        (ceros en filas mal formadas) y máscara de filas bien formadas
+
+    Raises:
+        ImportError: Si numpy no está instalado
+    """
+    digits, _, _, well_formed = _digit_matrix(cdcs, length)
+    return digits, well_formed
+
+
+# ===================================================================
+# CÁLCULO DE DV
+# ===================================================================
+
+def calculate_cdc_dv_array(cdcs_sin_dv: Sequence[Any]) -> "np.ndarray":
+    """
+    Calcula el DV de muchos CDCs sin dígito verificador.
+
+    Equivalente vectorizado de calculate_cdc_dv.
+
+    Args:
+        cdcs_sin_dv: CDCs de 43 dígitos
+
+    Returns:
+        np.ndarray: DV por CDC (int8); -1 en entradas mal formadas
+
+    Examples:
+        >>> dvs = calculate_cdc_dv_array(["0123456789012345678901234567890123456789012"])
+    """
+    digits, well_formed = cdc_digit_matrix(cdcs_sin_dv, CDC_LENGTH - 1)
+    return np.where(well_formed, _mod11_dv(digits, CDC_MODULO_11_BASE_FACTORS), -1).astype(np.int8)
+
+
+# ===================================================================
+# VALIDACIÓN POR LOTES
+# ===================================================================
+
+@dataclass
+class CdcBatchValidation:
+    """
+    Resultado de validar un lote de CDCs; cada campo es un array de
+    longitud n alineado con la entrada.
+    """
+    is_valid: "np.ndarray"
+    is_string: "np.ndarray"
+    length_valid: "np.ndarray"
+    well_formed: "np.ndarray"
+    ruc_valid: "np.ndarray"
+    tipo_valid: "np.ndarray"
+    fecha_valid: "np.ndarray"
+    emision_valid: "np.ndarray"
+    dv_valid: "np.ndarray"
+    expected_dv: "np.ndarray"
+
+    def __len__(self) -> int:
+        return len(self.is_valid)
+
+    def error_codes(self) -> "np.ndarray":
+        """
+        Código de error por CDC (None si es válido), con la misma
+        precedencia que validate_cdc.
+        """
+        conditions = [
+            ~self.is_string,
+            ~self.length_valid,
+            ~self.well_formed,
+            ~self.ruc_valid,
+            ~self.tipo_valid,
+            ~self.fecha_valid,
+            ~self.emision_valid,
+            ~self.dv_valid,
+        ]
+        codes = [
+            CdcErrorCode.INVALID_TYPE,
+            CdcErrorCode.INVALID_LENGTH,
+            CdcErrorCode.INVALID_FORMAT,
+            CdcErrorCode.INVALID_RUC_IN_CDC,
+            CdcErrorCode.INVALID_DOCUMENT_TYPE,
+            CdcErrorCode.INVALID_DATE_FORMAT,
+            CdcErrorCode.INVALID_EMISSION_TYPE,
+            CdcErrorCode.INVALID_CDC_DV,
+        ]
+        return np.select(conditions, np.array(codes, dtype=object), default=None)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totales del lote y conteo por código de error."""
+        codes, counts = np.unique(self.error_codes()[~self.is_valid].astype(str),
+                                  return_counts=True)
+        valid = int(self.is_valid.sum())
+        return {
+            'total': len(self),
+            'valid': valid,
+            'invalid': len(self) - valid,
+            'error_summary': dict(zip(codes.tolist(), counts.tolist())),
+        }
+
+
+def _fecha_mask(digits: "np.ndarray") -> "np.ndarray":
+    """Fechas YYYYMMDD válidas (mismo rango que _validate_fecha_format)."""
+    fecha = digits[:, _SLICES['fecha']]
+    year = _to_int(fecha[:, :4])
+    month = _to_int(fecha[:, 4:6])
+    day = _to_int(fecha[:, 6:8])
+
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_days = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    valid_month = (month >= 1) & (month <= 12)
+    max_day = month_days[np.where(valid_month, month, 0)] + ((month == 2) & leap)
+
+    return ((year >= 1900) & (year <= 2100) & valid_month
+            & (day >= 1) & (day <= max_day))
+
+
+def validate_cdc_array(cdcs: Sequence[Any]) -> CdcBatchValidation:
+    """
+    Valida muchos CDCs de 44 dígitos con operaciones vectorizadas.
+
+    Equivalente por lotes de validate_cdc: formato, RUC y su DV, tipo de
+    documento, fecha, tipo de emisión y DV del CDC, cada uno como máscara.
+
+    Args:
+        cdcs: CDCs a validar
+
+    Returns:
+        CdcBatchValidation: Máscaras por regla y DV esperado por CDC
+
+    Raises:
+        ImportError: Si numpy no está instalado
+
+    Examples:
+        >>> result = validate_cdc_array(cdcs)
+        >>> invalidos = np.flatnonzero(~result.is_valid)
+    """
+    digits, is_string, length_valid, well_formed = _digit_matrix(cdcs, CDC_LENGTH)
+
+    # RUC: base no reservada y DV módulo 11
+    ruc = digits[:, _SLICES['ruc']]
+    invalid_rucs = np.array(sorted(int(r) for r in INVALID_RUCS), dtype=np.int64)
+    ruc_valid = (~np.isin(_to_int(ruc), invalid_rucs)
+                 & (_mod11_dv(ruc, MODULO_11_FACTORS) == digits[:, _SLICES['dv_ruc']][:, 0]))
+
+    tipos = np.array([int(c) for c in TipoDocumento.get_all_codes()])
+    tipo_valid = np.isin(_to_int(digits[:, _SLICES['tipo']]), tipos)
+
+    emisiones = np.array([int(c) for c in TipoEmision.get_all_codes()])
+    emision_valid = np.isin(digits[:, _SLICES['emision']][:, 0], emisiones)
+
+    fecha_valid = _fecha_mask(digits)
+
+    expected_dv = _mod11_dv(digits[:, :CDC_LENGTH - 1], CDC_MODULO_11_BASE_FACTORS)
+    dv_valid = expected_dv == digits[:, CDC_LENGTH - 1]
+
+    ruc_valid &= well_formed
+    tipo_valid &= well_formed
+    fecha_valid &= well_formed
+    emision_valid &= well_formed
+    dv_valid &= well_formed
+
+    return CdcBatchValidation(
+        is_valid=ruc_valid & tipo_valid & fecha_valid & emision_valid & dv_valid,
+        is_string=is_string,
+        length_valid=length_valid & is_string,
+        well_formed=well_formed,
+        ruc_valid=ruc_valid,
+        tipo_valid=tipo_valid,
+        fecha_valid=fecha_valid,
+        emision_valid=emision_valid,
+        dv_valid=dv_valid,
+        expected_dv=np.where(well_formed, expected_dv, -1).astype(np.int8),
+    )
+
+
+# ===================================================================
+# CONSTANTES PARA EXPORT
+# ===================================================================
+
+__all__ = [
+    'CdcBatchValidation',
+    'cdc_digit_matrix',
+    'calculate_cdc_dv_array',
+    'validate_cdc_array',
+]
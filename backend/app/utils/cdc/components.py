@@ -91,6 +91,10 @@ def extract_cdc_components(cdc: str) -> CdcComponents:
     numero_documento = cdc[pos:pos + CDC_COMPONENT_LENGTHS['num']]
     pos += CDC_COMPONENT_LENGTHS['num']
 
+    # Tipo de contribuyente (1 dígito)
+    tipo_contribuyente = cdc[pos:pos + CDC_COMPONENT_LENGTHS['contribuyente']]
+    pos += CDC_COMPONENT_LENGTHS['contribuyente']
+
     # Fecha de emisión (8 dígitos)
     fecha_emision = cdc[pos:pos + CDC_COMPONENT_LENGTHS['fecha']]
     pos += CDC_COMPONENT_LENGTHS['fecha']
@@ -113,6 +117,7 @@ def extract_cdc_components(cdc: str) -> CdcComponents:
         establecimiento=establecimiento,
         punto_expedicion=punto_expedicion,
         numero_documento=numero_documento,
+        tipo_contribuyente=tipo_contribuyente,
         fecha_emision=fecha_emision,
         tipo_emision=tipo_emision,
         codigo_seguridad=codigo_seguridad,
@@ -145,7 +150,7 @@ def reconstruct_cdc(components: CdcComponents) -> str:
     return components.to_cdc()
 
 
-def extract_cdc_parts(cdc: str) -> Tuple[str, str, str, str, str, str, str, str, str, str]:
+def extract_cdc_parts(cdc: str) -> Tuple[str, str, str, str, str, str, str, str, str, str, str]:
     """
     Extrae los componentes de un CDC como tupla.
 
@@ -156,11 +161,11 @@ def extract_cdc_parts(cdc: str) -> Tuple[str, str, str, str, str, str, str, str,
         cdc: CDC de 44 dígitos
 
     Returns:
-        Tuple con los 10 componentes del CDC
+        Tuple con los 11 componentes del CDC
 
     Examples:
         >>> parts = extract_cdc_parts("01234567890123456789012345678901234567890123")
-        >>> ruc_emisor, dv_ruc, tipo_doc, est, pe, num, fecha, emision, seg, dv = parts
+        >>> ruc_emisor, dv_ruc, tipo_doc, est, pe, num, contrib, fecha, emision, seg, dv = parts
     """
     components = extract_cdc_components(cdc)
 
@@ -171,6 +176,7 @@ def extract_cdc_parts(cdc: str) -> Tuple[str, str, str, str, str, str, str, str,
         components.establecimiento,
         components.punto_expedicion,
         components.numero_documento,
+        components.tipo_contribuyente,
         components.fecha_emision,
         components.tipo_emision,
         components.codigo_seguridad,
@@ -206,6 +212,7 @@ def get_component_info(cdc: str, component_name: str) -> str:
         'establecimiento': components.establecimiento,
         'punto_expedicion': components.punto_expedicion,
         'numero_documento': components.numero_documento,
+        'tipo_contribuyente': components.tipo_contribuyente,
         'fecha_emision': components.fecha_emision,
         'tipo_emision': components.tipo_emision,
         'codigo_seguridad': components.codigo_seguridad,
@@ -243,6 +250,7 @@ def validate_component_lengths(components: CdcComponents) -> Dict[str, bool]:
         'establecimiento': len(components.establecimiento) == CDC_COMPONENT_LENGTHS['est'],
         'punto_expedicion': len(components.punto_expedicion) == CDC_COMPONENT_LENGTHS['pe'],
         'numero_documento': len(components.numero_documento) == CDC_COMPONENT_LENGTHS['num'],
+        'tipo_contribuyente': len(components.tipo_contribuyente) == CDC_COMPONENT_LENGTHS['contribuyente'],
         'fecha_emision': len(components.fecha_emision) == CDC_COMPONENT_LENGTHS['fecha'],
         'tipo_emision': len(components.tipo_emision) == CDC_COMPONENT_LENGTHS['emision'],
         'codigo_seguridad': len(components.codigo_seguridad) == CDC_COMPONENT_LENGTHS['seguridad'],
@@ -335,6 +343,7 @@ def compare_components(components1: CdcComponents, components2: CdcComponents) -
         'establecimiento': components1.establecimiento == components2.establecimiento,
         'punto_expedicion': components1.punto_expedicion == components2.punto_expedicion,
         'numero_documento': components1.numero_documento == components2.numero_documento,
+        'tipo_contribuyente': components1.tipo_contribuyente == components2.tipo_contribuyente,
         'fecha_emision': components1.fecha_emision == components2.fecha_emision,
         'tipo_emision': components1.tipo_emision == components2.tipo_emision,
         'codigo_seguridad': components1.codigo_seguridad == components2.codigo_seguridad,
@@ -7,6 +7,7 @@ generación, delegando validación y utilidades a otros módulos.
 
 RESPONSABILIDADES:
 - Generar CDCs completos a partir de parámetros
+- Generar CDCs para rangos de números pre-asignados
 - Formatear y validar componentes individuales
 - Calcular dígitos verificadores
 - Generar códigos de seguridad
@@ -22,8 +23,9 @@ Fecha: 2025-07-01
 
 import re
 import secrets
+from array import array
 from datetime import datetime, date
-from typing import Union
+from typing import List, Union
 
 # Imports locales del módulo CDC
 from .types import (
@@ -31,6 +33,7 @@ from .types import (
     CdcComponents,
     TipoDocumento,
     TipoEmision,
+    TipoContribuyente,
     CDC_LENGTH,
     CDC_COMPONENT_LENGTHS,
     CDC_MODULO_11_BASE_FACTORS,
@@ -82,23 +85,12 @@ def generate_cdc(request: CdcGenerationRequest) -> str:
     if basic_errors:
         raise ValueError(f"Parámetros inválidos: {', '.join(basic_errors)}")
 
-    # Validar y normalizar RUC emisor
-    ruc_result = validate_ruc_complete(request.ruc_emisor)
-    if not ruc_result.is_valid:
-        raise ValueError(f"RUC emisor inválido: {ruc_result.error_message}")
-
-    # Validar tipo de documento
-    if not TipoDocumento.is_valid(request.tipo_documento):
-        raise ValueError(
-            f"Tipo de documento inválido: {request.tipo_documento}")
-
-    # Validar y formatear componentes
-    establecimiento = _format_numeric_component(
-        request.establecimiento, CDC_COMPONENT_LENGTHS['est'], "establecimiento"
-    )
-
-    punto_expedicion = _format_numeric_component(
-        request.punto_expedicion, CDC_COMPONENT_LENGTHS['pe'], "punto_expedicion"
+    # Validar y formatear las partes fijas (RUC, tipo, est, pe, contribuyente,
+    # fecha, emisión)
+    prefijo, sufijo = _format_invariant_components(
+        request.ruc_emisor, request.tipo_documento, request.establecimiento,
+        request.punto_expedicion, request.fecha_emision, request.tipo_emision,
+        request.tipo_contribuyente
     )
 
     numero_documento = _format_numeric_component(
@@ -106,13 +98,6 @@ def generate_cdc(request: CdcGenerationRequest) -> str:
             request.numero_documento), CDC_COMPONENT_LENGTHS['num'], "numero_documento"
     )
 
-    # Formatear fecha
-    fecha_formatted = _format_fecha_emision(request.fecha_emision)
-
-    # Validar tipo de emisión
-    if not TipoEmision.is_valid(request.tipo_emision):
-        raise ValueError(f"Tipo de emisión inválido: {request.tipo_emision}")
-
     # Generar código de seguridad si no se proporciona
     codigo_seguridad = request.codigo_seguridad
     if codigo_seguridad is None:
@@ -123,11 +108,7 @@ def generate_cdc(request: CdcGenerationRequest) -> str:
                 "Código de seguridad debe tener 9 dígitos numéricos")
 
     # Construir CDC sin dígito verificador
-    cdc_sin_dv = (
-        ruc_result.ruc_base + ruc_result.dv + request.tipo_documento +
-        establecimiento + punto_expedicion + numero_documento +
-        fecha_formatted + request.tipo_emision + codigo_seguridad
-    )
+    cdc_sin_dv = prefijo + numero_documento + sufijo + codigo_seguridad
 
     # Calcular dígito verificador del CDC
     dv_cdc = calculate_cdc_dv(cdc_sin_dv)
@@ -143,6 +124,92 @@ def generate_cdc(request: CdcGenerationRequest) -> str:
     return cdc_final
 
 
+def generate_cdc_range(
+    ruc: str,
+    tipo: str,
+    est: str,
+    pe: str,
+    start: int,
+    end: int,
+    fecha: Union[datetime, date, str],
+    tipo_emision: str = TipoEmision.NORMAL.value,
+    tipo_contribuyente: str = TipoContribuyente.PERSONA_FISICA.value
+) -> List[str]:
+    """
+    Genera los CDCs de un rango de números pre-asignado (start..end inclusive).
+
+    Pensada para rangos reservados con reserve_numero_range: RUC, tipo,
+    establecimiento, punto de expedición, tipo de contribuyente, fecha y
+    tipo de emisión se validan
+    una sola vez, y la suma ponderada de esas partes se calcula una vez.
+    Por CDC solo se suman el número y el código de seguridad (aleatorio,
+    igual que en generate_cdc) mediante tablas precalculadas.
+
+    Args:
+        ruc: RUC del emisor
+        tipo: Tipo de documento (TipoDocumento)
+        est: Código de establecimiento
+        pe: Punto de expedición
+        start: Primer número del rango
+        end: Último número del rango (inclusive)
+        fecha: Fecha de emisión
+        tipo_emision: Tipo de emisión (TipoEmision)
+        tipo_contribuyente: Tipo de contribuyente (TipoContribuyente)
+
+    Returns:
+        List[str]: CDCs en el orden del rango, armados igual que en
+        generate_cdc (componentes más dígito verificador módulo 11)
+
+    Raises:
+        ValueError: Si algún parámetro o el rango es inválido
+
+    Examples:
+        >>> cdcs = generate_cdc_range("80000001", "01", "001", "001",
+        ...                           125, 200, date.today())
+        >>> print(len(cdcs))  # 76
+    """
+    max_numero = 10 ** CDC_COMPONENT_LENGTHS['num'] - 1
+    if start <= 0 or end > max_numero:
+        raise ValueError(
+            f"Rango fuera de límites: los números deben estar entre 1 y {max_numero}")
+    if start > end:
+        raise ValueError("'start' no puede ser mayor que 'end'")
+
+    prefijo, sufijo = _format_invariant_components(
+        ruc, tipo, est, pe, fecha, tipo_emision, tipo_contribuyente)
+
+    num_len = CDC_COMPONENT_LENGTHS['num']
+    num_pos = len(prefijo)
+    seg_pos = num_pos + num_len + len(sufijo)
+    base_sum = _weighted_sum(prefijo, 0) + _weighted_sum(sufijo, num_pos + num_len)
+
+    # Número: parte alta por bloque de 1000, tres dígitos bajos por tabla
+    tres_digitos, bajo_sum = _digit_table(num_pos + num_len - 3)
+    # Código de seguridad: tres grupos aleatorios de 3 dígitos
+    sum1, sum2, sum3 = (_digit_table(seg_pos + 3 * k)[1] for k in range(3))
+    n = end - start + 1
+    grupos = zip(
+        _random_groups(n, MIN_SECURITY_CODE // 10 ** 6, MAX_SECURITY_CODE // 10 ** 6 + 1),
+        _random_groups(n, 0, 1000),
+        _random_groups(n, 0, 1000),
+    )
+    dv_table = [str(0 if r < 2 else 11 - r) for r in range(11)]
+
+    cdcs = []
+    append = cdcs.append
+    for alto in range(start // 1000, end // 1000 + 1):
+        cabeza = f"{prefijo}{alto:0{num_len - 3}d}"
+        suma_alta = base_sum + _weighted_sum(cabeza[num_pos:], num_pos)
+        desde = max(start - alto * 1000, 0)
+        hasta = min(end - alto * 1000, 999)
+        for bajo, (a, b, c) in zip(range(desde, hasta + 1), grupos):
+            total = suma_alta + bajo_sum[bajo] + sum1[a] + sum2[b] + sum3[c]
+            append(cabeza + tres_digitos[bajo] + sufijo + tres_digitos[a] +
+                   tres_digitos[b] + tres_digitos[c] + dv_table[total % 11])
+
+    return cdcs
+
+
 def calculate_cdc_dv(cdc_sin_dv: str) -> str:
     """
     Calcula el dígito verificador de un CDC usando algoritmo módulo 11.
@@ -213,6 +280,93 @@ def generate_security_code() -> str:
 # FUNCIONES AUXILIARES DE FORMATEO
 # ===================================================================
 
+def _format_invariant_components(
+    ruc: str,
+    tipo: str,
+    est: str,
+    pe: str,
+    fecha: Union[datetime, date, str],
+    tipo_emision: str,
+    tipo_contribuyente: str
+) -> tuple:
+    """
+    Valida y formatea las partes del CDC que no dependen del número.
+
+    Returns:
+        tuple: (prefijo RUC+DV+tipo+est+pe, sufijo contribuyente+fecha+emisión)
+
+    Raises:
+        ValueError: Si algún componente es inválido
+    """
+    # Validar y normalizar RUC emisor
+    ruc_result = validate_ruc_complete(ruc)
+    if not ruc_result.is_valid:
+        raise ValueError(f"RUC emisor inválido: {ruc_result.error_message}")
+
+    # Validar tipo de documento
+    if not TipoDocumento.is_valid(tipo):
+        raise ValueError(f"Tipo de documento inválido: {tipo}")
+
+    establecimiento = _format_numeric_component(
+        est, CDC_COMPONENT_LENGTHS['est'], "establecimiento"
+    )
+    punto_expedicion = _format_numeric_component(
+        pe, CDC_COMPONENT_LENGTHS['pe'], "punto_expedicion"
+    )
+    fecha_formatted = _format_fecha_emision(fecha)
+
+    # Validar tipo de emisión
+    if not TipoEmision.is_valid(tipo_emision):
+        raise ValueError(f"Tipo de emisión inválido: {tipo_emision}")
+
+    # Validar tipo de contribuyente
+    if not TipoContribuyente.is_valid(tipo_contribuyente):
+        raise ValueError(
+            f"Tipo de contribuyente inválido: {tipo_contribuyente}")
+
+    prefijo = (ruc_result.ruc_base + ruc_result.dv + tipo +
+               establecimiento + punto_expedicion)
+    return prefijo, tipo_contribuyente + fecha_formatted + tipo_emision
+
+
+def _cdc_factor(position: int) -> int:
+    """Factor módulo 11 de una posición del CDC (cíclico, como calculate_cdc_dv)."""
+    return CDC_MODULO_11_BASE_FACTORS[position % len(CDC_MODULO_11_BASE_FACTORS)]
+
+
+def _weighted_sum(digits: str, start: int) -> int:
+    """Suma ponderada de dígitos ubicados a partir de la posición start."""
+    return sum(int(d) * _cdc_factor(start + i) for i, d in enumerate(digits))
+
+
+def _digit_table(start: int) -> tuple:
+    """
+    Tablas para los valores 000-999 ubicados en las posiciones start..start+2.
+
+    Returns:
+        tuple: (lista de strings de 3 dígitos, lista de sumas ponderadas)
+    """
+    strings = [f"{v:03d}" for v in range(1000)]
+    return strings, [_weighted_sum(v, start) for v in strings]
+
+
+def _random_groups(count: int, low: int, high: int) -> List[int]:
+    """
+    Enteros aleatorios uniformes en [low, high) desde el generador de secrets.
+
+    Se generan en bloque (un pedido de bytes para todo el rango) y se
+    descartan los valores que introducirían sesgo de módulo.
+    """
+    span = high - low
+    limit = 65536 - 65536 % span
+    values: List[int] = []
+    while len(values) < count:
+        raw = array('H', secrets.token_bytes(2 * (count - len(values)) + 64))
+        values.extend(low + v % span for v in raw if v < limit)
+    del values[count:]
+    return values
+
+
 def _format_numeric_component(value: str, expected_length: int, component_name: str) -> str:
     """
     Formatea un componente numérico con ceros a la izquierda.
@@ -329,6 +483,7 @@ def _validate_fecha_format(fecha_str: str) -> bool:
 __all__ = [
     # Función principal
     'generate_cdc',
+    'generate_cdc_range',
 
     # Funciones auxiliares
     'calculate_cdc_dv',
@@ -0,0 +1,3 @@
+"""
+Tests para el módulo CDC
+"""
@@ -0,0 +1,181 @@
+"""
+Tests para el cálculo y la validación vectorizada de CDCs por lotes
+"""
+import importlib
+import sys
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from app.utils.cdc import (
+    CDC_LENGTH,
+    CdcErrorCode,
+    calculate_cdc_dv,
+    generate_cdc_range,
+    validate_cdc,
+)
+from app.utils.cdc import batch
+from app.utils.cdc.types import CDC_MODULO_11_BASE_FACTORS
+
+np = pytest.importorskip("numpy")
+
+RUC = "80016875"
+FECHA = date(2025, 1, 15)
+
+
+def _resto(cuerpo: str) -> int:
+    """Resto módulo 11 de la suma ponderada (referencia de calculate_cdc_dv)"""
+    factores = CDC_MODULO_11_BASE_FACTORS
+    return sum(int(d) * factores[i % len(factores)] for i, d in enumerate(cuerpo)) % 11
+
+
+def _con_digito(cdc: str, pos: int, digito: str) -> str:
+    return cdc[:pos] + digito + cdc[pos + 1:]
+
+
+def _con_dv(cuerpo: str) -> str:
+    return cuerpo + calculate_cdc_dv(cuerpo)
+
+
+@pytest.fixture(scope="module")
+def validos():
+    return generate_cdc_range(RUC, "01", "001", "001", 1, 400, FECHA)
+
+
+@pytest.fixture(scope="module")
+def muestra(validos):
+    """CDCs válidos, cada regla rota por separado y filas mal formadas"""
+    base = validos[0]
+    cuerpo = base[:-1]
+    rotos = [
+        _con_digito(base, CDC_LENGTH - 1, str((int(base[-1]) + 1) % 10)),  # DV
+        _con_dv(cuerpo[:9] + "99" + cuerpo[11:]),         # tipo de documento
+        _con_dv(cuerpo[:25] + "20251345" + cuerpo[33:]),  # fecha (mes 13)
+        _con_dv(cuerpo[:25] + "20230229" + cuerpo[33:]),  # 29/02 no bisiesto
+        _con_dv(cuerpo[:33] + "7" + cuerpo[34:]),         # tipo de emisión
+        _con_dv(_con_digito(cuerpo, 8, str((int(cuerpo[8]) + 1) % 10))),  # DV del RUC
+        base[:20] + "A" + base[21:],                      # no dígito
+        "٣" * CDC_LENGTH,                                 # dígitos no ASCII
+        base[:-1],                                        # 43 dígitos
+        base + "0",                                       # 45 dígitos
+        "",
+        None,
+        int(base),
+    ]
+    return validos + rotos
+
+
+# ===============================================
+# calculate_cdc_dv_array
+# ===============================================
+
+def test_dv_array_coincide_con_calculate_cdc_dv(validos):
+    """Test el DV vectorizado es igual al escalar fila por fila"""
+    cuerpos = [cdc[:-1] for cdc in validos]
+
+    dvs = batch.calculate_cdc_dv_array(cuerpos)
+
+    assert dvs.tolist() == [int(calculate_cdc_dv(c)) for c in cuerpos]
+
+
+def test_dv_array_restos_0_y_1(validos):
+    """Test restos 0 y 1 dan DV 0; el resto 2 da DV 9"""
+    cuerpos = {}
+    for cdc in validos:
+        for pos in range(34, 43):
+            for digito in "0123456789":
+                cuerpo = _con_digito(cdc[:-1], pos, digito)
+                cuerpos.setdefault(_resto(cuerpo), cuerpo)
+    assert {0, 1, 2} <= set(cuerpos)
+
+    dvs = batch.calculate_cdc_dv_array([cuerpos[0], cuerpos[1], cuerpos[2]])
+
+    assert dvs.tolist() == [0, 0, 9]
+    assert [calculate_cdc_dv(cuerpos[r]) for r in (0, 1, 2)] == ["0", "0", "9"]
+
+
+def test_dv_array_filas_mal_formadas():
+    """Test las entradas mal formadas devuelven -1 sin afectar a las demás"""
+    cuerpo = "0" * (CDC_LENGTH - 1)
+    entradas = [cuerpo, cuerpo[:-1], cuerpo + "1", "A" + cuerpo[1:], None, 12345]
+
+    dvs = batch.calculate_cdc_dv_array(entradas)
+
+    assert dvs.tolist() == [int(calculate_cdc_dv(cuerpo)), -1, -1, -1, -1, -1]
+    assert batch.calculate_cdc_dv_array([]).shape == (0,)
+
+
+# ===============================================
+# validate_cdc_array
+# ===============================================
+
+def test_validate_array_coincide_con_validate_cdc(muestra):
+    """Test validez y código de error coinciden con validate_cdc fila por fila"""
+    resultado = batch.validate_cdc_array(muestra)
+    codigos = resultado.error_codes()
+
+    for i, cdc in enumerate(muestra):
+        esperado = validate_cdc(cdc)
+        assert bool(resultado.is_valid[i]) == esperado.is_valid, cdc
+        assert codigos[i] == (None if esperado.is_valid else esperado.error_code), cdc
+
+
+def test_validate_array_reglas_y_dv_esperado(validos, muestra):
+    """Test cada regla rota se marca en su máscara"""
+    resultado = batch.validate_cdc_array(muestra)
+    codigos = resultado.error_codes()[len(validos):].tolist()
+
+    assert resultado.is_valid[:len(validos)].all()
+    assert codigos == [
+        CdcErrorCode.INVALID_CDC_DV,
+        CdcErrorCode.INVALID_DOCUMENT_TYPE,
+        CdcErrorCode.INVALID_DATE_FORMAT,
+        CdcErrorCode.INVALID_DATE_FORMAT,
+        CdcErrorCode.INVALID_EMISSION_TYPE,
+        CdcErrorCode.INVALID_RUC_IN_CDC,
+        CdcErrorCode.INVALID_FORMAT,
+        CdcErrorCode.INVALID_FORMAT,
+        CdcErrorCode.INVALID_LENGTH,
+        CdcErrorCode.INVALID_LENGTH,
+        CdcErrorCode.INVALID_TYPE,
+        CdcErrorCode.INVALID_TYPE,
+        CdcErrorCode.INVALID_TYPE,
+    ]
+    assert resultado.expected_dv[:len(validos)].tolist() == [int(c[-1]) for c in validos]
+    assert (resultado.expected_dv[~resultado.well_formed] == -1).all()
+
+
+def test_validate_array_summary(validos, muestra):
+    """Test el resumen cuenta válidos y errores por código"""
+    summary = batch.validate_cdc_array(muestra).summary()
+
+    assert summary['total'] == len(muestra)
+    assert summary['valid'] == len(validos)
+    assert summary['error_summary'][CdcErrorCode.INVALID_TYPE] == 3
+    assert summary['error_summary'][CdcErrorCode.INVALID_DATE_FORMAT] == 2
+
+
+# ===============================================
+# SIN NUMPY
+# ===============================================
+
+def test_sin_numpy():
+    """Test sin numpy el módulo importa, las funciones por lotes lanzan
+    ImportError y la validación individual sigue funcionando"""
+    try:
+        with patch.dict(sys.modules, {"numpy": None}):
+            sin_numpy = importlib.reload(batch)
+            assert sin_numpy.np is None
+
+            with pytest.raises(ImportError, match="numpy"):
+                sin_numpy.calculate_cdc_dv_array(["0" * (CDC_LENGTH - 1)])
+            with pytest.raises(ImportError, match="numpy"):
+                sin_numpy.validate_cdc_array(["0" * CDC_LENGTH])
+
+            cdc = generate_cdc_range(RUC, "01", "001", "001", 1, 1, FECHA)[0]
+            assert validate_cdc(cdc).is_valid
+    finally:
+        importlib.reload(batch)
+
+    assert batch.np is not None
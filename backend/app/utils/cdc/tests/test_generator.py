@@ -0,0 +1,94 @@
+"""
+Tests para la generación de CDCs (individual y por rangos)
+"""
+from datetime import date
+
+import pytest
+
+from app.utils.cdc import (
+    CDC_LENGTH,
+    CdcGenerationRequest,
+    TipoContribuyente,
+    TipoEmision,
+    extract_cdc_components,
+    generate_cdc,
+    generate_cdc_range,
+    validate_cdc,
+)
+
+RUC = "80016875"
+FECHA = date(2025, 1, 15)
+
+
+def test_generate_cdc_tiene_44_digitos_y_es_valido():
+    """Test generate_cdc produce CDCs que validate_cdc acepta"""
+    cdc = generate_cdc(CdcGenerationRequest(
+        ruc_emisor=RUC,
+        tipo_documento="01",
+        establecimiento="001",
+        punto_expedicion="001",
+        numero_documento=123,
+        fecha_emision=FECHA
+    ))
+
+    assert len(cdc) == CDC_LENGTH
+    assert validate_cdc(cdc).is_valid
+
+
+def test_generate_cdc_range_todos_validos():
+    """Test cada CDC del rango tiene 44 dígitos y pasa validate_cdc"""
+    cdcs = generate_cdc_range(RUC, "01", "001", "001", 995, 2003, FECHA)
+
+    assert len(cdcs) == 2003 - 995 + 1
+    for cdc in cdcs:
+        assert len(cdc) == CDC_LENGTH
+        result = validate_cdc(cdc)
+        assert result.is_valid, result.error_message
+
+
+def test_generate_cdc_range_numeros_en_orden():
+    """Test los números del rango aparecen en orden y sin huecos"""
+    cdcs = generate_cdc_range(RUC, "05", "002", "003", 1, 1500, FECHA)
+
+    numeros = [extract_cdc_components(cdc).get_numero_documento_int() for cdc in cdcs]
+    assert numeros == list(range(1, 1501))
+
+
+@pytest.mark.parametrize("tipo_emision,tipo_contribuyente", [
+    (TipoEmision.NORMAL.value, TipoContribuyente.PERSONA_FISICA.value),
+    (TipoEmision.CONTINGENCIA.value, TipoContribuyente.PERSONA_JURIDICA.value),
+])
+def test_generate_cdc_range_igual_a_generate_cdc(tipo_emision, tipo_contribuyente):
+    """Test con código de seguridad fijo, el rango coincide con generate_cdc"""
+    cdcs = generate_cdc_range(RUC, "01", "001", "001", 990, 1010, FECHA,
+                              tipo_emision=tipo_emision,
+                              tipo_contribuyente=tipo_contribuyente)
+
+    for numero, cdc in zip(range(990, 1011), cdcs):
+        components = extract_cdc_components(cdc)
+        esperado = generate_cdc(CdcGenerationRequest(
+            ruc_emisor=RUC,
+            tipo_documento="01",
+            establecimiento="001",
+            punto_expedicion="001",
+            numero_documento=numero,
+            fecha_emision=FECHA,
+            tipo_emision=tipo_emision,
+            codigo_seguridad=components.codigo_seguridad,
+            tipo_contribuyente=tipo_contribuyente
+        ))
+        assert cdc == esperado
+
+
+@pytest.mark.parametrize("start,end", [(0, 10), (10, 5), (1, 10 ** 7)])
+def test_generate_cdc_range_rango_invalido(start, end):
+    """Test rangos fuera de límites o invertidos"""
+    with pytest.raises(ValueError):
+        generate_cdc_range(RUC, "01", "001", "001", start, end, FECHA)
+
+
+def test_generate_cdc_range_tipo_contribuyente_invalido():
+    """Test tipo de contribuyente fuera del catálogo"""
+    with pytest.raises(ValueError, match="contribuyente"):
+        generate_cdc_range(RUC, "01", "001", "001", 1, 10, FECHA,
+                           tipo_contribuyente="3")
@@ -38,6 +38,7 @@ CDC_COMPONENT_LENGTHS = {
     'est': 3,       # Establecimiento
     'pe': 3,        # Punto expedición
     'num': 7,       # Número documento
+    'contribuyente': 1,  # Tipo contribuyente
     'fecha': 8,     # Fecha YYYYMMDD
     'emision': 1,   # Tipo emisión
     'seguridad': 9,  # Código seguridad
@@ -102,6 +103,31 @@ class TipoDocumento(Enum):
         return result
 
 
+class TipoContribuyente(Enum):
+    """Tipos de contribuyente del emisor."""
+    PERSONA_FISICA = "1"
+    PERSONA_JURIDICA = "2"
+
+    @classmethod
+    def get_descripcion(cls, codigo: str) -> Optional[str]:
+        """Obtiene la descripción de un tipo de contribuyente."""
+        descriptions = {
+            "1": "Persona Física",
+            "2": "Persona Jurídica",
+        }
+        return descriptions.get(codigo)
+
+    @classmethod
+    def is_valid(cls, codigo: str) -> bool:
+        """Verifica si un código de tipo de contribuyente es válido."""
+        return codigo in [item.value for item in cls]
+
+    @classmethod
+    def get_all_codes(cls) -> List[str]:
+        """Obtiene todos los códigos válidos."""
+        return [item.value for item in cls]
+
+
 class TipoEmision(Enum):
     """Tipos de emisión de documentos."""
     NORMAL = "1"
@@ -146,6 +172,7 @@ class CdcComponents:
         establecimiento (str): Código establecimiento (3 dígitos)
         punto_expedicion (str): Punto de expedición (3 dígitos)
         numero_documento (str): Número de documento (7 dígitos)
+        tipo_contribuyente (str): Tipo contribuyente (1 dígito)
         fecha_emision (str): Fecha emisión YYYYMMDD (8 dígitos)
         tipo_emision (str): Tipo emisión (1 dígito)
         codigo_seguridad (str): Código seguridad (9 dígitos)
@@ -157,6 +184,7 @@ class CdcComponents:
     establecimiento: str
     punto_expedicion: str
     numero_documento: str
+    tipo_contribuyente: str
     fecha_emision: str
     tipo_emision: str
     codigo_seguridad: str
@@ -167,7 +195,7 @@ class CdcComponents:
         return (
             self.ruc_emisor + self.dv_ruc + self.tipo_documento +
             self.establecimiento + self.punto_expedicion + self.numero_documento +
-            self.fecha_emision + self.tipo_emision + self.codigo_seguridad +
+            self.tipo_contribuyente + self.fecha_emision + self.tipo_emision + self.codigo_seguridad +
             self.dv_cdc
         )
 
@@ -180,6 +208,7 @@ class CdcComponents:
             len(self.establecimiento) == CDC_COMPONENT_LENGTHS['est'] and
             len(self.punto_expedicion) == CDC_COMPONENT_LENGTHS['pe'] and
             len(self.numero_documento) == CDC_COMPONENT_LENGTHS['num'] and
+            len(self.tipo_contribuyente) == CDC_COMPONENT_LENGTHS['contribuyente'] and
             len(self.fecha_emision) == CDC_COMPONENT_LENGTHS['fecha'] and
             len(self.tipo_emision) == CDC_COMPONENT_LENGTHS['emision'] and
             len(self.codigo_seguridad) == CDC_COMPONENT_LENGTHS['seguridad'] and
@@ -211,6 +240,7 @@ class CdcComponents:
             'establecimiento': self.establecimiento,
             'punto_expedicion': self.punto_expedicion,
             'numero_documento': self.numero_documento,
+            'tipo_contribuyente': self.tipo_contribuyente,
             'fecha_emision': self.fecha_emision,
             'tipo_emision': self.tipo_emision,
             'codigo_seguridad': self.codigo_seguridad,
@@ -235,6 +265,7 @@ class CdcGenerationRequest:
         fecha_emision (Union[datetime, date, str]): Fecha de emisión
         tipo_emision (str): Tipo de emisión (TipoEmision)
         codigo_seguridad (Optional[str]): Código seguridad (auto-generado si None)
+        tipo_contribuyente (str): Tipo de contribuyente (TipoContribuyente)
     """
     ruc_emisor: str
     tipo_documento: str
@@ -244,6 +275,7 @@ class CdcGenerationRequest:
     fecha_emision: Union[datetime, date, str]
     tipo_emision: str = TipoEmision.NORMAL.value
     codigo_seguridad: Optional[str] = None
+    tipo_contribuyente: str = TipoContribuyente.PERSONA_FISICA.value
 
     def __post_init__(self):
         """Validaciones básicas post-inicialización."""
@@ -292,6 +324,11 @@ class CdcGenerationRequest:
         if not TipoEmision.is_valid(self.tipo_emision):
             errors.append(f"Tipo de emisión inválido: {self.tipo_emision}")
 
+        # Validar tipo contribuyente
+        if not TipoContribuyente.is_valid(self.tipo_contribuyente):
+            errors.append(
+                f"Tipo de contribuyente inválido: {self.tipo_contribuyente}")
+
         return errors
 
     def to_dict(self) -> Dict[str, Any]:
@@ -305,6 +342,7 @@ class CdcGenerationRequest:
             'fecha_emision': str(self.fecha_emision),
             'tipo_emision': self.tipo_emision,
             'codigo_seguridad': self.codigo_seguridad,
+            'tipo_contribuyente': self.tipo_contribuyente,
         }
 
 
@@ -397,6 +435,7 @@ __all__ = [
     # Enumeraciones
     'TipoDocumento',
     'TipoEmision',
+    'TipoContribuyente',
 
     # Clases de datos
     'CdcComponents',
@@ -0,0 +1,538 @@
+"""
+Registro local de RUCs de la SET con índice binario en memoria mapeada.
+
+validate_ruc_complete solo verifica formato y DV; confirmar que un RUC
+pertenece a un contribuyente real requiere el servicio consultaRUC. Este
+módulo importa los listados de RUC que publica la SET (archivos rucN.txt,
+sueltos o dentro de rucN.zip) a un índice binario ordenado y compacto, y
+lo consulta con mmap: millones de RUCs sin red ni base de datos.
+
+FORMATO DE LOS LISTADOS SET (una línea por contribuyente):
+    RUC|RAZON SOCIAL|DV|RUC ANTERIOR|ESTADO|
+
+FORMATO DEL ÍNDICE (little-endian):
+    cabecera | RUCs uint32 ordenados | registros | nombres UTF-8 | estados JSON
+    registro = offset nombre (uint32), largo nombre (uint16), DV (uint8),
+               código de estado (uint8)
+
+CARACTERÍSTICAS:
+- Búsqueda binaria O(log n) sobre la columna de RUCs
+- Búsqueda por prefijo
+- Reemplazo atómico del índice desde nuevos listados (refresh)
+
+Uso:
+    registry = configure_ruc_registry("data/ruc.idx")
+    registry.refresh(["ruc0.zip", ..., "ruc9.zip"])
+    record = registry.lookup("80000001-6")
+    if record and record.is_activo: ...
+
+Autor: Sistema de Gestión de Documentos
+Versión: 1.0.0
+Fecha: 2025-07-01
+"""
+
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+# ===================================================================
+# CONSTANTES Y CONFIGURACIÓN
+# ===================================================================
+
+INDEX_MAGIC = b"SIFENRUC"
+INDEX_VERSION = 1
+
+# magic, versión, cantidad, offsets de RUCs/registros/nombres/estados, largo estados
+_HEADER = struct.Struct("<8sIIQQQQI")
+# offset nombre, largo nombre, DV, código de estado
+_RECORD = struct.Struct("<IHBB")
+
+# Estado de un contribuyente habilitado para operar
+ESTADO_ACTIVO = "ACTIVO"
+
+# RUC base máximo representable en el índice (uint32)
+MAX_RUC_BASE = 2 ** 32 - 1
+
+PathLike = Union[str, Path]
+
+
+# ===================================================================
+# CLASES DE DATOS
+# ===================================================================
+
+class RucRecord(NamedTuple):
+    """
+    Contribuyente del registro SET.
+
+    Attributes:
+        ruc (str): RUC base sin DV, tal como lo publica la SET
+        dv (str): Dígito verificador
+        razon_social (str): Nombre o razón social
+        estado (str): Estado (ACTIVO, SUSPENSION TEMPORAL, CANCELADO, ...)
+    """
+    ruc: str
+    dv: str
+    razon_social: str
+    estado: str
+
+    @property
+    def ruc_completo(self) -> str:
+        return f"{self.ruc}-{self.dv}"
+
+    @property
+    def is_activo(self) -> bool:
+        return self.estado == ESTADO_ACTIVO
+
+
+# ===================================================================
+# IMPORTACIÓN DE LISTADOS SET
+# ===================================================================
+
+def _iter_source_lines(source: PathLike) -> Iterator[str]:
+    """Líneas de un listado .txt o de los .txt dentro de un .zip"""
+    path = Path(source)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                if name.lower().endswith(".txt"):
+                    with zf.open(name) as raw:
+                        yield from io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+def parse_ruc_line(line: str) -> Optional[Tuple[int, str, int, str]]:
+    """
+    Interpreta una línea del listado SET.
+
+    Returns:
+        Tuple[int, str, int, str]: (RUC, razón social, DV, estado) o None
+        si la línea no es válida
+    """
+    parts = line.rstrip("\r\n").split("|")
+    if len(parts) < 5:
+        return None
+    ruc, nombre, dv, _, estado = (p.strip() for p in parts[:5])
+    if not ruc.isdigit() or not dv.isdigit() or len(dv) != 1:
+        return None
+    ruc_int = int(ruc)
+    if ruc_int > MAX_RUC_BASE:
+        return None
+    return ruc_int, nombre, int(dv), estado.upper()
+
+
+def build_ruc_index(sources: Iterable[PathLike], output_path: PathLike) -> int:
+    """
+    Construye el índice binario desde listados SET y lo publica de forma atómica.
+
+    El índice se escribe en un archivo temporal del mismo directorio y se
+    reemplaza con os.replace: los lectores ven el índice anterior o el
+    nuevo completo, nunca uno a medio escribir.
+
+    Args:
+        sources: Archivos rucN.txt o rucN.zip
+        output_path: Ruta del índice
+
+    Returns:
+        int: Contribuyentes indexados (un RUC repetido cuenta una vez)
+    """
+    entries: Dict[int, Tuple[str, int, str]] = {}
+    for source in sources:
+        for line in _iter_source_lines(source):
+            parsed = parse_ruc_line(line)
+            if parsed is not None:
+                ruc, nombre, dv, estado = parsed
+                entries[ruc] = (nombre, dv, estado)
+
+    rucs = array("I", sorted(entries))
+    estados: List[str] = []
+    estado_codes: Dict[str, int] = {}
+    records = bytearray(_RECORD.size * len(rucs))
+    names = bytearray()
+    for i, ruc in enumerate(rucs):
+        nombre, dv, estado = entries[ruc]
+        code = estado_codes.get(estado)
+        if code is None:
+            code = estado_codes[estado] = len(estados)
+            estados.append(estado)
+        encoded = nombre.encode("utf-8")[:0xFFFF]
+        _RECORD.pack_into(records, i * _RECORD.size, len(names), len(encoded), dv, code)
+        names += encoded
+    if len(estados) > 256:
+        raise ValueError("El listado tiene más de 256 estados distintos")
+
+    if sys.byteorder != "little":
+        rucs.byteswap()
+    estados_json = json.dumps(estados).encode("utf-8")
+    rucs_offset = _align(_HEADER.size)
+    records_offset = rucs_offset + len(rucs) * rucs.itemsize
+    names_offset = records_offset + len(records)
+    estados_offset = names_offset + len(names)
+    header = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(rucs), rucs_offset,
+                          records_offset, names_offset, estados_offset, len(estados_json))
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=output.name, suffix=".tmp", dir=output.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(rucs_offset, b"\0"))
+            f.write(rucs.tobytes())
+            f.write(records)
+            f.write(names)
+            f.write(estados_json)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(rucs)
+
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+
+# ===================================================================
+# ÍNDICE EN MEMORIA MAPEADA
+# ===================================================================
+
+class _RucIndex:
+    """
+    Vista de solo lectura sobre un archivo de índice
+
+    Los lectores se registran con acquire/release; un índice retirado
+    cierra su mmap cuando termina el último lector.
+    """
+
+    def __init__(self, path: PathLike):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+        self.closed = False
+
+        (magic, version, count, rucs_offset, records_offset,
+         names_offset, estados_offset, estados_len) = _HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._mm.close()
+            raise ValueError(f"Archivo de índice RUC inválido: {path}")
+
+        self.count = count
+        self.size_bytes = len(self._mm)
+        self._records_offset = records_offset
+        self._names_offset = names_offset
+        self.estados: List[str] = json.loads(
+            self._mm[estados_offset:estados_offset + estados_len].decode("utf-8"))
+
+        column = memoryview(self._mm)[rucs_offset:rucs_offset + count * 4]
+        if sys.byteorder == "little":
+            self._rucs: Any = column.cast("I")
+            self._views = [self._rucs, column]
+        else:
+            self._rucs = array("I", column.tobytes())
+            self._rucs.byteswap()
+            column.release()
+
+    def acquire(self) -> bool:
+        """Registra un lector; False si el índice ya se cerró"""
+        with self._lock:
+            if self.closed:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._readers -= 1
+            if self._retired and self._readers == 0:
+                self._close()
+
+    def retire(self) -> None:
+        """Cierra el índice ahora, o al terminar los lectores en curso"""
+        with self._lock:
+            self._retired = True
+            if self._readers == 0:
+                self._close()
+
+    def _close(self) -> None:
+        if self.closed:
+            return
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mm.close()
+        self.closed = True
+
+    def find(self, ruc: int) -> int:
+        """Posición del RUC o -1"""
+        i = bisect_left(self._rucs, ruc)
+        if i < self.count and self._rucs[i] == ruc:
+            return i
+        return -1
+
+    def record(self, i: int) -> RucRecord:
+        name_offset, name_len, dv, code = _RECORD.unpack_from(
+            self._mm, self._records_offset + i * _RECORD.size)
+        start = self._names_offset + name_offset
+        return RucRecord(
+            ruc=str(self._rucs[i]),
+            dv=str(dv),
+            razon_social=self._mm[start:start + name_len].decode("utf-8"),
+            estado=self.estados[code],
+        )
+
+    def range(self, low: int, high: int, limit: int) -> List[RucRecord]:
+        """Registros con low <= RUC < high, hasta limit"""
+        i = bisect_left(self._rucs, low)
+        j = min(bisect_left(self._rucs, high, lo=i), i + limit)
+        return [self.record(k) for k in range(i, j)]
+
+
+def _split_ruc(ruc: Union[str, int]) -> Tuple[Optional[int], Optional[str]]:
+    """
+    RUC base y DV (si viene) desde "80000001-6", "800000016" o "80000001".
+
+    Con 9 dígitos sin guión el último es el DV, como en ruc_utils.
+    """
+    text = str(ruc).strip()
+    dv: Optional[str] = None
+    if "-" in text:
+        text, dv = (part.strip() for part in text.split("-", 1))
+    elif len(text) == 9:
+        text, dv = text[:8], text[8]
+    if not text.isdigit() or (dv is not None and not (dv.isdigit() and len(dv) == 1)):
+        return None, None
+    base = int(text)
+    return (base if base <= MAX_RUC_BASE else None), dv
+
+
+# ===================================================================
+# REGISTRO
+# ===================================================================
+
+class RucRegistry:
+    """
+    Registro de contribuyentes SET respaldado por un índice en mmap.
+
+    Las consultas no toman locks: leen la referencia al índice vigente,
+    que refresh reemplaza de forma atómica.
+    """
+
+    def __init__(self, index_path: PathLike):
+        """
+        Args:
+            index_path: Ruta del índice (se abre si existe)
+        """
+        self.index_path = Path(index_path)
+        self._index: Optional[_RucIndex] = None
+        self._refresh_lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'refreshes': 0}
+        if self.index_path.exists():
+            self._open()
+
+    def _open(self) -> None:
+        previous = self._index
+        self._index = _RucIndex(self.index_path)
+        self._loaded_at = time.time()
+        if previous is not None:
+            previous.retire()
+
+    @contextmanager
+    def _reading(self) -> Iterator[Optional[_RucIndex]]:
+        """Índice vigente, protegido de cierre mientras se lee"""
+        while True:
+            index = self._index
+            if index is None or index.acquire():
+                break
+        try:
+            yield index
+        finally:
+            if index is not None:
+                index.release()
+
+    def close(self) -> None:
+        """Cierra el índice (las consultas en curso terminan antes)"""
+        with self._refresh_lock:
+            index, self._index = self._index, None
+            if index is not None:
+                index.retire()
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def __len__(self) -> int:
+        index = self._index
+        return index.count if index else 0
+
+    def lookup(self, ruc: Union[str, int]) -> Optional[RucRecord]:
+        """
+        Busca un contribuyente por RUC.
+
+        Args:
+            ruc: RUC con o sin DV ("80000001-6", "800000016", "80000001")
+
+        Returns:
+            Optional[RucRecord]: Contribuyente, o None si no está registrado
+            o el índice no está cargado
+        """
+        self._stats['lookups'] += 1
+        base, _ = _split_ruc(ruc)
+        with self._reading() as index:
+            pos = index.find(base) if index is not None and base is not None else -1
+            if pos < 0:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return index.record(pos)
+
+    def verify(self, ruc: Union[str, int], dv: Optional[str] = None) -> Tuple[bool, str]:
+        """
+        Verifica que el RUC exista, que el DV coincida y que esté activo.
+
+        Args:
+            ruc: RUC con o sin DV
+            dv: DV (si no viene incluido en ruc)
+
+        Returns:
+            Tuple[bool, str]: (válido, motivo si no lo es)
+        """
+        record = self.lookup(ruc)
+        if record is None:
+            return False, "RUC no registrado en la SET"
+        dv = dv if dv is not None else _split_ruc(ruc)[1]
+        if dv is not None and str(dv) != record.dv:
+            return False, f"Dígito verificador no coincide con la SET (esperado {record.dv})"
+        if not record.is_activo:
+            return False, f"Contribuyente en estado {record.estado}"
+        return True, ""
+
+    def prefix_search(self, prefix: str, limit: int = 50) -> List[RucRecord]:
+        """
+        RUCs que empiezan con prefix (en su forma sin ceros a la izquierda).
+
+        Args:
+            prefix: Dígitos iniciales del RUC
+            limit: Máximo de resultados
+
+        Returns:
+            List[RucRecord]: Coincidencias, de menor a mayor longitud y RUC
+        """
+        prefix = prefix.strip()
+        if not prefix.isdigit() or prefix.startswith("0") or limit <= 0:
+            return []
+
+        results: List[RucRecord] = []
+        value = int(prefix)
+        max_digits = len(str(MAX_RUC_BASE))
+        with self._reading() as index:
+            if index is None:
+                return []
+            for extra in range(max_digits - len(prefix) + 1):
+                scale = 10 ** extra
+                low = value * scale
+                if low > MAX_RUC_BASE:
+                    break
+                results.extend(index.range(low, (value + 1) * scale, limit - len(results)))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def refresh(self, sources: Optional[Iterable[PathLike]] = None) -> int:
+        """
+        Recarga el índice; con sources, lo reconstruye antes desde los listados.
+
+        Las consultas en curso terminan sobre el índice anterior, que se
+        cierra (mmap incluido) cuando termina la última.
+
+        Returns:
+            int: Contribuyentes en el índice vigente
+        """
+        with self._refresh_lock:
+            if sources is not None:
+                build_ruc_index(sources, self.index_path)
+            self._open()
+            self._stats['refreshes'] += 1
+        return len(self)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamaño del índice y métricas de consultas"""
+        index = self._index
+        stats: Dict[str, Any] = dict(self._stats)
+        stats.update({
+            'ready': index is not None,
+            'entries': index.count if index else 0,
+            'size_bytes': index.size_bytes if index else 0,
+            'estados': list(index.estados) if index else [],
+            'loaded_at': self._loaded_at,
+            'index_path': str(self.index_path),
+        })
+        return stats
+
+
+# ===================================================================
+# REGISTRO DEL PROCESO
+# ===================================================================
+
+_registry: Optional[RucRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def configure_ruc_registry(index_path: PathLike) -> RucRegistry:
+    """Configura el registro del proceso sobre un índice"""
+    global _registry
+    with _registry_lock:
+        previous, _registry = _registry, RucRegistry(index_path)
+    if previous is not None:
+        previous.close()
+    return _registry
+
+
+def get_ruc_registry() -> Optional[RucRegistry]:
+    """Registro del proceso, o None si no se configuró"""
+    return _registry
+
+
+def reset_ruc_registry() -> None:
+    """Descarta el registro del proceso (usado en tests)"""
+    global _registry
+    with _registry_lock:
+        previous, _registry = _registry, None
+    if previous is not None:
+        previous.close()
+
+
+# ===================================================================
+# CONSTANTES PARA EXPORT
+# ===================================================================
+
+__all__ = [
+    'RucRecord',
+    'RucRegistry',
+    'ESTADO_ACTIVO',
+    'parse_ruc_line',
+    'build_ruc_index',
+    'configure_ruc_registry',
+    'get_ruc_registry',
+    'reset_ruc_registry',
+]
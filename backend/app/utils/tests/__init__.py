@@ -0,0 +1,3 @@
+"""
+Tests para las utilidades compartidas
+"""
@@ -0,0 +1,206 @@
+"""
+Tests para el registro local de RUCs (índice binario en mmap)
+"""
+import zipfile
+
+import pytest
+
+from app.utils.ruc_registry import (
+    ESTADO_ACTIVO,
+    RucRegistry,
+    build_ruc_index,
+    configure_ruc_registry,
+    get_ruc_registry,
+    parse_ruc_line,
+    reset_ruc_registry,
+)
+
+LISTADO = (
+    "80000001|EMPRESA DE PRUEBA S.A.|6|80000001|ACTIVO|\n"
+    "1234567|JUAN PÉREZ|0|1234567|ACTIVO|\n"
+    "1234|MARÍA GÓMEZ|3||SUSPENSION TEMPORAL|\n"
+    "12345|COMERCIAL DOCE|9||CANCELADO|\n"
+    "línea inválida\n"
+    "ABC|SIN RUC|1||ACTIVO|\n"
+)
+
+
+@pytest.fixture
+def listado(tmp_path):
+    path = tmp_path / "ruc0.txt"
+    path.write_text(LISTADO, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def registry(tmp_path, listado):
+    index_path = tmp_path / "ruc.idx"
+    build_ruc_index([listado], index_path)
+    registry = RucRegistry(index_path)
+    yield registry
+    registry.close()
+
+
+@pytest.fixture(autouse=True)
+def _limpiar_registro():
+    yield
+    reset_ruc_registry()
+
+
+# ===============================================
+# build_ruc_index
+# ===============================================
+
+def test_parse_ruc_line():
+    """Test interpretación de líneas del listado SET"""
+    assert parse_ruc_line("80000001|EMPRESA|6|80000001|activo|") == (
+        80000001, "EMPRESA", 6, "ACTIVO")
+    assert parse_ruc_line("línea inválida") is None
+    assert parse_ruc_line("80000001|EMPRESA|66||ACTIVO|") is None
+    assert parse_ruc_line("99999999999|EMPRESA|1||ACTIVO|") is None
+
+
+def test_build_ruc_index_desde_txt_y_zip(tmp_path, listado):
+    """Test se indexan .txt y .txt dentro de .zip; un RUC repetido cuenta una vez"""
+    zip_path = tmp_path / "ruc1.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        zf.writestr("ruc1.txt", "5000000|OTRA EMPRESA|2||ACTIVO|\n"
+                                "1234|MARÍA GÓMEZ|3||ACTIVO|\n")
+        zf.writestr("LEEME.pdf", b"no es un listado")
+
+    index_path = tmp_path / "data" / "ruc.idx"
+    count = build_ruc_index([listado, zip_path], index_path)
+
+    assert count == 5
+    assert index_path.exists()
+    assert not list(index_path.parent.glob("*.tmp"))
+
+    registry = RucRegistry(index_path)
+    try:
+        assert len(registry) == 5
+        # El último listado gana para un RUC repetido
+        assert registry.lookup("1234").estado == ESTADO_ACTIVO
+    finally:
+        registry.close()
+
+
+def test_indice_invalido(tmp_path):
+    """Test un archivo que no es índice se rechaza"""
+    path = tmp_path / "ruc.idx"
+    path.write_bytes(b"X" * 128)
+
+    with pytest.raises(ValueError):
+        RucRegistry(path)
+
+
+# ===============================================
+# lookup / verify
+# ===============================================
+
+@pytest.mark.parametrize("ruc", ["80000001", "80000001-6", "800000016", 80000001])
+def test_lookup_formatos(registry, ruc):
+    """Test lookup acepta RUC con o sin DV"""
+    record = registry.lookup(ruc)
+
+    assert record.ruc == "80000001"
+    assert record.dv == "6"
+    assert record.razon_social == "EMPRESA DE PRUEBA S.A."
+    assert record.ruc_completo == "80000001-6"
+    assert record.is_activo
+
+
+def test_lookup_no_registrado(registry):
+    """Test RUCs inexistentes o mal formados"""
+    assert registry.lookup("99999999") is None
+    assert registry.lookup("ABC") is None
+    assert registry.lookup("1234567").razon_social == "JUAN PÉREZ"
+
+    stats = registry.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+
+def test_verify(registry):
+    """Test existencia, DV y estado"""
+    assert registry.verify("80000001-6") == (True, "")
+    assert registry.verify("80000001", dv="6") == (True, "")
+
+    valido, motivo = registry.verify("80000001-5")
+    assert not valido and "esperado 6" in motivo
+
+    valido, motivo = registry.verify("1234-3")
+    assert not valido and "SUSPENSION TEMPORAL" in motivo
+
+    valido, motivo = registry.verify("99999999")
+    assert not valido and "no registrado" in motivo
+
+
+def test_registro_sin_indice(tmp_path):
+    """Test sin archivo de índice el registro no está listo"""
+    registry = RucRegistry(tmp_path / "no-existe.idx")
+
+    assert not registry.ready
+    assert registry.lookup("80000001") is None
+    assert registry.prefix_search("8") == []
+
+
+# ===============================================
+# prefix_search
+# ===============================================
+
+def test_prefix_search(registry):
+    """Test coincidencias por prefijo, de menor a mayor longitud"""
+    rucs = [record.ruc for record in registry.prefix_search("1234")]
+    assert rucs == ["1234", "12345", "1234567"]
+
+    assert [r.ruc for r in registry.prefix_search("1234", limit=2)] == ["1234", "12345"]
+    assert [r.ruc for r in registry.prefix_search("8")] == ["80000001"]
+
+
+@pytest.mark.parametrize("prefix,limit", [("", 10), ("0", 10), ("12a", 10), ("1", 0)])
+def test_prefix_search_invalido(registry, prefix, limit):
+    """Test prefijos vacíos, con cero inicial o no numéricos"""
+    assert registry.prefix_search(prefix, limit=limit) == []
+
+
+# ===============================================
+# refresh
+# ===============================================
+
+def test_refresh_reemplaza_y_cierra_indice_anterior(registry, tmp_path):
+    """Test refresh publica el nuevo índice y cierra el mmap anterior"""
+    anterior = registry._index
+    nuevo = tmp_path / "ruc2.txt"
+    nuevo.write_text("7000000|NUEVA S.R.L.|4||ACTIVO|\n", encoding="utf-8")
+
+    assert registry.refresh([nuevo]) == 1
+
+    assert anterior.closed
+    assert registry.lookup("7000000").razon_social == "NUEVA S.R.L."
+    assert registry.lookup("80000001") is None
+    assert registry.get_stats()['refreshes'] == 1
+
+
+def test_refresh_espera_lectores_en_curso(registry, tmp_path):
+    """Test el índice anterior se cierra recién al terminar la lectura en curso"""
+    nuevo = tmp_path / "ruc2.txt"
+    nuevo.write_text("7000000|NUEVA S.R.L.|4||ACTIVO|\n", encoding="utf-8")
+
+    with registry._reading() as anterior:
+        registry.refresh([nuevo])
+        assert not anterior.closed
+        assert anterior.record(anterior.find(80000001)).dv == "6"
+
+    assert anterior.closed
+
+
+def test_registro_del_proceso(registry):
+    """Test configure/get/reset del registro compartido"""
+    configurado = configure_ruc_registry(registry.index_path)
+
+    assert get_ruc_registry() is configurado
+    assert configurado.lookup("80000001-6") is not None
+
+    reset_ruc_registry()
+    assert get_ruc_registry() is None
+    assert configurado._index is None